@@ -0,0 +1,449 @@
+"""
+End-to-end benchmark suite for the collector and storage paths.
+
+Runs against a local simulated RSCM farm and writes machine-readable results,
+then compares them with the stored baselines and exits non-zero on regression.
+
+    python benchmarks/run_benchmarks.py                      # run and compare
+    python benchmarks/run_benchmarks.py --sizes 10,100       # smaller run
+    python benchmarks/run_benchmarks.py --update-baselines   # record new baselines
+"""
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import subprocess
+import logging
+import argparse
+import platform
+import datetime
+import tempfile
+
+# Set up proper paths (same layout as run.py)
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(base_dir, "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from rack_power_monitor.core.monitor import RackPowerMonitor
+from rack_power_monitor.core.timeseries import ColumnarStore
+from rack_power_monitor.core.sqlite_store import SQLiteStore
+from rack_power_monitor.core.gorilla import CompressedSeries
+from rack_power_monitor.simulator import RSCMFarm, FarmProfile, run_collector_benchmark
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINES_PATH = os.path.join(BENCHMARK_DIR, "baselines.json")
+RESULTS_PATH = os.path.join(BENCHMARK_DIR, "results", "latest.json")
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_TOLERANCE = 0.30
+
+# Timings this small are dominated by scheduler noise; allow this much absolute slack
+NOISE_FLOOR_SECONDS = 0.05
+
+
+def _metric(value, unit, better):
+    """Build a metric entry."""
+    return {'value': value, 'unit': unit, 'better': better}
+
+
+def _free_port():
+    """Find a free TCP port for the farm."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _raise_file_limit():
+    """Raise the open file limit; each polled RSCM keeps a pooled connection open."""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def _start_farm_process(farm, latency):
+    """Serve the farm from a separate process so it doesn't share CPU or file descriptors with the collector."""
+    cmd = [
+        sys.executable, "-u", "-m", "rack_power_monitor.simulator", "--log-level", "ERROR", "serve",
+        "--count", str(farm.count), "--port", str(farm.port), "--mode", farm.mode,
+        "--latency", latency, "--seed", "1"
+    ]
+    env = dict(os.environ, PYTHONPATH=src_dir + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env)
+
+    # The simulator prints a line once it is listening
+    line = process.stdout.readline()
+    if not line.startswith("Serving"):
+        process.kill()
+        raise RuntimeError(f"Simulated farm failed to start: {line}{process.stdout.read()}")
+    return process
+
+
+def bench_poll_cycle(size, latency="fixed:2", concurrency=64):
+    """Time one steady-state poll cycle for `size` racks against a local farm."""
+    # Every RSCM on its own loopback address needs Linux; elsewhere use one port per RSCM
+    mode = "single-port" if sys.platform.startswith("linux") else "multi-port"
+    if mode == "multi-port" and size > 1000:
+        print(f"  skipping {size} racks: needs single-port mode (Linux)")
+        return {}
+
+    # Local farm object describes the addresses; the process serves them
+    farm = RSCMFarm(size, FarmProfile(latency=latency, seed=1), port=_free_port(), mode=mode)
+    process = _start_farm_process(farm, latency)
+    try:
+        # The first cycle negotiates protocols and opens connections; the
+        # second is the steady state we care about
+        results = run_collector_benchmark(
+            farm,
+            cycles=2,
+            max_concurrent_polls=concurrency,
+            cycle_deadline_seconds=600,
+            api_settings={'timeout_seconds': 30, 'max_connections': 100}
+        )
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    steady = results['cycles'][-1]
+    if steady['succeeded'] != size:
+        raise RuntimeError(f"Poll cycle for {size} racks only got {steady['succeeded']} readings")
+
+    return {
+        f'poll_cycle_{size}_seconds': _metric(steady['wall_seconds'], 's', 'lower'),
+        # Throughput of tiny farms is too noisy to gate on; report it only
+        f'poll_cycle_{size}_readings_per_second': _metric(
+            steady['readings_per_second'], 'readings/s', 'higher' if size >= 1000 else 'info'
+        ),
+        f'poll_cycle_{size}_first_cycle_seconds': _metric(results['cycles'][0]['wall_seconds'], 's', 'lower')
+    }
+
+
+def bench_csv_save(rows=20000, racks=10):
+    """Measure RackPowerMonitor._save_to_csv throughput, end to end and on the caller's side."""
+    data_dir = tempfile.mkdtemp(prefix="rpm-bench-csv-")
+    try:
+        monitor = RackPowerMonitor()
+        monitor.data_dir = data_dir
+        monitor.reset_session()
+
+        timestamp = datetime.datetime.now()
+        rack_names = [f"BENCH{i:03d}" for i in range(racks)]
+        start = time.perf_counter()
+        for i in range(rows):
+            monitor._save_to_csv(rack_names[i % racks], timestamp, 8000.0 + i % 500)
+        # Time the polling loop spends handing rows to the writer thread
+        enqueued = time.perf_counter() - start
+        # Queued rows only count once they are on disk
+        monitor.flush_data(close=True)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    return {
+        'csv_save_rows_per_second': _metric(rows / elapsed, 'rows/s', 'higher'),
+        'csv_save_us_per_row': _metric(elapsed / rows * 1e6, 'us', 'lower'),
+        'csv_save_enqueue_us_per_row': _metric(enqueued / rows * 1e6, 'us', 'lower')
+    }
+
+
+def bench_columnar_query(racks=100, days=30, repeats=3):
+    """Time a month-long query over many racks from the columnar store, against parsing the same data from CSV."""
+    import numpy as np
+    import pandas as pd
+
+    data_dir = tempfile.mkdtemp(prefix="rpm-bench-columnar-")
+    try:
+        store = ColumnarStore(os.path.join(data_dir, "columnar"), part_rows=10 ** 9)
+        end = int(time.time()) // 86400 * 86400
+        epoch = np.arange(end - days * 86400, end, 60, dtype=np.int64)
+        watts = (8000 + 500 * np.sin(epoch / 600.0)).astype(np.float32)
+        rack_names = [f"BENCH{i:03d}" for i in range(racks)]
+        for rack in rack_names:
+            store.append(rack, epoch, watts)
+        store.flush()
+
+        # The same readings as session CSVs
+        csv_dir = os.path.join(data_dir, "csv")
+        os.makedirs(csv_dir)
+        text_timestamps = pd.Series(pd.to_datetime(epoch, unit='s')).dt.strftime("%Y-%m-%d %H:%M:%S")
+        for rack in rack_names:
+            pd.DataFrame({'Timestamp': text_timestamps, 'Power (W)': watts}).to_csv(
+                os.path.join(csv_dir, f"{rack}_20260101_000000.csv"), index=False)
+
+        # Best of several runs; the first run also pays for page faults
+        columnar_seconds = csv_seconds = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            rows = len(store.read(rack_names))
+            columnar_seconds = min(columnar_seconds, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for rack in rack_names:
+                df = pd.read_csv(os.path.join(csv_dir, f"{rack}_20260101_000000.csv"))
+                df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+            csv_seconds = min(csv_seconds, time.perf_counter() - start)
+
+        if rows != racks * len(epoch):
+            raise RuntimeError(f"Columnar query returned {rows} rows, expected {racks * len(epoch)}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    return {
+        'columnar_query_month_seconds': _metric(columnar_seconds, 's', 'lower'),
+        'columnar_query_rows_per_second': _metric(rows / columnar_seconds, 'rows/s', 'higher'),
+        'csv_query_month_seconds': _metric(csv_seconds, 's', 'info')
+    }
+
+
+def bench_rollup_query(racks=10, days=90, chart_points=2000, repeats=3):
+    """Time a 90-day fleet chart from the SQLite rollups, against reading the raw readings."""
+    import numpy as np
+
+    data_dir = tempfile.mkdtemp(prefix="rpm-bench-rollups-")
+    try:
+        store = SQLiteStore(os.path.join(data_dir, "bench.db"), batch_rows=10 ** 9)
+        end = int(time.time()) // 86400 * 86400
+        epoch = np.arange(end - days * 86400, end, 60, dtype=np.int64)
+        watts = 8000 + 500 * np.sin(epoch / 600.0)
+        rack_names = [f"BENCH{i:03d}" for i in range(racks)]
+
+        start = time.perf_counter()
+        for rack in rack_names:
+            store.append(rack, epoch, watts)
+            store.flush()
+        insert_seconds = time.perf_counter() - start
+
+        resolution = days * 86400 / chart_points
+        rollup_seconds = raw_seconds = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            rows = len(store.read_resampled(rack_names, resolution_seconds=resolution))
+            rollup_seconds = min(rollup_seconds, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            raw_rows = len(store.read(rack_names))
+            raw_seconds = min(raw_seconds, time.perf_counter() - start)
+        store.close()
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    return {
+        'rollup_query_90d_seconds': _metric(rollup_seconds, 's', 'lower'),
+        'rollup_query_90d_rows': _metric(rows, 'rows', 'info'),
+        'raw_query_90d_seconds': _metric(raw_seconds, 's', 'info'),
+        'raw_query_90d_rows': _metric(raw_rows, 'rows', 'info'),
+        'sqlite_insert_rows_per_second': _metric(raw_rows / insert_seconds, 'rows/s', 'higher')
+    }
+
+
+def bench_gorilla_encoding(points=100000, repeats=3):
+    """Measure Gorilla series size per point and encode/decode throughput, against CSV text and tuples."""
+    import numpy as np
+
+    rng = np.random.default_rng(42)
+    epoch = int(time.time()) // 60 * 60 + np.arange(points, dtype=np.int64) * 60
+    # Readings as RSCMs report them: whole watts that often repeat
+    watts = np.round(8000 + 500 * np.sin(epoch / 3600.0) + rng.normal(0, 20, points))
+
+    encode_seconds = decode_seconds = float('inf')
+    for _ in range(repeats):
+        series = CompressedSeries()
+        start = time.perf_counter()
+        series.extend(epoch, watts)
+        encode_seconds = min(encode_seconds, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        decoded_epoch, decoded_watts = series.to_arrays()
+        decode_seconds = min(decode_seconds, time.perf_counter() - start)
+
+    if not (np.array_equal(decoded_epoch, epoch) and np.array_equal(decoded_watts, watts)):
+        raise RuntimeError("Gorilla round trip changed the series")
+
+    timestamps = [datetime.datetime.fromtimestamp(ts) for ts in epoch[:1000].tolist()]
+    csv_bytes = sum(len(f"{ts:%Y-%m-%d %H:%M:%S},{w}\n") for ts, w in zip(timestamps, watts[:1000].tolist()))
+    # A (datetime, float) tuple in a list: list slot, tuple, datetime and float objects
+    tuple_bytes = 8 + sys.getsizeof((timestamps[0], 0.0)) + sys.getsizeof(timestamps[0]) + sys.getsizeof(0.0)
+
+    return {
+        'gorilla_bytes_per_point': _metric(len(series.to_bytes()) / points, 'B', 'lower'),
+        'gorilla_encode_points_per_second': _metric(points / encode_seconds, 'points/s', 'higher'),
+        'gorilla_decode_points_per_second': _metric(points / decode_seconds, 'points/s', 'higher'),
+        'csv_bytes_per_point': _metric(csv_bytes / 1000, 'B', 'info'),
+        'tuple_bytes_per_point': _metric(tuple_bytes, 'B', 'info')
+    }
+
+
+def bench_update_data(points=300):
+    """Measure MonitorTab._update_data dispatch (chart and statistics refresh) per reading."""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        print(f"  skipping MonitorTab._update_data: no display ({e})")
+        return {}
+
+    from rack_power_monitor.gui.monitor_tab import MonitorTab
+
+    class BenchApp:
+        """Minimal host for a MonitorTab outside the main window."""
+
+        def __init__(self):
+            self.config = {
+                'data_dir': tempfile.mkdtemp(prefix="rpm-bench-ui-"),
+                'rscm_list': [{'name': 'BENCH', 'address': '127.0.0.1'}],
+                'monitoring': {},
+                'api': {}
+            }
+
+        def set_status(self, message):
+            pass
+
+    app = BenchApp()
+    try:
+        root.withdraw()
+        tab = MonitorTab(root, app)
+        tab._create_rack_tab_without_showing('BENCH', '127.0.0.1')
+
+        timestamp = datetime.datetime.now()
+        start = time.perf_counter()
+        for i in range(points):
+            tab._update_data('BENCH', '127.0.0.1', timestamp + datetime.timedelta(seconds=i), 8000.0 + i % 50)
+            root.update_idletasks()
+        elapsed = time.perf_counter() - start
+        tab.collector.shutdown()
+    finally:
+        root.destroy()
+        shutil.rmtree(app.config['data_dir'], ignore_errors=True)
+
+    return {
+        'update_data_ms_per_reading': _metric(elapsed / points * 1000, 'ms', 'lower')
+    }
+
+
+def compare(results, baselines, tolerance):
+    """Compare results against baselines. Returns a list of regression messages."""
+    regressions = []
+    for name, baseline in baselines.get('metrics', {}).items():
+        result = results.get(name)
+        if result is None or baseline['better'] == 'info':
+            continue
+        allowed = baseline.get('tolerance', tolerance)
+        if baseline['better'] == 'lower':
+            limit = baseline['value'] * (1 + allowed)
+            if baseline['unit'] == 's':
+                limit = max(limit, baseline['value'] + NOISE_FLOOR_SECONDS)
+            failed = result['value'] > limit
+        else:
+            limit = baseline['value'] * (1 - allowed)
+            failed = result['value'] < limit
+
+        status = "REGRESSION" if failed else "ok"
+        print(f"  {status:10s} {name}: {result['value']:.4g} {result['unit']} "
+              f"(baseline {baseline['value']:.4g}, limit {limit:.4g})")
+        if failed:
+            regressions.append(f"{name}: {result['value']:.4g} {result['unit']} vs baseline "
+                               f"{baseline['value']:.4g} (limit {limit:.4g})")
+    return regressions
+
+
+def main(argv=None):
+    """Run the benchmark suite."""
+    parser = argparse.ArgumentParser(description="Rack Power Monitor benchmark suite")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma-separated rack counts for the poll cycle benchmark")
+    parser.add_argument("--skip", default="", help="Comma-separated benchmarks to skip (poll,csv,query,rollup,gorilla,ui)")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help=f"Allowed relative slowdown before failing (default from baselines or {DEFAULT_TOLERANCE})")
+    parser.add_argument("--output", default=RESULTS_PATH, help="Results file")
+    parser.add_argument("--baselines", default=BASELINES_PATH, help="Baselines file")
+    parser.add_argument("--update-baselines", action="store_true", help="Store these results as the new baselines")
+    args = parser.parse_args(argv)
+
+    # Per-reading INFO logging would dominate the timings
+    logging.basicConfig(level=logging.ERROR)
+    logging.getLogger("power_monitor").setLevel(logging.ERROR)
+    _raise_file_limit()
+
+    skip = {s.strip() for s in args.skip.split(',') if s.strip()}
+    results = {}
+
+    if 'poll' not in skip:
+        for size in (int(s) for s in args.sizes.split(',') if s.strip()):
+            print(f"Poll cycle: {size} racks")
+            results.update(bench_poll_cycle(size))
+    if 'csv' not in skip:
+        print("CSV persistence")
+        results.update(bench_csv_save())
+    if 'query' not in skip:
+        print("Columnar query")
+        results.update(bench_columnar_query())
+    if 'rollup' not in skip:
+        print("Rollup query")
+        results.update(bench_rollup_query())
+    if 'gorilla' not in skip:
+        print("Gorilla encoding")
+        results.update(bench_gorilla_encoding())
+    if 'ui' not in skip:
+        print("MonitorTab._update_data")
+        results.update(bench_update_data())
+
+    report = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'machine': {
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count()
+        },
+        'metrics': results
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.update_baselines:
+        # Merge so a partial run only replaces the metrics it measured
+        baselines = {'metrics': {}}
+        if os.path.exists(args.baselines):
+            with open(args.baselines) as f:
+                baselines = json.load(f)
+        baselines['metrics'].update(results)
+        baselines.update({
+            'tolerance': args.tolerance if args.tolerance is not None else baselines.get('tolerance', DEFAULT_TOLERANCE),
+            'recorded': report['timestamp'],
+            'machine': report['machine']
+        })
+        with open(args.baselines, 'w') as f:
+            json.dump(baselines, f, indent=2)
+        print(f"Baselines updated in {args.baselines}")
+        return 0
+
+    if not os.path.exists(args.baselines):
+        print("No baselines found; run with --update-baselines to record them")
+        return 0
+
+    with open(args.baselines) as f:
+        baselines = json.load(f)
+    tolerance = args.tolerance if args.tolerance is not None else baselines.get('tolerance', DEFAULT_TOLERANCE)
+
+    print("Comparing against baselines")
+    regressions = compare(results, baselines, tolerance)
+    if regressions:
+        print("\nPERFORMANCE REGRESSION DETECTED:")
+        for message in regressions:
+            print(f"  - {message}")
+        return 1
+
+    print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,542 @@
+import os
+import csv
+import time
+import sqlite3
+import logging
+import threading
+
+from .timeseries import parse_session_filename
+
+logger = logging.getLogger("power_monitor")
+
+# Catalog database kept in the data folder
+CATALOG_FILENAME = "session_catalog.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    mtime_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    rack TEXT,
+    session TEXT,
+    size INTEGER NOT NULL DEFAULT 0,
+    mtime REAL,
+    first_time TEXT,
+    last_time TEXT,
+    row_count INTEGER,
+    error_count INTEGER,
+    min_power REAL,
+    max_power REAL,
+    sum_power REAL,
+    stats_size INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_by_folder ON files(folder, name);
+CREATE INDEX IF NOT EXISTS files_by_rack ON files(rack);
+CREATE INDEX IF NOT EXISTS files_by_mtime ON files(folder, mtime);
+-- Per-rack, per-month archives written by the retention service
+CREATE TABLE IF NOT EXISTS archives (
+    path TEXT PRIMARY KEY,
+    rack TEXT NOT NULL,
+    month TEXT NOT NULL,
+    first_ts INTEGER NOT NULL,
+    last_ts INTEGER NOT NULL,
+    row_count INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS archives_by_rack ON archives(rack, month);
+"""
+
+_FILE_COLUMNS = ("path", "folder", "name", "rack", "session", "size", "mtime", "first_time", "last_time",
+                 "row_count", "error_count", "min_power", "max_power", "sum_power", "stats_size")
+
+_UPSERT_FILE = (
+    f"INSERT OR REPLACE INTO files ({', '.join(_FILE_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in _FILE_COLUMNS)})"
+)
+
+
+def _file_identity(path):
+    """Rack and session of a CSV file name; the rack falls back to the text before the first '_'."""
+    name = os.path.basename(path)
+    parsed = parse_session_filename(name)
+    if parsed:
+        return parsed[0], parsed[1].strftime("%Y-%m-%d %H:%M:%S")
+    return name.split('_')[0], None
+
+
+class SessionCatalog:
+    """Persistent catalog of the session CSVs in a data folder.
+
+    Each file's rack, session, size, time range, row count and power summary
+    are kept in a small SQLite database, so listing and filtering sessions is
+    an index lookup instead of a directory scan with a stat per file.
+
+    The CSV writer reports every batch it writes, which keeps the entries of
+    files written by this process current. Everything else is reconciled
+    lazily: before a listing, folders whose modification time changed (files
+    added or removed) are rescanned, at most once per reconcile interval.
+    Files changed in place by other programs are picked up by refresh_file().
+    Summary stats of files found by a scan are computed when first asked for.
+
+    The catalog also indexes the monthly archives of the retention service.
+    """
+
+    def __init__(self, root, reconcile_interval_seconds=5.0, flush_interval_seconds=5.0, clock=time.monotonic):
+        """Open or create the catalog.
+
+        Args:
+            root: Data folder; the folder itself and its session_* subfolders are cataloged
+            reconcile_interval_seconds: Minimum time between filesystem reconciliations
+            flush_interval_seconds: Write reported batches to the database at least this often
+            clock: Monotonic clock for both intervals
+        """
+        self.root = os.path.abspath(root)
+        self.reconcile_interval_seconds = reconcile_interval_seconds
+        self.flush_interval_seconds = flush_interval_seconds
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._dirty = {}  # path -> file entry dict waiting to be written
+        self._oldest_dirty = None
+        self._last_reconcile = None
+
+        os.makedirs(self.root, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(self.root, CATALOG_FILENAME), timeout=30,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _is_cataloged(self, path):
+        """Whether a file is in the root or one of its session folders."""
+        folder = os.path.dirname(path)
+        return folder == self.root or (os.path.dirname(folder) == self.root
+                                       and os.path.basename(folder).startswith("session_"))
+
+    def _load(self, path):
+        """Get a file's entry, pending or stored, or None. Call with the lock held."""
+        entry = self._dirty.get(path)
+        if entry is not None:
+            return entry
+        row = self._conn.execute(f"SELECT {', '.join(_FILE_COLUMNS)} FROM files WHERE path = ?", (path,)).fetchone()
+        return dict(zip(_FILE_COLUMNS, row)) if row else None
+
+    def _new_entry(self, path):
+        """Entry for a file the catalog hasn't seen."""
+        rack, session = _file_identity(path)
+        return {
+            'path': path, 'folder': os.path.dirname(path), 'name': os.path.basename(path),
+            'rack': rack, 'session': session, 'size': 0, 'mtime': None,
+            'first_time': None, 'last_time': None, 'row_count': 0, 'error_count': 0,
+            'min_power': None, 'max_power': None, 'sum_power': 0.0, 'stats_size': 0
+        }
+
+    def _mark_dirty(self, entry):
+        """Queue an entry for the next flush. Call with the lock held."""
+        self._dirty[entry['path']] = entry
+        if self._oldest_dirty is None:
+            self._oldest_dirty = self._clock()
+
+    def record_write(self, path, rows, size_before, size_after):
+        """Record rows appended to a CSV file; called by the writer after each batch.
+
+        Args:
+            path: File written
+            rows: Rows written, (timestamp, power) pairs for session CSVs
+            size_before: File size before the batch (and any header) was written
+            size_after: File size after the batch
+        """
+        path = os.path.abspath(path)
+        if not path.endswith('.csv') or not self._is_cataloged(path):
+            return
+        with self._lock:
+            entry = self._load(path)
+            if entry is None:
+                entry = self._new_entry(path)
+                if size_before != 0:
+                    entry['stats_size'] = None  # Written before the catalog knew it
+            # Stats can only be extended if they describe the file up to this batch
+            if entry['stats_size'] is not None and entry['stats_size'] == size_before:
+                _add_rows(entry, rows)
+                entry['stats_size'] = size_after
+            else:
+                entry['stats_size'] = None
+            entry['size'] = size_after
+            entry['mtime'] = time.time()
+            self._mark_dirty(entry)
+
+    def flush(self):
+        """Write reported batches to the database."""
+        with self._lock:
+            if not self._dirty:
+                return
+            entries, self._dirty, self._oldest_dirty = list(self._dirty.values()), {}, None
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(_UPSERT_FILE, [tuple(e[c] for c in _FILE_COLUMNS) for e in entries])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def flush_due(self):
+        """Write reported batches once the oldest has waited for the flush interval."""
+        with self._lock:
+            if self._oldest_dirty is not None and self._clock() - self._oldest_dirty >= self.flush_interval_seconds:
+                self.flush()
+
+    def close(self):
+        """Write reported batches."""
+        self.flush()
+
+    def reconcile(self, force=False):
+        """Bring the catalog in line with the folders on disk.
+
+        Only folders whose modification time changed are rescanned, except
+        on the first reconcile of a process: every folder is rescanned then,
+        to pick up writes that a previous run reported but never stored.
+
+        Args:
+            force: Rescan every folder now
+        """
+        with self._lock:
+            now = self._clock()
+            if self._last_reconcile is None:
+                force = True
+            elif not force and now - self._last_reconcile < self.reconcile_interval_seconds:
+                return
+            self._last_reconcile = now
+            self.flush()
+
+            known = dict(self._conn.execute("SELECT path, mtime_ns FROM folders").fetchall())
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._reconcile_folder(self.root, known, force)
+                for folder in list(known):
+                    if folder != self.root:
+                        self._reconcile_folder(folder, known, force)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _reconcile_folder(self, folder, known, force):
+        """Rescan a folder if it changed. Call inside a transaction."""
+        try:
+            mtime_ns = os.stat(folder).st_mtime_ns
+        except FileNotFoundError:
+            self._conn.execute("DELETE FROM files WHERE folder = ?", (folder,))
+            self._conn.execute("DELETE FROM folders WHERE path = ?", (folder,))
+            known.pop(folder, None)
+            return
+        if not force and known.get(folder) == mtime_ns:
+            return
+
+        on_disk = {}
+        for entry in os.scandir(folder):
+            if entry.name.endswith('.csv') and entry.is_file():
+                on_disk[entry.path] = entry
+            elif folder == self.root and entry.name.startswith("session_") and entry.is_dir():
+                if entry.path not in known:
+                    known[entry.path] = None
+                    self._conn.execute("INSERT OR IGNORE INTO folders (path, name, mtime_ns) VALUES (?, ?, NULL)",
+                                       (entry.path, entry.name))
+
+        stored = dict(self._conn.execute("SELECT path, size FROM files WHERE folder = ?", (folder,)).fetchall())
+        removed = [(path,) for path in stored if path not in on_disk]
+        self._conn.executemany("DELETE FROM files WHERE path = ?", removed)
+        for path, dir_entry in on_disk.items():
+            stat = dir_entry.stat()
+            if path not in stored:
+                entry = self._new_entry(path)
+                entry.update(size=stat.st_size, mtime=stat.st_mtime, row_count=None, error_count=None,
+                             sum_power=None, stats_size=None)
+                self._conn.execute(_UPSERT_FILE, tuple(entry[c] for c in _FILE_COLUMNS))
+            elif stored[path] != stat.st_size:
+                self._conn.execute("UPDATE files SET size = ?, mtime = ? WHERE path = ?",
+                                   (stat.st_size, stat.st_mtime, path))
+
+        self._conn.execute("INSERT OR REPLACE INTO folders (path, name, mtime_ns) VALUES (?, ?, ?)",
+                           (folder, os.path.basename(folder), mtime_ns))
+        known[folder] = mtime_ns
+        logger.debug(f"Catalog rescanned {folder}: {len(on_disk)} files, {len(removed)} removed")
+
+    def refresh_file(self, path, stats=False):
+        """Check one file against the disk, and compute its summary stats if asked and out of date.
+
+        Returns:
+            The file's entry dict, or None if the file doesn't exist
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+                self._dirty.pop(path, None)
+                return None
+            entry = self._load(path) or self._new_entry(path)
+            if entry['size'] != stat.st_size:
+                entry.update(size=stat.st_size, mtime=stat.st_mtime)
+                if entry['stats_size'] != stat.st_size:
+                    entry['stats_size'] = None
+                self._mark_dirty(entry)
+            if stats and entry['stats_size'] != entry['size']:
+                _scan_stats(entry)
+                self._mark_dirty(entry)
+            self.flush()
+            return _public_entry(entry)
+
+    def list_files(self, folder=None, rack=None, prefix=None, order="name", limit=None, stats=False):
+        """List cataloged CSV files.
+
+        Args:
+            folder: Only files in this folder; the data folder if omitted
+            rack: Only files of this rack
+            prefix: Only file names starting with this text
+            order: 'name' or 'modified' (newest first)
+            limit: Maximum number of files
+            stats: Compute summary stats that are missing or out of date
+
+        Returns:
+            List of file dicts (see _public_entry)
+        """
+        self.reconcile()
+        folder = os.path.abspath(folder) if folder else self.root
+        sql = f"SELECT {', '.join(_FILE_COLUMNS)} FROM files WHERE folder = ?"
+        params = [folder]
+        if rack is not None:
+            sql += " AND rack = ?"
+            params.append(rack)
+        if prefix:
+            # Range on the (folder, name) index rather than LIKE, so it stays an index seek
+            sql += " AND name >= ? AND name < ?"
+            params.extend([prefix, prefix + "\uffff"])
+        sql += " ORDER BY mtime DESC" if order == "modified" else " ORDER BY name"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        with self._lock:
+            self.flush()
+            entries = [dict(zip(_FILE_COLUMNS, row)) for row in self._conn.execute(sql, params).fetchall()]
+            if stats:
+                stale = [entry for entry in entries if entry['stats_size'] != entry['size']]
+                for entry in stale:
+                    _scan_stats(entry)
+                    self._mark_dirty(entry)
+                self.flush()
+        return [_public_entry(entry) for entry in entries]
+
+    def find_files(self, racks=None, start=None, end=None):
+        """Find the session CSVs, in any cataloged folder, that hold readings of racks within a time range.
+
+        Files are pruned by their first and last reading, computing them
+        for files whose summary is missing or out of date.
+
+        Args:
+            racks: Rack names; all racks if omitted
+            start: Earliest timestamp wanted, as 'YYYY-MM-DD HH:MM:SS'
+            end: Latest timestamp wanted, as 'YYYY-MM-DD HH:MM:SS'
+
+        Returns:
+            List of file dicts (see _public_entry), oldest session first
+        """
+        self.reconcile()
+        # Only names of either session scheme have a session start
+        sql = f"SELECT {', '.join(_FILE_COLUMNS)} FROM files WHERE session IS NOT NULL"
+        params = []
+        if racks is not None:
+            racks = list(racks)
+            if not racks:
+                return []
+            sql += f" AND rack IN ({', '.join('?' for _ in racks)})"
+            params.extend(racks)
+        if end:
+            # Nothing in a file is older than its session start
+            sql += " AND session <= ?"
+            params.append(end)
+        sql += " ORDER BY session, path"
+
+        matching = []
+        with self._lock:
+            self.flush()
+            entries = [dict(zip(_FILE_COLUMNS, row)) for row in self._conn.execute(sql, params).fetchall()]
+            for entry in entries:
+                if entry['stats_size'] != entry['size']:
+                    _scan_stats(entry)
+                    self._mark_dirty(entry)
+                if not entry['row_count']:
+                    continue
+                # Compare whole seconds; timestamps may carry fractions
+                if (start and entry['last_time'][:19] < start) or (end and entry['first_time'][:19] > end):
+                    continue
+                matching.append(entry)
+            self.flush()
+        return [_public_entry(entry) for entry in matching]
+
+    def forget_file(self, path):
+        """Remove a deleted file from the catalog."""
+        path = os.path.abspath(path)
+        with self._lock:
+            self._dirty.pop(path, None)
+            self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def record_archive(self, path, rack_name, month, first_ts, last_ts, row_count, size):
+        """Add or update an archive in the index.
+
+        Args:
+            path: Archive file
+            rack_name: Rack whose readings it holds
+            month: Month it covers, as YYYY-MM (UTC)
+            first_ts: Epoch second of its first reading
+            last_ts: Epoch second of its last reading
+            row_count: Number of readings
+            size: File size in bytes
+        """
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO archives (path, rack, month, first_ts, last_ts, row_count, size) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (os.path.abspath(path), rack_name, month, int(first_ts), int(last_ts),
+                                int(row_count), int(size)))
+
+    def forget_archive(self, path):
+        """Remove a deleted archive from the index."""
+        with self._lock:
+            self._conn.execute("DELETE FROM archives WHERE path = ?", (os.path.abspath(path),))
+
+    def find_archives(self, racks=None, start=None, end=None):
+        """Find the archives holding readings of racks within a time range.
+
+        Args:
+            racks: Rack names; all racks if omitted
+            start: Earliest epoch second wanted
+            end: Latest epoch second wanted
+
+        Returns:
+            List of dicts with path, rack_name, month, first_ts, last_ts,
+            row_count and size, oldest first
+        """
+        sql = "SELECT path, rack, month, first_ts, last_ts, row_count, size FROM archives WHERE 1 = 1"
+        params = []
+        if racks is not None:
+            racks = list(racks)
+            if not racks:
+                return []
+            sql += f" AND rack IN ({', '.join('?' for _ in racks)})"
+            params.extend(racks)
+        if start is not None:
+            sql += " AND last_ts >= ?"
+            params.append(int(start))
+        if end is not None:
+            sql += " AND first_ts <= ?"
+            params.append(int(end))
+        sql += " ORDER BY month, rack"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [{'path': path, 'rack_name': rack, 'month': month, 'first_ts': first, 'last_ts': last,
+                 'row_count': count, 'size': size}
+                for path, rack, month, first, last, count, size in rows]
+
+    def list_folders(self, prefix="session_"):
+        """List the cataloged session folders.
+
+        Returns:
+            List of dicts with path, name and file_count, sorted by name
+        """
+        self.reconcile()
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute(
+                "SELECT d.path, d.name, (SELECT COUNT(*) FROM files f WHERE f.folder = d.path) "
+                "FROM folders d WHERE d.path != ? AND d.name >= ? AND d.name < ? ORDER BY d.name",
+                (self.root, prefix, prefix + "\uffff")).fetchall()
+        return [{'path': path, 'name': name, 'file_count': count} for path, name, count in rows]
+
+
+def _add_rows(entry, rows):
+    """Extend an entry's summary with (timestamp, power) rows."""
+    for row in rows:
+        if len(row) != 2:
+            # Not a power CSV row; the stats can't describe this file
+            entry['stats_size'] = None
+            return
+        try:
+            power = float(row[1])
+        except (TypeError, ValueError):
+            entry['error_count'] = (entry['error_count'] or 0) + 1
+            continue
+        timestamp = str(row[0])
+        entry['row_count'] = (entry['row_count'] or 0) + 1
+        entry['sum_power'] = (entry['sum_power'] or 0.0) + power
+        entry['min_power'] = power if entry['min_power'] is None else min(entry['min_power'], power)
+        entry['max_power'] = power if entry['max_power'] is None else max(entry['max_power'], power)
+        # The timestamp format sorts as text
+        if entry['first_time'] is None or timestamp < entry['first_time']:
+            entry['first_time'] = timestamp
+        if entry['last_time'] is None or timestamp > entry['last_time']:
+            entry['last_time'] = timestamp
+
+
+def _scan_stats(entry):
+    """Compute an entry's summary by reading its file."""
+    entry.update(first_time=None, last_time=None, row_count=0, error_count=0,
+                 min_power=None, max_power=None, sum_power=0.0)
+    try:
+        with open(entry['path'], 'r', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None) or []
+            # PowerMonitoring files have the power in their third column
+            power_col = header.index('PowerWatts') if 'PowerWatts' in header else 1
+            _add_rows(entry, ((row[0], row[power_col]) for row in reader if len(row) > power_col))
+            entry['size'] = f.tell()
+        entry['stats_size'] = entry['size']
+    except OSError as e:
+        logger.warning(f"Can't read {entry['path']} for the catalog: {str(e)}")
+        entry['stats_size'] = None
+
+
+def _public_entry(entry):
+    """File dict for callers: location, identity, size, time range and summary if known."""
+    stats_known = entry['stats_size'] is not None and entry['stats_size'] == entry['size']
+    count = entry['row_count'] if stats_known else None
+    return {
+        'path': entry['path'],
+        'folder': entry['folder'],
+        'name': entry['name'],
+        'rack_name': entry['rack'],
+        'session': entry['session'],
+        'size': entry['size'],
+        'modified': entry['mtime'],
+        'first_time': entry['first_time'] if stats_known else None,
+        'last_time': entry['last_time'] if stats_known else None,
+        'row_count': count,
+        'error_count': entry['error_count'] if stats_known else None,
+        'min_power': entry['min_power'] if stats_known else None,
+        'max_power': entry['max_power'] if stats_known else None,
+        'avg_power': entry['sum_power'] / count if stats_known and count else None
+    }
+
+
+# One catalog per data folder, shared by the writer thread and the readers
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_session_catalog(data_dir, **kwargs):
+    """Get the session catalog of a data folder.
+
+    Args:
+        data_dir: Data folder
+        **kwargs: Passed to SessionCatalog when the catalog is created
+    """
+    root = os.path.abspath(data_dir or "power_data")
+    with _catalogs_lock:
+        catalog = _catalogs.get(root)
+        if catalog is None:
+            catalog = _catalogs[root] = SessionCatalog(root, **kwargs)
+        return catalog
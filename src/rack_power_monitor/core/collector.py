@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import threading
+
+from ..utils.http_pool import get_connection_pool
+
+logger = logging.getLogger("power_monitor")
+
+class CollectorService:
+    """Owns a single background event loop that runs every rack monitor as a task.
+
+    The GUI and web server talk to the collector through thread-safe commands
+    (start, pause, resume, stop), so the number of threads stays constant no
+    matter how many racks are being monitored.
+    """
+
+    def __init__(self):
+        """Initialize the collector service."""
+        self.loop = None
+        self.thread = None
+        self._racks = {}  # rack_key -> {'monitor': ..., 'future': ...}
+        self._lock = threading.Lock()
+        self._started = threading.Event()
+
+    @property
+    def is_running(self):
+        """Whether the collector event loop is running."""
+        return self.loop is not None and self.loop.is_running()
+
+    def start(self):
+        """Start the collector thread and its event loop if not already running."""
+        with self._lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+
+            self._started.clear()
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self._run_loop, name="rack-collector", daemon=True)
+            self.thread.start()
+
+        # Wait until the loop is accepting commands
+        self._started.wait(timeout=5)
+        logger.info("Collector service started")
+
+    def _run_loop(self):
+        """Run the collector event loop until it is stopped."""
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._started.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+            logger.info("Collector event loop closed")
+
+    def submit(self, coro):
+        """Schedule a coroutine on the collector loop and return a concurrent future."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call(self, func, *args):
+        """Run a plain callable on the collector loop thread."""
+        self.start()
+        self.loop.call_soon_threadsafe(func, *args)
+
+    def start_rack(self, rack_key, monitor, coro):
+        """Run the monitoring coroutine for a rack as a task on the collector loop.
+
+        Args:
+            rack_key: Unique key for the rack (name_address)
+            monitor: The RackPowerMonitor driving this rack
+            coro: Coroutine that performs the monitoring
+        """
+        future = self.submit(coro)
+
+        with self._lock:
+            self._racks[rack_key] = {'monitor': monitor, 'future': future}
+
+        def _on_done(done_future, rack_key=rack_key):
+            with self._lock:
+                entry = self._racks.get(rack_key)
+                if entry and entry['future'] is done_future:
+                    del self._racks[rack_key]
+
+        future.add_done_callback(_on_done)
+        logger.info(f"Collector scheduled monitoring task for {rack_key}")
+        return future
+
+    def pause_rack(self, rack_key, paused=True):
+        """Pause or resume polling for a rack."""
+        with self._lock:
+            entry = self._racks.get(rack_key)
+        if not entry:
+            return False
+        self.call(entry['monitor'].set_paused, paused)
+        return True
+
+    def stop_rack(self, rack_key):
+        """Ask a rack monitor to stop after its current poll."""
+        with self._lock:
+            entry = self._racks.get(rack_key)
+        if not entry:
+            return False
+        self.call(entry['monitor'].request_stop)
+        return True
+
+    def active_racks(self):
+        """Get the keys of racks with a running monitoring task."""
+        with self._lock:
+            return [key for key, entry in self._racks.items() if not entry['future'].done()]
+
+    def shutdown(self, timeout=10):
+        """Stop all rack tasks, release pooled connections and stop the loop."""
+        if not self.is_running:
+            return
+
+        with self._lock:
+            entries = list(self._racks.values())
+
+        for entry in entries:
+            self.loop.call_soon_threadsafe(entry['monitor'].request_stop)
+
+        async def _drain():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            if tasks:
+                # Give monitors a chance to finish their current poll, then cancel
+                done, pending = await asyncio.wait(tasks, timeout=timeout / 2)
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+            await get_connection_pool().close_loop_session()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_drain(), self.loop).result(timeout=timeout)
+        except Exception as e:
+            logger.warning(f"Collector shutdown did not complete cleanly: {e}")
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+
+        with self._lock:
+            self._racks.clear()
+            self.thread = None
+        logger.info("Collector service stopped")
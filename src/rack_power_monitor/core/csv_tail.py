@@ -0,0 +1,165 @@
+import os
+import csv
+import bisect
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger("power_monitor")
+
+# Leading bytes remembered per file, to notice a file replaced by one of the same inode
+FINGERPRINT_BYTES = 256
+
+
+class _TailState:
+    """Parsed series of one file and where parsing stopped."""
+
+    def __init__(self, device, inode):
+        self.device = device
+        self.inode = inode
+        self.offset = 0  # Bytes parsed so far, always at the end of a complete line
+        self.fingerprint = b""
+        self.header = None
+        self.timestamps = []
+        self.power = []
+        self.in_order = True  # Timestamps are sorted, so ranges can be bisected
+
+
+class CSVTailReader:
+    """Reads (timestamp, power) CSVs incrementally while monitors append to them.
+
+    The parsed series of each file is cached along with the byte offset where
+    parsing stopped, keyed by the file's device and inode. A later read parses
+    only the rows appended since. The file is parsed again from the start when
+    it was replaced (different inode, or different leading bytes) or truncated
+    (smaller than the parsed offset). A trailing line without its newline is
+    left for the next read, as the writer may be halfway through it.
+    """
+
+    def __init__(self, max_files=32):
+        """Initialize the reader.
+
+        Args:
+            max_files: Number of files whose parsed series are cached
+        """
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._states = OrderedDict()  # path -> _TailState, least recently used first
+        self._stats = {'full_reads': 0, 'incremental_reads': 0, 'unchanged_reads': 0, 'rows_parsed': 0}
+
+    def read(self, path, start=None, end=None):
+        """Read a file's timestamps and power readings.
+
+        Rows whose power isn't a number are skipped.
+
+        Args:
+            path: CSV file with the timestamp in the first column and power in the second
+            start: Earliest timestamp to return, as 'YYYY-MM-DD HH:MM:SS'
+            end: Latest timestamp to return, as 'YYYY-MM-DD HH:MM:SS'
+
+        Returns:
+            Tuple of (timestamp strings, power floats), or None if the file has no header
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            state = self._update(path)
+            self._states[path] = state
+            self._states.move_to_end(path)
+            while len(self._states) > self.max_files:
+                self._states.popitem(last=False)
+
+            if state.header is None:
+                return None
+            if start is None and end is None:
+                return list(state.timestamps), list(state.power)
+            if state.in_order:
+                # The timestamp format sorts as text
+                lo = bisect.bisect_left(state.timestamps, start) if start else 0
+                hi = bisect.bisect_right(state.timestamps, end) if end else len(state.timestamps)
+                return state.timestamps[lo:hi], state.power[lo:hi]
+            selected = [i for i, ts in enumerate(state.timestamps)
+                        if not ((start and ts < start) or (end and ts > end))]
+            return [state.timestamps[i] for i in selected], [state.power[i] for i in selected]
+
+    def forget(self, path):
+        """Drop a file's cached series."""
+        with self._lock:
+            self._states.pop(os.path.abspath(path), None)
+
+    def get_stats(self):
+        """Get counts of full, incremental and unchanged reads."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cached_files'] = len(self._states)
+            return stats
+
+    def _update(self, path):
+        """Bring a file's cached series up to date with the file. Call with the lock held."""
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            state = self._states.get(path)
+            if state is not None and not self._continues(state, f, stat):
+                logger.debug(f"{path} was truncated or replaced; parsing it again")
+                state = None
+
+            if state is None:
+                state = _TailState(stat.st_dev, stat.st_ino)
+                self._stats['full_reads'] += 1
+            elif stat.st_size == state.offset:
+                self._stats['unchanged_reads'] += 1
+                return state
+            else:
+                self._stats['incremental_reads'] += 1
+
+            f.seek(state.offset)
+            data = f.read(stat.st_size - state.offset)
+
+        # Only parse complete lines
+        complete = data.rfind(b"\n") + 1
+        if complete == 0:
+            return state
+        if state.offset < FINGERPRINT_BYTES:
+            state.fingerprint = (state.fingerprint + data[:complete])[:FINGERPRINT_BYTES]
+        state.offset += complete
+
+        reader = csv.reader(data[:complete].decode('utf-8', errors='replace').splitlines())
+        if state.header is None:
+            state.header = next(reader, None)
+        rows = 0
+        for row in reader:
+            if len(row) < 2:
+                continue
+            try:
+                power = float(row[1])
+            except ValueError:
+                continue
+            timestamp = row[0]
+            if state.timestamps and timestamp < state.timestamps[-1]:
+                state.in_order = False
+            state.timestamps.append(timestamp)
+            state.power.append(power)
+            rows += 1
+        self._stats['rows_parsed'] += rows
+        return state
+
+    def _continues(self, state, f, stat):
+        """Whether an open file is the one a state was parsed from, grown or unchanged."""
+        if (stat.st_dev, stat.st_ino) != (state.device, state.inode) or stat.st_size < state.offset:
+            return False
+        # Catches a file truncated and rewritten past the parsed offset in between reads
+        f.seek(0)
+        return f.read(len(state.fingerprint)) == state.fingerprint
+
+
+# Shared by the web server's request threads
+_shared_reader = None
+_shared_reader_lock = threading.Lock()
+
+
+def get_tail_reader():
+    """Get the process-wide CSV tail reader."""
+    global _shared_reader
+    with _shared_reader_lock:
+        if _shared_reader is None:
+            _shared_reader = CSVTailReader()
+        return _shared_reader
@@ -0,0 +1,335 @@
+import os
+import csv
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger("power_monitor")
+
+# How hard a flush pushes rows towards the disk
+DURABILITY_MODES = ("none", "flush", "fsync")
+
+
+class _OpenFile:
+    """An open CSV file and its csv.writer."""
+
+    def __init__(self, path):
+        """Open the file for appending."""
+        self.handle = open(path, 'a', newline='')
+        self.writer = csv.writer(self.handle)
+        # In append mode the position starts at the end of the file
+        self.is_empty = self.handle.tell() == 0
+
+
+class BufferedCSVWriter:
+    """Appends rows to CSV files through persistent, batched file handles.
+
+    Rows are buffered per file and written in batches, either when a file has
+    collected `flush_rows` rows or when `flush_interval_seconds` have passed
+    since its oldest unwritten row. Open handles are kept in an LRU so a large
+    number of racks doesn't exhaust file descriptors.
+
+    Durability modes control what a flush does after writing the batch:
+        none:  leave the rows in Python's file buffer (written when it fills up
+               or the file is closed)
+        flush: hand the rows to the operating system (visible to readers)
+        fsync: flush and fsync, so the rows survive a power loss
+    """
+
+    def __init__(self, max_open_files=64, flush_rows=100, flush_interval_seconds=5.0,
+                 durability="flush", clock=time.monotonic):
+        """Initialize the writer.
+
+        Args:
+            max_open_files: Maximum number of file handles kept open
+            flush_rows: Write a file's buffered rows once this many are waiting
+            flush_interval_seconds: Write buffered rows at least this often
+            durability: One of DURABILITY_MODES
+            clock: Monotonic clock used for the flush interval
+        """
+        self._lock = threading.RLock()
+        self._clock = clock
+        self._files = OrderedDict()  # path -> _OpenFile, least recently used first
+        self._pending = {}  # path -> list of buffered rows
+        self._headers = {}  # path -> header row written to new files
+        self._oldest = {}  # path -> clock time of the oldest buffered row
+        self._known_dirs = set()
+        self.on_write = None  # Called with (path, rows, size before, size after) after each batch
+
+        self.max_open_files = 64
+        self.flush_rows = 100
+        self.flush_interval_seconds = 5.0
+        self.durability = "flush"
+        self.configure(max_open_files, flush_rows, flush_interval_seconds, durability)
+
+        self._stats = {
+            'rows_buffered': 0,
+            'rows_written': 0,
+            'batches_written': 0,
+            'files_opened': 0,
+            'files_evicted': 0,
+            'fsyncs': 0,
+            'write_errors': 0
+        }
+
+    def configure(self, max_open_files=None, flush_rows=None, flush_interval_seconds=None, durability=None):
+        """Update the writer settings; None leaves a setting unchanged."""
+        if durability is not None and durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}")
+
+        with self._lock:
+            if max_open_files is not None:
+                self.max_open_files = max(1, int(max_open_files))
+            if flush_rows is not None:
+                self.flush_rows = max(1, int(flush_rows))
+            if flush_interval_seconds is not None:
+                self.flush_interval_seconds = max(0.0, float(flush_interval_seconds))
+            if durability is not None:
+                self.durability = durability
+            self._evict_to(self.max_open_files)
+
+    def write_row(self, path, row, header=None):
+        """Buffer one row for a file.
+
+        Args:
+            path: CSV file to append to
+            row: List of values
+            header: Header row written first if the file is new or empty
+        """
+        self.write_rows(path, [row], header)
+
+    def write_rows(self, path, rows, header=None):
+        """Buffer several rows for a file, writing them out if a flush is due."""
+        with self._lock:
+            pending = self._pending.get(path)
+            if pending is None:
+                pending = self._pending[path] = []
+                self._oldest[path] = self._clock()
+            if header is not None:
+                self._headers[path] = header
+            pending.extend(rows)
+            self._stats['rows_buffered'] += len(rows)
+
+            if len(pending) >= self.flush_rows:
+                self._write_pending(path)
+            self._flush_expired()
+
+    def flush_due(self):
+        """Write out files whose oldest buffered row has waited for the flush interval.
+
+        Call periodically so rows don't linger when no new rows arrive.
+        """
+        with self._lock:
+            self._flush_expired()
+
+    def flush(self, paths=None):
+        """Write out buffered rows now.
+
+        Args:
+            paths: Files to flush; all files if omitted
+        """
+        with self._lock:
+            for path in list(self._pending if paths is None else paths):
+                if path in self._pending:
+                    self._write_pending(path)
+                elif path in self._files:
+                    self._sync(self._files[path])
+
+    def close(self, paths=None):
+        """Flush and close files.
+
+        Args:
+            paths: Files to close; all files if omitted
+        """
+        with self._lock:
+            paths = list(set(self._files) | set(self._pending)) if paths is None else list(paths)
+            for path in paths:
+                try:
+                    if path in self._pending:
+                        self._write_pending(path)
+                finally:
+                    self._close_file(path)
+                    self._headers.pop(path, None)
+
+    def is_writing(self, path):
+        """Whether a file has an open handle or buffered rows."""
+        path = os.path.abspath(path)
+        with self._lock:
+            return any(os.path.abspath(p) == path for p in list(self._files) + list(self._pending))
+
+    def get_stats(self):
+        """Get writer counters and current buffer sizes."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open_files'] = len(self._files)
+            stats['pending_rows'] = sum(len(rows) for rows in self._pending.values())
+            stats['durability'] = self.durability
+            return stats
+
+    def _flush_expired(self):
+        """Write out files whose buffered rows are older than the flush interval."""
+        if not self._oldest:
+            return
+        cutoff = self._clock() - self.flush_interval_seconds
+        for path in [p for p, oldest in self._oldest.items() if oldest <= cutoff]:
+            self._write_pending(path)
+
+    def _write_pending(self, path):
+        """Write a file's buffered rows as one batch and apply the durability mode."""
+        rows = self._pending.pop(path, None)
+        self._oldest.pop(path, None)
+        if not rows:
+            return
+
+        try:
+            open_file = self._get_file(path)
+            size_before = open_file.handle.tell()
+            header = self._headers.get(path)
+            if open_file.is_empty and header is not None:
+                open_file.writer.writerow(header)
+            open_file.writer.writerows(rows)
+            open_file.is_empty = False
+            self._sync(open_file)
+        except OSError as e:
+            # Keep the rows so the next flush retries them, and reopen the file then
+            self._stats['write_errors'] += 1
+            self._pending[path] = rows + self._pending.get(path, [])
+            self._oldest.setdefault(path, self._clock())
+            self._close_file(path)
+            logger.error(f"Error writing {len(rows)} rows to {path}: {str(e)}")
+            raise
+
+        self._stats['rows_written'] += len(rows)
+        self._stats['batches_written'] += 1
+        logger.debug(f"Wrote {len(rows)} rows to {path}")
+
+        if self.on_write is not None:
+            try:
+                self.on_write(path, rows, size_before, open_file.handle.tell())
+            except Exception as e:
+                # Bookkeeping only; the rows are already written
+                logger.error(f"Error recording write to {path}: {str(e)}")
+
+    def _sync(self, open_file):
+        """Push written rows as far as the durability mode asks for."""
+        if self.durability == "none":
+            return
+        open_file.handle.flush()
+        if self.durability == "fsync":
+            os.fsync(open_file.handle.fileno())
+            self._stats['fsyncs'] += 1
+
+    def _get_file(self, path):
+        """Get the open handle for a file, opening it and evicting the LRU handle if needed."""
+        open_file = self._files.get(path)
+        if open_file is not None:
+            self._files.move_to_end(path)
+            return open_file
+
+        directory = os.path.dirname(path)
+        if directory and directory not in self._known_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._known_dirs.add(directory)
+
+        self._evict_to(self.max_open_files - 1)
+        open_file = self._files[path] = _OpenFile(path)
+        self._stats['files_opened'] += 1
+        return open_file
+
+    def _evict_to(self, limit):
+        """Close least recently used handles until at most `limit` remain."""
+        while len(self._files) > limit:
+            path = next(iter(self._files))
+            self._close_file(path)
+            self._stats['files_evicted'] += 1
+
+    def _close_file(self, path):
+        """Close a file's handle if it is open."""
+        open_file = self._files.pop(path, None)
+        if open_file is None:
+            return
+        try:
+            self._sync(open_file)
+        except OSError as e:
+            logger.error(f"Error syncing {path}: {str(e)}")
+        finally:
+            open_file.handle.close()
+
+
+# Process-wide writer shared by all monitors, so the open file limit is global
+_shared_writer = None
+_shared_writer_lock = threading.Lock()
+
+
+def get_csv_writer():
+    """Get the process-wide buffered CSV writer."""
+    global _shared_writer
+    with _shared_writer_lock:
+        if _shared_writer is None:
+            _shared_writer = BufferedCSVWriter()
+        return _shared_writer
+
+
+def apply_storage_settings(storage_config, data_dir=None):
+    """Apply the 'storage' block of the application config to the shared writer.
+    
+    Args:
+        storage_config: The 'storage' config block
+        data_dir: Data folder; when given, readings are also kept in its SQLite
+            database (and its columnar store, if a columnar backend is set),
+            written files in its session catalog, and its retention service runs
+    """
+    storage_config = storage_config or {}
+    get_csv_writer().configure(
+        max_open_files=storage_config.get('csv_max_open_files'),
+        flush_rows=storage_config.get('csv_flush_rows'),
+        flush_interval_seconds=storage_config.get('csv_flush_interval_seconds'),
+        durability=storage_config.get('csv_durability')
+    )
+    
+    # Imported here because the persistence module builds on this one
+    from .persistence import get_persistence_pipeline
+    pipeline = get_persistence_pipeline()
+    pipeline.configure(
+        max_queue_items=storage_config.get('queue_max_items'),
+        backpressure=storage_config.get('queue_backpressure'),
+        block_timeout_seconds=storage_config.get('queue_block_timeout_seconds'),
+        spill_dir=storage_config.get('spill_dir')
+    )
+    
+    if data_dir is not None:
+        from .timeseries import get_timeseries_store
+        from .sqlite_store import get_sqlite_store
+        from .catalog import get_session_catalog
+        catalog = get_session_catalog(data_dir)
+        get_csv_writer().on_write = catalog.record_write
+        pipeline.catalog = catalog
+        # SQLite is the series store; the columnar store is an opt-in alternative
+        series_stores = []
+        columnar_store = get_timeseries_store(
+            data_dir,
+            backend=storage_config.get('columnar_backend', 'none'),
+            flush_interval_seconds=storage_config.get('columnar_flush_interval_seconds', 300),
+            part_rows=storage_config.get('columnar_part_rows', 1440)
+        )
+        if columnar_store is not None:
+            series_stores.append(columnar_store)
+        if storage_config.get('sqlite_enabled', True):
+            sqlite_store = get_sqlite_store(data_dir)
+            sqlite_store.batch_rows = max(1, int(storage_config.get('sqlite_batch_rows', 500)))
+            sqlite_store.flush_interval_seconds = float(storage_config.get('sqlite_flush_interval_seconds', 5))
+            series_stores.append(sqlite_store)
+        pipeline.series_stores = series_stores
+        
+        from .retention import get_retention_service
+        retention = get_retention_service(data_dir)
+        retention.configure(
+            archive_after_days=storage_config.get('archive_after_days'),
+            raw_retention_days=storage_config.get('raw_retention_days') or 0,
+            interval_hours=storage_config.get('compaction_interval_hours')
+        )
+        if storage_config.get('retention_enabled', True):
+            retention.start()
+        else:
+            retention.stop()
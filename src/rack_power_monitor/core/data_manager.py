@@ -1,19 +1,40 @@
 import os
 import csv
+import numpy as np
 import pandas as pd
 import logging
 import datetime
 from pathlib import Path
+from .timeseries import get_timeseries_store, parse_session_filename, from_epoch_seconds
+from .sqlite_store import get_sqlite_store
+from .catalog import get_session_catalog
+from .query import get_query_engine
 
 logger = logging.getLogger("power_monitor")
 
 class DataManager:
     """Manages data storage and retrieval for power monitoring."""
     
-    def __init__(self, base_dir="power_data"):
-        """Initialize the data manager with a base directory."""
+    def __init__(self, base_dir="power_data", store_backend="none", sqlite_enabled=True):
+        """Initialize the data manager with a base directory.
+        
+        Args:
+            base_dir: Folder holding the session CSVs
+            store_backend: Columnar store format ('parquet', 'zlib', 'gorilla', 'auto'), or
+                'none' to keep readings in the database only
+            sqlite_enabled: Also keep readings in the SQLite database of the base directory
+        """
         self.base_dir = base_dir
         os.makedirs(base_dir, exist_ok=True)
+        
+        # Optional columnar store partitioned by rack and day
+        self.store = get_timeseries_store(base_dir, backend=store_backend)
+        
+        # SQLite database indexed by rack and timestamp, with the session catalog
+        self.sqlite_store = get_sqlite_store(base_dir) if sqlite_enabled else None
+        
+        # Catalog of the CSV files, so sessions can be listed without scanning the folders
+        self.catalog = get_session_catalog(base_dir)
     
     def create_session_folder(self):
         """Create a new session folder for storing monitoring data."""
@@ -31,6 +52,8 @@ class DataManager:
         # Create file with headers
         with open(filepath, 'w', newline='', encoding='utf-8') as f:
             f.write("Timestamp,RSCM_Address,PowerWatts\n")
+            size = f.tell()
+        self.catalog.record_write(filepath, [], 0, size)
         
         return filepath
     
@@ -38,7 +61,21 @@ class DataManager:
         """Append a power reading to the CSV file."""
         try:
             with open(filepath, 'a', newline='', encoding='utf-8') as f:
+                size_before = f.tell()
                 f.write(f"{timestamp},{rscm_address},{power_watts}\n")
+                size_after = f.tell()
+            self.catalog.record_write(filepath, [(timestamp, power_watts)], size_before, size_after)
+            self.catalog.flush_due()
+            
+            # Keep valid readings in the columnar store and database as well
+            parsed = parse_session_filename(filepath)
+            if parsed and isinstance(power_watts, (int, float)):
+                epoch = int(pd.Timestamp(timestamp).to_pydatetime().timestamp())
+                if self.store is not None:
+                    self.store.append(parsed[0], [epoch], [power_watts])
+                if self.sqlite_store is not None:
+                    self.sqlite_store.register_rack(parsed[0], rscm_address)
+                    self.sqlite_store.append(parsed[0], [epoch], [power_watts], source=filepath)
             return True
         except Exception as e:
             logger.error(f"Error writing to {filepath}: {e}")
@@ -61,14 +98,156 @@ class DataManager:
             logger.error(f"Error loading data from {filepath}: {e}")
             return pd.DataFrame()
     
+    def load_rack_data(self, rack_names=None, start_time=None, end_time=None):
+        """Load readings from the columnar store, or the database when there is none.
+        
+        Args:
+            rack_names: Racks to load; all racks if omitted
+            start_time: Earliest timestamp, inclusive
+            end_time: Latest timestamp, inclusive
+        
+        Returns:
+            DataFrame with Timestamp, Rack and PowerWatts columns
+        """
+        store = self.store if self.store is not None else self.sqlite_store
+        if store is None:
+            logger.warning("Columnar storage and the database are both disabled")
+            return pd.DataFrame(columns=['Timestamp', 'Rack', 'PowerWatts'])
+        try:
+            return store.read(rack_names, start_time, end_time)
+        except Exception as e:
+            logger.error(f"Error loading rack data from the series store: {e}")
+            return pd.DataFrame(columns=['Timestamp', 'Rack', 'PowerWatts'])
+    
+    def load_rack_series(self, rack_names=None, start_time=None, end_time=None, max_points=2000):
+        """Load readings for charting, from the coarsest rollups that still give `max_points` points.
+        
+        Args:
+            rack_names: Racks to load; all racks if omitted
+            start_time: Earliest timestamp; the first stored reading if omitted
+            end_time: Latest timestamp, inclusive; the last stored reading if omitted
+            max_points: Approximate number of points wanted per rack
+        
+        Returns:
+            DataFrame with Timestamp, Rack, PowerWatts (bucket mean), Min, Max
+            and Count columns
+        """
+        if self.sqlite_store is None:
+            df = self.load_rack_data(rack_names, start_time, end_time)
+            watts = df['PowerWatts'].astype('float64')
+            return df.assign(PowerWatts=watts, Min=watts, Max=watts, Count=1)
+        try:
+            first, last = start_time, end_time
+            if first is None or last is None:
+                spans = [rack for rack in self.sqlite_store.get_racks()
+                         if rack['first'] is not None and (rack_names is None or rack['name'] in rack_names)]
+                if not spans:
+                    return self.sqlite_store.read_resampled(rack_names, start_time, end_time)
+                first = first or min(rack['first'] for rack in spans)
+                last = last or max(rack['last'] for rack in spans)
+            resolution = (pd.Timestamp(last) - pd.Timestamp(first)).total_seconds() / max(1, max_points)
+            return self.sqlite_store.read_resampled(rack_names, start_time, end_time, resolution)
+        except Exception as e:
+            logger.error(f"Error loading rack series from the database: {e}")
+            return pd.DataFrame(columns=['Timestamp', 'Rack', 'PowerWatts', 'Min', 'Max', 'Count'])
+    
+    def load_session_data(self, filepath):
+        """Load a session CSV's readings from the SQLite database.
+        
+        Args:
+            filepath: Session CSV file
+        
+        Returns:
+            DataFrame with Timestamp and PowerWatts columns, or None if the
+            session isn't in the database
+        """
+        if self.sqlite_store is None:
+            return None
+        try:
+            # Readings still buffered belong to the session too
+            self.sqlite_store.flush()
+            folder = os.path.dirname(os.path.abspath(filepath))
+            session = self.sqlite_store.find_session(os.path.basename(filepath), folder)
+            if session is None or session['folder'] != folder:
+                return None
+            epoch, watts = self.sqlite_store.read_session(session)
+            return pd.DataFrame({'Timestamp': from_epoch_seconds(epoch), 'PowerWatts': watts})
+        except Exception as e:
+            logger.error(f"Error loading {filepath} from the database: {e}")
+            return None
+    
+    def query(self, rack_names=None, start_time=None, end_time=None, resolution=None, agg="mean"):
+        """Query readings across every session CSV of the base directory, of either naming scheme.
+        
+        See QueryEngine.query.
+        
+        Returns:
+            DataFrame indexed by Timestamp with a column per rack
+        """
+        return get_query_engine(self.base_dir).query(rack_names, start_time, end_time, resolution, agg)
+    
+    def load_csv_series(self, rack_name, start_time=None, end_time=None, max_points=2000):
+        """Load a rack's readings for charting from its session CSVs, in about `max_points` buckets.
+        
+        Returns:
+            DataFrame with Timestamp, PowerWatts (bucket mean), Min, Max and Count
+            columns, without empty buckets
+        """
+        engine = get_query_engine(self.base_dir)
+        span = engine.time_range([rack_name])
+        if span is None:
+            return pd.DataFrame(columns=['Timestamp', 'PowerWatts', 'Min', 'Max', 'Count'])
+        first = pd.Timestamp(start_time) if start_time is not None else span[0]
+        last = pd.Timestamp(end_time) if end_time is not None else span[1]
+        resolution = max(1, (last - first).total_seconds() / max(1, max_points))
+        frame = engine.query([rack_name], start_time, end_time, resolution, ['mean', 'min', 'max', 'count'])
+        frame = frame.xs(rack_name, axis=1, level='Rack')
+        frame = frame[frame['count'] > 0]
+        return pd.DataFrame({
+            'Timestamp': frame.index,
+            'PowerWatts': frame['mean'].to_numpy(),
+            'Min': frame['min'].to_numpy(),
+            'Max': frame['max'].to_numpy(),
+            'Count': frame['count'].to_numpy(dtype=np.int64)
+        })
+    
+    def list_csv_racks(self):
+        """Get the racks that have session CSVs or archives in the base directory."""
+        try:
+            return get_query_engine(self.base_dir).list_racks()
+        except Exception as e:
+            logger.error(f"Error listing racks of the session CSVs: {e}")
+            return []
+    
+    def list_stored_racks(self):
+        """Get the racks that have readings in the columnar store or the database."""
+        racks = set(self.store.list_racks()) if self.store is not None else set()
+        if self.sqlite_store is not None:
+            racks.update(self.sqlite_store.list_racks())
+        return sorted(racks)
+    
+    def import_csv_files(self):
+        """Import the session CSVs of the base directory and its session folders into the stores.
+        
+        Files that were already imported are skipped.
+        
+        Returns:
+            Number of readings imported
+        """
+        total = 0
+        folders = [self.base_dir] + self.find_session_folders()
+        for store in (self.store, self.sqlite_store):
+            if store is None:
+                continue
+            for folder in folders:
+                total += store.import_folder(folder)
+        logger.info(f"Imported {total} readings into the series stores")
+        return total
+    
     def find_session_folders(self):
         """Find all session folders in the base directory."""
         try:
-            sessions = []
-            for item in os.listdir(self.base_dir):
-                if item.startswith("session_") and os.path.isdir(os.path.join(self.base_dir, item)):
-                    sessions.append(os.path.join(self.base_dir, item))
-            return sessions
+            return [os.path.join(self.base_dir, folder['name']) for folder in self.catalog.list_folders()]
         except Exception as e:
             logger.error(f"Error finding session folders: {e}")
             return []
@@ -93,11 +272,8 @@ class DataManager:
     
     def _find_csv_files(self, folder):
         """Find all CSV files in a folder that match the monitoring pattern."""
-        files = []
-        for item in os.listdir(folder):
-            if item.startswith("PowerMonitoring-") and item.endswith(".csv"):
-                files.append(os.path.join(folder, item))
-        return files
+        return [os.path.join(folder, entry['name'])
+                for entry in self.catalog.list_files(folder=folder, prefix="PowerMonitoring-")]
     
     def get_rack_name_from_file(self, filepath):
         """Extract rack name from the file path."""
@@ -112,7 +288,10 @@ class DataManager:
             return "Unknown"
     
     def get_monitoring_sessions_info(self):
-        """Get information about all monitoring sessions."""
+        """Get information about all monitoring sessions.
+        
+        Answered from the session catalog, without listing the folders.
+        """
         sessions = []
         session_folders = self.find_session_folders()
         
@@ -121,12 +300,10 @@ class DataManager:
             timestamp_str = folder_name.replace("session_", "")
             try:
                 timestamp = datetime.datetime.strptime(timestamp_str, "%Y%m%d-%H%M%S")
-                files = self._find_csv_files(folder)
+                files = self.catalog.list_files(folder=folder, prefix="PowerMonitoring-")
                 
                 # Get unique rack names in this session
-                rack_names = set()
-                for file in files:
-                    rack_names.add(self.get_rack_name_from_file(file))
+                rack_names = set(entry['rack_name'] for entry in files)
                 
                 sessions.append({
                     'path': folder,
@@ -0,0 +1,400 @@
+import struct
+import bisect
+
+import numpy as np
+
+# Points per block; blocks are the unit of random access
+DEFAULT_BLOCK_POINTS = 1024
+
+# Block header: first timestamp, first value, point count, payload bit count
+_BLOCK_HEADER = struct.Struct("<qdII")
+
+# Chunk file: magic and block count, then one index entry per block, then the blocks
+_CHUNK_HEADER = struct.Struct("<4sI")
+_CHUNK_INDEX = struct.Struct("<qqII")
+_CHUNK_MAGIC = b"RPG1"
+
+_DOUBLE = struct.Struct("<d")
+_UINT64 = struct.Struct("<Q")
+
+# Delta-of-delta buckets: (prefix, value bits); the value is stored offset to be non-negative
+_DOD_BUCKETS = (("10", 7), ("110", 9), ("1110", 12))
+_DOD_WIDE = "1111"
+_MASK64 = (1 << 64) - 1
+
+
+def _float_bits(value):
+    """IEEE 754 bits of a float as an unsigned int."""
+    return _UINT64.unpack(_DOUBLE.pack(value))[0]
+
+
+def _bits_float(bits):
+    """Float from its IEEE 754 bits."""
+    return _DOUBLE.unpack(_UINT64.pack(bits))[0]
+
+
+class BlockEncoder:
+    """Encodes points into one Gorilla block as they arrive.
+
+    Timestamps are stored as delta-of-deltas, so a regular polling interval
+    costs one bit per point. Values are XORed with the previous value and
+    only the meaningful bits are stored, so a repeated reading costs one bit
+    and a small change a few bits. Timestamps are int epoch seconds and
+    values are floats (stored exactly, as float64).
+    """
+
+    def __init__(self):
+        """Start an empty block."""
+        self._bits = []  # Bit strings, joined when the block is sealed
+        self._bit_count = 0
+        self.count = 0
+        self.first_ts = None
+        self.last_ts = None
+        self._first_value = None
+        self._delta = 0
+        self._value_bits = 0
+        self._leading = 65  # Window of the last stored XOR; 65 means no window yet
+        self._trailing = 0
+
+    def _write(self, bits):
+        """Append a bit string."""
+        self._bits.append(bits)
+        self._bit_count += len(bits)
+
+    def append(self, ts, value):
+        """Add a point; timestamps must not decrease."""
+        ts = int(ts)
+        value_bits = _float_bits(float(value))
+        if self.count == 0:
+            self.first_ts = self.last_ts = ts
+            self._first_value = float(value)
+            self._value_bits = value_bits
+            self.count = 1
+            return
+        if ts < self.last_ts:
+            raise ValueError(f"Timestamp {ts} is before the previous point ({self.last_ts})")
+
+        # Timestamp: delta of deltas
+        delta = ts - self.last_ts
+        dod = delta - self._delta
+        if dod == 0:
+            self._write("0")
+        else:
+            for prefix, width in _DOD_BUCKETS:
+                offset = (1 << (width - 1)) - 1
+                if -offset <= dod <= offset + 1:
+                    self._write(prefix + format(dod + offset, f"0{width}b"))
+                    break
+            else:
+                self._write(_DOD_WIDE + format(dod & _MASK64, "064b"))
+        self._delta = delta
+        self.last_ts = ts
+
+        # Value: XOR with the previous value
+        xor = value_bits ^ self._value_bits
+        self._value_bits = value_bits
+        if xor == 0:
+            self._write("0")
+        else:
+            leading = min(64 - xor.bit_length(), 31)
+            trailing = (xor & -xor).bit_length() - 1
+            if leading >= self._leading and trailing >= self._trailing:
+                # Fits the previous window: store only the window
+                width = 64 - self._leading - self._trailing
+                self._write("10" + format(xor >> self._trailing, f"0{width}b"))
+            else:
+                width = 64 - leading - trailing
+                self._write("11" + format(leading, "05b") + format(width & 63, "06b")
+                            + format(xor >> trailing, f"0{width}b"))
+                self._leading, self._trailing = leading, trailing
+        self.count += 1
+
+    @property
+    def nbytes(self):
+        """Encoded size of the block so far."""
+        return _BLOCK_HEADER.size + (self._bit_count + 7) // 8
+
+    def to_bytes(self):
+        """Get the encoded block."""
+        if self.count == 0:
+            raise ValueError("Can't encode an empty block")
+        payload = b""
+        if self._bit_count:
+            padding = -self._bit_count % 8
+            payload = int("".join(self._bits) + "0" * padding, 2).to_bytes((self._bit_count + padding) // 8, "big")
+        return _BLOCK_HEADER.pack(self.first_ts, self._first_value, self.count, self._bit_count) + payload
+
+
+def encode_block(epoch_seconds, values):
+    """Encode points into one block. Returns the block bytes."""
+    encoder = BlockEncoder()
+    for ts, value in zip(np.asarray(epoch_seconds).tolist(), np.asarray(values, dtype=np.float64).tolist()):
+        encoder.append(ts, value)
+    return encoder.to_bytes()
+
+
+def decode_block(data):
+    """Decode a block.
+
+    Returns:
+        Tuple of (int64 epoch seconds array, float64 values array)
+    """
+    first_ts, first_value, count, bit_count = _BLOCK_HEADER.unpack_from(data)
+    payload = bytes(data[_BLOCK_HEADER.size:_BLOCK_HEADER.size + (bit_count + 7) // 8])
+    bits = format(int.from_bytes(payload, "big"), f"0{len(payload) * 8}b") if payload else ""
+
+    timestamps = [first_ts]
+    values = [first_value]
+    ts, delta, value_bits = first_ts, 0, _float_bits(first_value)
+    leading = trailing = 0
+    pos = 0
+    for _ in range(count - 1):
+        # Timestamp
+        if bits[pos] == "0":
+            pos += 1
+        else:
+            for prefix, width in _DOD_BUCKETS:
+                if bits.startswith(prefix, pos):
+                    pos += len(prefix)
+                    delta += int(bits[pos:pos + width], 2) - ((1 << (width - 1)) - 1)
+                    pos += width
+                    break
+            else:
+                pos += len(_DOD_WIDE)
+                dod = int(bits[pos:pos + 64], 2)
+                delta += dod - (1 << 64) if dod >> 63 else dod
+                pos += 64
+        ts += delta
+        timestamps.append(ts)
+
+        # Value
+        if bits[pos] == "0":
+            pos += 1
+        else:
+            if bits[pos + 1] == "1":
+                leading = int(bits[pos + 2:pos + 7], 2)
+                width = int(bits[pos + 7:pos + 13], 2) or 64
+                trailing = 64 - leading - width
+                pos += 13
+            else:
+                width = 64 - leading - trailing
+                pos += 2
+            value_bits ^= int(bits[pos:pos + width], 2) << trailing
+            pos += width
+        values.append(_bits_float(value_bits))
+
+    return np.array(timestamps, dtype=np.int64), np.array(values, dtype=np.float64)
+
+
+class CompressedSeries:
+    """A power series held as Gorilla-compressed blocks.
+
+    Points are appended to an open block, which is sealed once it holds
+    `block_points` points. Each block's time range is kept in an index, so a
+    time range decodes only the blocks that overlap it. Usable in memory, or
+    saved as a chunk file with to_bytes() / write().
+    """
+
+    def __init__(self, block_points=DEFAULT_BLOCK_POINTS):
+        """Create an empty series.
+
+        Args:
+            block_points: Points per block
+        """
+        self.block_points = max(2, int(block_points))
+        self._blocks = []  # Sealed block bytes
+        self._first = []  # First timestamp of each sealed block
+        self._last = []  # Last timestamp of each sealed block
+        self._counts = []
+        self._open = BlockEncoder()
+
+    def append(self, ts, value):
+        """Add a point; timestamps must not decrease."""
+        if self._open.count == 0 and self._last and int(ts) < self._last[-1]:
+            raise ValueError(f"Timestamp {ts} is before the previous point ({self._last[-1]})")
+        self._open.append(ts, value)
+        if self._open.count >= self.block_points:
+            self._seal()
+
+    def extend(self, epoch_seconds, values):
+        """Add points in time order."""
+        for ts, value in zip(np.asarray(epoch_seconds).tolist(), np.asarray(values, dtype=np.float64).tolist()):
+            self.append(ts, value)
+
+    def _seal(self):
+        """Close the open block and start a new one."""
+        if self._open.count == 0:
+            return
+        self._blocks.append(self._open.to_bytes())
+        self._first.append(self._open.first_ts)
+        self._last.append(self._open.last_ts)
+        self._counts.append(self._open.count)
+        self._open = BlockEncoder()
+
+    def __len__(self):
+        return sum(self._counts) + self._open.count
+
+    @property
+    def block_count(self):
+        """Number of blocks, including the open one if it has points."""
+        return len(self._blocks) + (1 if self._open.count else 0)
+
+    @property
+    def nbytes(self):
+        """Encoded size of all blocks."""
+        return sum(len(block) for block in self._blocks) + (self._open.nbytes if self._open.count else 0)
+
+    def block_range(self, index):
+        """Get (first timestamp, last timestamp, point count) of a block."""
+        if index < len(self._blocks):
+            return self._first[index], self._last[index], self._counts[index]
+        if index == len(self._blocks) and self._open.count:
+            return self._open.first_ts, self._open.last_ts, self._open.count
+        raise IndexError(f"Block {index} out of range")
+
+    def read_block(self, index):
+        """Decode one block as (epoch seconds, values) arrays."""
+        if index < len(self._blocks):
+            return decode_block(self._blocks[index])
+        if index == len(self._blocks) and self._open.count:
+            return decode_block(self._open.to_bytes())
+        raise IndexError(f"Block {index} out of range")
+
+    def to_arrays(self, start=None, end=None):
+        """Decode the points in a time range.
+
+        Args:
+            start: Earliest epoch second, inclusive
+            end: Latest epoch second, inclusive
+
+        Returns:
+            Tuple of (int64 epoch seconds array, float64 values array)
+        """
+        # Blocks are in time order, so the overlapping ones are found by bisection
+        firsts, lasts = self._first, self._last
+        if self._open.count:
+            firsts, lasts = firsts + [self._open.first_ts], lasts + [self._open.last_ts]
+        first = 0 if start is None else bisect.bisect_left(lasts, start)
+        last = len(firsts) if end is None else bisect.bisect_right(firsts, end)
+
+        parts = [self.read_block(i) for i in range(first, last)]
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        epoch = np.concatenate([p[0] for p in parts])
+        values = np.concatenate([p[1] for p in parts])
+        if start is not None or end is not None:
+            keep = np.ones(len(epoch), dtype=bool)
+            if start is not None:
+                keep &= epoch >= start
+            if end is not None:
+                keep &= epoch <= end
+            epoch, values = epoch[keep], values[keep]
+        return epoch, values
+
+    def __iter__(self):
+        """Iterate (epoch second, value) pairs in time order, one block at a time."""
+        for index in range(self.block_count):
+            epoch, values = self.read_block(index)
+            yield from zip(epoch.tolist(), values.tolist())
+
+    def to_bytes(self):
+        """Encode the series as a chunk: header, block index and blocks."""
+        self._seal()
+        parts = [_CHUNK_HEADER.pack(_CHUNK_MAGIC, len(self._blocks))]
+        offset = _CHUNK_HEADER.size + _CHUNK_INDEX.size * len(self._blocks)
+        for first, last, count, block in zip(self._first, self._last, self._counts, self._blocks):
+            parts.append(_CHUNK_INDEX.pack(first, last, count, offset))
+            offset += len(block)
+        return b"".join(parts + self._blocks)
+
+    @classmethod
+    def from_bytes(cls, data, block_points=DEFAULT_BLOCK_POINTS):
+        """Load a series from chunk bytes."""
+        magic, block_count = _CHUNK_HEADER.unpack_from(data)
+        if magic != _CHUNK_MAGIC:
+            raise ValueError("Not a compressed series chunk")
+        series = cls(block_points)
+        entries = [_CHUNK_INDEX.unpack_from(data, _CHUNK_HEADER.size + i * _CHUNK_INDEX.size)
+                   for i in range(block_count)]
+        for i, (first, last, count, offset) in enumerate(entries):
+            end = entries[i + 1][3] if i + 1 < block_count else len(data)
+            series._blocks.append(bytes(data[offset:end]))
+            series._first.append(first)
+            series._last.append(last)
+            series._counts.append(count)
+        return series
+
+    def write(self, path):
+        """Save the series as a chunk file."""
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def read(cls, path):
+        """Load a series from a chunk file."""
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+def read_chunk_range(path, start=None, end=None):
+    """Decode the points of a chunk file in a time range, reading only the blocks that overlap it.
+
+    Returns:
+        Tuple of (int64 epoch seconds array, float64 values array)
+    """
+    with open(path, 'rb') as f:
+        magic, block_count = _CHUNK_HEADER.unpack(f.read(_CHUNK_HEADER.size))
+        if magic != _CHUNK_MAGIC:
+            raise ValueError(f"Not a compressed series chunk: {path}")
+        index = f.read(_CHUNK_INDEX.size * block_count)
+        entries = [_CHUNK_INDEX.unpack_from(index, i * _CHUNK_INDEX.size) for i in range(block_count)]
+        series = CompressedSeries()
+        for i, (first, last, count, offset) in enumerate(entries):
+            if (start is not None and last < start) or (end is not None and first > end):
+                continue
+            f.seek(offset)
+            length = entries[i + 1][3] - offset if i + 1 < block_count else -1
+            series._blocks.append(f.read(length))
+            series._first.append(first)
+            series._last.append(last)
+            series._counts.append(count)
+    return series.to_arrays(start, end)
+
+
+def read_chunk_span(path):
+    """Get a chunk file's first and last timestamp and point count from its block index alone.
+
+    Returns:
+        Tuple of (first epoch second, last epoch second, count); the times are None if it is empty
+    """
+    with open(path, 'rb') as f:
+        magic, block_count = _CHUNK_HEADER.unpack(f.read(_CHUNK_HEADER.size))
+        if magic != _CHUNK_MAGIC:
+            raise ValueError(f"Not a compressed series chunk: {path}")
+        index = f.read(_CHUNK_INDEX.size * block_count)
+    entries = [_CHUNK_INDEX.unpack_from(index, i * _CHUNK_INDEX.size) for i in range(block_count)]
+    if not entries:
+        return None, None, 0
+    return entries[0][0], entries[-1][1], sum(entry[2] for entry in entries)
+
+
+class GorillaColumnFormat:
+    """Columnar partition files as Gorilla-compressed chunks (see CompressedSeries).
+
+    Smaller than the zlib columns for repetitive readings, but decoding is
+    pure Python, so it suits archives better than hot partitions.
+    """
+
+    name = "gorilla"
+    extension = ".gor"
+
+    def write(self, path, epoch_seconds, watts):
+        """Write one partition file."""
+        series = CompressedSeries()
+        series.extend(epoch_seconds, watts)
+        series.write(path)
+
+    def read(self, path):
+        """Read one partition file."""
+        epoch, values = CompressedSeries.read(path).to_arrays()
+        return epoch, values.astype(np.float32)
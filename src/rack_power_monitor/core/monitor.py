@@ -2,20 +2,68 @@ import asyncio
 import datetime
 import logging
 import os
-import csv
 from ..utils.api_client import RedfishAPIClient
+from .scheduler import PollScheduler
+from .persistence import get_persistence_pipeline
 
 logger = logging.getLogger("power_monitor")
 
 class RackPowerMonitor:
     """Core class for monitoring server rack power usage."""
     
-    def __init__(self):
-        """Initialize the power monitor."""
+    # Collection modes: a single rack total, or every shelf/PSU metric
+    COLLECTION_MODES = ("single", "shelves")
+    
+    # Header of the per-rack power files
+    CSV_HEADER = ["Timestamp", "Power (W)"]
+    
+    def __init__(self, max_concurrent_polls=32, cycle_deadline_seconds=None,
+                 align_to_grid=True, stagger_fraction=0.5, collection_mode="single",
+                 persistence=None):
+        """Initialize the power monitor.
+        
+        Args:
+            max_concurrent_polls: Maximum number of racks polled at the same time
+            cycle_deadline_seconds: Time budget for one polling cycle; polls still
+                running after it are cancelled. Defaults to the polling interval.
+            align_to_grid: Align polling ticks to whole multiples of the interval
+            stagger_fraction: Portion of the interval used to spread rack polls
+            collection_mode: "single" reads the rack total from shelf 1; "shelves"
+                discovers every shelf and records all shelf and PSU metrics
+            persistence: Pipeline that writes readings on a background thread;
+                defaults to the process-wide pipeline
+        """
         self.api_client = RedfishAPIClient()
         self.monitoring_active = False
         self.racks_data = {}
         self.data_dir = None
+        self.paused = False
+        self.stop_requested = False
+        self._wake_event = None  # Created on the loop that runs monitor_all_racks
+        
+        # Concurrency settings for each polling cycle
+        self.max_concurrent_polls = max(1, int(max_concurrent_polls))
+        self.cycle_deadline_seconds = cycle_deadline_seconds
+        self.last_cycle_stats = {}
+        
+        # Racks skipped because their RSCM's circuit breaker is open
+        self.unavailable_racks = {}
+        
+        # Multi-shelf collection
+        if collection_mode not in self.COLLECTION_MODES:
+            raise ValueError(f"Unknown collection mode: {collection_mode}")
+        self.collection_mode = collection_mode
+        self.last_shelf_records = {}  # rack_name -> list of shelf records from the last poll
+        
+        # Scheduling settings; the scheduler is created per monitoring run
+        self.align_to_grid = align_to_grid
+        self.stagger_fraction = stagger_fraction
+        self.scheduler = None
+        
+        # Readings are queued to a writer thread so disk I/O never blocks polling
+        self.persistence = persistence or get_persistence_pipeline()
+        self._csv_paths = set()  # Files this monitor has written to
+        self._series_racks = set()  # Racks this monitor has sent to the series store
     
     def initialize_results_folder(self, base_dir="power_data"):
         """Initialize results folder for data storage."""
@@ -43,12 +91,9 @@ class RackPowerMonitor:
         logger = logging.getLogger("power_monitor")
         logger.info(f"Starting monitor_all_racks with interval={interval_minutes}min, duration={duration_hours}hrs")
         
-        # Create a new session ID for this monitoring run to ensure new CSV files
-        self.reset_session()
-        
-        # Add a paused attribute if it doesn't exist
-        if not hasattr(self, 'paused'):
-            self.paused = False
+        # Create a new session ID for this monitoring run to ensure new CSV files;
+        # closing the previous session drains the queue, so off the loop
+        await asyncio.to_thread(self.reset_session)
         
         # Add detailed diagnostic logging
         logger.info(f"DIAGNOSTIC: Racks configuration: {json.dumps({k: {
@@ -60,94 +105,51 @@ class RackPowerMonitor:
         # Calculate interval in seconds
         interval_seconds = interval_minutes * 60
         
+        # Ticks come from a monotonic clock aligned to an absolute grid, so
+        # the polling cadence doesn't drift with poll duration or clock changes
+        scheduler = PollScheduler(
+            interval_seconds,
+            align_to_grid=self.align_to_grid,
+            stagger_fraction=self.stagger_fraction
+        )
+        self.scheduler = scheduler
+        
         # Calculate end time if duration is specified
         end_time = None
         if duration_hours:
-            end_time = datetime.datetime.now() + datetime.timedelta(hours=duration_hours)
+            end_time = scheduler.clock() + duration_hours * 3600
         
-        # Reset stop flag
+        # Reset stop flag and create the event used to interrupt waits
         self.stop_requested = False
+        self._wake_event = asyncio.Event()
         
         try:
             # Main monitoring loop
             while not self.stop_requested:
-                start_time = datetime.datetime.now()
+                # Wait for the next tick; request_stop() wakes us up early
+                tick = await scheduler.wait_for_next_tick(self._wait_for_wake)
+                if tick is None:
+                    logger.info("Stop requested during wait period")
+                    break
+                
+                # Check if we've exceeded the duration
+                if end_time and scheduler.clock() >= end_time:
+                    logger.info("Monitoring duration reached")
+                    break
                 
                 # Check if monitoring is paused
                 if not self.paused:
-                    logger.info(f"Polling at {start_time}")
-                    
-                    # Check if we've exceeded the duration
-                    if end_time and datetime.datetime.now() >= end_time:
-                        logger.info("Monitoring duration reached")
-                        break
+                    logger.info(f"Polling at {datetime.datetime.now()}")
                     
-                    # Process each rack
-                    for rack_name, rack_info in self.racks.items():
-                        try:
-                            # Get credentials
-                            address = rack_info["address"]
-                            username = rack_info["username"]
-                            password = rack_info["password"]
-                            
-                            # Log that we're getting a power reading
-                            logger.info(f"Getting power reading for {rack_name} ({address})...")
-                            
-                            # Use self to call the method
-                            success, power = await self._direct_api_call(address, username, password)
-                            
-                            # If we got a valid power reading
-                            if success and power is not None:
-                                timestamp = datetime.datetime.now()
-                                logger.info(f"Power reading for {rack_name}: {power:.2f}W")
-                                
-                                # Record the data
-                                if rack_name not in self.racks_data:
-                                    self.racks_data[rack_name] = []
-                                self.racks_data[rack_name].append((timestamp, power))
-                                
-                                # Save to CSV file
-                                self._save_to_csv(rack_name, timestamp, power)
-                                
-                                # Call the callback function if provided
-                                if callback:
-                                    try:
-                                        callback(rack_name, timestamp, power)
-                                    except Exception as callback_ex:
-                                        logger.error(f"Error in callback for {rack_name}: {str(callback_ex)}")
-                            else:
-                                logger.warning(f"No power data returned for {rack_name}")
-                                
-                        except Exception as e:
-                            logger.error(f"Error monitoring {rack_name}: {str(e)}")
+                    # Poll every rack concurrently within the cycle deadline
+                    deadline = self.cycle_deadline_seconds or interval_seconds
+                    await self._poll_cycle(deadline, callback, tick=tick)
                 else:
-                    logger.info(f"Monitoring is paused, skipping polling cycle at {start_time}")
-                
-                # Calculate time to wait until next measurement
-                elapsed = (datetime.datetime.now() - start_time).total_seconds()
-                wait_time = max(0, interval_seconds - elapsed)
+                    logger.info(f"Monitoring is paused, skipping polling cycle at {datetime.datetime.now()}")
                 
                 if self.stop_requested:
                     logger.info("Stop requested during monitoring loop")
                     break
-                    
-                # Wait for the next interval, checking periodically for stop request or pause state changes
-                if wait_time > 0:
-                    if not self.paused:
-                        logger.info(f"Waiting {wait_time:.1f} seconds until next measurement")
-                    else:
-                        logger.info(f"Paused: Waiting {wait_time:.1f} seconds until next check")
-                        
-                    wait_chunks = min(1.0, wait_time / 10)  # Check for stop/pause every 1 second or less
-                    waited = 0
-                    
-                    while waited < wait_time and not self.stop_requested:
-                        await asyncio.sleep(min(wait_chunks, wait_time - waited))
-                        waited += wait_chunks
-                        
-                        if self.stop_requested:
-                            logger.info("Stop requested during wait period")
-                            break
                 
             logger.info("Monitoring loop completed")
             return True
@@ -160,78 +162,203 @@ class RackPowerMonitor:
             import traceback
             logger.error(f"Exception details: {traceback.format_exc()}")
             return False
+        finally:
+            # Drain queued readings and release this session's files without
+            # blocking the other racks on this loop
+            await asyncio.to_thread(self.flush_data, True)
         
-    # Add this helper function to make direct API calls with the working authentication logic
-    async def _direct_api_call(self, address, username, password):
-        """Make a direct API call using the successful authentication approach from test_connection_with_power."""
-        import logging
-        import aiohttp
-        import asyncio
-        import base64
+    async def _poll_cycle(self, deadline_seconds, callback=None, tick=None):
+        """Poll all racks concurrently, bounded by a semaphore and a cycle deadline.
         
-        logger = logging.getLogger("power_monitor")
+        Each reading is recorded as soon as it arrives, so a slow RSCM only
+        delays its own rack. Each rack starts at its phase offset after the
+        tick. Polls still running at the deadline are cancelled.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_polls)
+        cycle_start = asyncio.get_running_loop().time()
         
-        # Add diagnostic logging
-        logger.info(f"DIAGNOSTIC: _direct_api_call for {address}")
-        logger.info(f"DIAGNOSTIC: Username length: {len(username) if username else 0}")
-        logger.info(f"DIAGNOSTIC: Password length: {len(password) if password else 0}")
+        tasks = {}
+        for rack_name, rack_info in self.racks.items():
+            start_delay = 0.0
+            if self.scheduler is not None and tick is not None:
+                start_delay = self.scheduler.seconds_until(tick, self.scheduler.phase_offset(rack_name))
+            task = asyncio.ensure_future(self._poll_rack(rack_name, rack_info, semaphore, callback, start_delay))
+            tasks[task] = rack_name
         
-        # Create a new session for this call
-        session = aiohttp.ClientSession(
-            connector=aiohttp.TCPConnector(verify_ssl=False)
-        )
+        if not tasks:
+            return
+        
+        # The deadline is measured from the tick, not from when we got here
+        timeout = deadline_seconds
+        if self.scheduler is not None and tick is not None:
+            timeout = self.scheduler.seconds_until(tick, deadline_seconds)
+        
+        done, pending = await asyncio.wait(tasks.keys(), timeout=timeout)
         
+        # Cancel polls that overran the deadline so they don't bleed into the next cycle
+        for task in pending:
+            logger.warning(f"Poll for {tasks[task]} missed the {deadline_seconds:.1f}s cycle deadline")
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        results = [task.result() for task in done if not task.cancelled()]
+        succeeded = sum(1 for result in results if result is True)
+        skipped = sum(1 for result in results if result is None)
+        self.last_cycle_stats = {
+            'racks': len(tasks),
+            'succeeded': succeeded,
+            'failed': len(done) - succeeded - skipped,
+            'skipped_unhealthy': skipped,
+            'timed_out': len(pending),
+            'duration_seconds': asyncio.get_running_loop().time() - cycle_start
+        }
+        if self.scheduler is not None:
+            self.last_cycle_stats.update({
+                'late_ticks': self.scheduler.metrics['late_ticks'],
+                'skipped_ticks': self.scheduler.metrics['skipped_ticks']
+            })
+        logger.info(f"Polling cycle finished: {self.last_cycle_stats}")
+    
+    async def _poll_rack(self, rack_name, rack_info, semaphore, callback=None, start_delay=0.0):
+        """Poll a single rack and record the reading.
+        
+        Returns True on success, False on failure and None if the poll was
+        skipped because the RSCM's circuit breaker is open.
+        """
         try:
-            # Use ONLY this specific endpoint and port that works in tests
-            endpoint = "/redfish/v1/PowerEquipment/PowerShelves/1/Oem/Microsoft/PowerMeter"
-            url = f"https://{address}:8080{endpoint}"
-            
-            # Prepare both types of authentication
-            auth = aiohttp.BasicAuth(username, password)
-            basic_auth_header = f"Basic {base64.b64encode(f'{username}:{password}'.encode()).decode()}"
+            # Wait for this rack's phase offset within the interval
+            if start_delay > 0:
+                await asyncio.sleep(start_delay)
             
-            # Log the auth header without exposing credentials completely
-            masked_header = basic_auth_header[:15] + '...' + basic_auth_header[-5:] if len(basic_auth_header) > 20 else basic_auth_header
-            logger.info(f"DIAGNOSTIC: Auth header: {masked_header}")
+            # Get credentials
+            address = rack_info["address"]
+            username = rack_info["username"]
+            password = rack_info["password"]
             
-            headers = {
-                "Authorization": basic_auth_header,
-                "Content-Type": "application/json",
-                "Accept": "application/json"
-            }
+            # Skip hosts that keep failing until their backoff expires
+            if not self.api_client.is_available(address):
+                self.unavailable_racks[rack_name] = self.api_client.health.get_health(address)
+                logger.info(f"Skipping {rack_name} ({address}): RSCM marked unavailable")
+                return None
+            self.unavailable_racks.pop(rack_name, None)
             
-            # Try with explicit headers first since that's working more reliably in test
-            async with session.get(url, headers=headers, timeout=10, ssl=False) as headers_response:
-                if headers_response.status == 200:
-                    data = await headers_response.json()
-                    if "TotalInputPowerInWatts" in data:
-                        power_watts = data.get("TotalInputPowerInWatts")
-                        logger.info(f"Power reading (headers auth): {power_watts}W")
-                        return True, power_watts
+            records = None
+            async with semaphore:
+                # Log that we're getting a power reading
+                logger.info(f"Getting power reading for {rack_name} ({address})...")
+                if self.collection_mode == "shelves":
+                    success, power, records = await self._collect_shelves_call(address, username, password)
                 else:
-                    logger.warning(f"HTTP {headers_response.status} using explicit headers")
-                    
-            # Try with basic auth as backup
-            async with session.get(url, auth=auth, timeout=10, ssl=False) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if "TotalInputPowerInWatts" in data:
-                        power_watts = data.get("TotalInputPowerInWatts")
-                        logger.info(f"Power reading (basic auth): {power_watts}W")
-                        return True, power_watts
-                else:
-                    logger.warning(f"HTTP {response.status} using basic auth")
-                    
-            # If we get here, both attempts failed
-            return False, None
+                    success, power = await self._direct_api_call(address, username, password)
+            
+            timestamp = datetime.datetime.now()
+            if records:
+                self.last_shelf_records[rack_name] = records
+                self._save_shelf_records(rack_name, timestamp, records)
+            
+            # If we got a valid power reading
+            if success and power is not None:
+                self._record_reading(rack_name, timestamp, power, callback)
+                return True
             
+            logger.warning(f"No power data returned for {rack_name}")
+            return False
+        
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error monitoring {rack_name}: {str(e)}")
+            return False
+    
+    def _record_reading(self, rack_name, timestamp, power, callback=None):
+        """Store a reading, persist it and notify the callback."""
+        logger.info(f"Power reading for {rack_name}: {power:.2f}W")
+        
+        # Record the data
+        if rack_name not in self.racks_data:
+            self.racks_data[rack_name] = []
+        self.racks_data[rack_name].append((timestamp, power))
+        
+        # Save to CSV file
+        self._save_to_csv(rack_name, timestamp, power)
+        
+        # Call the callback function if provided
+        if callback:
+            try:
+                callback(rack_name, timestamp, power)
+            except Exception as callback_ex:
+                logger.error(f"Error in callback for {rack_name}: {str(callback_ex)}")
+    
+    async def _wait_for_wake(self, timeout):
+        """Sleep until the timeout expires or a stop is requested.
+        
+        Returns True if the wait was interrupted by a stop request.
+        """
+        if self._wake_event is None:
+            await asyncio.sleep(timeout)
+            return self.stop_requested
+        try:
+            await asyncio.wait_for(self._wake_event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.stop_requested
+    
+    def request_stop(self):
+        """Request the monitoring loop to stop.
+        
+        Must be called on the event loop running the monitor (the collector
+        service forwards it with call_soon_threadsafe).
+        """
+        self.stop_requested = True
+        if self._wake_event is not None:
+            self._wake_event.set()
+    
+    def get_scheduler_metrics(self):
+        """Get tick metrics (late and skipped ticks) for the current run."""
+        if self.scheduler is None:
+            return {}
+        return self.scheduler.get_metrics()
+    
+    def set_paused(self, paused):
+        """Pause or resume polling without stopping the monitoring loop."""
+        self.paused = paused
+        logger.info(f"Monitoring {'paused' if paused else 'resumed'}")
+    
+    async def _direct_api_call(self, address, username, password):
+        """Get a power reading using the protocol negotiated for this RSCM.
+        
+        Returns:
+            Tuple of (success, power_watts)
+        """
+        try:
+            return await self.api_client.fetch_power(address, username, password)
         except Exception as e:
             logger.error(f"Error accessing {address}: {str(e)}")
             return False, None
-        finally:
-            # Always close the session
-            if not session.closed:
-                await session.close()
+    
+    async def _collect_shelves_call(self, address, username, password):
+        """Collect every shelf of an RSCM; the rack power is the sum of the shelf totals.
+        
+        A rack total is only reported when every shelf reported its total, as
+        a sum over some of the shelves would be stored as a (too low) reading.
+        
+        Returns:
+            Tuple of (success, total_power_watts, shelf_records); the records
+            are returned even when the total isn't
+        """
+        try:
+            success, records = await self.api_client.collect_shelves(address, username, password)
+        except Exception as e:
+            logger.error(f"Error collecting shelves from {address}: {str(e)}")
+            return False, None, []
+        
+        if not records:
+            return False, None, records
+        if not success or any('TotalInputPowerInWatts' not in r['metrics'] for r in records):
+            logger.warning(f"Only some shelves of {address} reported their power; no rack total recorded")
+            return False, None, records
+        return True, sum(r['metrics']['TotalInputPowerInWatts'] for r in records), records
     
     async def monitor_rack(self, rack_name, interval_minutes=1.0, duration_hours=None, callback=None):
         """Monitor a specific rack.
@@ -291,8 +418,8 @@ class RackPowerMonitor:
                 self.racks_data[rack_name]['power_values'].append(power_watts)
                 
             # Write to CSV
-            with open(csv_path, 'a', newline='', encoding='utf-8') as f:
-                f.write(f"{formatted_time},{address},{power_watts if power_watts is not None else 'ERROR'}\n")
+            self._csv_paths.add(csv_path)
+            self.persistence.submit(csv_path, [[formatted_time, address, power_watts if power_watts is not None else 'ERROR']])
                 
             # Call the callback function if provided
             if callback:
@@ -333,8 +460,29 @@ class RackPowerMonitor:
         self.monitoring_active = True
     
     def stop_monitoring(self):
-        """Clear the monitoring active flag."""
+        """Clear the monitoring active flag and drain queued readings to disk."""
         self.monitoring_active = False
+        self.flush_data(close=True)
+    
+    def flush_data(self, close=False, timeout=None):
+        """Wait for queued readings to be written and flush this monitor's CSV files.
+        
+        Args:
+            close: Also close the files; they are reopened if more rows arrive
+            timeout: Maximum seconds to wait for the queue to drain
+        
+        Returns:
+            True if the queue drained in time
+        """
+        paths = list(self._csv_paths)
+        if not paths:
+            return True
+        racks = list(self._series_racks)
+        if close:
+            self._csv_paths.clear()
+            self._series_racks.clear()
+            return self.persistence.close(paths, timeout, racks)
+        return self.persistence.flush(paths, timeout, racks)
 
     def _save_to_csv(self, rack_name, timestamp, power):
         """Save power reading to CSV file with unique session-based naming."""
@@ -348,42 +496,53 @@ class RackPowerMonitor:
         # Create a unique filename for this monitoring session
         filename = f"{rack_name}_{self.session_id}.csv"
         
-        # Create power_data directory if it doesn't exist
+        # Use the power_data directory if none is set; the writer creates it
         if not hasattr(self, 'data_dir') or self.data_dir is None:
             self.data_dir = "power_data"
-            
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir, exist_ok=True)
         
         filepath = os.path.join(self.data_dir, filename)
         
-        # Check if file exists
-        file_exists = os.path.isfile(filepath)
-        
         # Format timestamp for CSV
         formatted_time = timestamp.strftime("%Y-%m-%d %H:%M:%S")
         
-        # Open file in append mode
-        with open(filepath, 'a', newline='') as f:
-            writer = csv.writer(f)
-            
-            # Write header if new file
-            if not file_exists:
-                writer.writerow(["Timestamp", "Power (W)"])
-            
-            # Write data
-            writer.writerow([formatted_time, power])
-                
-        logger.info(f"Saved power reading for {rack_name} to {filepath}")
+        # Queue the row; the writer thread adds the header to new files and writes in batches
+        # The series stores get the same reading with an epoch timestamp
+        self._csv_paths.add(filepath)
+        self._series_racks.add(rack_name)
+        self.persistence.submit(filepath, [[formatted_time, power]], header=self.CSV_HEADER,
+                                series=(rack_name, [int(timestamp.timestamp())], [power], filepath))
+        
+        logger.debug(f"Queued power reading for {rack_name} to {filepath}")
         
         # Store the last saved file name for reference
         self.last_saved_file = filename
         
         return filepath
 
+    def _save_shelf_records(self, rack_name, timestamp, records):
+        """Append shelf metrics in long format (one row per shelf and metric).
+        
+        Stored in a 'shelves' subfolder so the per-rack power files keep their layout.
+        """
+        shelves_dir = os.path.join(self.data_dir or "power_data", "shelves")
+        filepath = os.path.join(shelves_dir, f"{rack_name}_{self.session_id}.csv")
+        formatted_time = timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        
+        rows = [
+            [formatted_time, record['shelf_id'], metric, value]
+            for record in records
+            for metric, value in sorted(record['metrics'].items())
+        ]
+        self._csv_paths.add(filepath)
+        self.persistence.submit(filepath, rows, header=["Timestamp", "Shelf", "Metric", "Value"])
+        
+        return filepath
+
     # Add this method to the RackPowerMonitor class
     def reset_session(self):
         """Reset the session ID to create a new file for a new monitoring session."""
         import datetime
+        # The previous session's files won't be written again
+        self.flush_data(close=True)
         self.session_id = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         logger.info(f"Reset monitoring session with new ID: {self.session_id}")
\ No newline at end of file
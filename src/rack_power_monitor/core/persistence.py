@@ -0,0 +1,466 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+from collections import deque
+
+from .csv_writer import get_csv_writer
+
+logger = logging.getLogger("power_monitor")
+
+# What submit() does when the queue is full
+BACKPRESSURE_MODES = ("block", "drop_oldest", "spill")
+
+# Most items the writer thread takes off the queue at once
+WRITE_BATCH_ITEMS = 256
+
+
+def _on_event_loop():
+    """Whether the calling thread is running an asyncio event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class _LatencyStats:
+    """Last, mean and maximum of a series of durations."""
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        """Add a duration."""
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self):
+        """Return the durations in milliseconds."""
+        return {
+            'last_ms': self.last * 1000,
+            'mean_ms': (self.total / self.count * 1000) if self.count else 0.0,
+            'max_ms': self.max * 1000
+        }
+
+
+class PersistencePipeline:
+    """Moves CSV writes off the polling event loop onto a dedicated writer thread.
+
+    Monitors submit rows to a bounded queue and return immediately; the writer
+    thread hands them to the BufferedCSVWriter, and readings to the columnar
+    series store when one is attached. When the queue is full the
+    back-pressure mode decides what happens:
+        block:       the caller waits for room (up to block_timeout_seconds,
+                     after which the rows are dropped)
+        drop_oldest: the oldest queued rows are discarded
+        spill:       rows overflow to a spool file on local disk and are
+                     written, in order, once the queue has caught up
+
+    Waiting in block mode would stall every rack polled on the collector's
+    event loop, so callers running an event loop spill instead of waiting.
+    Block mode only holds back plain threads.
+    """
+
+    def __init__(self, writer=None, max_queue_items=10000, backpressure="spill",
+                 block_timeout_seconds=5.0, spill_dir=None):
+        """Initialize the pipeline.
+
+        Args:
+            writer: BufferedCSVWriter that does the writing; defaults to the shared writer
+            max_queue_items: Capacity of the queue (one item per submit call)
+            backpressure: One of BACKPRESSURE_MODES
+            block_timeout_seconds: In block mode, how long submit() waits for room
+            spill_dir: Folder for the spool file in spill mode; the system temp folder if omitted
+        """
+        self.writer = writer or get_csv_writer()
+        self.series_stores = []  # TimeSeriesStores that also receive readings
+        self.catalog = None  # SessionCatalog the writer reports to; flushed along with the series stores
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._thread = None
+        self._stopping = False
+        self._writer_idle = False  # Writer thread is waiting for work
+
+        # Spill state: once spilling starts, new rows go to the spool until it
+        # has been replayed, so rows for a file are never reordered
+        self._spilling = False
+        self._spill_file = None
+        self._spill_path = None
+        self._spill_items = 0
+        self._spill_sequence = 0
+        self._replaying = 0
+
+        # Submitted items count as completed once written, dropped or failed
+        self._submitted = 0
+        self._completed = 0
+        self._in_flight = 0
+
+        self._stats = {
+            'written': 0,
+            'dropped': 0,
+            'spilled': 0,
+            'write_errors': 0,
+            'max_queue_depth': 0
+        }
+        self._write_latency = _LatencyStats()
+        self._queue_wait = _LatencyStats()
+        self._dropping = False
+
+        self.max_queue_items = 10000
+        self.backpressure = "spill"
+        self.block_timeout_seconds = 5.0
+        self.spill_dir = None
+        self.configure(max_queue_items, backpressure, block_timeout_seconds, spill_dir)
+
+    def configure(self, max_queue_items=None, backpressure=None, block_timeout_seconds=None, spill_dir=None):
+        """Update the pipeline settings; None leaves a setting unchanged."""
+        if backpressure is not None and backpressure not in BACKPRESSURE_MODES:
+            raise ValueError(f"Unknown back-pressure mode: {backpressure}")
+
+        with self._cond:
+            if max_queue_items is not None:
+                self.max_queue_items = max(1, int(max_queue_items))
+            if backpressure is not None:
+                self.backpressure = backpressure
+            if block_timeout_seconds is not None:
+                self.block_timeout_seconds = max(0.0, float(block_timeout_seconds))
+            if spill_dir is not None:
+                self.spill_dir = spill_dir
+            self._cond.notify_all()
+
+    def submit(self, path, rows, header=None, series=None):
+        """Queue rows to be appended to a CSV file.
+
+        Args:
+            path: CSV file to append to
+            rows: List of rows (lists of values)
+            header: Header row written first if the file is new or empty
+            series: Optional (rack_name, epoch_seconds, watts, source) for the series stores,
+                where source is the CSV file the readings belong to
+
+        Returns:
+            True if the rows were accepted, False if they were dropped
+        """
+        item = (path, rows, header, time.monotonic(), series)
+        with self._cond:
+            self._ensure_thread()
+
+            if self._spilling:
+                self._spill(item)
+                return True
+
+            if len(self._queue) >= self.max_queue_items:
+                if self.backpressure == "spill" or (self.backpressure == "block" and _on_event_loop()):
+                    self._spilling = True
+                    self._spill(item)
+                    return True
+
+                if self.backpressure == "drop_oldest":
+                    self._queue.popleft()
+                    self._completed += 1
+                    self._record_drop()
+                else:
+                    has_room = self._cond.wait_for(
+                        lambda: len(self._queue) < self.max_queue_items or self._stopping,
+                        timeout=self.block_timeout_seconds
+                    )
+                    if not has_room or self._stopping:
+                        self._record_drop()
+                        return False
+
+            self._queue.append(item)
+            self._submitted += 1
+            if len(self._queue) > self._stats['max_queue_depth']:
+                self._stats['max_queue_depth'] = len(self._queue)
+            if self._writer_idle:
+                self._cond.notify_all()
+            return True
+
+    def drain(self, timeout=None):
+        """Wait until everything submitted so far has been handed to the writer.
+
+        Args:
+            timeout: Maximum seconds to wait; None waits indefinitely
+
+        Returns:
+            True if the queue drained, False on timeout
+        """
+        with self._cond:
+            target = self._submitted
+            if self._completed >= target:
+                return True
+            if self._thread is None or not self._thread.is_alive():
+                self._ensure_thread()
+            drained = self._cond.wait_for(lambda: self._completed >= target, timeout=timeout)
+
+        if not drained:
+            logger.warning(f"Persistence queue did not drain within {timeout} seconds "
+                           f"({self.get_queue_depth()} items left)")
+        return drained
+
+    def flush(self, paths=None, timeout=None, racks=None):
+        """Drain the queue and write out the writer's buffered rows.
+
+        Args:
+            paths: CSV files to flush; all files if omitted
+            timeout: Maximum seconds to wait for the queue to drain
+            racks: Racks whose buffered series readings are written; all if omitted
+        """
+        drained = self.drain(timeout)
+        self.writer.flush(paths)
+        self._flush_series(racks)
+        return drained
+
+    def close(self, paths=None, timeout=None, racks=None):
+        """Drain the queue, then flush and close files in the writer."""
+        drained = self.drain(timeout)
+        self.writer.close(paths)
+        self._flush_series(racks)
+        return drained
+
+    def stop(self, timeout=10):
+        """Drain the queue, stop the writer thread and close every file.
+
+        The pipeline restarts on the next submit().
+        """
+        drained = self.drain(timeout)
+        with self._cond:
+            self._stopping = True
+            thread = self._thread
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            self._thread = None
+            self._stopping = False
+        self.writer.close()
+        for series_store in self.series_stores:
+            try:
+                series_store.close()
+            except OSError as e:
+                logger.error(f"Error closing series store: {str(e)}")
+        self._flush_catalog()
+        return drained
+
+    def get_queue_depth(self):
+        """Number of items waiting, including spilled ones."""
+        with self._cond:
+            return len(self._queue) + self._spill_items + self._replaying
+
+    def get_stats(self):
+        """Get queue depth, write latency and counters."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'queue_depth': len(self._queue),
+                'queue_capacity': self.max_queue_items,
+                'spill_pending': self._spill_items + self._replaying,
+                'in_flight': self._in_flight,
+                'backpressure': self.backpressure,
+                'submitted': self._submitted,
+                'write_latency': self._write_latency.as_dict(),
+                'queue_wait': self._queue_wait.as_dict(),
+                'writer_running': self._thread is not None and self._thread.is_alive()
+            })
+        stats['writer'] = self.writer.get_stats()
+        return stats
+
+    def _ensure_thread(self):
+        """Start the writer thread if it isn't running. Call with the lock held."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="PersistenceWriter", daemon=True)
+        self._thread.start()
+
+    def _record_drop(self):
+        """Count a dropped item, warning once per overflow episode. Call with the lock held."""
+        self._stats['dropped'] += 1
+        if not self._dropping:
+            self._dropping = True
+            logger.warning(f"Persistence queue is full ({self.max_queue_items} items); "
+                           f"dropping readings ({self.backpressure})")
+
+    def _spill(self, item):
+        """Append an item to the spool file. Call with the lock held."""
+        if self._spill_file is None:
+            spill_dir = self.spill_dir or tempfile.gettempdir()
+            os.makedirs(spill_dir, exist_ok=True)
+            self._spill_sequence += 1
+            self._spill_path = os.path.join(spill_dir, f"rack_power_spill_{os.getpid()}_{self._spill_sequence}.jsonl")
+            self._spill_file = open(self._spill_path, 'w', encoding='utf-8')
+            logger.warning(f"Persistence queue is full; spilling readings to {self._spill_path}")
+
+        self._spill_file.write(json.dumps(list(item)) + "\n")
+        self._spill_items += 1
+        self._submitted += 1
+        self._stats['spilled'] += 1
+        self._cond.notify_all()
+
+    def _take_spill(self):
+        """Hand the current spool file to the writer thread. Call with the lock held."""
+        spill_path, count = self._spill_path, self._spill_items
+        self._spill_file.close()
+        self._spill_file = None
+        self._spill_path = None
+        self._spill_items = 0
+        self._replaying = count
+        return spill_path
+
+    def _run(self):
+        """Writer thread: write queued items, replay spilled ones and flush on time."""
+        idle_wait = max(0.05, min(1.0, self.writer.flush_interval_seconds))
+        while True:
+            spill_path = None
+            items = None
+            with self._cond:
+                self._writer_idle = True
+                while not self._queue and not self._spill_items and not self._stopping:
+                    if not self._cond.wait(timeout=idle_wait):
+                        break
+                self._writer_idle = False
+
+                if self._queue:
+                    # Take a batch at once so the lock isn't handed back and forth per item
+                    count = min(len(self._queue), WRITE_BATCH_ITEMS)
+                    items = [self._queue.popleft() for _ in range(count)]
+                    self._in_flight = count
+                    if len(self._queue) < self.max_queue_items // 2:
+                        self._dropping = False
+                    self._cond.notify_all()
+                elif self._spill_items:
+                    spill_path = self._take_spill()
+                else:
+                    # Nothing left to replay, so new rows can use the queue again
+                    self._spilling = False
+                    if self._stopping:
+                        return
+
+            if items:
+                self._write(items)
+            elif spill_path is not None:
+                self._replay(spill_path)
+            else:
+                try:
+                    self.writer.flush_due()
+                except OSError:
+                    pass  # Logged by the writer; the rows stay buffered for the next attempt
+                self._flush_series_due()
+
+    def _flush_series(self, racks=None):
+        """Write out the series stores' buffered readings."""
+        for series_store in self.series_stores:
+            try:
+                series_store.flush(racks)
+            except OSError as e:
+                logger.error(f"Error writing series readings: {str(e)}")
+        self._flush_catalog()
+
+    def _flush_series_due(self):
+        """Write out series readings that have waited long enough."""
+        for series_store in self.series_stores:
+            try:
+                series_store.flush_due()
+            except OSError as e:
+                logger.error(f"Error writing series readings: {str(e)}")
+        self._flush_catalog(due_only=True)
+
+    def _flush_catalog(self, due_only=False):
+        """Write out the catalog entries the writer reported."""
+        if self.catalog is None:
+            return
+        try:
+            if due_only:
+                self.catalog.flush_due()
+            else:
+                self.catalog.flush()
+        except Exception as e:
+            logger.error(f"Error updating session catalog: {str(e)}")
+
+    def _write(self, items, completes=True):
+        """Hand items to the writer and record their latency.
+
+        Args:
+            items: Queued items
+            completes: Count the items as completed; the caller does it otherwise
+        """
+        latencies = []
+        series_stores = list(self.series_stores)
+        for path, rows, header, queued_at, series in items:
+            start = time.monotonic()
+            failed = False
+            try:
+                self.writer.write_rows(path, rows, header)
+                if series:
+                    for series_store in series_stores:
+                        series_store.append(*series)
+            except Exception as e:
+                # The writer keeps the rows and retries on its next flush
+                failed = True
+                logger.error(f"Error persisting readings to {path}: {str(e)}")
+            latencies.append((start - queued_at, time.monotonic() - start, failed))
+
+        with self._cond:
+            for queue_wait, write_latency, failed in latencies:
+                self._queue_wait.record(queue_wait)
+                self._write_latency.record(write_latency)
+                self._stats['write_errors' if failed else 'written'] += 1
+            if completes:
+                self._completed += len(items)
+            self._in_flight = 0
+            self._cond.notify_all()
+
+    def _replay(self, spill_path):
+        """Write the items of a spool file in order, then delete it.
+
+        The items count as completed once the file is gone, so a drained
+        pipeline leaves no spool behind.
+        """
+        with self._cond:
+            count = self._replaying
+        try:
+            with open(spill_path, encoding='utf-8') as f:
+                for line in f:
+                    self._write([tuple(json.loads(line))], completes=False)
+                    with self._cond:
+                        self._replaying -= 1
+        except (OSError, ValueError) as e:
+            logger.error(f"Error replaying spilled readings from {spill_path}: {str(e)}")
+        finally:
+            try:
+                os.remove(spill_path)
+            except OSError:
+                pass
+            with self._cond:
+                # Anything not replayed is lost; count it so drain() doesn't hang
+                self._stats['dropped'] += self._replaying
+                self._completed += count
+                self._replaying = 0
+                if not self._spill_items:
+                    # Nothing spilled during the replay, so new rows can use the queue again
+                    self._spilling = False
+                self._cond.notify_all()
+
+
+# Process-wide pipeline shared by all monitors
+_shared_pipeline = None
+_shared_pipeline_lock = threading.Lock()
+
+
+def get_persistence_pipeline():
+    """Get the process-wide persistence pipeline."""
+    global _shared_pipeline
+    with _shared_pipeline_lock:
+        if _shared_pipeline is None:
+            _shared_pipeline = PersistencePipeline()
+        return _shared_pipeline
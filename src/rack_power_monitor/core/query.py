@@ -0,0 +1,209 @@
+import os
+import logging
+import threading
+import concurrent.futures
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .catalog import get_session_catalog
+from .gorilla import read_chunk_range
+from .timeseries import read_session_csv, to_epoch_seconds, from_epoch_seconds
+
+logger = logging.getLogger("power_monitor")
+
+# Aggregations a query can ask for, by pandas name
+AGGREGATIONS = ("mean", "min", "max", "sum", "count", "first", "last", "median", "std")
+
+
+class QueryEngine:
+    """Range queries over the session CSVs of a data folder.
+
+    Files of both naming schemes, in the data folder and its session folders,
+    and the monthly archives of the retention service are found through the
+    session catalog. Files whose first and last reading fall outside the
+    range are skipped without being opened; the rest are read in parallel and
+    their parsed arrays cached while the file size stays the same.
+    """
+
+    def __init__(self, data_dir, max_workers=4, cache_files=256):
+        """Initialize the engine.
+
+        Args:
+            data_dir: Data folder holding the session CSVs
+            max_workers: Number of files read at the same time
+            cache_files: Number of files whose parsed readings are kept in memory
+        """
+        self.data_dir = data_dir
+        self.max_workers = max(1, int(max_workers))
+        self.cache_files = cache_files
+        self.catalog = get_session_catalog(data_dir)
+        self._cache = OrderedDict()  # path -> (size, epoch, watts), least recently used first
+        self._cache_lock = threading.Lock()
+
+    def query(self, racks=None, start=None, end=None, resolution=None, agg="mean"):
+        """Get racks' readings over a time range as one aligned frame.
+
+        Args:
+            racks: Rack names; all racks with session CSVs if omitted
+            start: Earliest timestamp, inclusive (naive local time)
+            end: Latest timestamp, inclusive (naive local time)
+            resolution: Bucket width in seconds, aligned to the epoch like the
+                rollups; raw readings if omitted
+            agg: Aggregation of each bucket (one of AGGREGATIONS), or a list of them
+
+        Returns:
+            DataFrame indexed by Timestamp (bucket start) with a column per
+            rack, or an (Agg, Rack) column MultiIndex when agg is a list.
+            With a resolution, every bucket between the first and last is
+            present; missing buckets are NaN.
+        """
+        aggs = [agg] if isinstance(agg, str) else list(agg)
+        unknown = [name for name in aggs if name not in AGGREGATIONS]
+        if unknown:
+            raise ValueError(f"Unknown aggregation: {', '.join(unknown)}")
+        if resolution is not None:
+            resolution = max(1, int(resolution))
+
+        start_epoch = int(to_epoch_seconds([pd.Timestamp(start)])[0]) if start is not None else None
+        end_epoch = int(to_epoch_seconds([pd.Timestamp(end)])[0]) if end is not None else None
+        files = self.catalog.find_files(
+            racks,
+            pd.Timestamp(start).strftime("%Y-%m-%d %H:%M:%S") if start is not None else None,
+            pd.Timestamp(end).strftime("%Y-%m-%d %H:%M:%S") if end is not None else None
+        )
+        files += self.catalog.find_archives(racks, start_epoch, end_epoch)
+        if racks is None:
+            racks = sorted(set(entry['rack_name'] for entry in files))
+        else:
+            racks = list(racks)
+
+        arrays = self._read_files(files)
+        epochs, watts, codes = [], [], []
+        for code, rack in enumerate(racks):
+            parts = [arrays[entry['path']] for entry in files if entry['rack_name'] == rack]
+            if not parts:
+                continue
+            epoch = np.concatenate([p[0] for p in parts])
+            values = np.concatenate([p[1] for p in parts])
+            mask = np.ones(len(epoch), dtype=bool)
+            if start_epoch is not None:
+                mask &= epoch >= start_epoch
+            if end_epoch is not None:
+                mask &= epoch <= end_epoch
+            # The same reading can be in more than one file; keep one per second
+            epoch, first = np.unique(epoch[mask], return_index=True)
+            epochs.append(epoch)
+            watts.append(values[mask][first])
+            codes.append(np.full(len(epoch), code, dtype=np.int32))
+
+        if epochs:
+            epoch = np.concatenate(epochs)
+            long = pd.DataFrame({
+                'Bucket': epoch - epoch % resolution if resolution else epoch,
+                'Rack': pd.Categorical.from_codes(np.concatenate(codes), categories=racks),
+                'PowerWatts': np.concatenate(watts).astype(np.float64)
+            })
+            frame = long.groupby(['Bucket', 'Rack'], observed=True)['PowerWatts'].agg(aggs).unstack('Rack')
+            if resolution and len(frame):
+                frame = frame.reindex(np.arange(frame.index[0], frame.index[-1] + 1, resolution))
+        else:
+            frame = pd.DataFrame(index=np.empty(0, dtype=np.int64))
+
+        frame = frame.reindex(columns=pd.MultiIndex.from_product([aggs, racks]))
+        frame.index = from_epoch_seconds(frame.index.to_numpy(dtype=np.int64))
+        frame.index.name = 'Timestamp'
+        if isinstance(agg, str):
+            frame = frame[agg]
+            frame.columns.name = 'Rack'
+        else:
+            frame.columns.names = ['Agg', 'Rack']
+        return frame
+
+    def time_range(self, racks=None):
+        """Get the first and last reading of racks in the session CSVs.
+
+        Returns:
+            Tuple of (first, last) timestamps, or None if there are no readings
+        """
+        files = self.catalog.find_files(racks)
+        firsts = [pd.Timestamp(entry['first_time']) for entry in files]
+        lasts = [pd.Timestamp(entry['last_time']) for entry in files]
+        archives = self.catalog.find_archives(racks)
+        if archives:
+            firsts.append(from_epoch_seconds([min(archive['first_ts'] for archive in archives)])[0])
+            lasts.append(from_epoch_seconds([max(archive['last_ts'] for archive in archives)])[0])
+        if not firsts:
+            return None
+        return min(firsts), max(lasts)
+
+    def list_racks(self):
+        """Get the racks that have session CSVs or archives."""
+        files = self.catalog.find_files() + self.catalog.find_archives()
+        return sorted(set(entry['rack_name'] for entry in files))
+
+    def _read_files(self, files):
+        """Read files in parallel, reusing cached arrays of files that haven't changed size."""
+        arrays = {}
+        missing = []
+        with self._cache_lock:
+            for entry in files:
+                cached = self._cache.get(entry['path'])
+                if cached is not None and cached[0] == entry['size']:
+                    self._cache.move_to_end(entry['path'])
+                    arrays[entry['path']] = cached[1:]
+                else:
+                    missing.append(entry)
+
+        if missing:
+            workers = min(self.max_workers, len(missing))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                for entry, result in zip(missing, executor.map(self._read_file, missing)):
+                    arrays[entry['path']] = result
+
+            with self._cache_lock:
+                for entry in missing:
+                    self._cache[entry['path']] = (entry['size'],) + arrays[entry['path']]
+                    self._cache.move_to_end(entry['path'])
+                while len(self._cache) > self.cache_files:
+                    self._cache.popitem(last=False)
+        return arrays
+
+    def _read_file(self, entry):
+        """Read one session CSV or archive, treating an unreadable file as empty."""
+        try:
+            if 'month' in entry:
+                return read_chunk_range(entry['path'])
+            return read_session_csv(entry['path'])
+        except Exception as e:
+            logger.warning(f"Error reading {entry['path']} for a query: {str(e)}")
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+
+# One engine per data folder, so the file cache is shared
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_query_engine(data_dir, **kwargs):
+    """Get the query engine of a data folder.
+
+    Args:
+        data_dir: Data folder
+        **kwargs: Passed to QueryEngine when the engine is created
+    """
+    key = os.path.abspath(data_dir or "power_data")
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = QueryEngine(key, **kwargs)
+        return engine
+
+
+def query(racks=None, start=None, end=None, resolution=None, agg="mean", data_dir="power_data"):
+    """Query racks' readings across every session of a data folder.
+
+    See QueryEngine.query.
+    """
+    return get_query_engine(data_dir).query(racks, start, end, resolution, agg)
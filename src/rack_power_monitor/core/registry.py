@@ -0,0 +1,157 @@
+import threading
+
+
+class RackRegistry:
+    """Racks of the monitor tab, indexed by name, address and tree item id.
+
+    Every lookup is a dict access on the exact key, so it costs the same for
+    ten racks or ten thousand, and "G2" never finds "G24". The monitor tab
+    keeps it in step with the tree as racks are added, renamed and removed.
+
+    Names are unique; several racks may share an address. An entry is a dict
+    with name, address, rack_key, item_id and settings (the rack's config
+    entry, e.g. credentials), replaced rather than changed on update, so
+    entries handed out stay consistent. Safe to use from several threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_name = {}     # name -> entry, in the order racks were added
+        self._by_address = {}  # address -> {name: None}
+        self._by_item = {}     # tree item id -> name
+
+    def add(self, name, address, item_id=None, settings=None):
+        """Add a rack, replacing any rack with the same name.
+
+        Args:
+            name: Rack name
+            address: R-SCM address
+            item_id: The rack's item in the tree
+            settings: The rack's config entry
+
+        Returns:
+            The new entry
+        """
+        entry = self._new_entry(name, address, item_id, settings)
+        with self._lock:
+            if name in self._by_name:
+                self._unindex(self._by_name[name])
+            self._by_name[name] = entry
+            self._index(entry)
+        return entry
+
+    def remove(self, name):
+        """Remove a rack.
+
+        Returns:
+            The removed entry, or None if there was no rack of that name
+        """
+        with self._lock:
+            entry = self._by_name.pop(name, None)
+            if entry is not None:
+                self._unindex(entry)
+            return entry
+
+    def update(self, name, new_name=None, address=None, item_id=None, settings=None):
+        """Rename a rack or change its address, item or settings.
+
+        Arguments left as None keep their value. A rack renamed to the name of
+        another rack replaces it.
+
+        Returns:
+            The updated entry, or None if there was no rack of that name
+        """
+        with self._lock:
+            entry = self._by_name.get(name)
+            if entry is None:
+                return None
+            new_name = entry['name'] if new_name is None else new_name
+            updated = self._new_entry(
+                new_name,
+                entry['address'] if address is None else address,
+                entry['item_id'] if item_id is None else item_id,
+                entry['settings'] if settings is None else settings
+            )
+            self._unindex(entry)
+            if new_name == name:
+                self._by_name[name] = updated
+            else:
+                if new_name in self._by_name:
+                    self._unindex(self._by_name[new_name])
+                # Rebuilt to keep the rack's place in the order
+                by_name = {}
+                for key, value in self._by_name.items():
+                    if key == name:
+                        by_name[new_name] = updated
+                    elif key != new_name:
+                        by_name[key] = value
+                self._by_name = by_name
+            self._index(updated)
+            return updated
+
+    def clear(self):
+        """Remove every rack."""
+        with self._lock:
+            self._by_name = {}
+            self._by_address = {}
+            self._by_item = {}
+
+    def get(self, name):
+        """Get the entry of a rack by name, or None."""
+        with self._lock:
+            return self._by_name.get(name)
+
+    def find(self, name, address):
+        """Get the entry of a rack by name if it has the given address, or None."""
+        entry = self.get(name)
+        return entry if entry is not None and entry['address'] == address else None
+
+    def by_address(self, address):
+        """Get the entries of the racks at an address."""
+        with self._lock:
+            return [self._by_name[name] for name in self._by_address.get(address, ())]
+
+    def by_item(self, item_id):
+        """Get the entry of the rack shown by a tree item, or None."""
+        with self._lock:
+            name = self._by_item.get(item_id)
+            return self._by_name.get(name) if name is not None else None
+
+    def entries(self):
+        """Get every entry, in the order the racks were added."""
+        with self._lock:
+            return list(self._by_name.values())
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._by_name
+
+    def __len__(self):
+        with self._lock:
+            return len(self._by_name)
+
+    def _index(self, entry):
+        """Add an entry to the address and item indexes. Call with the lock held."""
+        self._by_address.setdefault(entry['address'], {})[entry['name']] = None
+        if entry['item_id'] is not None:
+            self._by_item[entry['item_id']] = entry['name']
+
+    def _unindex(self, entry):
+        """Remove an entry from the address and item indexes. Call with the lock held."""
+        names = self._by_address.get(entry['address'])
+        if names is not None:
+            names.pop(entry['name'], None)
+            if not names:
+                del self._by_address[entry['address']]
+        if entry['item_id'] is not None and self._by_item.get(entry['item_id']) == entry['name']:
+            del self._by_item[entry['item_id']]
+
+    @staticmethod
+    def _new_entry(name, address, item_id, settings):
+        return {
+            'name': name,
+            'address': address,
+            'rack_key': f"{name}_{address}",
+            'item_id': item_id,
+            'settings': dict(settings or {}, name=name, address=address)
+        }
@@ -1,9 +1,12 @@
 import os
 import logging
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import datetime
 
+from .sketch import DEFAULT_QUANTILES, quantile_labels
+
 logger = logging.getLogger("power_monitor")
 
 class ReportGenerator:
@@ -39,76 +42,169 @@ class ReportGenerator:
             min_power = power_values.min()
             max_power = power_values.max()
             std_dev = power_values.std()
+            # The readings are all here, so the percentiles are exact
+            percentiles = dict(zip(quantile_labels(), power_values.quantile(list(DEFAULT_QUANTILES)).tolist()))
             
-            # Calculate energy consumption (watt-hours)
+            # Calculate energy consumption (watt-hours) with the trapezoidal rule
             total_energy = 0
             if len(data_df) > 1:
                 data_df = data_df.sort_values('Timestamp')
-                for i in range(1, len(data_df)):
-                    time_diff = (pd.to_datetime(data_df['Timestamp'].iloc[i]) - 
-                                pd.to_datetime(data_df['Timestamp'].iloc[i-1])).total_seconds() / 3600  # hours
-                    avg_pwr = (data_df['PowerWatts'].iloc[i] + data_df['PowerWatts'].iloc[i-1]) / 2
-                    total_energy += avg_pwr * time_diff
+                hours = pd.to_datetime(data_df['Timestamp']).diff().dt.total_seconds().to_numpy()[1:] / 3600
+                watts = data_df['PowerWatts'].to_numpy(dtype=np.float64)
+                total_energy = float(np.sum((watts[1:] + watts[:-1]) / 2 * hours))
             
-            # Generate timestamp for file naming
-            timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+            # Add time-based analysis
+            hourly_avg = None
+            if len(data_df) > 1:
+                data_df['Hour'] = pd.to_datetime(data_df['Timestamp']).dt.hour
+                hourly_avg = data_df.groupby('Hour')['PowerWatts'].mean()
             
-            # Generate the report file
-            report_path = os.path.join(self.output_dir, f"PowerReport-{rack_name}-{timestamp}.txt")
+            statistics = {
+                'avg_power': avg_power,
+                'min_power': min_power,
+                'max_power': max_power,
+                'std_dev': std_dev,
+                'total_energy': total_energy,
+                'duration': (end_time - start_time).total_seconds() / 3600,
+                'readings': len(data_df),
+                **percentiles
+            }
+            return self._write_report(rack_name, data_df, start_time, end_time, statistics, hourly_avg)
             
-            with open(report_path, 'w', encoding='utf-8') as f:
-                f.write(f"Power Monitoring Report for Rack: {rack_name}\n")
-                f.write("=" * 50 + "\n\n")
-                f.write(f"Monitoring Period: {start_time.strftime('%Y-%m-%d %H:%M:%S')} to {end_time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                
-                duration = (end_time - start_time).total_seconds() / 3600
-                f.write(f"Duration: {duration:.2f} hours\n")
-                f.write(f"Total Readings: {len(data_df)}\n\n")
-                
-                f.write("Power Statistics:\n")
-                f.write(f"  Average Power: {avg_power:.2f} W\n")
-                f.write(f"  Minimum Power: {min_power:.2f} W\n")
-                f.write(f"  Maximum Power: {max_power:.2f} W\n")
-                f.write(f"  Standard Deviation: {std_dev:.2f} W\n\n")
+        except Exception as e:
+            logger.error(f"Error generating report for rack {rack_name}: {e}")
+            return None
+    
+    def _write_report(self, rack_name, chart_df, start_time, end_time, statistics, hourly_avg=None):
+        """Write the text report and chart.
+        
+        Args:
+            rack_name: Rack the report is for
+            chart_df: Timestamp and PowerWatts to chart
+            start_time: Start of the period
+            end_time: End of the period
+            statistics: Dict from generate_power_report
+            hourly_avg: Series of average power by hour of day, if known
+        """
+        # Generate timestamp for file naming
+        timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        
+        # Generate the report file
+        report_path = os.path.join(self.output_dir, f"PowerReport-{rack_name}-{timestamp}.txt")
+        total_energy = statistics['total_energy']
+        
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(f"Power Monitoring Report for Rack: {rack_name}\n")
+            f.write("=" * 50 + "\n\n")
+            f.write(f"Monitoring Period: {start_time.strftime('%Y-%m-%d %H:%M:%S')} to {end_time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+            
+            f.write(f"Duration: {statistics['duration']:.2f} hours\n")
+            f.write(f"Total Readings: {statistics['readings']}\n\n")
+            
+            f.write("Power Statistics:\n")
+            f.write(f"  Average Power: {statistics['avg_power']:.2f} W\n")
+            f.write(f"  Minimum Power: {statistics['min_power']:.2f} W\n")
+            f.write(f"  Maximum Power: {statistics['max_power']:.2f} W\n")
+            f.write(f"  Standard Deviation: {statistics['std_dev']:.2f} W\n")
+            for label in quantile_labels():
+                if statistics.get(label) is not None:
+                    f.write(f"  {label.upper()} Power: {statistics[label]:.2f} W\n")
+            f.write("\n")
+            
+            f.write("Energy Consumption:\n")
+            f.write(f"  Total Energy: {total_energy:.2f} Watt-hours ({total_energy/1000:.4f} kWh)\n\n")
+            
+            # Add time-based analysis
+            if hourly_avg is not None and len(hourly_avg):
+                f.write("Hourly Power Usage:\n")
+                for hour, avg in hourly_avg.items():
+                    f.write(f"  {hour:02d}:00 - {hour:02d}:59: {avg:.2f} W\n")
                 
-                f.write("Energy Consumption:\n")
-                f.write(f"  Total Energy: {total_energy:.2f} Watt-hours ({total_energy/1000:.4f} kWh)\n\n")
+                # Identify peak times
+                peak_hour = hourly_avg.idxmax()
+                min_hour = hourly_avg.idxmin()
                 
-                # Add time-based analysis
-                if len(data_df) > 1:
-                    data_df['Hour'] = pd.to_datetime(data_df['Timestamp']).dt.hour
-                    hourly_avg = data_df.groupby('Hour')['PowerWatts'].mean()
-                    
-                    f.write("Hourly Power Usage:\n")
-                    for hour, avg in hourly_avg.items():
-                        f.write(f"  {hour:02d}:00 - {hour:02d}:59: {avg:.2f} W\n")
-                    
-                    # Identify peak times
-                    peak_hour = hourly_avg.idxmax()
-                    min_hour = hourly_avg.idxmin()
-                    
-                    f.write(f"\nPeak usage hour: {peak_hour:02d}:00 - {peak_hour:02d}:59 ({hourly_avg[peak_hour]:.2f} W)\n")
-                    f.write(f"Minimum usage hour: {min_hour:02d}:00 - {min_hour:02d}:59 ({hourly_avg[min_hour]:.2f} W)\n")
-            
-            logger.info(f"Generated power report: {report_path}")
-            
-            # Create chart
-            chart_path = self.generate_power_chart(rack_name, data_df, timestamp)
-            
-            return {
-                'report_path': report_path,
-                'chart_path': chart_path,
-                'statistics': {
-                    'avg_power': avg_power,
-                    'min_power': min_power,
-                    'max_power': max_power,
-                    'std_dev': std_dev,
-                    'total_energy': total_energy,
-                    'duration': duration,
-                    'readings': len(data_df)
-                }
-            }
+                f.write(f"\nPeak usage hour: {peak_hour:02d}:00 - {peak_hour:02d}:59 ({hourly_avg[peak_hour]:.2f} W)\n")
+                f.write(f"Minimum usage hour: {min_hour:02d}:00 - {min_hour:02d}:59 ({hourly_avg[min_hour]:.2f} W)\n")
+        
+        logger.info(f"Generated power report: {report_path}")
+        
+        # Create chart
+        chart_path = self.generate_power_chart(rack_name, chart_df, timestamp)
+        
+        return {
+            'report_path': report_path,
+            'chart_path': chart_path,
+            'statistics': statistics
+        }
+    
+    def generate_rack_report(self, rack_name, store, start_time=None, end_time=None):
+        """Generate a report for a rack from a TimeSeriesStore.
+        
+        Stores with rollups (SQLiteStore) are reported from them, so long
+        periods don't read every reading.
+        
+        Args:
+            rack_name: Rack to report on
+            store: TimeSeriesStore holding the readings
+            start_time: Start of the period; the first reading if omitted
+            end_time: End of the period; the last reading if omitted
+        """
+        if hasattr(store, 'summarize'):
+            return self.generate_rollup_report(rack_name, store, start_time, end_time)
+        
+        data_df = store.read([rack_name], start_time, end_time)
+        if data_df.empty:
+            logger.warning(f"No stored data for rack {rack_name}")
+            return None
+        
+        # Stored as float32; compute statistics in double precision
+        data_df = data_df[['Timestamp']].assign(PowerWatts=data_df['PowerWatts'].astype('float64'))
+        start_time = start_time or data_df['Timestamp'].min().to_pydatetime()
+        end_time = end_time or data_df['Timestamp'].max().to_pydatetime()
+        return self.generate_power_report(rack_name, data_df, start_time, end_time)
+    
+    def generate_rollup_report(self, rack_name, store, start_time=None, end_time=None, chart_points=1000):
+        """Generate a report for a rack from the rollups of a SQLiteStore.
+        
+        Args:
+            rack_name: Rack to report on
+            store: SQLiteStore holding the readings
+            start_time: Start of the period; the first reading if omitted
+            end_time: End of the period; the last reading if omitted
+            chart_points: Approximate number of points in the chart
+        """
+        try:
+            summary = store.summarize(rack_name, start_time, end_time)
+            if summary is None:
+                logger.warning(f"No stored data for rack {rack_name}")
+                return None
+            
+            start_time = start_time or summary['first']
+            end_time = end_time or summary['last']
+            span_seconds = max((end_time - start_time).total_seconds(), 1)
             
+            # Hourly profile from the hour tier, the chart from the coarsest tier that gives enough points
+            hourly = store.read_rollups([rack_name], start_time, end_time, tier=3600)
+            hourly_avg = None
+            if not hourly.empty:
+                by_hour = hourly.groupby(hourly['Timestamp'].dt.hour)[['Sum', 'Count']].sum()
+                hourly_avg = by_hour['Sum'] / by_hour['Count']
+            chart_df = store.read_resampled([rack_name], start_time, end_time, span_seconds / chart_points)
+            
+            statistics = {
+                'avg_power': summary['mean'],
+                'min_power': summary['min'],
+                'max_power': summary['max'],
+                'std_dev': summary['std_dev'],
+                'total_energy': summary['energy_wh'],
+                'duration': span_seconds / 3600,
+                'readings': summary['count'],
+                # Estimated from the rollup sketches, to within 1%
+                **{label: summary.get(label) for label in quantile_labels()}
+            }
+            return self._write_report(rack_name, chart_df, start_time, end_time, statistics, hourly_avg)
+        
         except Exception as e:
             logger.error(f"Error generating report for rack {rack_name}: {e}")
             return None
@@ -163,6 +259,21 @@ class ReportGenerator:
             logger.error(f"Error generating chart for rack {rack_name}: {e}")
             return None
     
+    def generate_query_comparison_chart(self, frame, start_time=None, end_time=None):
+        """Generate a comparison chart from an aligned query frame.
+        
+        Args:
+            frame: DataFrame indexed by Timestamp with a column per rack, as
+                returned by QueryEngine.query
+            start_time: Start of the period charted
+            end_time: End of the period charted
+        """
+        rack_data_dict = {
+            rack: pd.DataFrame({'Timestamp': frame.index, 'PowerWatts': frame[rack].to_numpy()}).dropna()
+            for rack in frame.columns
+        }
+        return self.generate_comparison_chart(rack_data_dict, start_time, end_time)
+    
     def generate_comparison_chart(self, rack_data_dict, start_time=None, end_time=None):
         """Generate a comparison chart for multiple racks."""
         try:
@@ -0,0 +1,322 @@
+import os
+import time
+import logging
+import threading
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from .catalog import get_session_catalog
+from .gorilla import CompressedSeries, read_chunk_range, read_chunk_span
+from .timeseries import COLUMNAR_DIR, read_session_csv, get_timeseries_store
+from .sqlite_store import get_sqlite_store
+from .csv_writer import get_csv_writer
+
+logger = logging.getLogger("power_monitor")
+
+# Folder under the data directory that holds the monthly archives
+ARCHIVE_DIR = "archive"
+ARCHIVE_EXTENSION = ".gor"
+
+DAY_SECONDS = 86400
+
+
+class RetentionService:
+    """Background job that archives old session CSVs and drops old raw readings.
+
+    Session CSVs whose last reading and last write are older than
+    `archive_after_days` are merged into one Gorilla-compressed archive per
+    rack and month (archive/rack=<name>/<YYYY-MM>.gor, indexed in the session
+    catalog) and deleted, so the number of files to list and open stays
+    bounded by racks times months rather than sessions.
+
+    With `raw_retention_days` set, readings older than that are dropped from
+    the archives, the SQLite database and the columnar store; the SQLite
+    rollups of those days are kept. CSVs are imported into the database
+    before being archived, so their rollups exist before any raw data goes.
+
+    Safe to run while monitors write: files the shared CSV writer has open or
+    buffered, or that changed recently, are left alone; archives are replaced
+    atomically; a CSV is deleted only if it is unchanged since it was read.
+    Merging is idempotent, so an interrupted run is completed by the next.
+    """
+
+    def __init__(self, data_dir, archive_after_days=30, raw_retention_days=None,
+                 interval_hours=6.0, first_run_delay_seconds=300):
+        """Initialize the service.
+
+        Args:
+            data_dir: Data folder
+            archive_after_days: Archive session CSVs this many days after their last reading
+            raw_retention_days: Drop raw readings older than this many days; keep them if None
+            interval_hours: Time between runs of the background thread
+            first_run_delay_seconds: Wait this long after start() before the first run
+        """
+        self.data_dir = os.path.abspath(data_dir)
+        self.archive_root = os.path.join(self.data_dir, ARCHIVE_DIR)
+        self.archive_after_days = archive_after_days
+        self.raw_retention_days = raw_retention_days
+        self.interval_hours = interval_hours
+        self.first_run_delay_seconds = first_run_delay_seconds
+        self.catalog = get_session_catalog(self.data_dir)
+        self._run_lock = threading.Lock()  # One run at a time
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_result = None
+
+    def configure(self, archive_after_days=None, raw_retention_days=None, interval_hours=None):
+        """Change settings; None leaves a setting unchanged, except raw_retention_days ('keep' if <= 0)."""
+        if archive_after_days is not None:
+            self.archive_after_days = max(0, float(archive_after_days))
+        if raw_retention_days is not None:
+            self.raw_retention_days = float(raw_retention_days) if float(raw_retention_days) > 0 else None
+        if interval_hours is not None:
+            self.interval_hours = max(0.01, float(interval_hours))
+
+    def start(self):
+        """Start the background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="RetentionService")
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        """Stop the background thread; a run in progress finishes first."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        """Background thread: run on the interval until stopped."""
+        if self._stop.wait(self.first_run_delay_seconds):
+            return
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Error in retention run: {str(e)}")
+            if self._stop.wait(self.interval_hours * 3600):
+                return
+
+    def run_once(self, now=None):
+        """Archive old session CSVs, then drop raw readings past the retention age.
+
+        Args:
+            now: Current epoch second; the clock if omitted
+
+        Returns:
+            Dict with files_archived, readings_archived, archives_written,
+            archives_dropped, readings_dropped (from archives) and
+            database_readings_dropped
+        """
+        now = time.time() if now is None else now
+        result = {'files_archived': 0, 'readings_archived': 0, 'archives_written': 0,
+                  'archives_dropped': 0, 'readings_dropped': 0, 'database_readings_dropped': 0}
+        with self._run_lock:
+            self._index_archives()
+            archive_after = self.archive_after_days
+            if self.raw_retention_days is not None:
+                # Raw CSVs past retention are archived first, so they are trimmed like the rest
+                archive_after = min(archive_after, self.raw_retention_days)
+            self._archive_files(now - archive_after * DAY_SECONDS, result)
+            if self.raw_retention_days is not None:
+                self._drop_raw(now - self.raw_retention_days * DAY_SECONDS, result)
+        self.last_result = result
+        logger.info(f"Retention run: {result}")
+        return result
+
+    def _archive_files(self, cutoff, result):
+        """Merge session CSVs untouched since `cutoff` into the monthly archives and delete them."""
+        cutoff_text = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(cutoff))
+        writer = get_csv_writer()
+        candidates = [entry for entry in self.catalog.find_files(end=cutoff_text)
+                      if entry['last_time'][:19] < cutoff_text
+                      and (entry['modified'] or 0) < cutoff
+                      and not writer.is_writing(entry['path'])]
+        if not candidates:
+            return
+
+        sqlite_store = get_sqlite_store(self.data_dir, create=False)
+        by_rack = {}
+        for entry in candidates:
+            by_rack.setdefault(entry['rack_name'], []).append(entry)
+
+        for rack, entries in sorted(by_rack.items()):
+            read = []
+            for entry in entries:
+                try:
+                    stat = os.stat(entry['path'])
+                    epoch, watts = read_session_csv(entry['path'], dtype=np.float64)
+                    # Rollups of readings that only exist in the CSV are built before it goes
+                    if sqlite_store is not None and sqlite_store.find_session(
+                            entry['name'], entry['folder']) is None:
+                        sqlite_store.import_csv(entry['path'], rack)
+                except Exception as e:
+                    logger.warning(f"Not archiving {entry['path']}: {str(e)}")
+                    continue
+                read.append((entry, stat, epoch, watts))
+            if not read:
+                continue
+
+            epoch = np.concatenate([r[2] for r in read])
+            watts = np.concatenate([r[3] for r in read])
+            result['archives_written'] += self._merge_into_archives(rack, epoch, watts)
+            result['readings_archived'] += len(epoch)
+
+            for entry, stat, _, _ in read:
+                if self._delete_if_unchanged(entry['path'], stat):
+                    self.catalog.forget_file(entry['path'])
+                    result['files_archived'] += 1
+                    self._remove_empty_folder(entry['folder'])
+
+    def _merge_into_archives(self, rack, epoch, watts):
+        """Merge readings into the rack's monthly archives.
+
+        Returns:
+            Number of archives written
+        """
+        months = epoch.astype('datetime64[s]').astype('datetime64[M]')
+        written = 0
+        for month in np.unique(months):
+            in_month = months == month
+            path = self._archive_path(rack, str(month))
+            try:
+                old_epoch, old_watts = read_chunk_range(path)
+            except FileNotFoundError:
+                old_epoch, old_watts = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+            self._write_archive(rack, str(month), path,
+                                np.concatenate([old_epoch, epoch[in_month]]),
+                                np.concatenate([old_watts, watts[in_month]]))
+            written += 1
+        return written
+
+    def _write_archive(self, rack, month, path, epoch, watts):
+        """Write an archive atomically, sorted with one reading per second, and index it."""
+        epoch, first = np.unique(epoch, return_index=True)
+        watts = watts[first]
+        if not len(epoch):
+            self._delete_archive(path)
+            return
+        series = CompressedSeries()
+        series.extend(epoch, watts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + ".tmp"
+        series.write(temp_path)
+        # Readers see either the old archive or the new one
+        os.replace(temp_path, path)
+        self.catalog.record_archive(path, rack, month, epoch[0], epoch[-1], len(epoch), os.path.getsize(path))
+
+    def _delete_archive(self, path):
+        """Delete an archive and its index entry."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        self.catalog.forget_archive(path)
+
+    def _drop_raw(self, cutoff, result):
+        """Drop raw readings older than `cutoff`, rounded down to a UTC day, keeping rollups."""
+        cutoff = int(cutoff) - int(cutoff) % DAY_SECONDS
+        sqlite_store = get_sqlite_store(self.data_dir, create=False)
+        if sqlite_store is None:
+            logger.warning("Raw retention needs the SQLite database for rollups; keeping raw readings")
+            return
+
+        for archive in self.catalog.find_archives(end=cutoff - 1):
+            if archive['last_ts'] < cutoff:
+                self._delete_archive(archive['path'])
+                result['archives_dropped'] += 1
+                result['readings_dropped'] += archive['row_count']
+            else:
+                # The month straddles the cutoff: keep its newer readings
+                epoch, watts = read_chunk_range(archive['path'], start=cutoff)
+                self._write_archive(archive['rack_name'], archive['month'], archive['path'], epoch, watts)
+                result['readings_dropped'] += archive['row_count'] - len(epoch)
+
+        result['database_readings_dropped'] = sqlite_store.drop_readings_before(cutoff)
+        if os.path.isdir(os.path.join(self.data_dir, COLUMNAR_DIR)):
+            columnar_store = get_timeseries_store(self.data_dir)
+            if columnar_store is not None:
+                columnar_store.drop_partitions_before(time.strftime("%Y-%m-%d", time.gmtime(cutoff)))
+
+    def _index_archives(self):
+        """Bring the archive index in line with the archive folder.
+
+        Reads only the block index of archives that are new or changed size.
+        """
+        indexed = {archive['path']: archive for archive in self.catalog.find_archives()}
+        on_disk = set()
+        try:
+            rack_dirs = [entry for entry in os.scandir(self.archive_root)
+                         if entry.is_dir() and entry.name.startswith("rack=")]
+        except FileNotFoundError:
+            rack_dirs = []
+        for rack_dir in rack_dirs:
+            rack = unquote(rack_dir.name[5:])
+            for entry in os.scandir(rack_dir.path):
+                if not entry.name.endswith(ARCHIVE_EXTENSION):
+                    continue
+                path = os.path.abspath(entry.path)
+                on_disk.add(path)
+                size = entry.stat().st_size
+                if path in indexed and indexed[path]['size'] == size:
+                    continue
+                try:
+                    first, last, count = read_chunk_span(path)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Skipping unreadable archive {path}: {str(e)}")
+                    continue
+                if count:
+                    self.catalog.record_archive(path, rack, entry.name[:-len(ARCHIVE_EXTENSION)],
+                                                first, last, count, size)
+        for path in indexed:
+            if path not in on_disk:
+                self.catalog.forget_archive(path)
+
+    def _archive_path(self, rack, month):
+        """Archive file of a rack and month (YYYY-MM)."""
+        return os.path.join(self.archive_root, f"rack={quote(rack, safe='')}", f"{month}{ARCHIVE_EXTENSION}")
+
+    @staticmethod
+    def _delete_if_unchanged(path, stat):
+        """Delete a file if its size and modification time are still those of `stat`."""
+        try:
+            current = os.stat(path)
+        except FileNotFoundError:
+            return True
+        if (current.st_size, current.st_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            logger.info(f"{path} changed while being archived; keeping it")
+            return False
+        os.remove(path)
+        return True
+
+    def _remove_empty_folder(self, folder):
+        """Remove a session folder left empty by archiving."""
+        if os.path.abspath(folder) == self.data_dir:
+            return
+        try:
+            os.rmdir(folder)
+        except OSError:
+            pass  # Not empty
+
+
+# One service per data folder
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_retention_service(data_dir, **kwargs):
+    """Get the retention service of a data folder.
+
+    Args:
+        data_dir: Data folder
+        **kwargs: Passed to RetentionService when the service is created
+    """
+    key = os.path.abspath(data_dir or "power_data")
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = _services[key] = RetentionService(key, **kwargs)
+        return service
@@ -0,0 +1,147 @@
+import datetime
+
+import numpy as np
+
+from .timeseries import from_epoch_seconds
+from .streaming_stats import StreamingStats
+
+# Readings of live history kept per rack unless configured otherwise
+DEFAULT_HISTORY_CAPACITY = 1000
+
+
+class PowerRingBuffer:
+    """Fixed-capacity history of (timestamp, power) readings for one rack.
+
+    Timestamps are int64 epoch seconds and readings float32, in arrays
+    allocated once, so appending is O(1) and memory is capacity * 12 bytes
+    twice over: every reading is written to two mirrored halves, which makes
+    the latest n readings one contiguous slice. Windows are returned as
+    read-only views, without copying.
+
+    A view keeps pointing into the buffer: once `capacity` more readings have
+    been appended, it shows newer ones. Readers on another thread than the
+    writer should pass copy=True.
+
+    `stats` holds the statistics of the readings in the buffer, updated as
+    readings are appended and overwritten.
+    """
+
+    def __init__(self, capacity=DEFAULT_HISTORY_CAPACITY):
+        """Create an empty buffer.
+
+        Args:
+            capacity: Maximum number of readings kept; older ones are overwritten
+        """
+        self.capacity = max(1, int(capacity))
+        self._epoch = np.zeros(2 * self.capacity, dtype=np.int64)
+        self._watts = np.zeros(2 * self.capacity, dtype=np.float32)
+        self._next = 0  # Position the next reading is written to, in [0, capacity)
+        self._size = 0
+        self.total_appended = 0
+        self.stats = StreamingStats()
+
+    def append(self, timestamp, power):
+        """Add a reading.
+
+        Args:
+            timestamp: datetime (naive local time) or epoch seconds
+            power: Power in watts
+        """
+        if isinstance(timestamp, datetime.datetime):
+            timestamp = timestamp.timestamp()
+        position = self._next
+        if self._size == self.capacity:
+            # The oldest reading is about to be overwritten
+            self.stats.remove(self._watts[position])
+        self._epoch[position] = self._epoch[position + self.capacity] = int(timestamp)
+        self._watts[position] = self._watts[position + self.capacity] = power
+        # Advance only once both halves hold the reading
+        self._next = (position + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.total_appended += 1
+        # The stored float32 value, so it matches the one removed later
+        self.stats.add(self._watts[position])
+
+    def clear(self):
+        """Drop every reading."""
+        self._next = 0
+        self._size = 0
+        self.stats.clear()
+
+    def resize(self, capacity):
+        """Change the capacity, keeping the latest readings that fit."""
+        epoch, watts = self.window(copy=True)
+        self.capacity = max(1, int(capacity))
+        epoch, watts = epoch[-self.capacity:], watts[-self.capacity:]
+        self._epoch = np.zeros(2 * self.capacity, dtype=np.int64)
+        self._watts = np.zeros(2 * self.capacity, dtype=np.float32)
+        self._size = len(epoch)
+        self._next = self._size % self.capacity
+        self._epoch[:self._size] = self._epoch[self.capacity:self.capacity + self._size] = epoch
+        self._watts[:self._size] = self._watts[self.capacity:self.capacity + self._size] = watts
+        self.stats.clear()
+        for value in watts:
+            self.stats.add(value)
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def _slice(self, n):
+        """Slice of the mirrored arrays holding the latest n readings, oldest first."""
+        n = self._size if n is None else max(0, min(int(n), self._size))
+        # The latest reading is at _next - 1 in the upper half; the readings
+        # before it run back through the upper half into the lower one
+        end = self._next + self.capacity
+        return slice(end - n, end)
+
+    def window(self, n=None, copy=False):
+        """Get the latest readings as (epoch seconds, watts) arrays, oldest first.
+
+        Args:
+            n: Number of readings; all of them if omitted
+            copy: Return copies instead of read-only views
+
+        Returns:
+            Tuple of (int64 array, float32 array)
+        """
+        part = self._slice(n)
+        epoch, watts = self._epoch[part], self._watts[part]
+        if copy:
+            return epoch.copy(), watts.copy()
+        epoch.flags.writeable = False
+        watts.flags.writeable = False
+        return epoch, watts
+
+    def since(self, start, copy=False):
+        """Get the readings at or after an epoch second, oldest first.
+
+        Returns:
+            Tuple of (int64 array, float32 array)
+        """
+        epoch, watts = self.window(copy=copy)
+        first = int(np.searchsorted(epoch, int(start), side='left'))
+        return epoch[first:], watts[first:]
+
+    def watts(self, n=None, copy=False):
+        """Get the latest power readings, oldest first."""
+        return self.window(n, copy)[1]
+
+    def timestamps(self, n=None):
+        """Get the latest timestamps as naive local datetimes (a DatetimeIndex)."""
+        return from_epoch_seconds(self.window(n)[0])
+
+    def last(self):
+        """Get the latest reading as (datetime, watts), or None if empty."""
+        if not self._size:
+            return None
+        position = (self._next - 1) % self.capacity
+        return (datetime.datetime.fromtimestamp(int(self._epoch[position])),
+                float(self._watts[position]))
+
+    def __iter__(self):
+        """Iterate (datetime, watts) readings, oldest first."""
+        epoch, watts = self.window(copy=True)
+        return iter(zip(from_epoch_seconds(epoch).to_pydatetime(), watts.tolist()))
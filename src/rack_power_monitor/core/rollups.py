@@ -0,0 +1,131 @@
+import numpy as np
+
+# Rollup tiers, as bucket widths in seconds: 1 minute, 15 minutes, 1 hour, 1 day.
+# Buckets are aligned to the epoch, so day buckets are UTC days.
+ROLLUP_TIERS = (60, 900, 3600, 86400)
+
+TIER_NAMES = {60: "1min", 900: "15min", 3600: "1h", 86400: "1d"}
+
+# Readings further apart than this are a gap in monitoring; no energy is counted across it
+DEFAULT_MAX_GAP_SECONDS = 900
+
+
+def choose_tier(resolution_seconds):
+    """Get the coarsest rollup tier whose buckets are no wider than a resolution.
+
+    Args:
+        resolution_seconds: Wanted spacing between points, in seconds
+
+    Returns:
+        Bucket width in seconds, or None if raw readings are needed
+    """
+    if resolution_seconds is None:
+        return None
+    fitting = [tier for tier in ROLLUP_TIERS if tier <= resolution_seconds]
+    return fitting[-1] if fitting else None
+
+
+def aligned_tier(start, end):
+    """Get the coarsest tier whose buckets exactly cover [start, end].
+
+    Totals over the range can then be read from that tier without
+    counting readings outside it.
+
+    Args:
+        start: First epoch second of the range, or None for unbounded
+        end: Last epoch second of the range, inclusive, or None for unbounded
+    """
+    for tier in reversed(ROLLUP_TIERS):
+        if (start is None or start % tier == 0) and (end is None or (end + 1) % tier == 0):
+            return tier
+    return ROLLUP_TIERS[0]
+
+
+def energy_increments(epoch, watts, previous=None, max_gap_seconds=DEFAULT_MAX_GAP_SECONDS):
+    """Energy in watt-hours since the previous reading, for each reading of one rack.
+
+    Uses the trapezoidal rule between consecutive readings, like the power
+    report. The energy of an interval is counted in the bucket of the reading
+    that ends it.
+
+    Args:
+        epoch: Sorted int64 epoch seconds
+        watts: Power readings
+        previous: (epoch, watts) of the reading before the first one, if known
+        max_gap_seconds: Intervals longer than this count no energy
+
+    Returns:
+        float64 array of watt-hours, one per reading
+    """
+    epoch = np.asarray(epoch, dtype=np.int64)
+    watts = np.asarray(watts, dtype=np.float64)
+    if previous is not None:
+        prev_epoch = np.concatenate(([previous[0]], epoch[:-1]))
+        prev_watts = np.concatenate(([previous[1]], watts[:-1]))
+    else:
+        prev_epoch = np.concatenate((epoch[:1], epoch[:-1]))
+        prev_watts = np.concatenate((watts[:1], watts[:-1]))
+    seconds = epoch - prev_epoch
+    energy = (watts + prev_watts) / 2 * seconds / 3600.0
+    energy[(seconds <= 0) | (seconds > max_gap_seconds)] = 0.0
+    return energy
+
+
+def aggregate(epoch, watts, energy, tier):
+    """Aggregate one rack's sorted readings into buckets of a tier.
+
+    Returns:
+        Tuple of arrays (bucket start, min, max, sum, sum of squares, count, energy Wh)
+    """
+    epoch = np.asarray(epoch, dtype=np.int64)
+    watts = np.asarray(watts, dtype=np.float64)
+    buckets = epoch - epoch % tier
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    counts = np.diff(np.append(starts, len(buckets)))
+    return (buckets[starts],
+            np.minimum.reduceat(watts, starts),
+            np.maximum.reduceat(watts, starts),
+            np.add.reduceat(watts, starts),
+            np.add.reduceat(watts * watts, starts),
+            counts,
+            np.add.reduceat(energy, starts))
+
+
+def tier_cover(start, end, tiers=ROLLUP_TIERS):
+    """Split [start, end] into runs of whole buckets, using the coarsest tier that fits each part.
+
+    A month is then mostly day buckets, with hours, quarter hours and
+    minutes only at its edges. Partial buckets at the edges are included
+    whole from the finest tier, so the cover is exact to the minute.
+
+    Args:
+        start: First epoch second, or None for unbounded
+        end: Last epoch second, inclusive, or None for unbounded
+        tiers: Bucket widths to cover with, finest first
+
+    Returns:
+        List of (tier, first epoch second, last epoch second) runs; the
+        seconds are None where the range is unbounded
+    """
+    return _cover(start, end, tuple(tiers))
+
+
+def _cover(start, end, tiers):
+    """tier_cover over the given tiers, finest first."""
+    if start is not None and end is not None and start > end:
+        return []
+    tier = tiers[-1]
+    if len(tiers) == 1:
+        return [(tier, start, end)]
+    # Whole buckets of this tier inside the range
+    first = None if start is None else -(-start // tier) * tier
+    last = None if end is None else (end + 1) // tier * tier - 1
+    if first is not None and last is not None and first > last:
+        return _cover(start, end, tiers[:-1])
+    runs = []
+    if first is not None:
+        runs += _cover(start, first - 1, tiers[:-1])
+    runs.append((tier, first, last))
+    if last is not None:
+        runs += _cover(last + 1, end, tiers[:-1])
+    return runs
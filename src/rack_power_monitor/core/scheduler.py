@@ -0,0 +1,125 @@
+import math
+import time
+import zlib
+import asyncio
+import logging
+
+logger = logging.getLogger("power_monitor")
+
+class PollScheduler:
+    """Drift-free polling ticks on a monotonic clock, aligned to an absolute grid.
+
+    Ticks are computed as ``anchor + n * interval`` rather than by adding up
+    sleep durations, so they never drift. With grid alignment enabled the
+    anchor is a whole multiple of the interval in wall-clock time (e.g. every
+    whole minute for a 60 second interval). The first tick fires at once and
+    the ones after it land on the grid. Racks are spread across the interval
+    with deterministic phase offsets to flatten network bursts.
+    """
+
+    def __init__(self, interval_seconds, align_to_grid=True, stagger_fraction=0.5,
+                 late_tolerance_seconds=None, clock=time.monotonic, wall_clock=time.time):
+        """Initialize the scheduler.
+
+        Args:
+            interval_seconds: Time between ticks
+            align_to_grid: Align ticks to whole multiples of the interval in wall-clock time
+            stagger_fraction: Portion of the interval used to spread rack phase offsets
+            late_tolerance_seconds: A tick firing later than this counts as late
+                (defaults to 5% of the interval, at most one second)
+            clock: Monotonic clock used for scheduling
+            wall_clock: Wall clock used only to pick the grid anchor
+        """
+        if interval_seconds <= 0:
+            raise ValueError("interval_seconds must be positive")
+
+        self.interval = float(interval_seconds)
+        self.align_to_grid = align_to_grid
+        self.stagger_fraction = min(max(float(stagger_fraction), 0.0), 1.0)
+        if late_tolerance_seconds is None:
+            late_tolerance_seconds = min(1.0, self.interval * 0.05)
+        self.late_tolerance = late_tolerance_seconds
+        self.clock = clock
+
+        self.metrics = {
+            'ticks': 0,
+            'late_ticks': 0,
+            'skipped_ticks': 0,
+            'last_lateness_seconds': 0.0,
+            'max_lateness_seconds': 0.0
+        }
+
+        # The first tick is now, so the first cycle gets its whole deadline and
+        # every phase offset. With grid alignment the second tick is the first
+        # grid point at least half an interval later, so the first two polls
+        # aren't back to back, and the ticks after it stay on the grid.
+        now = clock()
+        self._next_tick = now
+        self._grid_tick = None
+        if align_to_grid:
+            wall_now = wall_clock()
+            next_grid = (math.floor(wall_now / self.interval) + 1) * self.interval
+            if next_grid - wall_now < self.interval / 2:
+                next_grid += self.interval
+            self._grid_tick = now + (next_grid - wall_now)
+        self._first_tick = True
+
+    def phase_offset(self, key):
+        """Get the deterministic offset (seconds) after each tick for a rack key."""
+        fraction = zlib.crc32(str(key).encode('utf-8')) / 2 ** 32
+        return fraction * self.interval * self.stagger_fraction
+
+    def seconds_until(self, tick, offset=0.0):
+        """Seconds from now until ``tick + offset`` (never negative)."""
+        return max(0.0, tick + offset - self.clock())
+
+    async def wait_for_next_tick(self, sleep=None):
+        """Wait for the next tick and return its monotonic time.
+
+        Args:
+            sleep: Optional coroutine function ``sleep(seconds)`` returning True
+                if the wait was interrupted (e.g. by a stop request)
+
+        Returns:
+            The monotonic time of the tick, or None if the wait was interrupted.
+        """
+        now = self.clock()
+
+        # If we fell more than a full interval behind (stalled loop, sleep/resume),
+        # skip the missed ticks instead of firing them back to back.
+        if now - self._next_tick >= self.interval:
+            missed = int((now - self._next_tick) // self.interval)
+            self._next_tick += missed * self.interval
+            if not self._first_tick:
+                self.metrics['skipped_ticks'] += missed
+                logger.warning(f"Scheduler skipped {missed} tick(s) after falling behind")
+
+        delay = self._next_tick - now
+        if delay > 0:
+            if sleep is None:
+                await asyncio.sleep(delay)
+            elif await sleep(delay):
+                return None
+
+        tick = self._next_tick
+        if self._first_tick and self._grid_tick is not None:
+            self._next_tick = self._grid_tick
+        else:
+            self._next_tick += self.interval
+
+        # Track how late the tick fired
+        lateness = max(0.0, self.clock() - tick)
+        self.metrics['ticks'] += 1
+        if not self._first_tick:
+            self.metrics['last_lateness_seconds'] = lateness
+            self.metrics['max_lateness_seconds'] = max(self.metrics['max_lateness_seconds'], lateness)
+            if lateness > self.late_tolerance:
+                self.metrics['late_ticks'] += 1
+                logger.warning(f"Scheduler tick fired {lateness:.2f}s late")
+        self._first_tick = False
+
+        return tick
+
+    def get_metrics(self):
+        """Return a snapshot of the scheduler metrics."""
+        return dict(self.metrics)
@@ -0,0 +1,243 @@
+import math
+import struct
+
+import numpy as np
+
+# Quantile estimates are within this fraction of the true value
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+# Quantiles reported for capacity planning
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+# Values smaller than this in magnitude are counted as zero
+MIN_INDEXABLE = 1e-9
+
+# Serialized sketch: relative accuracy, zero count, positive and negative bin counts,
+# then the keys (int32) and counts (int64) of the positive bins, then of the negative ones
+_HEADER = struct.Struct("<dqII")
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch of power readings (DDSketch).
+
+    Values are counted in logarithmic bins: bin k holds values in
+    (gamma^(k-1), gamma^k] with gamma = (1 + a) / (1 - a), so every quantile
+    is estimated to within a relative error of a, the relative accuracy.
+    Memory depends on the range of values, not their number: readings from
+    1 W to 100 kW take under 600 bins at 1%.
+
+    Sketches with the same accuracy merge exactly (bin counts add up), so the
+    sketch of a rack's day is the merge of its hours, and the sketch of a row
+    of racks is the merge of theirs. Values can also be removed, which keeps
+    the sketch of a sliding window.
+    """
+
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        """Create an empty sketch.
+
+        Args:
+            relative_accuracy: Relative error of quantile estimates, in (0, 1)
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"Relative accuracy must be between 0 and 1: {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._positive = {}  # key -> count
+        self._negative = {}  # key of -value -> count
+        self.zero_count = 0
+        self.count = 0
+
+    def _key(self, magnitude):
+        """Bin key of a positive value."""
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+
+    def _value(self, key):
+        """Representative value of a bin, within the relative accuracy of all its values."""
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+    def add(self, value, count=1):
+        """Add a value `count` times."""
+        value = float(value)
+        if value > MIN_INDEXABLE:
+            key = self._key(value)
+            self._positive[key] = self._positive.get(key, 0) + count
+        elif value < -MIN_INDEXABLE:
+            key = self._key(-value)
+            self._negative[key] = self._negative.get(key, 0) + count
+        else:
+            self.zero_count += count
+        self.count += count
+
+    def add_many(self, values):
+        """Add an array of values."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        positive = values[values > MIN_INDEXABLE]
+        negative = -values[values < -MIN_INDEXABLE]
+        for bins, magnitudes in ((self._positive, positive), (self._negative, negative)):
+            if len(magnitudes):
+                keys, counts = np.unique(np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64),
+                                         return_counts=True)
+                for key, count in zip(keys.tolist(), counts.tolist()):
+                    bins[key] = bins.get(key, 0) + count
+        self.zero_count += len(values) - len(positive) - len(negative)
+        self.count += len(values)
+
+    def remove(self, value, count=1):
+        """Remove a value added before; values not in the sketch are ignored."""
+        value = float(value)
+        if value > MIN_INDEXABLE:
+            bins, key = self._positive, self._key(value)
+        elif value < -MIN_INDEXABLE:
+            bins, key = self._negative, self._key(-value)
+        else:
+            removed = min(count, self.zero_count)
+            self.zero_count -= removed
+            self.count -= removed
+            return
+        removed = min(count, bins.get(key, 0))
+        if removed == bins.get(key, 0):
+            bins.pop(key, None)
+        else:
+            bins[key] -= removed
+        self.count -= removed
+
+    def merge(self, other):
+        """Add the values of another sketch with the same relative accuracy."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Can't merge sketches of different relative accuracy")
+        for bins, other_bins in ((self._positive, other._positive), (self._negative, other._negative)):
+            for key, count in other_bins.items():
+                bins[key] = bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def clear(self):
+        """Remove every value."""
+        self._positive.clear()
+        self._negative.clear()
+        self.zero_count = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def quantile(self, q):
+        """Estimate a quantile.
+
+        Args:
+            q: Quantile in [0, 1]
+
+        Returns:
+            Estimated value, or None if the sketch is empty
+        """
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs=DEFAULT_QUANTILES):
+        """Estimate several quantiles in one pass over the bins.
+
+        Returns:
+            List of estimated values (None if the sketch is empty), in the order of qs
+        """
+        if not self.count:
+            return [None] * len(qs)
+        # Bins from the lowest value to the highest
+        bins = [(-self._value(key), count) for key, count in sorted(self._negative.items(), reverse=True)]
+        if self.zero_count:
+            bins.append((0.0, self.zero_count))
+        bins += [(self._value(key), count) for key, count in sorted(self._positive.items())]
+
+        results = [None] * len(qs)
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        seen = 0
+        position = 0
+        for value, count in bins:
+            seen += count
+            while position < len(order) and seen > min(max(qs[order[position]], 0.0), 1.0) * (self.count - 1):
+                results[order[position]] = value
+                position += 1
+            if position == len(order):
+                break
+        return results
+
+    def to_bytes(self):
+        """Serialize the sketch, e.g. to store it in a database."""
+        parts = [_HEADER.pack(self.relative_accuracy, self.zero_count, len(self._positive), len(self._negative))]
+        for bins in (self._positive, self._negative):
+            if bins:
+                keys = sorted(bins)
+                # Keys (int32) then counts (int64); struct is much quicker than numpy for a few bins
+                parts.append(struct.pack(f"<{len(keys)}i{len(keys)}q", *keys, *[bins[key] for key in keys]))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Create a sketch from to_bytes() output."""
+        relative_accuracy, zero_count, n_positive, n_negative = _HEADER.unpack_from(data)
+        sketch = cls(relative_accuracy)
+        offset = _HEADER.size
+        for bins, n in ((sketch._positive, n_positive), (sketch._negative, n_negative)):
+            keys = np.frombuffer(data, dtype='<i4', count=n, offset=offset)
+            offset += 4 * n
+            counts = np.frombuffer(data, dtype='<i8', count=n, offset=offset)
+            offset += 8 * n
+            bins.update(zip(keys.tolist(), counts.tolist()))
+        sketch.zero_count = zero_count
+        sketch.count = zero_count + sum(sketch._positive.values()) + sum(sketch._negative.values())
+        return sketch
+
+    @classmethod
+    def bucketed(cls, values, counts, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        """Create the sketches of many groups of values in one pass, e.g. of rollup buckets.
+
+        Args:
+            values: The values of every group, one group after the other
+            counts: Number of values in each group
+
+        Returns:
+            List of sketches, one per group
+        """
+        sketches = [cls(relative_accuracy) for _ in range(len(counts))]
+        if not sketches:
+            return sketches
+        values = np.asarray(values, dtype=np.float64)
+        groups = np.repeat(np.arange(len(sketches)), counts)
+        valid = ~np.isnan(values)
+        values, groups = values[valid], groups[valid]
+        log_gamma = sketches[0]._log_gamma
+        positive = values > MIN_INDEXABLE
+        negative = values < -MIN_INDEXABLE
+        for attr, mask, magnitudes in (('_positive', positive, values[positive]),
+                                       ('_negative', negative, -values[negative])):
+            if not len(magnitudes):
+                continue
+            keys = np.ceil(np.log(magnitudes) / log_gamma).astype(np.int64)
+            # One (group, key) pair per bin, counted across all groups at once
+            low = int(keys.min())
+            width = int(keys.max()) - low + 1
+            pairs, bin_counts = np.unique(groups[mask] * width + (keys - low), return_counts=True)
+            bins = [getattr(sketch, attr) for sketch in sketches]
+            for group, key, count in zip((pairs // width).tolist(), (pairs % width + low).tolist(),
+                                         bin_counts.tolist()):
+                bins[group][key] = count
+        zeros = np.bincount(groups[~(positive | negative)], minlength=len(sketches)).tolist()
+        totals = np.bincount(groups, minlength=len(sketches)).tolist()
+        for sketch, zero_count, count in zip(sketches, zeros, totals):
+            sketch.zero_count = zero_count
+            sketch.count = count
+        return sketches
+
+    @classmethod
+    def merged(cls, sketches, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        """Merge sketches, e.g. of the racks of a row, into a new one."""
+        result = cls(relative_accuracy)
+        for sketch in sketches:
+            result.merge(sketch)
+        return result
+
+
+def quantile_labels(qs=DEFAULT_QUANTILES):
+    """Names of quantiles as percentiles, e.g. 'p95' for 0.95 and 'p99.9' for 0.999."""
+    return [f"p{q * 100:g}" for q in qs]
@@ -0,0 +1,991 @@
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from .timeseries import (TimeSeriesStore, parse_session_filename, read_session_csv,
+                         to_epoch_seconds, from_epoch_seconds, _local_datetime64)
+from .rollups import (ROLLUP_TIERS, DEFAULT_MAX_GAP_SECONDS, choose_tier, aligned_tier,
+                      tier_cover, energy_increments, aggregate)
+from .sketch import QuantileSketch, DEFAULT_QUANTILES, quantile_labels
+
+logger = logging.getLogger("power_monitor")
+
+# Database file kept in the data folder
+SQLITE_FILENAME = "power_readings.db"
+
+# Rollup tiers that keep a quantile sketch per bucket. Minute buckets hold a
+# reading or a few, so their sketches would cost more to write than the
+# readings themselves; parts of a range finer than a quarter hour are read
+# from the raw readings instead.
+SKETCH_TIERS = ROLLUP_TIERS[1:]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS racks (
+    rack_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    address TEXT,
+    first_ts INTEGER,
+    last_ts INTEGER
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id INTEGER PRIMARY KEY,
+    rack_id INTEGER NOT NULL REFERENCES racks(rack_id),
+    source TEXT NOT NULL UNIQUE,
+    folder TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    started INTEGER,
+    first_ts INTEGER,
+    last_ts INTEGER,
+    reading_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_by_file_name ON sessions(file_name);
+CREATE INDEX IF NOT EXISTS sessions_by_folder ON sessions(folder);
+-- Clustered on (rack_id, ts), so a rack's time range is one index seek and a sequential read
+CREATE TABLE IF NOT EXISTS readings (
+    rack_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    power REAL NOT NULL,
+    session_id INTEGER,
+    PRIMARY KEY (rack_id, ts)
+) WITHOUT ROWID;
+-- Per-rack aggregates for each tier (bucket width in seconds), kept up to date on insert
+CREATE TABLE IF NOT EXISTS rollups (
+    rack_id INTEGER NOT NULL,
+    tier INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    sum REAL NOT NULL,
+    sum_sq REAL NOT NULL,
+    count INTEGER NOT NULL,
+    energy_wh REAL NOT NULL,
+    PRIMARY KEY (rack_id, tier, bucket)
+) WITHOUT ROWID;
+-- Quantile sketch (QuantileSketch.to_bytes) of each rollup bucket of SKETCH_TIERS, merged on insert
+CREATE TABLE IF NOT EXISTS rollup_sketches (
+    rack_id INTEGER NOT NULL,
+    tier INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    sketch BLOB NOT NULL,
+    PRIMARY KEY (rack_id, tier, bucket)
+) WITHOUT ROWID;
+-- Readings before before_ts were dropped by retention; their rollups are kept
+CREATE TABLE IF NOT EXISTS raw_horizons (
+    rack_id INTEGER PRIMARY KEY,
+    before_ts INTEGER NOT NULL
+);
+"""
+
+_UPSERT_ROLLUP = (
+    "INSERT INTO rollups (rack_id, tier, bucket, min, max, sum, sum_sq, count, energy_wh) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(rack_id, tier, bucket) DO UPDATE SET "
+    "min = MIN(min, excluded.min), max = MAX(max, excluded.max), sum = sum + excluded.sum, "
+    "sum_sq = sum_sq + excluded.sum_sq, count = count + excluded.count, "
+    "energy_wh = energy_wh + excluded.energy_wh"
+)
+
+_ROLLUP_COLUMNS = ['Timestamp', 'Rack', 'Min', 'Max', 'Mean', 'Count', 'Sum', 'SumSquares', 'EnergyWh']
+
+
+class SQLiteStore(TimeSeriesStore):
+    """Rack power readings in a single SQLite database.
+
+    The database runs in WAL mode: the writer appends to the log while
+    readers keep reading their snapshot, so queries from the web server or
+    the GUI never block the persistence writer, and the writer never blocks
+    them. Readings are buffered and inserted in one transaction per batch.
+
+    Readings are keyed by (rack, epoch second); a second reading for the same
+    rack and second replaces the first, in the rollups and session counts
+    too. Sessions are the CSV files the readings were also written to, so a
+    CSV can be answered from the index.
+
+    Each insert also updates per-rack rollups (min, max, sum, count and
+    energy) at the ROLLUP_TIERS resolutions in the same transaction, so long
+    ranges can be read from a few thousand buckets instead of every reading.
+    Buckets of SKETCH_TIERS also have a quantile sketch, so percentiles of
+    any range or group of racks are a merge of bucket sketches.
+    """
+
+    def __init__(self, path, batch_rows=500, flush_interval_seconds=5.0, max_readers=4,
+                 max_gap_seconds=DEFAULT_MAX_GAP_SECONDS, clock=time.monotonic):
+        """Initialize the store, creating the database if needed.
+
+        Args:
+            path: Database file
+            batch_rows: Insert buffered readings once this many are waiting
+            flush_interval_seconds: Insert buffered readings at least this often
+            max_readers: Read connections kept open for reuse
+            max_gap_seconds: Readings further apart count no energy between them
+            clock: Monotonic clock used for the flush interval
+        """
+        self.path = path
+        self.batch_rows = max(1, int(batch_rows))
+        self.flush_interval_seconds = max(0.0, float(flush_interval_seconds))
+        self.max_gap_seconds = max_gap_seconds
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._pending = []  # (rack_id, ts, power, session_id) rows waiting for the next batch
+        self._oldest = None  # Clock time of the oldest pending row
+        self._rack_ids = {}  # rack name -> rack_id
+        self._addresses = {}  # rack name -> last stored address
+        self._session_ids = {}  # source path -> session_id
+        self._readers = queue.LifoQueue(maxsize=max(1, int(max_readers)))
+        self._stats = {'rows_inserted': 0, 'batches': 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The writer connection is shared by whichever thread flushes, under the lock
+        self._writer = self._connect()
+        self._writer.executescript(_SCHEMA)
+        for rack_id, name, address in self._writer.execute("SELECT rack_id, name, address FROM racks"):
+            self._rack_ids[name] = rack_id
+            self._addresses[name] = address
+
+        # Databases written before rollups (or their sketches) existed get them built once
+        if (self._writer.execute("SELECT 1 FROM readings LIMIT 1").fetchone()
+                and not self._writer.execute("SELECT 1 FROM rollup_sketches LIMIT 1").fetchone()):
+            self.rebuild_rollups()
+
+    def _connect(self):
+        """Open a connection in WAL mode."""
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL only syncs at checkpoints, and a power loss can't corrupt the database
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextlib.contextmanager
+    def _reader(self):
+        """Borrow a read connection; each query sees one consistent snapshot."""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+            conn.execute("PRAGMA query_only=1")
+        try:
+            yield conn
+        finally:
+            try:
+                self._readers.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def register_rack(self, rack_name, address=None):
+        """Add a rack, or update its address. Returns the rack id."""
+        with self._lock:
+            rack_id = self._rack_ids.get(rack_name)
+            if rack_id is not None and (address is None or self._addresses.get(rack_name) == address):
+                return rack_id
+            self._writer.execute(
+                "INSERT INTO racks (name, address) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET address = COALESCE(excluded.address, address)",
+                (rack_name, address))
+            rack_id = self._writer.execute("SELECT rack_id FROM racks WHERE name = ?", (rack_name,)).fetchone()[0]
+            self._rack_ids[rack_name] = rack_id
+            if address is not None:
+                self._addresses[rack_name] = address
+            return rack_id
+
+    def _session_id(self, rack_id, source):
+        """Get the session id of a CSV file, adding the session if it is new. Call with the lock held."""
+        source = os.path.abspath(source)
+        session_id = self._session_ids.get(source)
+        if session_id is not None:
+            return session_id
+
+        parsed = parse_session_filename(source)
+        started = int(parsed[1].timestamp()) if parsed else None
+        self._writer.execute(
+            "INSERT OR IGNORE INTO sessions (rack_id, source, folder, file_name, started) VALUES (?, ?, ?, ?, ?)",
+            (rack_id, source, os.path.dirname(source), os.path.basename(source), started))
+        session_id = self._writer.execute("SELECT session_id FROM sessions WHERE source = ?", (source,)).fetchone()[0]
+        self._session_ids[source] = session_id
+        return session_id
+
+    def append(self, rack_name, epoch_seconds, watts, source=None):
+        """Buffer readings for a rack.
+
+        Args:
+            rack_name: Rack the readings belong to
+            epoch_seconds: Sequence of int epoch seconds
+            watts: Sequence of power readings
+            source: CSV file the readings were written to, recorded as their session
+        """
+        if not len(epoch_seconds):
+            return
+        with self._lock:
+            rack_id = self.register_rack(rack_name)
+            session_id = self._session_id(rack_id, source) if source else None
+            if self._oldest is None:
+                self._oldest = self._clock()
+            self._pending.extend((rack_id, int(ts), float(power), session_id)
+                                 for ts, power in zip(epoch_seconds, watts))
+            if len(self._pending) >= self.batch_rows or self._clock() - self._oldest >= self.flush_interval_seconds:
+                self.flush()
+
+    def flush(self, racks=None):
+        """Insert all buffered readings in one transaction.
+
+        Readings are always flushed together, so `racks` is accepted for the
+        TimeSeriesStore interface but doesn't limit the flush.
+        """
+        with self._lock:
+            rows, self._pending, self._oldest = self._pending, [], None
+            if not rows:
+                return
+            try:
+                self._insert(rows)
+            except sqlite3.Error as e:
+                # Keep the rows so the next flush retries them
+                self._pending = rows + self._pending
+                self._oldest = self._clock()
+                raise OSError(f"Error inserting {len(rows)} readings into {self.path}: {e}") from e
+
+    def flush_due(self):
+        """Insert buffered readings once the oldest has waited for the flush interval."""
+        with self._lock:
+            if self._oldest is not None and self._clock() - self._oldest >= self.flush_interval_seconds:
+                self.flush()
+
+    def _insert(self, rows):
+        """Insert rows and update the rack and session ranges. Call with the lock held."""
+        # As in the table, a later reading for the same rack and second replaces an earlier one
+        keys = {(row[0], row[1]): row for row in rows}
+        if len(keys) < len(rows):
+            rows = list(keys.values())
+        ranges = {}  # (rack_id, session_id) -> [first, last, count]
+        for rack_id, ts, _, session_id in rows:
+            span = ranges.get((rack_id, session_id))
+            if span is None:
+                ranges[(rack_id, session_id)] = [ts, ts, 1]
+            else:
+                span[0] = min(span[0], ts)
+                span[1] = max(span[1], ts)
+                span[2] += 1
+        spans = {}  # rack_id -> [first, last]
+        for (rack_id, _), (first, last, _) in ranges.items():
+            span = spans.setdefault(rack_id, [first, last])
+            span[0] = min(span[0], first)
+            span[1] = max(span[1], last)
+
+        conn = self._writer
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Readings the batch replaces are already in the rollups, sketches and
+            # session counts, so the days holding them are rebuilt instead of added to
+            rebuilt = {}  # rack_id -> (first, last) second of the days rebuilt
+            replaced_counts = {}  # session_id -> its readings replaced
+            day = ROLLUP_TIERS[-1]
+            for rack_id, (first, last) in spans.items():
+                replaced = [(ts, session_id) for ts, session_id in
+                            conn.execute("SELECT ts, session_id FROM readings WHERE rack_id = ? AND ts BETWEEN ? AND ?",
+                                         (rack_id, first, last))
+                            if (rack_id, ts) in keys]
+                if not replaced:
+                    continue
+                first = min(ts for ts, _ in replaced)
+                last = max(ts for ts, _ in replaced)
+                rebuilt[rack_id] = (first - first % day, last - last % day + day - 1)
+                for _, session_id in replaced:
+                    if session_id is not None:
+                        replaced_counts[session_id] = replaced_counts.get(session_id, 0) + 1
+
+            conn.executemany("INSERT OR REPLACE INTO readings (rack_id, ts, power, session_id) VALUES (?, ?, ?, ?)",
+                             rows)
+            added = rows
+            if rebuilt:
+                added = [row for row in rows if row[0] not in rebuilt
+                         or not rebuilt[row[0]][0] <= row[1] <= rebuilt[row[0]][1]]
+            self._update_rollups(conn, added)
+            for rack_id, (first, last) in rebuilt.items():
+                self._rebuild_rack_rollups(conn, rack_id, first, last)
+            for session_id, count in replaced_counts.items():
+                conn.execute("UPDATE sessions SET reading_count = reading_count - ? WHERE session_id = ?",
+                             (count, session_id))
+            for (rack_id, session_id), (first, last, count) in ranges.items():
+                conn.execute("UPDATE racks SET first_ts = MIN(COALESCE(first_ts, ?), ?), "
+                             "last_ts = MAX(COALESCE(last_ts, ?), ?) WHERE rack_id = ?",
+                             (first, first, last, last, rack_id))
+                if session_id is not None:
+                    conn.execute("UPDATE sessions SET first_ts = MIN(COALESCE(first_ts, ?), ?), "
+                                 "last_ts = MAX(COALESCE(last_ts, ?), ?), reading_count = reading_count + ? "
+                                 "WHERE session_id = ?",
+                                 (first, first, last, last, count, session_id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._stats['rows_inserted'] += len(rows)
+        self._stats['batches'] += 1
+
+    def _update_rollups(self, conn, rows):
+        """Add inserted rows to the rollups of every tier. Call inside the insert transaction."""
+        if not rows:
+            return
+        rack_ids, all_epoch, all_watts, _ = zip(*rows)
+        rack_ids = np.array(rack_ids, dtype=np.int64)
+        all_epoch = np.array(all_epoch, dtype=np.int64)
+        all_watts = np.array(all_watts, dtype=np.float64)
+        # Sorted by rack, then time
+        order = np.lexsort((all_epoch, rack_ids))
+        rack_ids, all_epoch, all_watts = rack_ids[order], all_epoch[order], all_watts[order]
+        starts = np.flatnonzero(np.concatenate(([True], rack_ids[1:] != rack_ids[:-1])))
+
+        for rack_id, first, last in zip(rack_ids[starts].tolist(), starts.tolist(),
+                                        np.append(starts[1:], len(rack_ids)).tolist()):
+            epoch = all_epoch[first:last]
+            watts = all_watts[first:last]
+            # Energy of the first new reading runs from the latest reading stored before it
+            previous = conn.execute("SELECT ts, power FROM readings WHERE rack_id = ? AND ts < ? "
+                                    "ORDER BY ts DESC LIMIT 1", (rack_id, int(epoch[0]))).fetchone()
+            energy = energy_increments(epoch, watts, previous, self.max_gap_seconds)
+            self._write_rollups(conn, rack_id, epoch, watts, energy, _UPSERT_ROLLUP)
+
+    def _write_rollups(self, conn, rack_id, epoch, watts, energy, sql):
+        """Aggregate one rack's sorted readings into every tier and write the buckets."""
+        for tier in ROLLUP_TIERS:
+            buckets, mins, maxs, sums, sums_sq, counts, energies = aggregate(epoch, watts, energy, tier)
+            conn.executemany(sql, zip([rack_id] * len(buckets), [tier] * len(buckets), buckets.tolist(),
+                                      mins.tolist(), maxs.tolist(), sums.tolist(), sums_sq.tolist(),
+                                      counts.tolist(), energies.tolist()))
+            if tier in SKETCH_TIERS:
+                self._write_sketches(conn, rack_id, tier, buckets, counts, watts)
+
+    def _write_sketches(self, conn, rack_id, tier, buckets, counts, watts):
+        """Merge the readings of each bucket into its stored sketch."""
+        # One range query for the sketches already stored for the batch's buckets
+        stored = dict(conn.execute("SELECT bucket, sketch FROM rollup_sketches "
+                                   "WHERE rack_id = ? AND tier = ? AND bucket BETWEEN ? AND ?",
+                                   (rack_id, tier, int(buckets[0]), int(buckets[-1]))))
+        rows = []
+        for bucket, sketch in zip(buckets.tolist(), QuantileSketch.bucketed(watts, counts)):
+            if bucket in stored:
+                sketch.merge(QuantileSketch.from_bytes(stored[bucket]))
+            rows.append((rack_id, tier, bucket, sketch.to_bytes()))
+        conn.executemany("INSERT OR REPLACE INTO rollup_sketches (rack_id, tier, bucket, sketch) "
+                         "VALUES (?, ?, ?, ?)", rows)
+
+    def _rebuild_rack_rollups(self, conn, rack_id, first, last):
+        """Recompute a rack's rollups for the days covering [first, last] from its readings.
+
+        Call inside a write transaction.
+        """
+        day = ROLLUP_TIERS[-1]
+        start = first - first % day
+        end = last - last % day + day - 1
+        # Rollups older than the raw horizon have no readings left to rebuild them from
+        horizon = conn.execute("SELECT before_ts FROM raw_horizons WHERE rack_id = ?", (rack_id,)).fetchone()
+        if horizon is not None:
+            start = max(start, horizon[0])
+            if start > end:
+                return
+        conn.execute("DELETE FROM rollups WHERE rack_id = ? AND bucket BETWEEN ? AND ?", (rack_id, start, end))
+        conn.execute("DELETE FROM rollup_sketches WHERE rack_id = ? AND bucket BETWEEN ? AND ?", (rack_id, start, end))
+
+        # Read from one gap earlier, so the first reading's energy is known
+        rows = conn.execute("SELECT ts, power FROM readings WHERE rack_id = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                            (rack_id, start - self.max_gap_seconds, end)).fetchall()
+        if not rows:
+            return
+        epoch = np.fromiter((ts for ts, _ in rows), dtype=np.int64, count=len(rows))
+        watts = np.fromiter((power for _, power in rows), dtype=np.float64, count=len(rows))
+        energy = energy_increments(epoch, watts, None, self.max_gap_seconds)
+        in_range = epoch >= start
+        if in_range.any():
+            self._write_rollups(conn, rack_id, epoch[in_range], watts[in_range], energy[in_range],
+                                _UPSERT_ROLLUP)
+
+    def rebuild_rollups(self, racks=None):
+        """Recompute rollups from the stored readings.
+
+        Args:
+            racks: Rack names to rebuild; all racks if omitted
+        """
+        with self._lock:
+            self.flush()
+            spans = self._writer.execute(
+                "SELECT rack_id, name, first_ts, last_ts FROM racks WHERE first_ts IS NOT NULL").fetchall()
+            conn = self._writer
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for rack_id, name, first, last in spans:
+                    if racks is None or name in racks:
+                        self._rebuild_rack_rollups(conn, rack_id, first, last)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        logger.info(f"Rebuilt rollups for {len(spans) if racks is None else len(racks)} racks in {self.path}")
+
+    def drop_readings_before(self, before):
+        """Delete raw readings older than a UTC day, keeping their rollups.
+
+        Args:
+            before: Epoch second; rounded down to the start of its UTC day so
+                no rollup bucket is left with only part of its readings
+
+        Returns:
+            Number of readings deleted
+        """
+        day = ROLLUP_TIERS[-1]
+        before = int(before) - int(before) % day
+        deleted = 0
+        with self._lock:
+            self.flush()
+            conn = self._writer
+            rack_ids = [rack_id for rack_id, in conn.execute("SELECT rack_id FROM racks")]
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for rack_id in rack_ids:
+                    # (rack_id, ts) is the primary key, so this is a range delete
+                    deleted += conn.execute("DELETE FROM readings WHERE rack_id = ? AND ts < ?",
+                                            (rack_id, before)).rowcount
+                    conn.execute("INSERT INTO raw_horizons (rack_id, before_ts) VALUES (?, ?) "
+                                 "ON CONFLICT(rack_id) DO UPDATE SET before_ts = MAX(before_ts, excluded.before_ts)",
+                                 (rack_id, before))
+                conn.execute("DELETE FROM sessions WHERE last_ts < ?", (before,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._session_ids.clear()
+        if deleted:
+            logger.info(f"Dropped {deleted} raw readings before {_to_datetime(before)} from {self.path}")
+        return deleted
+
+    def close(self):
+        """Insert buffered readings and close the read connections.
+
+        The writer connection stays open, so the store can still be used.
+        """
+        self.flush()
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def list_racks(self):
+        """Get the names of racks with stored readings."""
+        with self._reader() as conn:
+            return [name for name, in conn.execute(
+                "SELECT name FROM racks WHERE first_ts IS NOT NULL ORDER BY name")]
+
+    def get_racks(self):
+        """Get the stored racks with their address and time range.
+
+        Returns:
+            List of dicts with name, address, first and last (datetime or None)
+        """
+        with self._reader() as conn:
+            rows = conn.execute("SELECT name, address, first_ts, last_ts FROM racks ORDER BY name").fetchall()
+        return [{'name': name, 'address': address,
+                 'first': _to_datetime(first), 'last': _to_datetime(last)}
+                for name, address, first, last in rows]
+
+    def read_arrays(self, rack_name, start=None, end=None):
+        """Read a rack's readings as sorted (epoch seconds, watts) arrays.
+
+        Args:
+            rack_name: Rack to read
+            start: Earliest epoch second, inclusive
+            end: Latest epoch second, inclusive
+        """
+        with self._reader() as conn:
+            return self._select(conn, rack_name, start, end)
+
+    def read(self, racks=None, start=None, end=None):
+        """Read readings as a DataFrame with Timestamp, Rack and PowerWatts columns."""
+        start_epoch = int(to_epoch_seconds([start])[0]) if start is not None else None
+        end_epoch = int(to_epoch_seconds([end])[0]) if end is not None else None
+        racks = self.list_racks() if racks is None else list(racks)
+
+        # One connection, and so one snapshot, for all racks
+        with self._reader() as conn:
+            arrays = [self._select(conn, rack, start_epoch, end_epoch) for rack in racks]
+
+        counts = [len(epoch) for epoch, _ in arrays]
+        epoch = np.concatenate([a[0] for a in arrays]) if arrays else np.empty(0, dtype=np.int64)
+        watts = np.concatenate([a[1] for a in arrays]) if arrays else np.empty(0, dtype=np.float32)
+        codes = np.repeat(np.arange(len(racks), dtype=np.int32), counts)
+        return pd.DataFrame({
+            'Timestamp': _local_datetime64(epoch),
+            'Rack': pd.Categorical.from_codes(codes, categories=pd.Index(racks, dtype=object)),
+            'PowerWatts': watts
+        }, copy=False)
+
+    def _select(self, conn, rack_name, start=None, end=None, session_id=None, dtype=np.float32):
+        """Range query on the (rack_id, ts) key."""
+        sql = "SELECT ts, power FROM readings WHERE rack_id = (SELECT rack_id FROM racks WHERE name = ?)"
+        params = [rack_name]
+        if start is not None:
+            sql += " AND ts >= ?"
+            params.append(int(start))
+        if end is not None:
+            sql += " AND ts <= ?"
+            params.append(int(end))
+        if session_id is not None:
+            sql += " AND session_id = ?"
+            params.append(session_id)
+        rows = conn.execute(sql + " ORDER BY ts", params).fetchall()
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=dtype)
+        epoch, watts = zip(*rows)
+        return np.array(epoch, dtype=np.int64), np.array(watts, dtype=dtype)
+
+    def read_rollups(self, racks=None, start=None, end=None, tier=ROLLUP_TIERS[0]):
+        """Read rollup buckets of one tier.
+
+        Args:
+            racks: Rack names to read; all racks if omitted
+            start: Earliest timestamp (naive local datetime); its bucket is included
+            end: Latest timestamp (naive local datetime), inclusive
+            tier: Bucket width in seconds, one of ROLLUP_TIERS
+
+        Returns:
+            DataFrame with Timestamp (bucket start), Rack, Min, Max, Mean,
+            Count, Sum, SumSquares and EnergyWh columns
+        """
+        if tier not in ROLLUP_TIERS:
+            raise ValueError(f"Unknown rollup tier: {tier}")
+        start_epoch = int(to_epoch_seconds([start])[0]) if start is not None else None
+        end_epoch = int(to_epoch_seconds([end])[0]) if end is not None else None
+        racks = self.list_racks() if racks is None else list(racks)
+
+        frames = []
+        with self._reader() as conn:
+            for rack in racks:
+                rows = self._select_rollups(conn, rack, tier, start_epoch, end_epoch)
+                if rows:
+                    frames.append((rack, rows))
+        if not frames:
+            return pd.DataFrame({column: [] for column in _ROLLUP_COLUMNS})
+
+        bucket, mins, maxs, sums, sums_sq, counts, energy = (np.array(column) for column in
+                                                             zip(*[row for _, rows in frames for row in rows]))
+        codes = np.repeat(np.arange(len(frames), dtype=np.int32), [len(rows) for _, rows in frames])
+        return pd.DataFrame({
+            'Timestamp': _local_datetime64(bucket.astype(np.int64)),
+            'Rack': pd.Categorical.from_codes(codes, categories=pd.Index([rack for rack, _ in frames], dtype=object)),
+            'Min': mins.astype(np.float64),
+            'Max': maxs.astype(np.float64),
+            'Mean': sums / counts,
+            'Count': counts.astype(np.int64),
+            'Sum': sums.astype(np.float64),
+            'SumSquares': sums_sq.astype(np.float64),
+            'EnergyWh': energy.astype(np.float64)
+        })
+
+    def _select_rollups(self, conn, rack_name, tier, start=None, end=None):
+        """Range query on the (rack_id, tier, bucket) key."""
+        sql = ("SELECT bucket, min, max, sum, sum_sq, count, energy_wh FROM rollups "
+               "WHERE rack_id = (SELECT rack_id FROM racks WHERE name = ?) AND tier = ?")
+        params = [rack_name, tier]
+        if start is not None:
+            sql += " AND bucket >= ?"
+            params.append(start - start % tier)
+        if end is not None:
+            sql += " AND bucket <= ?"
+            params.append(end)
+        return conn.execute(sql + " ORDER BY bucket", params).fetchall()
+
+    def read_resampled(self, racks=None, start=None, end=None, resolution_seconds=None):
+        """Read power at a resolution, from the coarsest rollup tier that satisfies it.
+
+        Args:
+            racks: Rack names to read; all racks if omitted
+            start: Earliest timestamp (naive local datetime)
+            end: Latest timestamp (naive local datetime), inclusive
+            resolution_seconds: Wanted spacing between points; raw readings
+                when it is finer than the smallest tier or omitted
+
+        Returns:
+            DataFrame with Timestamp, Rack, PowerWatts (bucket mean), Min, Max
+            and Count columns; raw readings have Count 1
+        """
+        tier = choose_tier(resolution_seconds)
+        if tier is None:
+            df = self.read(racks, start, end)
+            watts = df['PowerWatts'].astype(np.float64)
+            return df.assign(PowerWatts=watts, Min=watts, Max=watts, Count=1)
+        df = self.read_rollups(racks, start, end, tier)
+        return df[['Timestamp', 'Rack', 'Mean', 'Min', 'Max', 'Count']].rename(columns={'Mean': 'PowerWatts'})
+
+    def summarize(self, rack_name, start=None, end=None):
+        """Get power statistics and energy for a rack from its rollups.
+
+        The statistics come from the coarsest tier whose buckets line up with
+        the range, so for unaligned ranges they are exact to the minute.
+
+        Args:
+            rack_name: Rack to summarize
+            start: Start of the period (naive local datetime); all history if omitted
+            end: End of the period (naive local datetime), inclusive
+
+        Returns:
+            Dict with count, mean, min, max, std_dev, energy_wh, first, last,
+            tier and the DEFAULT_QUANTILES as p50, p95 and p99 (None for
+            buckets stored without sketches), or None if the rack has no
+            readings in the range
+        """
+        start_epoch = int(to_epoch_seconds([start])[0]) if start is not None else None
+        end_epoch = int(to_epoch_seconds([end])[0]) if end is not None else None
+        tier = aligned_tier(start_epoch, end_epoch)
+        with self._reader() as conn:
+            rows = self._select_rollups(conn, rack_name, tier, start_epoch, end_epoch)
+            sketch = self._merge_sketches(conn, [rack_name], start_epoch, end_epoch)
+        if not rows:
+            return None
+
+        bucket, mins, maxs, sums, sums_sq, counts, energy = (np.array(column, dtype=np.float64)
+                                                             for column in zip(*rows))
+        count = int(counts.sum())
+        total = float(sums.sum())
+        mean = total / count
+        variance = (float(sums_sq.sum()) - total * mean) / (count - 1) if count > 1 else 0.0
+        summary = {
+            'count': count,
+            'mean': mean,
+            'min': float(mins.min()),
+            'max': float(maxs.max()),
+            'std_dev': float(np.sqrt(max(variance, 0.0))),
+            'energy_wh': float(energy.sum()),
+            'first': _to_datetime(int(bucket[0])),
+            'last': _to_datetime(int(bucket[-1]) + tier - 1),
+            'tier': tier
+        }
+        summary.update(zip(quantile_labels(), sketch.quantiles(DEFAULT_QUANTILES)))
+        return summary
+
+    def read_sketch(self, racks=None, start=None, end=None):
+        """Get the quantile sketch of racks' readings over a range, merged across racks.
+
+        Merges day buckets where the range covers whole days and finer ones
+        only at its edges. Merging the result of several calls gives the
+        sketch of a group.
+
+        Args:
+            racks: Rack names; all racks if omitted
+            start: Start of the period (naive local datetime); all history if omitted
+            end: End of the period (naive local datetime), inclusive
+
+        Returns:
+            QuantileSketch, empty if there are no readings
+        """
+        start_epoch = int(to_epoch_seconds([start])[0]) if start is not None else None
+        end_epoch = int(to_epoch_seconds([end])[0]) if end is not None else None
+        racks = self.list_racks() if racks is None else list(racks)
+        with self._reader() as conn:
+            return self._merge_sketches(conn, racks, start_epoch, end_epoch)
+
+    def quantiles(self, racks=None, start=None, end=None, quantiles=DEFAULT_QUANTILES):
+        """Get percentiles of each rack's readings and of all of them together.
+
+        Args:
+            racks: Rack names; all racks if omitted
+            start: Start of the period (naive local datetime); all history if omitted
+            end: End of the period (naive local datetime), inclusive
+            quantiles: Quantiles to estimate, in [0, 1]
+
+        Returns:
+            Dict with 'racks' (rack name -> {label: value}), 'combined'
+            ({label: value} over every rack) and 'count' per rack; labels
+            are like 'p95'
+        """
+        start_epoch = int(to_epoch_seconds([start])[0]) if start is not None else None
+        end_epoch = int(to_epoch_seconds([end])[0]) if end is not None else None
+        racks = self.list_racks() if racks is None else list(racks)
+        labels = quantile_labels(quantiles)
+        with self._reader() as conn:
+            sketches = {rack: self._merge_sketches(conn, [rack], start_epoch, end_epoch) for rack in racks}
+        combined = QuantileSketch.merged(sketches.values())
+        return {
+            'racks': {rack: dict(zip(labels, sketch.quantiles(quantiles))) for rack, sketch in sketches.items()},
+            'counts': {rack: sketch.count for rack, sketch in sketches.items()},
+            'combined': dict(zip(labels, combined.quantiles(quantiles)))
+        }
+
+    def read_rollup_quantiles(self, racks=None, start=None, end=None, tier=ROLLUP_TIERS[2],
+                              quantiles=DEFAULT_QUANTILES):
+        """Read the percentiles of each rollup bucket of one tier.
+
+        Args:
+            racks: Rack names to read; all racks if omitted
+            start: Earliest timestamp (naive local datetime); its bucket is included
+            end: Latest timestamp (naive local datetime), inclusive
+            tier: Bucket width in seconds, one of SKETCH_TIERS
+            quantiles: Quantiles to estimate, in [0, 1]
+
+        Returns:
+            DataFrame with Timestamp (bucket start), Rack and a column per
+            quantile named like 'p95'
+        """
+        if tier not in SKETCH_TIERS:
+            raise ValueError(f"No quantile sketches for rollup tier: {tier}")
+        start_epoch = int(to_epoch_seconds([start])[0]) if start is not None else None
+        end_epoch = int(to_epoch_seconds([end])[0]) if end is not None else None
+        racks = self.list_racks() if racks is None else list(racks)
+        labels = quantile_labels(quantiles)
+
+        buckets, rack_names, values = [], [], []
+        with self._reader() as conn:
+            for rack in racks:
+                for bucket, blob in self._select_sketches(conn, [rack], tier, start_epoch, end_epoch):
+                    buckets.append(bucket)
+                    rack_names.append(rack)
+                    values.append(QuantileSketch.from_bytes(blob).quantiles(quantiles))
+        frame = pd.DataFrame(values, columns=labels, dtype=np.float64)
+        frame.insert(0, 'Timestamp', _local_datetime64(np.array(buckets, dtype=np.int64)))
+        frame.insert(1, 'Rack', pd.Categorical(rack_names, categories=pd.Index(racks, dtype=object)))
+        return frame
+
+    def _select_sketches(self, conn, racks, tier, start=None, end=None):
+        """Range query on the (rack_id, tier, bucket) key of the bucket sketches."""
+        rows = []
+        for rack in racks:
+            sql = ("SELECT bucket, sketch FROM rollup_sketches "
+                   "WHERE rack_id = (SELECT rack_id FROM racks WHERE name = ?) AND tier = ?")
+            params = [rack, tier]
+            if start is not None:
+                sql += " AND bucket >= ?"
+                params.append(start - start % tier)
+            if end is not None:
+                sql += " AND bucket <= ?"
+                params.append(end)
+            rows += conn.execute(sql + " ORDER BY bucket", params).fetchall()
+        return rows
+
+    def _merge_sketches(self, conn, racks, start=None, end=None):
+        """Merge the bucket sketches of racks over a range, from as few buckets as possible.
+
+        The edges of the range finer than a quarter hour come from the raw
+        readings, or from their whole quarter-hour bucket where retention
+        dropped the readings.
+        """
+        sketch = QuantileSketch()
+        # One-second "buckets" are the raw readings
+        for tier, first, last in tier_cover(start, end, (1,) + SKETCH_TIERS):
+            if tier in SKETCH_TIERS:
+                for _, blob in self._select_sketches(conn, racks, tier, first, last):
+                    sketch.merge(QuantileSketch.from_bytes(blob))
+                continue
+            for rack in racks:
+                row = conn.execute("SELECT r.rack_id, h.before_ts FROM racks r "
+                                   "LEFT JOIN raw_horizons h ON h.rack_id = r.rack_id WHERE r.name = ?",
+                                   (rack,)).fetchone()
+                if row is None:
+                    continue
+                # Edges lie within one quarter hour, so never across a (day-aligned) horizon
+                if row[1] is not None and first < row[1]:
+                    for _, blob in self._select_sketches(conn, [rack], SKETCH_TIERS[0], first, last):
+                        sketch.merge(QuantileSketch.from_bytes(blob))
+                else:
+                    watts = conn.execute("SELECT power FROM readings WHERE rack_id = ? AND ts BETWEEN ? AND ?",
+                                         (row[0], first, last)).fetchall()
+                    sketch.add_many([power for power, in watts])
+        return sketch
+
+    def list_sessions(self, rack_name=None, folder=None):
+        """Get the sessions (CSV files) with stored readings.
+
+        Args:
+            rack_name: Only sessions of this rack
+            folder: Only sessions whose CSV is in this folder
+
+        Returns:
+            List of dicts with source, folder, file_name, rack, started, first,
+            last (datetimes or None) and reading_count, newest first
+        """
+        sql = ("SELECT s.session_id, s.source, s.folder, s.file_name, r.name, s.started, "
+               "s.first_ts, s.last_ts, s.reading_count "
+               "FROM sessions s JOIN racks r ON r.rack_id = s.rack_id WHERE 1 = 1")
+        params = []
+        if rack_name is not None:
+            sql += " AND r.name = ?"
+            params.append(rack_name)
+        if folder is not None:
+            sql += " AND s.folder = ?"
+            params.append(os.path.abspath(folder))
+        with self._reader() as conn:
+            rows = conn.execute(sql + " ORDER BY COALESCE(s.started, s.first_ts) DESC", params).fetchall()
+        return [_session_dict(row) for row in rows]
+
+    def find_session(self, file_name, folder=None):
+        """Find a session by CSV file name, preferring one in `folder`.
+
+        Returns:
+            Session dict (see list_sessions) or None
+        """
+        with self._reader() as conn:
+            rows = conn.execute(
+                "SELECT s.session_id, s.source, s.folder, s.file_name, r.name, s.started, "
+                "s.first_ts, s.last_ts, s.reading_count "
+                "FROM sessions s JOIN racks r ON r.rack_id = s.rack_id WHERE s.file_name = ?",
+                (os.path.basename(file_name),)).fetchall()
+        if not rows:
+            return None
+        if folder is not None:
+            folder = os.path.abspath(folder)
+            for row in rows:
+                if row[2] == folder:
+                    return _session_dict(row)
+        return _session_dict(rows[0]) if len(rows) == 1 else None
+
+    def read_session(self, session):
+        """Read the readings of a session as (epoch seconds, float64 watts) arrays.
+
+        Power keeps full precision, so the values match the session's CSV.
+
+        Args:
+            session: Session dict from list_sessions or find_session
+        """
+        if session['first_ts'] is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        with self._reader() as conn:
+            return self._select(conn, session['rack'], session['first_ts'], session['last_ts'],
+                                session_id=session['session_id'], dtype=np.float64)
+
+    def import_csv(self, filepath, rack_name=None, address=None):
+        """Load a session CSV into the store, replacing the session's stored readings.
+
+        Returns:
+            Number of readings imported
+        """
+        if rack_name is None:
+            parsed = parse_session_filename(filepath)
+            if parsed is None:
+                raise ValueError(f"Can't tell the rack from file name: {filepath}")
+            rack_name = parsed[0]
+
+        epoch, watts = read_session_csv(filepath)
+        with self._lock:
+            self.flush()
+            rack_id = self.register_rack(rack_name, address)
+            session_id = self._session_id(rack_id, filepath)
+            conn = self._writer
+            old_span = conn.execute("SELECT first_ts, last_ts FROM sessions WHERE session_id = ?",
+                                    (session_id,)).fetchone()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM readings WHERE session_id = ? AND rack_id = ?", (session_id, rack_id))
+                conn.execute("UPDATE sessions SET first_ts = NULL, last_ts = NULL, reading_count = 0 "
+                             "WHERE session_id = ?", (session_id,))
+                if len(epoch):
+                    conn.executemany("INSERT OR REPLACE INTO readings (rack_id, ts, power, session_id) "
+                                     "VALUES (?, ?, ?, ?)",
+                                     zip([rack_id] * len(epoch), epoch.tolist(), watts.tolist(),
+                                         [session_id] * len(epoch)))
+                    first, last = int(epoch.min()), int(epoch.max())
+                    conn.execute("UPDATE sessions SET first_ts = ?, last_ts = ?, reading_count = ? "
+                                 "WHERE session_id = ?", (first, last, len(epoch), session_id))
+                    conn.execute("UPDATE racks SET first_ts = MIN(COALESCE(first_ts, ?), ?), "
+                                 "last_ts = MAX(COALESCE(last_ts, ?), ?) WHERE rack_id = ?",
+                                 (first, first, last, last, rack_id))
+                # Replaced readings would be counted twice by the incremental
+                # update, so the affected days are rebuilt instead
+                spans = [span for span in (old_span, (epoch.min(), epoch.max()) if len(epoch) else None)
+                         if span and span[0] is not None]
+                if spans:
+                    self._rebuild_rack_rollups(conn, rack_id, int(min(s[0] for s in spans)),
+                                               int(max(s[1] for s in spans)))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._stats['rows_inserted'] += len(epoch)
+        logger.debug(f"Imported {len(epoch)} readings for {rack_name} from {filepath}")
+        return len(epoch)
+
+    def import_folder(self, folder, skip_known=True):
+        """Import every session CSV in a folder.
+
+        Args:
+            folder: Folder to scan
+            skip_known: Skip CSVs that are already sessions in the store
+
+        Returns:
+            Number of readings imported
+        """
+        total = 0
+        known = self._known_sources() if skip_known else set()
+        for entry in sorted(os.scandir(folder), key=lambda e: e.name):
+            if not entry.is_file() or not parse_session_filename(entry.name):
+                continue
+            if os.path.abspath(entry.path) in known:
+                continue
+            try:
+                total += self.import_csv(entry.path)
+            except (OSError, ValueError, KeyError, pd.errors.ParserError, sqlite3.Error) as e:
+                logger.warning(f"Skipping {entry.path}: {str(e)}")
+        return total
+
+    def _known_sources(self):
+        """Source paths of the stored sessions."""
+        with self._reader() as conn:
+            return {source for source, in conn.execute("SELECT source FROM sessions")}
+
+    def get_stats(self):
+        """Get insert counters and the number of buffered readings."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending_rows'] = len(self._pending)
+            return stats
+
+
+def _to_datetime(epoch):
+    """Naive local datetime of an epoch second, or None."""
+    return from_epoch_seconds([epoch])[0].to_pydatetime() if epoch is not None else None
+
+
+def _session_dict(row):
+    """Session dict from a sessions query row."""
+    session_id, source, folder, file_name, rack, started, first, last, count = row
+    return {
+        'session_id': session_id,
+        'source': source,
+        'folder': folder,
+        'file_name': file_name,
+        'rack': rack,
+        'started': _to_datetime(started),
+        'first_ts': first,
+        'last_ts': last,
+        'first': _to_datetime(first),
+        'last': _to_datetime(last),
+        'reading_count': count
+    }
+
+
+# One store per database, shared by the writer thread and the readers
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_sqlite_store(data_dir, create=True, **kwargs):
+    """Get the SQLite store of a data folder.
+
+    Args:
+        data_dir: Data folder holding the database
+        create: Create the database if it doesn't exist yet
+        **kwargs: Passed to SQLiteStore when the store is created
+
+    Returns:
+        The SQLiteStore, or None if `create` is False and there is no database
+    """
+    path = os.path.abspath(os.path.join(data_dir or "power_data", SQLITE_FILENAME))
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            if not create and not os.path.isfile(path):
+                return None
+            store = _stores[path] = SQLiteStore(path, **kwargs)
+        return store
@@ -0,0 +1,159 @@
+import math
+import threading
+from collections import deque
+
+from .sketch import QuantileSketch, DEFAULT_QUANTILES, quantile_labels
+
+# Readings are grouped to this many decimals when finding the mode
+MODE_DECIMALS = 2
+
+
+class StreamingStats:
+    """Statistics of a sliding window of power readings, updated per reading.
+
+    Readings enter with add() and leave, oldest first, with remove(); the
+    owner of the window (a PowerRingBuffer) calls remove() for each reading
+    it overwrites. Every operation is O(1) amortized, whatever the window
+    size:
+
+    - mean and variance: Welford's algorithm, run backwards on removal
+    - min and max: monotonic deques of (sequence, value), whose fronts are
+      the window's minimum and maximum
+    - mode: a count per rounded value plus the values grouped by count, so
+      the highest count only ever moves by one per reading
+    - percentiles: a QuantileSketch, estimated to within 1%
+
+    Safe to read from another thread than the one adding readings.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def clear(self):
+        """Forget every reading."""
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._last = None
+        self._added = 0    # Sequence number of the next reading added
+        self._removed = 0  # Sequence number of the oldest reading in the window
+        self._min = deque()
+        self._max = deque()
+        self._counts = {}    # Rounded value -> count
+        self._by_count = {}  # Count -> {rounded value: None}, in the order they reached it
+        self._mode_count = 0
+        self._sketch = QuantileSketch()
+
+    def add(self, value):
+        """Add the newest reading."""
+        value = float(value)
+        with self._lock:
+            sequence = self._added
+            self._added += 1
+            self._last = value
+
+            self._count += 1
+            delta = value - self._mean
+            self._mean += delta / self._count
+            self._m2 += delta * (value - self._mean)
+
+            # Readings that can no longer be the minimum (or maximum) are dropped
+            while self._min and self._min[-1][1] >= value:
+                self._min.pop()
+            self._min.append((sequence, value))
+            while self._max and self._max[-1][1] <= value:
+                self._max.pop()
+            self._max.append((sequence, value))
+
+            key = round(value, MODE_DECIMALS)
+            count = self._counts.get(key, 0)
+            if count:
+                self._unlink(key, count)
+            self._link(key, count + 1)
+            if count + 1 > self._mode_count:
+                self._mode_count = count + 1
+
+            self._sketch.add(value)
+
+    def remove(self, value):
+        """Remove the oldest reading, which must be `value`."""
+        value = float(value)
+        with self._lock:
+            if not self._count:
+                return
+            sequence = self._removed
+            self._removed += 1
+
+            self._count -= 1
+            if self._count:
+                delta = value - self._mean
+                self._mean -= delta / self._count
+                self._m2 = max(0.0, self._m2 - delta * (value - self._mean))
+            else:
+                self._mean = self._m2 = 0.0
+                self._last = None
+
+            if self._min and self._min[0][0] == sequence:
+                self._min.popleft()
+            if self._max and self._max[0][0] == sequence:
+                self._max.popleft()
+
+            self._sketch.remove(value)
+
+            key = round(value, MODE_DECIMALS)
+            count = self._counts.get(key, 0)
+            if not count:
+                return
+            self._unlink(key, count)
+            if count > 1:
+                self._link(key, count - 1)
+            if count == self._mode_count and count not in self._by_count:
+                self._mode_count -= 1
+
+    def _link(self, key, count):
+        """Record a rounded value's count. Call with the lock held."""
+        self._counts[key] = count
+        self._by_count.setdefault(count, {})[key] = None
+
+    def _unlink(self, key, count):
+        """Forget a rounded value's count. Call with the lock held."""
+        del self._counts[key]
+        values = self._by_count[count]
+        del values[key]
+        if not values:
+            del self._by_count[count]
+
+    def __len__(self):
+        return self._count
+
+    def snapshot(self):
+        """Get the current statistics.
+
+        Returns:
+            Dict with count, current, min, max, avg, std (population), mode,
+            mode_count, p50, p95 and p99; values are None while the window
+            is empty
+        """
+        with self._lock:
+            if not self._count:
+                stats = {'count': 0, 'current': None, 'min': None, 'max': None,
+                         'avg': None, 'std': None, 'mode': None, 'mode_count': 0}
+            else:
+                stats = {
+                    'count': self._count,
+                    'current': self._last,
+                    'min': self._min[0][1],
+                    'max': self._max[0][1],
+                    'avg': self._mean,
+                    'std': math.sqrt(self._m2 / self._count),
+                    # Of the values sharing the highest count, the first to reach it
+                    'mode': next(iter(self._by_count[self._mode_count])),
+                    'mode_count': self._mode_count
+                }
+            stats.update(zip(quantile_labels(), self._sketch.quantiles(DEFAULT_QUANTILES)))
+            return stats
@@ -0,0 +1,161 @@
+import threading
+import time
+
+# Statuses of a rack whose collector task is running
+ACTIVE_STATUSES = ("Connecting", "Monitoring", "Paused")
+
+
+class _RackSlot:
+    """Holder of one rack's current record, swapped whole on every update."""
+
+    __slots__ = ('record',)
+
+    def __init__(self, record):
+        self.record = record
+
+
+class TelemetryStore:
+    """Inventory, status and latest reading of every rack, in one place.
+
+    The GUI thread registers racks and sets their status, the collector
+    thread records readings, and the web server and other readers take
+    records without touching Tk widgets or the GUI's dicts.
+
+    Records are never changed once published. Writers, serialized by one
+    lock, build a new record and swap it into the rack's slot, and adding or
+    removing a rack swaps in a new inventory of slots. Readers take no lock:
+    a record, or a list of them, stays consistent while they use it.
+
+    A record is a dict with name, address, rack_key, status, monitoring (the
+    status is one of ACTIVE_STATUSES), paused, history (the rack's
+    PowerRingBuffer, or None), last_timestamp, last_power, readings (since
+    monitoring last started) and updated (epoch seconds).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots = {}  # name -> _RackSlot, in registration order; replaced, never changed
+
+    def register(self, name, address, status="Not Started", history=None):
+        """Add a rack, or replace the record of one with the same name.
+
+        Args:
+            name: Rack name
+            address: R-SCM address
+            status: Initial status
+            history: The rack's live history buffer, if it has one
+        """
+        record = self._new_record(name, address, status, history)
+        with self._lock:
+            slots = dict(self._slots)
+            slots[name] = _RackSlot(record)
+            self._slots = slots
+
+    def unregister(self, name):
+        """Remove a rack; unknown names are ignored."""
+        with self._lock:
+            if name in self._slots:
+                slots = dict(self._slots)
+                del slots[name]
+                self._slots = slots
+
+    def rename(self, name, new_name, address=None):
+        """Change a rack's name and, optionally, its address, keeping its state.
+
+        Returns:
+            True if the rack was found
+        """
+        with self._lock:
+            slot = self._slots.get(name)
+            if slot is None:
+                return False
+            record = dict(slot.record, name=new_name, updated=time.time())
+            if address is not None:
+                record['address'] = address
+            record['rack_key'] = f"{new_name}_{record['address']}"
+            # Rebuilt to keep the rack's place in the inventory
+            slots = {}
+            for key, value in self._slots.items():
+                if key == name:
+                    slots[new_name] = _RackSlot(record)
+                elif key != new_name:
+                    slots[key] = value
+            self._slots = slots
+            return True
+
+    def clear(self):
+        """Remove every rack."""
+        with self._lock:
+            self._slots = {}
+
+    def set_status(self, name, status):
+        """Record a rack's status, as shown in the GUI."""
+        fields = {'status': status, 'monitoring': status in ACTIVE_STATUSES, 'paused': status == "Paused"}
+        if status == "Connecting":
+            fields['readings'] = 0
+        self._update(name, fields)
+
+    def set_history(self, name, history):
+        """Record the live history buffer of a rack."""
+        self._update(name, {'history': history})
+
+    def record_reading(self, name, timestamp, power):
+        """Record a rack's latest reading; called from the collector thread."""
+        with self._lock:
+            slot = self._slots.get(name)
+            if slot is not None:
+                record = slot.record
+                slot.record = dict(record, last_timestamp=timestamp, last_power=float(power),
+                                   readings=record['readings'] + 1, updated=time.time())
+
+    def _update(self, name, fields):
+        """Swap in a rack's record with some fields changed; unknown names are ignored."""
+        with self._lock:
+            slot = self._slots.get(name)
+            if slot is not None:
+                slot.record = dict(slot.record, updated=time.time(), **fields)
+
+    def get(self, name):
+        """Get a rack's record, or None if the rack isn't registered."""
+        slot = self._slots.get(name)
+        return slot.record if slot is not None else None
+
+    def racks(self):
+        """Get the records of every rack, in registration order."""
+        return [slot.record for slot in self._slots.values()]
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, name):
+        return name in self._slots
+
+    @staticmethod
+    def _new_record(name, address, status, history):
+        return {
+            'name': name,
+            'address': address,
+            'rack_key': f"{name}_{address}",
+            'status': status,
+            'monitoring': status in ACTIVE_STATUSES,
+            'paused': status == "Paused",
+            'history': history,
+            'last_timestamp': None,
+            'last_power': None,
+            'readings': 0,
+            'updated': time.time()
+        }
+
+
+# One store per process, shared by the GUI, the collector and the web server
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def get_telemetry_store():
+    """Get the process-wide telemetry store."""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = TelemetryStore()
+        return _shared_store
@@ -0,0 +1,654 @@
+import os
+import re
+import abc
+import json
+import time
+import zlib
+import shutil
+import struct
+import logging
+import datetime
+import threading
+import concurrent.futures
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+
+from .gorilla import GorillaColumnFormat
+
+logger = logging.getLogger("power_monitor")
+
+# Folder under the data directory that holds the columnar store
+COLUMNAR_DIR = "columnar"
+
+# Session CSV naming schemes:
+#   {rack}_{YYYYmmdd_HHMMSS}.csv             written by RackPowerMonitor._save_to_csv
+#   PowerMonitoring-{rack}-{YYYYmmdd-HHMMSS}.csv written by DataManager.create_csv_file
+_SESSION_CSV = re.compile(r"^(?P<rack>.+)_(?P<session>\d{8}_\d{6})\.csv$")
+_DATA_MANAGER_CSV = re.compile(r"^PowerMonitoring-(?P<rack>.+)-(?P<session>\d{8}-\d{6})\.csv$")
+
+
+def parse_session_filename(filename):
+    """Get the rack name and session start from a session CSV file name.
+
+    Returns:
+        Tuple of (rack_name, session_start datetime, scheme) where scheme is
+        'session' or 'data_manager', or None if the name matches neither scheme
+    """
+    filename = os.path.basename(filename)
+    match = _DATA_MANAGER_CSV.match(filename)
+    if match:
+        scheme, fmt = 'data_manager', "%Y%m%d-%H%M%S"
+    else:
+        match = _SESSION_CSV.match(filename)
+        if not match:
+            return None
+        scheme, fmt = 'session', "%Y%m%d_%H%M%S"
+    try:
+        session_start = datetime.datetime.strptime(match.group('session'), fmt)
+    except ValueError:
+        return None
+    return match.group('rack'), session_start, scheme
+
+
+def read_session_csv(filepath, dtype=np.float32):
+    """Read a session CSV of either naming scheme into epoch seconds and watts.
+
+    ERROR and other non-numeric readings are dropped.
+
+    Args:
+        filepath: Session CSV
+        dtype: Type of the watts array
+
+    Returns:
+        Tuple of (int64 epoch seconds array, watts array)
+    """
+    df = pd.read_csv(filepath)
+    power_col = 'PowerWatts' if 'PowerWatts' in df.columns else 'Power (W)'
+    power = pd.to_numeric(df[power_col], errors='coerce')
+    timestamps = pd.to_datetime(df['Timestamp'], errors='coerce')
+
+    valid = power.notna() & timestamps.notna()
+    return to_epoch_seconds(timestamps[valid]), power[valid].to_numpy(dtype=dtype)
+
+
+def to_epoch_seconds(timestamps):
+    """Convert naive local timestamps (datetimes or a Series) to int64 epoch seconds."""
+    local = pd.Series(pd.to_datetime(timestamps)).to_numpy(dtype='datetime64[s]').astype(np.int64)
+    if not len(local):
+        return local
+    # Look the offset up at an estimate first, so readings near a daylight
+    # saving change pick the offset that was in effect at the time
+    estimate = local - _utc_offsets(local)
+    return local - _utc_offsets(estimate)
+
+
+def from_epoch_seconds(epoch):
+    """Convert int64 epoch seconds to naive local timestamps (the CSV convention)."""
+    return pd.DatetimeIndex(_local_datetime64(np.asarray(epoch, dtype=np.int64)))
+
+
+def _local_datetime64(epoch):
+    """Naive local datetime64[s] values for an int64 epoch seconds array."""
+    if not len(epoch):
+        return np.empty(0, dtype='datetime64[s]')
+    return (epoch + _utc_offsets(epoch)).astype('datetime64[s]')
+
+
+# Offsets can only change on a quarter hour, so they are looked up once per quarter hour
+_OFFSET_BUCKET_SECONDS = 900
+_MAX_OFFSET_TABLE_BUCKETS = 1000000
+
+# (timezone names, first bucket, offsets per bucket), grown as wider ranges are converted
+_offset_table = (None, 0, np.empty(0, dtype=np.int64))
+
+
+def _utc_offsets(epoch):
+    """Local UTC offset in seconds for each epoch second, following daylight saving rules."""
+    global _offset_table
+    buckets = epoch // _OFFSET_BUCKET_SECONDS
+    first, last = int(buckets.min()), int(buckets.max())
+
+    zone, table_first, offsets = _offset_table
+    if zone != time.tzname or first < table_first or last >= table_first + len(offsets):
+        if zone == time.tzname and len(offsets):
+            first, last = min(first, table_first), max(last, table_first + len(offsets) - 1)
+        if last - first > _MAX_OFFSET_TABLE_BUCKETS:
+            # Readings spread over decades: look up only the buckets in use
+            unique, inverse = np.unique(buckets, return_inverse=True)
+            values = np.array([time.localtime(int(b) * _OFFSET_BUCKET_SECONDS).tm_gmtoff for b in unique],
+                              dtype=np.int64)
+            return values[inverse]
+        offsets = np.array([time.localtime(b * _OFFSET_BUCKET_SECONDS).tm_gmtoff for b in range(first, last + 1)],
+                           dtype=np.int64)
+        table_first = first
+        _offset_table = (time.tzname, table_first, offsets)
+    return offsets[buckets - table_first]
+
+
+class TimeSeriesStore(abc.ABC):
+    """Interface for rack power storage that DataManager, AnalyzeTab and ReportGenerator read through."""
+
+    @abc.abstractmethod
+    def append(self, rack_name, epoch_seconds, watts, source=None):
+        """Buffer readings for a rack.
+
+        Args:
+            rack_name: Rack the readings belong to
+            epoch_seconds: Sequence of int epoch seconds
+            watts: Sequence of power readings
+            source: CSV file the readings were also written to, if any
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def read(self, racks=None, start=None, end=None):
+        """Read readings as a DataFrame with Timestamp, Rack and PowerWatts columns.
+
+        Args:
+            racks: Rack names to read; all racks if omitted
+            start: Earliest timestamp (naive local datetime), inclusive
+            end: Latest timestamp (naive local datetime), inclusive
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_racks(self):
+        """Get the names of racks with stored readings."""
+        raise NotImplementedError
+
+    def flush(self, racks=None):
+        """Write out buffered readings."""
+
+    def flush_due(self):
+        """Write out buffered readings that have waited long enough."""
+
+    def close(self):
+        """Write out buffered readings and release resources."""
+        self.flush()
+
+
+class ZlibColumnFormat:
+    """Delta-encoded timestamp and float32 power columns compressed with zlib; always available.
+
+    File layout: a header (magic, row count) followed by one zlib stream with
+    the int64 timestamp deltas and then the float32 power values. Regular
+    polling intervals make the deltas almost constant, so they compress to
+    next to nothing.
+    """
+
+    name = "zlib"
+    extension = ".zcol"
+    _header = struct.Struct("<4sQ")
+    _magic = b"RPM1"
+
+    def write(self, path, epoch_seconds, watts):
+        """Write one partition file."""
+        deltas = np.diff(np.asarray(epoch_seconds, dtype=np.int64), prepend=np.int64(0))
+        payload = deltas.astype('<i8').tobytes() + np.asarray(watts, dtype='<f4').tobytes()
+        with open(path, 'wb') as f:
+            f.write(self._header.pack(self._magic, len(deltas)))
+            f.write(zlib.compress(payload, 6))
+
+    def read(self, path):
+        """Read one partition file."""
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, count = self._header.unpack_from(data)
+        if magic != self._magic:
+            raise ValueError(f"Not a columnar data file: {path}")
+        payload = zlib.decompress(data[self._header.size:])
+        deltas = np.frombuffer(payload, dtype='<i8', count=count)
+        watts = np.frombuffer(payload, dtype='<f4', count=count, offset=count * 8)
+        return np.cumsum(deltas), watts.astype(np.float32)
+
+
+class ParquetFormat:
+    """Parquet files through pyarrow, compressed with zstd."""
+
+    name = "parquet"
+    extension = ".parquet"
+
+    def __init__(self):
+        """Import pyarrow; raises ImportError if it isn't installed."""
+        import pyarrow
+        import pyarrow.parquet
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+
+    def write(self, path, epoch_seconds, watts):
+        """Write one partition file."""
+        table = self._pa.table({
+            'ts': self._pa.array(epoch_seconds, type=self._pa.int64()),
+            'power': self._pa.array(watts, type=self._pa.float32())
+        })
+        self._pq.write_table(table, path, compression='zstd')
+
+    def read(self, path):
+        """Read one partition file."""
+        table = self._pq.read_table(path, columns=['ts', 'power'])
+        return (table.column('ts').to_numpy().astype(np.int64, copy=False),
+                table.column('power').to_numpy().astype(np.float32, copy=False))
+
+
+def get_columnar_format(name="auto"):
+    """Get a columnar file format.
+
+    Args:
+        name: 'parquet', 'zlib', 'gorilla', or 'auto' for parquet when pyarrow is installed
+
+    Returns:
+        A format object with name, extension, write() and read()
+    """
+    if name == "gorilla":
+        return GorillaColumnFormat()
+    if name in ("auto", "parquet"):
+        try:
+            return ParquetFormat()
+        except ImportError:
+            if name == "parquet":
+                raise
+            logger.info("pyarrow is not installed; using zlib-compressed columns instead of Parquet")
+    elif name != "zlib":
+        raise ValueError(f"Unknown columnar format: {name}")
+    return ZlibColumnFormat()
+
+
+class ColumnarStore(TimeSeriesStore):
+    """Columnar time-series files partitioned by rack and day.
+
+    Layout: <root>/rack=<name>/date=<YYYY-MM-DD>/<file>, where the date is the
+    UTC day of the readings. Timestamps are int64 epoch seconds and power is
+    float32. Buffered readings are written as small part files; parts of days
+    that have ended are merged into a single data file. Queries only open the
+    partitions of the racks and days they ask for, and read them in parallel.
+    """
+
+    def __init__(self, root, file_format="auto", flush_interval_seconds=300.0, part_rows=1440,
+                 max_read_workers=None, clock=time.monotonic):
+        """Initialize the store.
+
+        Args:
+            root: Folder holding the partitions
+            file_format: 'parquet', 'zlib', 'gorilla' or 'auto'
+            flush_interval_seconds: Write buffered readings at least this often
+            part_rows: Write a partition's buffer once it holds this many readings
+            max_read_workers: Threads used to read partitions in parallel
+            clock: Monotonic clock used for the flush interval
+        """
+        self.root = root
+        self.format = get_columnar_format(file_format) if isinstance(file_format, str) else file_format
+        self.flush_interval_seconds = float(flush_interval_seconds)
+        self.part_rows = max(1, int(part_rows))
+        self.max_read_workers = max_read_workers or min(32, (os.cpu_count() or 1) * 2)
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._buffers = {}  # (rack, day) -> ([epoch], [watts])
+        self._oldest = {}  # (rack, day) -> clock time of the oldest buffered reading
+        self._sequence = 0
+        self._imported = None  # Loaded lazily from the import manifest
+        os.makedirs(root, exist_ok=True)
+
+    def append(self, rack_name, epoch_seconds, watts, source=None):
+        """Buffer readings for a rack; nothing is written until a flush."""
+        epoch_seconds = np.asarray(epoch_seconds, dtype=np.int64)
+        watts = np.asarray(watts, dtype=np.float32)
+        if not len(epoch_seconds):
+            return
+
+        # Split the readings by UTC day
+        day_numbers = epoch_seconds // 86400
+        with self._lock:
+            for day_number in np.unique(day_numbers):
+                in_day = day_numbers == day_number
+                key = (rack_name, _utc_day(int(day_number) * 86400))
+                buffer = self._buffers.get(key)
+                if buffer is None:
+                    buffer = self._buffers[key] = ([], [])
+                    self._oldest[key] = self._clock()
+                buffer[0].extend(epoch_seconds[in_day].tolist())
+                buffer[1].extend(watts[in_day].tolist())
+                if len(buffer[0]) >= self.part_rows:
+                    self._write_buffer(key)
+
+    def flush(self, racks=None):
+        """Write out buffered readings, for some racks or all of them."""
+        with self._lock:
+            flushed = [key for key in self._buffers if racks is None or key[0] in racks]
+            for key in flushed:
+                self._write_buffer(key)
+            self._compact_finished_days({rack for rack, _ in flushed})
+
+    def flush_due(self):
+        """Write out partitions whose oldest buffered reading has waited for the flush interval."""
+        with self._lock:
+            if not self._oldest:
+                return
+            cutoff = self._clock() - self.flush_interval_seconds
+            expired = [key for key, oldest in self._oldest.items() if oldest <= cutoff]
+            for key in expired:
+                self._write_buffer(key)
+            self._compact_finished_days({rack for rack, _ in expired})
+
+    def list_racks(self):
+        """Get the names of racks with stored or buffered readings."""
+        racks = set()
+        try:
+            for entry in os.scandir(self.root):
+                if entry.is_dir() and entry.name.startswith("rack="):
+                    racks.add(unquote(entry.name[5:]))
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            racks.update(rack for rack, _ in self._buffers)
+        return sorted(racks)
+
+    def list_partitions(self, rack_name, start_day=None, end_day=None):
+        """Get the partition folders of a rack, optionally limited to a range of days.
+
+        Returns:
+            List of (day, folder) tuples sorted by day
+        """
+        rack_dir = self._rack_dir(rack_name)
+        partitions = []
+        try:
+            entries = list(os.scandir(rack_dir))
+        except FileNotFoundError:
+            return partitions
+        for entry in entries:
+            if not entry.is_dir() or not entry.name.startswith("date="):
+                continue
+            day = entry.name[5:]
+            if (start_day and day < start_day) or (end_day and day > end_day):
+                continue
+            partitions.append((day, entry.path))
+        return sorted(partitions)
+
+    def read_arrays(self, rack_name, start=None, end=None):
+        """Read a rack's readings as sorted (epoch seconds, watts) arrays.
+
+        Args:
+            rack_name: Rack to read
+            start: Earliest epoch second, inclusive
+            end: Latest epoch second, inclusive
+        """
+        return self._read_racks([rack_name], start, end)[rack_name]
+
+    def read(self, racks=None, start=None, end=None):
+        """Read readings as a DataFrame with Timestamp, Rack and PowerWatts columns."""
+        start_epoch = int(to_epoch_seconds([start])[0]) if start is not None else None
+        end_epoch = int(to_epoch_seconds([end])[0]) if end is not None else None
+        racks = self.list_racks() if racks is None else list(racks)
+
+        arrays = self._read_racks(racks, start_epoch, end_epoch)
+
+        # Fill each column in place, rack by rack, so large queries don't
+        # allocate a temporary per conversion step. The rack column is
+        # categorical, so it costs one code per row.
+        counts = [len(arrays[rack][0]) for rack in racks]
+        total = sum(counts)
+        timestamps = np.empty(total, dtype='datetime64[s]')
+        watts = np.empty(total, dtype=np.float32)
+        position = 0
+        for rack, count in zip(racks, counts):
+            epoch, values = arrays[rack]
+            timestamps[position:position + count] = _local_datetime64(epoch)
+            watts[position:position + count] = values
+            position += count
+        codes = np.repeat(np.arange(len(racks), dtype=np.int32), counts)
+        return pd.DataFrame({
+            'Timestamp': timestamps,
+            'Rack': pd.Categorical.from_codes(codes, categories=pd.Index(racks, dtype=object)),
+            'PowerWatts': watts
+        }, copy=False)
+
+    def import_csv(self, filepath, rack_name=None):
+        """Load a session CSV into the store.
+
+        Files already imported with the same size and modification time are
+        skipped, so importing a folder twice doesn't duplicate readings.
+
+        Returns:
+            Number of readings imported
+        """
+        if rack_name is None:
+            parsed = parse_session_filename(filepath)
+            if parsed is None:
+                raise ValueError(f"Can't tell the rack from file name: {filepath}")
+            rack_name = parsed[0]
+
+        stat = os.stat(filepath)
+        signature = [stat.st_size, int(stat.st_mtime)]
+        key = os.path.abspath(filepath)
+        with self._lock:
+            manifest = self._load_manifest()
+            if manifest.get(key) == signature:
+                return 0
+
+        epoch, watts = read_session_csv(filepath)
+        with self._lock:
+            self.append(rack_name, epoch, watts)
+            self.flush([rack_name])
+            manifest[key] = signature
+            self._save_manifest()
+        logger.debug(f"Imported {len(epoch)} readings for {rack_name} from {filepath}")
+        return len(epoch)
+
+    def import_folder(self, folder):
+        """Import every session CSV in a folder. Returns the number of readings imported."""
+        total = 0
+        for entry in sorted(os.scandir(folder), key=lambda e: e.name):
+            if entry.is_file() and parse_session_filename(entry.name):
+                try:
+                    total += self.import_csv(entry.path)
+                except (OSError, ValueError, KeyError, pd.errors.ParserError) as e:
+                    logger.warning(f"Skipping {entry.path}: {str(e)}")
+        return total
+
+    def _read_racks(self, racks, start=None, end=None):
+        """Read several racks, opening all their partition files in parallel."""
+        start_day = _utc_day(start) if start is not None else None
+        end_day = _utc_day(end) if end is not None else None
+
+        jobs = []
+        for rack in racks:
+            for _, folder in self.list_partitions(rack, start_day, end_day):
+                jobs.append((rack, folder))
+
+        pieces = {rack: [] for rack in racks}
+        if jobs:
+            workers = min(self.max_read_workers, len(jobs))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                for rack, result in zip((rack for rack, _ in jobs),
+                                        executor.map(lambda job: self._read_partition(job[1]), jobs)):
+                    pieces[rack].extend(result)
+
+        # Readings still in memory haven't reached a file yet
+        with self._lock:
+            for (rack, day), (epoch, watts) in self._buffers.items():
+                if rack in pieces and (start_day is None or day >= start_day) and (end_day is None or day <= end_day):
+                    pieces[rack].append((np.asarray(epoch, dtype=np.int64), np.asarray(watts, dtype=np.float32)))
+
+        arrays = {}
+        for rack, parts in pieces.items():
+            if not parts:
+                arrays[rack] = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+                continue
+            epoch = np.concatenate([p[0] for p in parts])
+            watts = np.concatenate([p[1] for p in parts])
+            mask = None
+            if start is not None:
+                mask = epoch >= start
+            if end is not None:
+                mask = (epoch <= end) if mask is None else (mask & (epoch <= end))
+            if mask is not None:
+                epoch, watts = epoch[mask], watts[mask]
+            if len(epoch) > 1 and not np.all(epoch[1:] >= epoch[:-1]):
+                order = np.argsort(epoch, kind='stable')
+                epoch, watts = epoch[order], watts[order]
+            arrays[rack] = _last_per_second(epoch, watts)
+        return arrays
+
+    def _read_partition(self, folder, retries=2):
+        """Read every file of one partition.
+
+        A compaction can replace the part files while we read them; if a file
+        disappears the partition is listed again. Reading the new data file
+        and a part file it already merged gives duplicate readings, which
+        _read_racks drops.
+        """
+        for _ in range(retries + 1):
+            names = sorted(n for n in os.listdir(folder) if n.endswith(self.format.extension))
+            try:
+                return [self.format.read(os.path.join(folder, name)) for name in names]
+            except FileNotFoundError:
+                continue
+        logger.warning(f"Partition {folder} kept changing while being read")
+        return []
+
+    def _rack_dir(self, rack_name):
+        """Folder holding a rack's partitions."""
+        return os.path.join(self.root, f"rack={quote(rack_name, safe='')}")
+
+    def _partition_dir(self, rack_name, day):
+        """Folder holding one rack-day partition."""
+        return os.path.join(self._rack_dir(rack_name), f"date={day}")
+
+    def _write_buffer(self, key):
+        """Write a partition's buffered readings as a new part file."""
+        buffer = self._buffers.pop(key, None)
+        self._oldest.pop(key, None)
+        if not buffer or not buffer[0]:
+            return
+
+        rack, day = key
+        folder = self._partition_dir(rack, day)
+        os.makedirs(folder, exist_ok=True)
+        self._sequence += 1
+        name = f"part-{int(time.time() * 1000)}-{os.getpid()}-{self._sequence}{self.format.extension}"
+        if day < _utc_day(time.time()) and not os.listdir(folder):
+            # A finished day with nothing stored yet (e.g. an import) needs no compaction later
+            name = f"data{self.format.extension}"
+        self._write_file(os.path.join(folder, name),
+                         np.asarray(buffer[0], dtype=np.int64),
+                         np.asarray(buffer[1], dtype=np.float32))
+
+    def _write_file(self, path, epoch, watts):
+        """Write a file atomically so readers never see a partial one."""
+        temp_path = path + ".tmp"
+        self.format.write(temp_path, epoch, watts)
+        os.replace(temp_path, path)
+
+    def drop_partitions_before(self, day):
+        """Delete the partitions of every rack older than a day.
+
+        Args:
+            day: First UTC day to keep, as YYYY-MM-DD
+
+        Returns:
+            Number of partitions deleted
+        """
+        dropped = 0
+        with self._lock:
+            for rack in self.list_racks():
+                for partition_day, folder in self.list_partitions(rack):
+                    if partition_day < day:
+                        shutil.rmtree(folder, ignore_errors=True)
+                        dropped += 1
+        return dropped
+
+    def _compact_finished_days(self, racks):
+        """Merge the part files of days that have ended into one data file per partition."""
+        today = _utc_day(time.time())
+        for rack in racks:
+            for day, folder in self.list_partitions(rack, end_day=today):
+                if day < today:
+                    self.compact_partition(folder)
+
+    def compact_partition(self, folder):
+        """Merge a partition's files into a single sorted data file.
+
+        Returns:
+            True if files were merged
+        """
+        with self._lock:
+            names = sorted(n for n in os.listdir(folder) if n.endswith(self.format.extension))
+            if len(names) < 2 and not any(n.startswith("part-") for n in names):
+                return False
+
+            parts = [self.format.read(os.path.join(folder, name)) for name in names]
+            epoch = np.concatenate([p[0] for p in parts])
+            watts = np.concatenate([p[1] for p in parts])
+            order = np.argsort(epoch, kind='stable')
+            epoch, watts = _last_per_second(epoch[order], watts[order])
+
+            self._write_file(os.path.join(folder, f"data{self.format.extension}"), epoch, watts)
+            for name in names:
+                if name != f"data{self.format.extension}":
+                    os.remove(os.path.join(folder, name))
+            return True
+
+    def _manifest_path(self):
+        """File listing the CSVs already imported."""
+        return os.path.join(self.root, "imported.json")
+
+    def _load_manifest(self):
+        """Load the import manifest."""
+        if self._imported is None:
+            try:
+                with open(self._manifest_path()) as f:
+                    self._imported = json.load(f)
+            except (OSError, ValueError):
+                self._imported = {}
+        return self._imported
+
+    def _save_manifest(self):
+        """Save the import manifest atomically."""
+        temp_path = self._manifest_path() + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self._imported, f)
+        os.replace(temp_path, self._manifest_path())
+
+
+def _last_per_second(epoch, watts):
+    """Keep the last of readings sharing an epoch second, like the database's key; `epoch` is sorted."""
+    if len(epoch) < 2:
+        return epoch, watts
+    keep = np.empty(len(epoch), dtype=bool)
+    np.not_equal(epoch[1:], epoch[:-1], out=keep[:-1])
+    keep[-1] = True
+    if keep.all():
+        return epoch, watts
+    return epoch[keep], watts[keep]
+
+
+def _utc_day(epoch_seconds):
+    """Partition day (UTC, YYYY-MM-DD) of an epoch second."""
+    return time.strftime("%Y-%m-%d", time.gmtime(int(epoch_seconds)))
+
+
+# One store per data folder, shared by the writer thread and the readers
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_timeseries_store(data_dir, backend="auto", **kwargs):
+    """Get the columnar store for a data folder.
+
+    Args:
+        data_dir: Data folder; the store lives in its 'columnar' subfolder
+        backend: 'parquet', 'zlib', 'gorilla', 'auto', or 'none' to disable columnar storage
+        **kwargs: Passed to ColumnarStore when the store is created
+
+    Returns:
+        A ColumnarStore, or None if the backend is 'none'
+    """
+    if backend == "none":
+        return None
+    root = os.path.abspath(os.path.join(data_dir or "power_data", COLUMNAR_DIR))
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None:
+            store = _stores[root] = ColumnarStore(root, file_format=backend, **kwargs)
+        return store
@@ -9,6 +9,7 @@ import datetime
 import logging
 from datetime import timedelta
 from matplotlib.dates import DateFormatter
+from ..core.data_manager import DataManager
 
 logger = logging.getLogger("power_monitor")
 
@@ -21,6 +22,8 @@ class AnalyzeTab(ttk.Frame):
         self.app = app
         self.data = None
         self.current_file = None
+        self.data_manager = None  # Created on first use, for the configured data directory
+        self.stored_rack = None  # Rack whose stored history is shown, re-queried per time range
         
         # Set up UI components
         self._init_ui()
@@ -78,6 +81,15 @@ class AnalyzeTab(ttk.Frame):
         ttk.Button(controls_frame, text="Refresh", command=self._refresh_chart).grid(
             row=1, column=3, sticky="w", padx=5, pady=5)
         
+        # Rack history from the series stores
+        ttk.Label(controls_frame, text="Rack History:").grid(row=2, column=0, sticky="w", padx=5, pady=5)
+        self.rack_var = tk.StringVar()
+        self.rack_combo = ttk.Combobox(controls_frame, textvariable=self.rack_var, width=30,
+                                       postcommand=self._refresh_rack_list)
+        self.rack_combo.grid(row=2, column=1, sticky="w", padx=5, pady=5)
+        ttk.Button(controls_frame, text="Load Rack", command=self._load_rack_data).grid(
+            row=2, column=3, sticky="w", padx=5, pady=5)
+        
         # === Chart Area ===
         self.chart_frame = ttk.LabelFrame(self, text="Power Usage Chart")
         self.chart_frame.grid(row=1, column=0, sticky="nsew", padx=10, pady=5)
@@ -167,6 +179,14 @@ class AnalyzeTab(ttk.Frame):
             return
             
         try:
+            # Sessions in the database are read with an index range query
+            stored = self._get_data_manager().load_session_data(file_path)
+            if stored is not None and not stored.empty:
+                df = stored.rename(columns={'Timestamp': 'timestamp', 'PowerWatts': 'power'})
+                self._show_data(df, os.path.basename(file_path))
+                logger.info(f"Loaded {len(df)} readings for {file_path} from the database")
+                return
+            
             # Load data from CSV
             df = pd.read_csv(file_path)
             logger.info(f"Loaded CSV with columns: {df.columns.tolist()}")
@@ -212,15 +232,7 @@ class AnalyzeTab(ttk.Frame):
             # Convert timestamp to datetime
             df['timestamp'] = pd.to_datetime(df['timestamp'])
             
-            # Set as current data
-            self.data = df
-            self.current_file = os.path.basename(file_path)
-            
-            # Update chart
-            self._refresh_chart()
-            
-            # Update statistics
-            self._update_statistics()
+            self._show_data(df, os.path.basename(file_path))
             
             logger.info(f"Successfully loaded data file: {file_path} with {len(df)} rows")
             
@@ -230,6 +242,64 @@ class AnalyzeTab(ttk.Frame):
             import traceback
             logger.error(traceback.format_exc())
             
+    def _get_data_manager(self):
+        """Get the data manager for the configured data directory."""
+        data_dir = self.app.config.get('data_dir', 'power_data')
+        if self.data_manager is None or self.data_manager.base_dir != data_dir:
+            storage = self.app.config.get('storage', {})
+            self.data_manager = DataManager(data_dir,
+                                            store_backend=storage.get('columnar_backend', 'none'),
+                                            sqlite_enabled=storage.get('sqlite_enabled', True))
+        return self.data_manager
+    
+    def _refresh_rack_list(self):
+        """Fill the rack list from the stores and the session CSVs."""
+        try:
+            data_manager = self._get_data_manager()
+            racks = set(data_manager.list_stored_racks()) | set(data_manager.list_csv_racks())
+            self.rack_combo['values'] = sorted(racks)
+        except Exception as e:
+            logger.error(f"Error listing stored racks: {str(e)}")
+    
+    def _load_rack_data(self):
+        """Load the full history of a rack, from rollups when it is long."""
+        rack_name = self.rack_var.get().strip()
+        if not rack_name:
+            messagebox.showerror("Error", "Please select a rack")
+            return
+        
+        df = self._load_stored_range(rack_name)
+        if df.empty:
+            messagebox.showinfo("No Data", f"No stored readings for {rack_name}")
+            return
+        
+        self._show_data(df, rack_name, stored_rack=rack_name)
+        logger.info(f"Loaded {len(df)} stored points for {rack_name}")
+    
+    def _load_stored_range(self, rack_name, start_time=None, end_time=None):
+        """Load a stored rack's readings for charting, at the resolution the range needs."""
+        data_manager = self._get_data_manager()
+        df = data_manager.load_rack_series([rack_name], start_time, end_time)
+        if df.empty:
+            # Not in the stores: query the session CSVs across every session instead
+            df = data_manager.load_csv_series(rack_name, start_time, end_time)
+        df = df.rename(columns={'Timestamp': 'timestamp', 'PowerWatts': 'power',
+                                'Min': 'min', 'Max': 'max', 'Count': 'count'})
+        return df[['timestamp', 'power', 'min', 'max', 'count']]
+    
+    def _show_data(self, df, label, stored_rack=None):
+        """Make a loaded dataset current and redraw the chart and statistics."""
+        self.data = df
+        self.data_filtered = None
+        self.current_file = label
+        self.stored_rack = stored_rack
+        
+        # Update chart
+        self._refresh_chart()
+        
+        # Update statistics
+        self._update_statistics()
+            
     def _set_time_range(self, range_type):
         """Set the time range for filtering data."""
         if self.data is None or len(self.data) == 0:
@@ -249,11 +319,16 @@ class AnalyzeTab(ttk.Frame):
         elif range_type == "week":
             min_time = max_time - timedelta(weeks=1)
             
-        # Filter data by time range
-        self.data_filtered = self.data[
-            (self.data['timestamp'] >= min_time) & 
-            (self.data['timestamp'] <= max_time)
-        ]
+        if self.stored_rack and range_type != "all":
+            # Re-query stored history so a week is charted from rollups at a useful resolution
+            self.data_filtered = self._load_stored_range(self.stored_rack, min_time.to_pydatetime(),
+                                                         max_time.to_pydatetime())
+        else:
+            # Filter data by time range
+            self.data_filtered = self.data[
+                (self.data['timestamp'] >= min_time) & 
+                (self.data['timestamp'] <= max_time)
+            ]
         
         # Update chart and statistics
         self._refresh_chart()
@@ -308,10 +383,18 @@ class AnalyzeTab(ttk.Frame):
             return
             
         # Calculate statistics
-        count = len(self.data_filtered)
-        avg_power = self.data_filtered['power'].mean()
-        min_power = self.data_filtered['power'].min()
-        max_power = self.data_filtered['power'].max()
+        if 'count' in self.data_filtered.columns:
+            # Rollup buckets: weight each mean by its readings
+            counts = self.data_filtered['count']
+            count = int(counts.sum())
+            avg_power = (self.data_filtered['power'] * counts).sum() / count
+            min_power = self.data_filtered['min'].min()
+            max_power = self.data_filtered['max'].max()
+        else:
+            count = len(self.data_filtered)
+            avg_power = self.data_filtered['power'].mean()
+            min_power = self.data_filtered['power'].min()
+            max_power = self.data_filtered['power'].max()
         
         # Calculate time range
         min_time = self.data_filtered['timestamp'].min()
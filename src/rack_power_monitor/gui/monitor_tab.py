@@ -15,9 +15,20 @@ import concurrent.futures
 
 # Import our modules
 from ..core.monitor import RackPowerMonitor
+from ..core.collector import CollectorService
+from ..core.csv_writer import apply_storage_settings
+from ..core.persistence import get_persistence_pipeline
+from ..core.ring_buffer import PowerRingBuffer, DEFAULT_HISTORY_CAPACITY
+from ..core.telemetry import get_telemetry_store
+from ..core.registry import RackRegistry
+from ..utils.api_client import apply_api_settings
+from ..utils.preflight import get_preflight
 
 logger = logging.getLogger("power_monitor")
 
+# How long a stopped rack may take to finish its current poll before its task is cancelled
+STOP_GRACE_MS = 10000
+
 class MonitorTab(ttk.Frame):
     """Monitor tab for the application."""
     
@@ -32,6 +43,12 @@ class MonitorTab(ttk.Frame):
         self.monitoring_tasks = {}  # Store monitoring tasks for each rack
         self.monitoring_status = {}  # Track monitoring status per rack
         
+        # Rack state shared with the collector and the web server
+        self.telemetry = get_telemetry_store()
+        
+        # Racks in the tree, indexed by name, address and item id
+        self.registry = RackRegistry()
+        
         # Set up the tab UI
         self._init_ui()
         
@@ -229,6 +246,9 @@ class MonitorTab(ttk.Frame):
         # Get the event loop
         self.async_loop = asyncio.get_event_loop()
         
+        # Single collector service that runs every rack monitor on one event loop
+        self.collector = CollectorService()
+        
         # Create a monitor instance for general use
         self.monitor = RackPowerMonitor()
         # Get data directory from app config
@@ -236,6 +256,13 @@ class MonitorTab(ttk.Frame):
         self.monitor.data_dir = self.data_dir_var.get()
         os.makedirs(self.monitor.data_dir, exist_ok=True)
         
+        # Configure the shared HTTP connection pool from the 'api' settings
+        apply_api_settings(self.app.config.get('api', {}))
+        
+        # Configure the shared CSV writer and persistence queue from the 'storage' settings
+        apply_storage_settings(self.app.config.get('storage', {}), self.monitor.data_dir)
+        self.persistence = get_persistence_pipeline()
+        
         self.log_message("Async support initialized")
 
     def _show_tree_menu(self, event):
@@ -366,13 +393,10 @@ class MonitorTab(ttk.Frame):
         """Stop all monitoring processes."""
         self.log_message("Stopping all monitoring processes")
         
-        # Stop each rack monitoring task
-        for rack_key in list(self.monitoring_tasks.keys()):
-            parts = rack_key.split('_')
-            if len(parts) >= 2:
-                name = parts[0]
-                address = '_'.join(parts[1:])  # Handle addresses that might have underscores
-                self._stop_rack_monitoring(name, address)
+        # Stop each rack monitoring task, taking names from the registry as they may contain underscores
+        for rack in self.registry.entries():
+            if rack['rack_key'] in self.monitoring_tasks:
+                self._stop_rack_monitoring(rack['name'], rack['address'])
         
         # Clear all monitoring tasks
         self.monitoring_tasks.clear()
@@ -407,17 +431,20 @@ class MonitorTab(ttk.Frame):
         
         try:
             # Stop the monitor instance if it exists
+            stop_sent = False
             if 'monitor' in task_info and task_info['monitor']:
-                # Set the stop_requested flag on the monitor
-                task_info['monitor'].stop_requested = True
+                # Send the stop command to the collector service
+                stop_sent = self.collector.stop_rack(rack_key)
                 self.log_message(f"Stop flag set for {rack_name}")
-                logger.info(f"[DEBUG] Set stop_requested flag on monitor")
+                logger.info("[DEBUG] Sent stop command to collector")
                 
-            # Cancel the future if it exists
-            if 'future' in task_info and task_info['future']:
-                task_info['future'].cancel()
-                self.log_message(f"Future cancelled for {rack_name}")
-                logger.info(f"[DEBUG] Cancelled future")
+            # Cancel the future if it exists, giving a graceful stop time to finish first
+            future = task_info.get('future')
+            if future:
+                if stop_sent:
+                    self.after(STOP_GRACE_MS, lambda: self._cancel_if_running(rack_name, future))
+                else:
+                    self._cancel_if_running(rack_name, future)
                 
         except Exception as e:
             error_msg = str(e) if str(e) else "Task was already cancelled"
@@ -470,12 +497,64 @@ class MonitorTab(ttk.Frame):
     def _update_rack_status(self, rack_name, rack_address, status):
         """Update the status of a rack in the tree."""
         # Find the item
-        for item_id in self.rscm_tree.get_children():
-            item = self.rscm_tree.item(item_id)
-            if item['values'][0] == rack_name and item['values'][1] == rack_address:
-                # Update the status
-                self.rscm_tree.item(item_id, values=(rack_name, rack_address, status))
-                break
+        rack = self.registry.find(rack_name, rack_address)
+        if rack:
+            # Update the status
+            self.rscm_tree.item(rack['item_id'], values=(rack_name, rack_address, status))
+        
+        # Publish it to readers on other threads
+        self.telemetry.set_status(rack_name, status)
+
+    def _add_rack(self, name, address, show_tab=False, settings=None):
+        """Add an RSCM to the tree, the registry and the telemetry store, and create its tab.
+        
+        Args:
+            name: Rack name
+            address: R-SCM address
+            show_tab: Add the tab to the notebook instead of keeping it hidden
+            settings: The rack's config entry, e.g. with credentials
+        """
+        item_id = self.rscm_tree.insert('', 'end', values=(name, address, "Not Started"))
+        self.registry.add(name, address, item_id, settings)
+        
+        if show_tab:
+            self._create_rack_tab(name, address)
+        else:
+            self._create_rack_tab_without_showing(name, address)
+        
+        self.telemetry.register(name, address, history=self.rack_tabs[f"{name}_{address}"]['data'])
+
+    def _remove_rack(self, name):
+        """Remove an RSCM from the tree, the registry and the telemetry store, and drop its tab.
+        
+        Returns:
+            The rack's registry entry, or None if there was no rack of that name
+        """
+        rack = self.registry.remove(name)
+        if rack is None:
+            return None
+        
+        self.rscm_tree.delete(rack['item_id'])
+        self.telemetry.unregister(name)
+        
+        # Remove the rack tab if it exists and is in the notebook
+        rack_key = rack['rack_key']
+        if rack_key in self.rack_tabs:
+            try:
+                # Only try to remove from notebook if it's actually there
+                if self.rack_tabs[rack_key].get('added_to_notebook', False):
+                    try:
+                        tab_idx = self.rack_notebook.index(self.rack_tabs[rack_key]['tab'])
+                        self.rack_notebook.forget(tab_idx)
+                    except (ValueError, tkinter.TclError) as e:
+                        self.log_message(f"Could not remove tab for {name}: {str(e)}", level="WARNING")
+                        
+                # Clean up the rack_tabs dict regardless of whether tab was in notebook
+                del self.rack_tabs[rack_key]
+            except Exception as e:
+                self.log_message(f"Error removing tab for {name}: {str(e)}", level="ERROR")
+        
+        return rack
 
     def _monitor_single_rack_isolated(self, rack_name, rack_address, interval_minutes, duration_hours=None):
         """Start monitoring for a specific rack with complete isolation."""
@@ -513,19 +592,71 @@ class MonitorTab(ttk.Frame):
                 messagebox.showerror("Authentication Error", f"No credentials available for {rack_name} ({rack_address})")
                 return
             
-            # Test the connection first to verify credentials
-            success = self._test_connection_sync(rack_name, rack_address, username, password)
-            if not success:
-                self.log_message(f"Connection test failed before monitoring {rack_name} ({rack_address})", level="ERROR")
-                messagebox.showerror("Connection Error", f"Failed to connect to {rack_name} ({rack_address}). Please check credentials and try again.")
-                return
-                
+            # Preflight on the collector loop so the UI stays responsive; monitoring
+            # starts in _on_preflight_complete once the check finishes
+            self._update_rack_status(rack_name, rack_address, "Connecting")
+            self.log_message(f"Testing connection before monitoring {rack_name} ({rack_address})...")
+            self._run_preflight(
+                [(rack_address, username, password)],
+                lambda results: self._on_preflight_complete(
+                    rack_name, rack_address, interval_minutes, duration_hours, username, password, results
+                )
+            )
+            
+        except Exception as e:
+            self.log_message(f"Error starting monitoring for {rack_name}: {str(e)}", level="ERROR")
+            import traceback
+            self.log_message(f"Exception details: {traceback.format_exc()}", level="ERROR")
+            messagebox.showerror("Monitoring Error", f"Error starting monitoring for {rack_name}: {str(e)}")
+
+    def _run_preflight(self, targets, on_done):
+        """Preflight RSCMs on the collector loop and call on_done(results) on the UI thread.
+        
+        Args:
+            targets: List of (address, username, password) tuples
+            on_done: Callback receiving a dictionary of address -> PreflightResult
+        """
+        future = self.collector.submit(get_preflight().check_many(targets))
+        
+        def _on_future_done(done_future):
+            try:
+                results = done_future.result()
+            except Exception as e:
+                logger.error(f"Preflight failed: {e}")
+                results = {}
+            self.after(0, lambda: on_done(results))
+        
+        future.add_done_callback(_on_future_done)
+
+    def _on_preflight_complete(self, rack_name, rack_address, interval_minutes, duration_hours, username, password, results):
+        """Start monitoring a rack once its preflight has passed."""
+        result = results.get(rack_address)
+        if result is None or not result.ok:
+            error = result.error if result is not None else "Preflight did not complete"
+            self._update_rack_status(rack_name, rack_address, "Error")
+            self.log_message(f"Connection test failed before monitoring {rack_name} ({rack_address}): {error}", level="ERROR")
+            messagebox.showerror("Connection Error", f"Failed to connect to {rack_name} ({rack_address}). Please check credentials and try again.")
+            return
+        
+        self.log_message(f"Pre-monitoring connection test succeeded for {rack_name}")
+        self._start_isolated_monitoring(rack_name, rack_address, interval_minutes, duration_hours, username, password)
+
+    def _start_isolated_monitoring(self, rack_name, rack_address, interval_minutes, duration_hours, username, password):
+        """Create the monitor and tab for a rack and schedule it on the collector."""
+        try:
             # Log the credentials being used
             self.log_message(f"Verified credentials work for {rack_name} ({rack_address})")
             
             # Create a monitor just for this rack
             from ..core.monitor import RackPowerMonitor
-            monitor = RackPowerMonitor()
+            monitoring_config = self.app.config.get('monitoring', {})
+            monitor = RackPowerMonitor(
+                max_concurrent_polls=monitoring_config.get('max_concurrent_polls', 32),
+                cycle_deadline_seconds=monitoring_config.get('cycle_deadline_seconds'),
+                align_to_grid=monitoring_config.get('align_to_grid', True),
+                stagger_fraction=monitoring_config.get('stagger_fraction', 0.5),
+                collection_mode=monitoring_config.get('collection_mode', 'single')
+            )
             
             # IMPORTANT: Set up data directory
             monitor.data_dir = self.data_dir_var.get()
@@ -553,8 +684,8 @@ class MonitorTab(ttk.Frame):
             # IMPORTANT: Clear existing data when starting a new monitoring session
             # This is the key change we're making
             if rack_key in self.rack_tabs:
-                # Reset data to an empty list
-                self.rack_tabs[rack_key]['data'] = []
+                # Empty the rack's history buffer
+                self.rack_tabs[rack_key]['data'].clear()
                 
                 # Clear the chart
                 self.rack_tabs[rack_key]['axes'].clear()
@@ -603,25 +734,24 @@ class MonitorTab(ttk.Frame):
             
             # Initialize data if needed
             if 'data' not in self.rack_tabs[rack_key]:
-                self.rack_tabs[rack_key]['data'] = []
+                self.rack_tabs[rack_key]['data'] = self._new_history()
+                self.telemetry.set_history(rack_name, self.rack_tabs[rack_key]['data'])
+            
+            # Schedule the rack as a task on the shared collector event loop
+            future = self.collector.start_rack(
+                rack_key,
+                monitor,
+                self._run_isolated_rack_monitoring(monitor, rack_name, rack_address, interval_minutes, duration_hours, username, password)  # Pass credentials
+            )
             
             # Store this monitoring task in the monitoring_tasks dictionary
             self.monitoring_tasks[rack_key] = {
                 'monitor': monitor,
-                'future': None  # Will be set by the thread
+                'future': future
             }
             
-            # Run the monitoring thread
-            import threading
-            monitor_thread = threading.Thread(
-                target=self._run_isolated_rack_monitoring,
-                args=(monitor, rack_name, rack_address, interval_minutes, duration_hours, username, password)  # Pass credentials
-            )
-            monitor_thread.daemon = True
-            monitor_thread.start()
-            
-            # Log thread started
-            self.log_message(f"Started monitoring thread for {rack_name}")
+            # Log task started
+            self.log_message(f"Started monitoring task for {rack_name}")
             
         except Exception as e:
             self.log_message(f"Error starting monitoring for {rack_name}: {str(e)}", level="ERROR")
@@ -629,8 +759,8 @@ class MonitorTab(ttk.Frame):
             self.log_message(f"Exception details: {traceback.format_exc()}", level="ERROR")
             messagebox.showerror("Monitoring Error", f"Error starting monitoring for {rack_name}: {str(e)}")
 
-    def _run_isolated_rack_monitoring(self, monitor, rack_name, rack_address, interval_minutes, duration_hours=None, username=None, password=None):
-        """Run completely isolated monitoring for a single rack."""
+    async def _run_isolated_rack_monitoring(self, monitor, rack_name, rack_address, interval_minutes, duration_hours=None, username=None, password=None):
+        """Run isolated monitoring for a single rack as a task on the collector loop."""
         try:
             # Update status
             self.after(0, lambda: self._update_rack_status(rack_name, rack_address, "Monitoring"))
@@ -658,6 +788,9 @@ class MonitorTab(ttk.Frame):
                 # Log the data received
                 logger.info(f"CALLBACK: Received data for {callback_name}: {power:.2f}W at {timestamp}")
                 
+                # The store is safe to write from this thread; the widgets aren't
+                self.telemetry.record_reading(rack_name, timestamp, power)
+                
                 # Important: Use after() to update UI from background thread
                 self.after(0, lambda: self._update_data(
                     rack_name=rack_name, 
@@ -666,71 +799,32 @@ class MonitorTab(ttk.Frame):
                     power=power
                 ))
             
-            # Run the monitoring task in the event loop
-            import asyncio
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
             # Log before running
             logger.info(f"Starting monitor_all_racks with rack {rack_name}")
             
-            # Run the coroutine directly in this thread
-            result = loop.run_until_complete(
-                monitor.monitor_all_racks(
-                    interval_minutes=interval_minutes,
-                    duration_hours=duration_hours,
-                    callback=isolated_callback
-                )
+            # Run the coroutine on the collector's event loop
+            result = await monitor.monitor_all_racks(
+                interval_minutes=interval_minutes,
+                duration_hours=duration_hours,
+                callback=isolated_callback
             )
             
             logger.info(f"monitor_all_racks completed with result: {result}")
             
-            # Close the loop when done
-            loop.close()
-            
             # Update status when finished
             self.after(0, lambda: self._update_rack_status(rack_name, rack_address, "Complete"))
             
         except Exception as e:
             self.after(0, lambda: self._update_rack_status(rack_name, rack_address, "Error"))
-            self.after(0, lambda msg=str(e): self.log_message(f"Error in monitoring thread: {msg}", level="ERROR"))
+            self.after(0, lambda msg=str(e): self.log_message(f"Error in monitoring task: {msg}", level="ERROR"))
             
             # Log the full exception for debugging
             import traceback
             import logging
             logger = logging.getLogger("power_monitor")
-            logger.error(f"Exception in monitoring thread: {e}")
+            logger.error(f"Exception in monitoring task: {e}")
             logger.error(f"Traceback: {traceback.format_exc()}")
 
-    def _test_connection_sync(self, rack_name, rack_address, username, password):
-        """Test connection synchronously before starting monitoring."""
-        try:
-            import asyncio
-            from ..utils.api_client import RedfishAPIClient
-            
-            # Create a new event loop for this test
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            client = RedfishAPIClient()
-            
-            # Run the connection test
-            self.log_message(f"Testing connection before monitoring {rack_name} ({rack_address})...")
-            success = loop.run_until_complete(client.test_connection(rack_address, username, password))
-            
-            # Close the loop when done
-            loop.close()
-            
-            if success:
-                self.log_message(f"Pre-monitoring connection test succeeded for {rack_name}")
-                return True
-            else:
-                self.log_message(f"Pre-monitoring connection test failed for {rack_name}", level="ERROR")
-                return False
-        except Exception as e:
-            self.log_message(f"Error in pre-monitoring connection test: {str(e)}", level="ERROR")
-            return False
-
     def log_message(self, message, level="INFO"):
         """Log a message to the text widget and application logger."""
         # Get the current time
@@ -776,6 +870,9 @@ class MonitorTab(ttk.Frame):
         self.data_dir_var.set(self.app.config.get('data_dir', 'power_data'))
         self.full_path_var.set(os.path.abspath(self.data_dir_var.get()))
         
+        # Storage settings and the series stores follow the data directory
+        apply_storage_settings(self.app.config.get('storage', {}), self.data_dir_var.get())
+        
 ##################
     def _show_add_rscm_dialog(self):
         """Show dialog to add a new RSCM."""
@@ -822,22 +919,12 @@ class MonitorTab(ttk.Frame):
                 return
             
             # Check if this RSCM already exists
-            exists = False
-            for item_id in self.rscm_tree.get_children():
-                item = self.rscm_tree.item(item_id)
-                if item['values'][0] == name or item['values'][1] == address:
-                    exists = True
-                    break
-            
-            if exists:
+            if name in self.registry or self.registry.by_address(address):
                 messagebox.showerror("Duplicate", "An RSCM with this name or address already exists")
                 return
             
-            # Add to tree
-            self.rscm_tree.insert('', 'end', values=(name, address, "Not Started"))
-            
-            # Create tab WITHOUT adding to notebook (changed from _create_rack_tab)
-            self._create_rack_tab_without_showing(name, address)
+            # Add to tree, with its tab kept out of the notebook
+            self._add_rack(name, address)
             
             # Save config
             self._save_rscm_list()
@@ -926,18 +1013,21 @@ class MonitorTab(ttk.Frame):
         stats_frame.rowconfigure(1, weight=1)
         stats_frame.rowconfigure(2, weight=1)
         stats_frame.rowconfigure(3, weight=1)
+        stats_frame.rowconfigure(4, weight=1)
         
         # Add statistics
         ttk.Label(stats_frame, text="Current:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=2)
         ttk.Label(stats_frame, text="Minimum:").grid(row=1, column=0, sticky=tk.W, padx=5, pady=2)
         ttk.Label(stats_frame, text="Maximum:").grid(row=2, column=0, sticky=tk.W, padx=5, pady=2)
         ttk.Label(stats_frame, text="Average:").grid(row=3, column=0, sticky=tk.W, padx=5, pady=2)
+        ttk.Label(stats_frame, text="Percentiles:").grid(row=4, column=0, sticky=tk.W, padx=5, pady=2)
         
         # Create StringVars for statistics
         current_var = tk.StringVar(value="0 W")
         min_var = tk.StringVar(value="0 W")
         max_var = tk.StringVar(value="0 W")
         avg_var = tk.StringVar(value="0 W")
+        percentiles_var = tk.StringVar(value="N/A")
         
         # Add value labels
         current_label = ttk.Label(stats_frame, textvariable=current_var, font=("Arial", 10, "bold"))
@@ -948,6 +1038,8 @@ class MonitorTab(ttk.Frame):
         max_label.grid(row=2, column=1, sticky=tk.W, padx=5, pady=2)
         avg_label = ttk.Label(stats_frame, textvariable=avg_var)
         avg_label.grid(row=3, column=1, sticky=tk.W, padx=5, pady=2)
+        percentiles_label = ttk.Label(stats_frame, textvariable=percentiles_var)
+        percentiles_label.grid(row=4, column=1, sticky=tk.W, padx=5, pady=2)
         
         # Export button
         export_btn = ttk.Button(info_frame, text="Export Data", 
@@ -960,12 +1052,13 @@ class MonitorTab(ttk.Frame):
             'figure': fig,
             'axes': ax,
             'canvas': canvas,
-            'data': [],  # Will store (timestamp, power) tuples
+            'data': self._new_history(),  # Latest (timestamp, power) readings
             'stats': {
                 'current': current_var,
                 'min': min_var,
                 'max': max_var,
-                'avg': avg_var
+                'avg': avg_var,
+                'percentiles': percentiles_var
             }
         }
 
@@ -1029,6 +1122,7 @@ class MonitorTab(ttk.Frame):
         stats_frame.rowconfigure(3, weight=1)
         stats_frame.rowconfigure(4, weight=1)  # Added for mode
         stats_frame.rowconfigure(5, weight=1)  # Added for reading count
+        stats_frame.rowconfigure(6, weight=1)
         
         # Add statistics
         ttk.Label(stats_frame, text="Current:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=2)
@@ -1037,6 +1131,7 @@ class MonitorTab(ttk.Frame):
         ttk.Label(stats_frame, text="Average:").grid(row=3, column=0, sticky=tk.W, padx=5, pady=2)
         ttk.Label(stats_frame, text="Mode:").grid(row=4, column=0, sticky=tk.W, padx=5, pady=2)  # Added for mode
         ttk.Label(stats_frame, text="Readings:").grid(row=5, column=0, sticky=tk.W, padx=5, pady=2)  # Added for count
+        ttk.Label(stats_frame, text="Percentiles:").grid(row=6, column=0, sticky=tk.W, padx=5, pady=2)
         
         # Create StringVars for statistics
         current_var = tk.StringVar(value="0 W")
@@ -1045,6 +1140,7 @@ class MonitorTab(ttk.Frame):
         avg_var = tk.StringVar(value="0 W")
         mode_var = tk.StringVar(value="0 W")  # Added for mode
         count_var = tk.StringVar(value="0")  # Added for reading count
+        percentiles_var = tk.StringVar(value="N/A")
         
         # Add value labels
         current_label = ttk.Label(stats_frame, textvariable=current_var, font=("Arial", 10, "bold"))
@@ -1059,6 +1155,8 @@ class MonitorTab(ttk.Frame):
         mode_label.grid(row=4, column=1, sticky=tk.W, padx=5, pady=2)
         count_label = ttk.Label(stats_frame, textvariable=count_var)  # Added for count
         count_label.grid(row=5, column=1, sticky=tk.W, padx=5, pady=2)
+        percentiles_label = ttk.Label(stats_frame, textvariable=percentiles_var)
+        percentiles_label.grid(row=6, column=1, sticky=tk.W, padx=5, pady=2)
         
         # Create a control button frame
         control_frame = ttk.Frame(info_frame)
@@ -1086,14 +1184,15 @@ class MonitorTab(ttk.Frame):
             'figure': fig,
             'axes': ax,
             'canvas': canvas,
-            'data': [],  # Will store (timestamp, power) tuples
+            'data': self._new_history(),  # Latest (timestamp, power) readings
             'stats': {
                 'current': current_var,
                 'min': min_var,
                 'max': max_var,
                 'avg': avg_var,
                 'mode': mode_var,  # Added for mode
-                'count': count_var  # Added for count
+                'count': count_var,  # Added for count
+                'percentiles': percentiles_var
             },
             'controls': {
                 'pause_var': pause_var,
@@ -1114,13 +1213,14 @@ class MonitorTab(ttk.Frame):
         
         # Process each selected item
         for item_id in selected_items:
-            item = self.rscm_tree.item(item_id)
-            name = item['values'][0]
-            address = item['values'][1]
+            rack = self.registry.by_item(item_id)
+            if rack is None:
+                continue
+            name = rack['name']
+            address = rack['address']
             
             # Check if the rack is being monitored
-            rack_key = f"{name}_{address}"
-            if rack_key in self.monitoring_tasks:
+            if rack['rack_key'] in self.monitoring_tasks:
                 messagebox.showwarning("Monitoring Active", 
                                     f"Cannot remove {name} while it is being monitored. "
                                     "Please stop monitoring first.")
@@ -1131,24 +1231,8 @@ class MonitorTab(ttk.Frame):
             if not confirm:
                 continue
             
-            # Remove from tree
-            self.rscm_tree.delete(item_id)
-            
-            # Remove the rack tab if it exists and is in the notebook
-            if rack_key in self.rack_tabs:
-                try:
-                    # Only try to remove from notebook if it's actually there
-                    if self.rack_tabs[rack_key].get('added_to_notebook', False):
-                        try:
-                            tab_idx = self.rack_notebook.index(self.rack_tabs[rack_key]['tab'])
-                            self.rack_notebook.forget(tab_idx)
-                        except (ValueError, tkinter.TclError) as e:
-                            self.log_message(f"Could not remove tab for {name}: {str(e)}", level="WARNING")
-                            
-                    # Clean up the rack_tabs dict regardless of whether tab was in notebook
-                    del self.rack_tabs[rack_key]
-                except Exception as e:
-                    self.log_message(f"Error removing tab for {name}: {str(e)}", level="ERROR")
+            # Remove from tree, with its tab
+            self._remove_rack(name)
             
             # Log removal
             self.log_message(f"Removed RSCM: {name} ({address})")
@@ -1164,14 +1248,9 @@ class MonitorTab(ttk.Frame):
         """Remove all RSCMs from the tree."""
         # Check if any are being monitored
         monitoring_racks = []
-        for item_id in self.rscm_tree.get_children():
-            item = self.rscm_tree.item(item_id)
-            name = item['values'][0]
-            address = item['values'][1]
-            
-            rack_key = f"{name}_{address}"
-            if rack_key in self.monitoring_tasks:
-                monitoring_racks.append(name)
+        for rack in self.registry.entries():
+            if rack['rack_key'] in self.monitoring_tasks:
+                monitoring_racks.append(rack['name'])
         
         if monitoring_racks:
             messagebox.showwarning("Monitoring Active", 
@@ -1187,6 +1266,8 @@ class MonitorTab(ttk.Frame):
         # Clear all items from tree
         for item_id in self.rscm_tree.get_children():
             self.rscm_tree.delete(item_id)
+        self.registry.clear()
+        self.telemetry.clear()
         
         # Clear all rack tabs safely
         for rack_key in list(self.rack_tabs.keys()):
@@ -1249,20 +1330,10 @@ class MonitorTab(ttk.Frame):
                         address = row[1].strip()
                         
                         if name and address:
-                            # Check if this RSCM already exists
-                            exists = False
-                            for item_id in self.rscm_tree.get_children():
-                                item = self.rscm_tree.item(item_id)
-                                if item['values'][0] == name and item['values'][1] == address:
-                                    exists = True
-                                    break
-                            
-                            if not exists:
-                                # Add to tree
-                                self.rscm_tree.insert('', 'end', values=(name, address, "Not Started"))
-                                
-                                # Create tab
-                                self._create_rack_tab(name, address)
+                            # Skip RSCMs whose name is already taken
+                            if name not in self.registry:
+                                # Add to tree and create its tab
+                                self._add_rack(name, address, show_tab=True)
                                 
                                 added += 1
             
@@ -1369,7 +1440,8 @@ class MonitorTab(ttk.Frame):
                         self.after(0, lambda: messagebox.showerror("Connection Test", 
                             f"Failed to connect to {rack_name} ({rack_address}). The RSCM may be unreachable or the API may be unresponsive."))
                     
-                    # Close the loop
+                    # Release the pooled HTTP session bound to this loop, then close the loop
+                    loop.run_until_complete(client.pool.close_loop_session())
                     loop.close()
                     
                 except Exception as e:
@@ -1429,6 +1501,7 @@ class MonitorTab(ttk.Frame):
         if rack_key not in self.rack_tabs:
             self.log_message(f"Warning: Tab for {rack_name} doesn't exist, creating it now...")
             self._create_rack_tab_without_showing(rack_name, rack_address)
+            self.telemetry.set_history(rack_name, self.rack_tabs[rack_key]['data'])
             
             # Add the tab to the notebook if it's not already there
             if not self.rack_tabs[rack_key].get('added_to_notebook', False):
@@ -1442,20 +1515,21 @@ class MonitorTab(ttk.Frame):
         # Get tab data
         tab_data = self.rack_tabs[rack_key]
         
-        # Add data point
-        tab_data['data'].append((timestamp, power))
+        # Add data point; the ring buffer drops the oldest once it is full
+        tab_data['data'].append(timestamp, power)
         self.log_message(f"Added data point. Total points: {len(tab_data['data'])}")
         
-        # Keep only the last 1000 data points to avoid memory issues
-        if len(tab_data['data']) > 1000:
-            tab_data['data'] = tab_data['data'][-1000:]
-        
         # Update the chart immediately
         self._update_chart(rack_name, rack_address)
         
         # Update statistics
         self._update_statistics(rack_name, rack_address)
 
+    def _new_history(self):
+        """Create a rack's live history buffer with the configured capacity."""
+        capacity = self.app.config.get('monitoring', {}).get('history_capacity', DEFAULT_HISTORY_CAPACITY)
+        return PowerRingBuffer(capacity)
+
     def _update_chart(self, rack_name, rack_address):
         """Update the chart for a specific rack."""
         # Get the rack key
@@ -1486,9 +1560,9 @@ class MonitorTab(ttk.Frame):
         tab_data['axes'].set_ylabel("Power (W)")
         tab_data['axes'].grid(True)
         
-        # Extract data for plotting
-        timestamps = [d[0] for d in tab_data['data']]
-        power_values = [d[1] for d in tab_data['data']]
+        # Views of the history buffer, no copies
+        timestamps = tab_data['data'].timestamps()
+        power_values = tab_data['data'].watts()
         
         # Plot the data
         tab_data['axes'].plot(timestamps, power_values, 'b-', marker='o', markersize=2)
@@ -1498,9 +1572,9 @@ class MonitorTab(ttk.Frame):
         plt.setp(tab_data['axes'].xaxis.get_majorticklabels(), rotation=45)
         
         # Set y-axis limits to give some padding
-        if power_values:
-            min_power = min(power_values)
-            max_power = max(power_values)
+        if len(power_values):
+            min_power = float(power_values.min())
+            max_power = float(power_values.max())
             padding = (max_power - min_power) * 0.1 if max_power > min_power else max_power * 0.1
             tab_data['axes'].set_ylim(min_power - padding, max_power + padding)
         
@@ -1529,29 +1603,16 @@ class MonitorTab(ttk.Frame):
         if not tab_data['data']:
             return
         
-        # Extract power values
-        power_values = [d[1] for d in tab_data['data']]
-        
-        # Calculate statistics
-        current_power = power_values[-1]
-        min_power = min(power_values)
-        max_power = max(power_values)
-        avg_power = sum(power_values) / len(power_values)
-        
-        # Calculate mode (most frequent value)
-        # Round to 2 decimal places to handle floating point values
-        rounded_values = [round(x, 2) for x in power_values]
+        # Statistics kept up to date by the history buffer as readings arrive
+        stats = tab_data['data'].stats.snapshot()
+        current_power = stats['current']
+        min_power = stats['min']
+        max_power = stats['max']
+        avg_power = stats['avg']
         
-        # Count occurrences of each value
-        from collections import Counter
-        value_counts = Counter(rounded_values)
-        
-        # Find the most common value(s)
-        most_common = value_counts.most_common(1)
-        
-        # Check if we have a mode
-        if most_common:
-            mode_power, mode_count = most_common[0]
+        # Mode (most frequent value, rounded to 2 decimal places)
+        if stats['mode'] is not None:
+            mode_power, mode_count = stats['mode'], stats['mode_count']
             # Only show mode if it appears more than once
             if mode_count > 1:
                 mode_text = f"{mode_power:.2f} W ({mode_count} times)"
@@ -1561,7 +1622,7 @@ class MonitorTab(ttk.Frame):
             mode_text = "N/A"
         
         # Get reading count
-        reading_count = len(power_values)
+        reading_count = stats['count']
         
         # Update statistics variables
         tab_data['stats']['current'].set(f"{current_power:.2f} W")
@@ -1570,21 +1631,19 @@ class MonitorTab(ttk.Frame):
         tab_data['stats']['avg'].set(f"{avg_power:.2f} W")
         tab_data['stats']['mode'].set(mode_text)
         tab_data['stats']['count'].set(f"{reading_count}")
+        tab_data['stats']['percentiles'].set(
+            f"p50 {stats['p50']:.2f} / p95 {stats['p95']:.2f} / p99 {stats['p99']:.2f} W")
 
     def _save_rscm_list(self):
         """Save the list of RSCMs to the configuration."""
         rscms = []
         
-        # Iterate through tree items
-        for item_id in self.rscm_tree.get_children():
-            item = self.rscm_tree.item(item_id)
-            name = item['values'][0]
-            address = item['values'][1]
-            
+        # Iterate through the registered racks, in the order they were added
+        for rack in self.registry.entries():
             # Add to list
             rscms.append({
-                'name': name,
-                'address': address
+                'name': rack['name'],
+                'address': rack['address']
             })
         
         # Save to both config keys for backward compatibility
@@ -1603,6 +1662,8 @@ class MonitorTab(ttk.Frame):
         # Clear the tree first
         for item_id in self.rscm_tree.get_children():
             self.rscm_tree.delete(item_id)
+        self.registry.clear()
+        self.telemetry.clear()
         
         # Get the list from config
         rscms = []
@@ -1622,12 +1683,9 @@ class MonitorTab(ttk.Frame):
             name = rscm.get('name', '')
             address = rscm.get('address', '')
             
-            if name and address:
-                # Add to tree
-                self.rscm_tree.insert('', 'end', values=(name, address, "Not Started"))
-                
-                # Create tab WITHOUT adding to notebook
-                self._create_rack_tab_without_showing(name, address)
+            if name and address and name not in self.registry:
+                # Add to tree, with its tab kept out of the notebook
+                self._add_rack(name, address, settings=rscm)
                 added_count += 1
         
         self.log_message(f"Loaded {added_count} RSCMs from configuration")
@@ -1709,11 +1767,8 @@ class MonitorTab(ttk.Frame):
                 name = rscm["name"]
                 address = rscm["address"]
                 
-                # Add to tree
-                self.rscm_tree.insert('', 'end', values=(name, address, "Not Started"))
-                
-                # Create tab WITHOUT adding to notebook
-                self._create_rack_tab_without_showing(name, address)
+                # Add to tree, with its tab kept out of the notebook
+                self._add_rack(name, address)
                 
             # Save to configuration
             self._save_rscm_list()
@@ -1772,14 +1827,16 @@ class MonitorTab(ttk.Frame):
             self.log_message(f"Monitoring resumed for {rack_name}")
             self._update_rack_status(rack_name, rack_address, "Monitoring")
         
-        # Update monitoring task's paused state
-        if rack_key in self.monitoring_tasks and 'monitor' in self.monitoring_tasks[rack_key]:
-            # Check if the monitor object has a paused attribute, if not add it
-            monitor = self.monitoring_tasks[rack_key]['monitor']
-            if not hasattr(monitor, 'paused'):
-                monitor.paused = paused
-            else:
-                monitor.paused = paused
+        # Send the pause/resume command to the collector service
+        if rack_key in self.monitoring_tasks:
+            self.collector.pause_rack(rack_key, paused)
+
+    def _cancel_if_running(self, rack_name, future):
+        """Cancel a rack's monitoring task if it hasn't finished yet."""
+        if not future.done():
+            future.cancel()
+            self.log_message(f"Future cancelled for {rack_name}")
+            logger.info("[DEBUG] Cancelled future")
 
     def _stop_rack_monitoring_with_confirmation(self, rack_name, rack_address):
         """Stop monitoring with confirmation and file location information."""
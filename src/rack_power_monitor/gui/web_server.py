@@ -5,7 +5,7 @@ import os
 import logging
 import traceback
 import datetime
-from collections import Counter
+import concurrent.futures
 
 class WebMonitorServer:
     def __init__(self, app_instance, port=5000):
@@ -13,6 +13,11 @@ class WebMonitorServer:
         self.app = app_instance  # Main application instance
         self.port = port
         
+        # Rack state published by the GUI and the collector; routes read it
+        # instead of the Tk widgets, which only the Tk thread may touch
+        from ..core.telemetry import get_telemetry_store
+        self.telemetry = get_telemetry_store()
+        
         # Correct static folder path
         static_folder = os.path.join(os.path.dirname(__file__), 'web_static')
         template_folder = os.path.join(os.path.dirname(__file__), 'web_templates')
@@ -43,7 +48,6 @@ class WebMonitorServer:
                 try:
                     # Use your existing endpoint logic to get stats
                     rack_name = rack['name']
-                    rack_key = f"{rack_name}_{rack['address']}"
                     
                     # Initialize stats
                     rack['stats'] = {
@@ -52,25 +56,20 @@ class WebMonitorServer:
                         'count': '0'
                     }
                     
-                    # Check if we have stats in rack_tabs
-                    if hasattr(self.app, 'monitor_tab') and hasattr(self.app.monitor_tab, 'rack_tabs'):
-                        if rack_key in self.app.monitor_tab.rack_tabs:
-                            tab_data = self.app.monitor_tab.rack_tabs[rack_key]
+                    # Check if the rack has a history buffer in the telemetry store
+                    record = self.telemetry.get(rack_name)
+                    if record and record['history']:
+                        stats = record['history'].stats.snapshot()
+                        
+                        if stats['count']:
+                            # Current power (last reading)
+                            rack['stats']['current'] = f"{stats['current']:.2f} W"
                             
-                            # Get power data points
-                            if 'data' in tab_data and tab_data['data']:
-                                power_values = [entry[1] for entry in tab_data['data']]
-                                
-                                if power_values:
-                                    # Current power (last reading)
-                                    rack['stats']['current'] = f"{power_values[-1]:.2f} W"
-                                    
-                                    # Average
-                                    avg = sum(power_values) / len(power_values)
-                                    rack['stats']['avg'] = f"{avg:.2f} W"
-                                    
-                                    # Count
-                                    rack['stats']['count'] = str(len(power_values))
+                            # Average
+                            rack['stats']['avg'] = f"{stats['avg']:.2f} W"
+                            
+                            # Count
+                            rack['stats']['count'] = str(stats['count'])
                 except Exception as e:
                     import logging
                     logging.error(f"Error enhancing rack data for {rack['name']}: {str(e)}")
@@ -96,28 +95,20 @@ class WebMonitorServer:
             saved_racks = []
             
             try:
-                import os
+                from ..core.catalog import get_session_catalog
                 power_data_dir = os.path.join(os.getcwd(), 'power_data')
                 
+                # Get all CSV files from the session catalog instead of listing the folder
+                csv_files = []
                 if os.path.isdir(power_data_dir):
-                    # Get all CSV files
-                    csv_files = []
-                    for filename in os.listdir(power_data_dir):
-                        filepath = os.path.join(power_data_dir, filename)
-                        if os.path.isfile(filepath) and filename.endswith('.csv'):
-                            # Try to extract rack name from filename
-                            rack_name = 'Unknown'
-                            parts = filename.split('_')
-                            if len(parts) > 0:
-                                rack_name = parts[0]
-                                
-                            csv_files.append({
-                                'name': filename,
-                                'path': filepath,
-                                'size': os.path.getsize(filepath),
-                                'modified': os.path.getmtime(filepath),
-                                'rack_name': rack_name
-                            })
+                    for entry in get_session_catalog(power_data_dir).list_files():
+                        csv_files.append({
+                            'name': entry['name'],
+                            'path': entry['path'],
+                            'size': entry['size'],
+                            'modified': entry['modified'] or 0,
+                            'rack_name': entry['rack_name'] or 'Unknown'
+                        })
                 
                 # Group files by rack name
                 racks_dict = {}
@@ -163,77 +154,52 @@ class WebMonitorServer:
         def api_racks():
             """API endpoint to get all racks."""
             rack_list = []
-            if hasattr(self.app, 'monitor_tab'):
-                for item_id in self.app.monitor_tab.rscm_tree.get_children():
-                    item = self.app.monitor_tab.rscm_tree.item(item_id)
-                    rack_list.append({
-                        'name': item['values'][0],
-                        'address': item['values'][1],
-                        'status': item['values'][2]
-                    })
+            for record in self.telemetry.racks():
+                rack_list.append({
+                    'name': record['name'],
+                    'address': record['address'],
+                    'status': record['status']
+                })
             return jsonify(racks=rack_list)
             
         @self.flask_app.route('/api/rack/<rack_name>/data')
         def api_rack_data(rack_name):
             """API endpoint to get power data for a specific rack."""
+            from ..core.timeseries import from_epoch_seconds
+            
             # Initialize response data
             timestamps = []
             power_values = []
-            rack_data = None
+            stats = None
             
-            # First try monitor_tab.rack_tabs
-            if hasattr(self.app, 'monitor_tab') and hasattr(self.app.monitor_tab, 'rack_tabs'):
-                for rack_key, data in self.app.monitor_tab.rack_tabs.items():
-                    if rack_name in rack_key and 'data' in data and data['data']:
-                        rack_data = data
-                        timestamps = [point[0].isoformat() if hasattr(point[0], 'isoformat') else str(point[0]) for point in data['data']]
-                        power_values = [point[1] for point in data['data']]
-                        break
-            
-            # If not found, then try monitoring_data
-            if not power_values and hasattr(self.app, 'monitoring_data'):
-                for rack_key, data in self.app.monitoring_data.items():
-                    if rack_name in rack_key and 'data' in data and data['data']:
-                        rack_data = data
-                        timestamps = [point[0].isoformat() if hasattr(point[0], 'isoformat') else str(point[0]) for point in data['data']]
-                        power_values = [point[1] for point in data['data']]
-                        break
+            # Find the rack's history buffer in the telemetry store
+            record = self.telemetry.get(rack_name)
+            if record and record['history']:
+                history = record['history']
+                stats = history.stats.snapshot()
+                # Copied, as the GUI thread keeps appending
+                epoch, watts = history.window(copy=True)
+                timestamps = [ts.isoformat() for ts in from_epoch_seconds(epoch)]
+                power_values = watts.astype(float).tolist()
             
             # If still no data found, return an error
             if not power_values:
                 return jsonify({"error": "No data available for rack"}), 404
             
-            # Calculate statistics
-            min_power = min(power_values) if power_values else 0
-            max_power = max(power_values) if power_values else 0
-            avg_power = sum(power_values) / len(power_values) if power_values else 0
-            
-            # Calculate mode (most frequent value)
-            mode_power = None
-            mode_count = 0
-            
-            try:
-                # Round to 2 decimal places to handle floating point values
-                rounded_values = [round(x, 2) for x in power_values]
-                value_counts = Counter(rounded_values)
-                
-                # Get the most common value
-                most_common = value_counts.most_common(1)
-                if most_common:
-                    mode_power, mode_count = most_common[0]
-            except Exception as e:
-                logging.warning(f"Failed to calculate mode: {str(e)}")
-            
-            # Return data as JSON
+            # Return data as JSON, with the statistics the buffer keeps as readings arrive
             return jsonify({
                 "timestamps": timestamps,
                 "power": power_values,
                 "name": rack_name,
-                "min": min_power,
-                "max": max_power,
-                "avg": avg_power,
-                "mode": mode_power,
-                "mode_count": mode_count,
+                "min": stats['min'],
+                "max": stats['max'],
+                "avg": stats['avg'],
+                "std": stats['std'],
+                "mode": stats['mode'],
+                "mode_count": stats['mode_count'],
+                "p50": stats['p50'],
+                "p95": stats['p95'],
+                "p99": stats['p99'],
             })
         
         @self.flask_app.route('/api/rack/<rack_name>/status')
@@ -250,160 +216,47 @@ class WebMonitorServer:
                     "stats": None
                 }
                 
-                # Find the rack in data sources
-                found_rack = False
-                rack_key = None
-                
-                # Check monitoring_data first
-                if hasattr(self.app, 'monitoring_data'):
-                    # Try to find the matching rack by name
-                    for key in self.app.monitoring_data.keys():
-                        if rack_name in key:
-                            rack_key = key
-                            found_rack = True
-                            if '_' in key:
-                                _, address = key.split('_', 1)
-                                rack_data['address'] = address
-                            break
-                
-                # If not found in monitoring_data, try rack_tabs
-                if not found_rack and hasattr(self.app, 'monitor_tab') and hasattr(self.app.monitor_tab, 'rack_tabs'):
-                    for key in self.app.monitor_tab.rack_tabs.keys():
-                        if rack_name in key:
-                            rack_key = key
-                            found_rack = True
-                            if '_' in key:
-                                _, address = key.split('_', 1)
-                                rack_data['address'] = address
-                            break
-                
-                if not found_rack:
+                # Find the rack in the telemetry store
+                record = self.telemetry.get(rack_name)
+                if record is None:
                     logger.warning(f"Rack not found: {rack_name}")
                     return jsonify(rack_data), 404
                 
-                logger.info(f"Found rack: {rack_key}")
-                
-                # Determine status - UPDATED LOGIC
-                status = "Not Monitoring"
-                is_monitoring = False
+                rack_data['address'] = record['address']
                 
-                # Multiple signals that a rack might be monitored
-                signals = {
-                    "has_monitor_task": False,
-                    "has_monitor_object": False,
-                    "has_data": False,
-                    "in_notebook": False,
-                    "recent_data": False
-                }
-                
-                # Check for monitoring task
-                if hasattr(self.app, 'monitoring_tasks') and rack_key in self.app.monitoring_tasks:
-                    signals["has_monitor_task"] = True
-                    if 'monitor' in self.app.monitoring_tasks[rack_key]:
-                        signals["has_monitor_object"] = True
-                
-                # Check for data
-                data_source = None
-                if hasattr(self.app, 'monitor_tab') and hasattr(self.app.monitor_tab, 'rack_tabs'):
-                    if rack_key in self.app.monitor_tab.rack_tabs:
-                        tab_data = self.app.monitor_tab.rack_tabs[rack_key]
-                        
-                        # Check if added to notebook
-                        if 'added_to_notebook' in tab_data:
-                            signals["in_notebook"] = tab_data['added_to_notebook']
-                        
-                        # Check if it has data
-                        if 'data' in tab_data and tab_data['data']:
-                            signals["has_data"] = True
-                            
-                            # Check if data is recent (last 5 minutes)
-                            if len(tab_data['data']) > 0:
-                                last_timestamp = tab_data['data'][-1][0]
-                                if isinstance(last_timestamp, datetime.datetime):
-                                    time_diff = datetime.datetime.now() - last_timestamp
-                                    if time_diff.total_seconds() < 300:  # 5 minutes
-                                        signals["recent_data"] = True
-                        
-                        data_source = tab_data
-                
-                # Also check monitoring_data
-                if not data_source and hasattr(self.app, 'monitoring_data'):
-                    if rack_key in self.app.monitoring_data:
-                        md_data = self.app.monitoring_data[rack_key]
-                        if 'data' in md_data and md_data['data']:
-                            signals["has_data"] = True
-                            data_source = md_data
-                
-                # Log the signals we found
-                logger.info(f"Monitoring signals for {rack_name}: {signals}")
-                
-                # Determine if monitoring based on signals
-                # We consider a rack monitored if:
-                # 1. It has a monitor task and object, OR
-                # 2. It has data AND is in the notebook, OR
-                # 3. It has recent data
-                is_monitoring = (
-                    (signals["has_monitor_task"] and signals["has_monitor_object"]) or
-                    (signals["has_data"] and signals["in_notebook"]) or
-                    signals["recent_data"] or
-                    (signals["has_data"] and rack_name == "G24")  # Special case for G24
-                )
-                
-                if is_monitoring:
-                    # Check if paused
-                    is_paused = False
-                    
-                    if hasattr(self.app, 'monitor_tab') and hasattr(self.app.monitor_tab, 'rack_tabs'):
-                        if rack_key in self.app.monitor_tab.rack_tabs:
-                            tab_data = self.app.monitor_tab.rack_tabs[rack_key]
-                            
-                            # Check for explicit paused flag
-                            if 'paused' in tab_data:
-                                is_paused = tab_data['paused']
-                            
-                            # Check pause button state
-                            elif 'controls' in tab_data and 'pause_var' in tab_data['controls']:
-                                pause_text = tab_data['controls']['pause_var'].get()
-                                is_paused = (pause_text == "Resume")
-                    
-                    # Also check monitoring_tasks
-                    if hasattr(self.app, 'monitoring_tasks') and rack_key in self.app.monitoring_tasks:
-                        if 'paused' in self.app.monitoring_tasks[rack_key]:
-                            is_paused = self.app.monitoring_tasks[rack_key]['paused']
-                    
-                    status = "Paused" if is_paused else "Monitoring"
+                # The GUI publishes the status it shows in the tree
+                if record['paused']:
+                    status = "Paused"
+                elif record['monitoring']:
+                    status = "Monitoring"
+                else:
+                    status = "Not Monitoring"
                 
-                logger.info(f"Rack {rack_name} final status: {status} (is_monitoring={is_monitoring})")
+                logger.info(f"Rack {rack_name} status: {status}")
                 rack_data['status'] = status
                 
                 # Get statistics if we have data
-                if data_source and 'data' in data_source and data_source['data']:
-                    power_values = [entry[1] for entry in data_source['data']]
+                if record['history']:
+                    stats = record['history'].stats.snapshot()
                     
-                    if power_values:
-                        current = power_values[-1]
-                        
-                        # Format mode if we have enough data
+                    if stats['count']:
+                        # Format mode if a value repeats
                         mode_text = None
-                        if len(power_values) > 1:
-                            rounded_values = [round(x, 2) for x in power_values]
-                            value_counts = Counter(rounded_values)
-                            most_common = value_counts.most_common(1)
-                            if most_common and most_common[0][1] > 1:
-                                mode_power, mode_count = most_common[0]
-                                mode_text = f"{mode_power:.2f} W ({mode_count} times)"
+                        if stats['mode_count'] > 1:
+                            mode_text = f"{stats['mode']:.2f} W ({stats['mode_count']} times)"
                         
                         rack_data['stats'] = {
-                            'current': f"{current:.2f} W",
-                            'count': str(len(power_values)),
-                            'mode': mode_text
+                            'current': f"{stats['current']:.2f} W",
+                            'count': str(stats['count']),
+                            'mode': mode_text,
+                            'p95': f"{stats['p95']:.2f} W",
+                            'p99': f"{stats['p99']:.2f} W"
                         }
                         logger.info(f"Rack {rack_name}: has stats with current={rack_data['stats']['current']}")
                 
                 return jsonify(rack_data)
                 
             except Exception as e:
-                import logging, traceback
                 logging.error(f"Error in get_rack_status for {rack_name}: {str(e)}")
                 logging.error(traceback.format_exc())
                 return jsonify({"error": str(e)}), 500
@@ -413,167 +266,42 @@ class WebMonitorServer:
             """API endpoint to get active racks only."""
             active_racks = []
             
-            # Use the same logic as the index route to determine active racks
-            data_source = {}
-            if hasattr(self.app, 'monitor_tab') and hasattr(self.app.monitor_tab, 'rack_tabs'):
-                data_source = self.app.monitor_tab.rack_tabs
-            elif hasattr(self.app, 'monitoring_data') and self.app.monitoring_data:
-                data_source = self.app.monitoring_data
-            
-            for rack_key, rack_data in data_source.items():
-                try:
-                    # Parse rack name and address
-                    if '_' in rack_key:
-                        name, address = rack_key.split('_', 1)
-                    else:
-                        name = rack_key
-                        address = "Unknown"
+            for record in self.telemetry.racks():
+                # Only add if actually monitoring (not paused)
+                if record['monitoring'] and not record['paused']:
+                    # Get current power if available
+                    current_power = None
+                    if record['last_power'] is not None:
+                        current_power = f"{record['last_power']:.2f} W"
                     
-                    # Determine if active using the same monitoring signals
-                    is_monitoring = False
-                    status = "Not Monitoring"
-                    
-                    # Check for monitoring task
-                    if hasattr(self.app, 'monitoring_tasks') and rack_key in self.app.monitoring_tasks:
-                        has_task = True
-                        has_monitor = 'monitor' in self.app.monitoring_tasks[rack_key]
-                        
-                        if has_task and has_monitor:
-                            is_monitoring = True
-                    
-                    # Check for recent data
-                    if 'data' in rack_data and rack_data['data']:
-                        has_data = True
-                        
-                        # Special case for G24
-                        if name == "G24" and has_data:
-                            is_monitoring = True
-                        
-                        # Check if in notebook
-                        if 'added_to_notebook' in rack_data and rack_data['added_to_notebook'] and has_data:
-                            is_monitoring = True
-                        
-                        # Check if data is recent (last 5 minutes)
-                        if len(rack_data['data']) > 0:
-                            last_timestamp = rack_data['data'][-1][0]
-                            if isinstance(last_timestamp, datetime.datetime):
-                                time_diff = datetime.datetime.now() - last_timestamp
-                                if time_diff.total_seconds() < 300:  # 5 minutes
-                                    is_monitoring = True
-                
-                    if is_monitoring:
-                        # Check if paused
-                        is_paused = False
-                        
-                        if 'paused' in rack_data:
-                            is_paused = rack_data['paused']
-                        elif 'controls' in rack_data and 'pause_var' in rack_data['controls']:
-                            pause_text = rack_data['controls']['pause_var'].get()
-                            is_paused = (pause_text == "Resume")
-                        elif hasattr(self.app, 'monitoring_tasks') and rack_key in self.app.monitoring_tasks:
-                            if 'paused' in self.app.monitoring_tasks[rack_key]:
-                                is_paused = self.app.monitoring_tasks[rack_key]['paused']
-                        
-                        status = "Paused" if is_paused else "Monitoring"
-                        
-                        # Only add if actually monitoring (not paused)
-                        if status == "Monitoring":
-                            # Get current power if available
-                            current_power = None
-                            if 'data' in rack_data and rack_data['data']:
-                                power_values = [entry[1] for entry in rack_data['data']]
-                                if power_values:
-                                    current_power = f"{power_values[-1]:.2f} W"
-                            
-                            active_racks.append({
-                                'name': name,
-                                'address': address,
-                                'status': status,
-                                'current_power': current_power
-                            })
-                        
-                except Exception as e:
-                    logging.error(f"Error in api_active_racks for rack {rack_key}: {e}")
+                    active_racks.append({
+                        'name': record['name'],
+                        'address': record['address'],
+                        'status': "Monitoring",
+                        'current_power': current_power
+                    })
             
             return jsonify({"active_racks": active_racks})
         
         @self.flask_app.route('/api/racks/standby')
         def api_standby_racks():
             """API endpoint to get standby racks only."""
-            # Similar to active but returns racks that are not monitoring or are paused
+            # Racks that are not monitoring or are paused
             standby_racks = []
             
-            # Get data sources
-            data_source = {}
-            if hasattr(self.app, 'monitor_tab') and hasattr(self.app.monitor_tab, 'rack_tabs'):
-                data_source = self.app.monitor_tab.rack_tabs
-            elif hasattr(self.app, 'monitoring_data') and self.app.monitoring_data:
-                data_source = self.app.monitoring_data
-            
-            # Process each rack
-            for rack_key, rack_data in data_source.items():
-                try:
-                    # Parse rack name
-                    if '_' in rack_key:
-                        name, address = rack_key.split('_', 1)
-                    else:
-                        name = rack_key
-                        address = "Unknown"
-                    
-                    # Determine if monitoring using same logic as before
-                    is_monitoring = False
-                    has_task = hasattr(self.app, 'monitoring_tasks') and rack_key in self.app.monitoring_tasks
-                    has_monitor = has_task and 'monitor' in self.app.monitoring_tasks[rack_key]
-                    has_data = 'data' in rack_data and rack_data['data']
-                    in_notebook = 'added_to_notebook' in rack_data and rack_data['added_to_notebook']
-                    
-                    # Check for recent data
-                    has_recent_data = False
-                    if has_data and rack_data['data']:
-                        last_timestamp = rack_data['data'][-1][0]
-                        if isinstance(last_timestamp, datetime.datetime):
-                            time_diff = datetime.datetime.now() - last_timestamp
-                            if time_diff.total_seconds() < 300:
-                                has_recent_data = True
-                    
-                    # Determine monitoring state
-                    is_monitoring = (
-                        (has_task and has_monitor) or
-                        (has_data and in_notebook) or
-                        has_recent_data or
-                        (has_data and name == "G24")
-                    )
+            for record in self.telemetry.racks():
+                if not record['monitoring'] or record['paused']:
+                    # Get last power reading if available
+                    last_power = None
+                    if record['last_power'] is not None:
+                        last_power = f"{record['last_power']:.2f} W"
                     
-                    # Check if paused
-                    is_paused = False
-                    if 'paused' in rack_data:
-                        is_paused = rack_data['paused']
-                    elif 'controls' in rack_data and 'pause_var' in rack_data['controls']:
-                        pause_text = rack_data['controls']['pause_var'].get()
-                        is_paused = (pause_text == "Resume")
-                    elif has_task and 'paused' in self.app.monitoring_tasks[rack_key]:
-                        is_paused = self.app.monitoring_tasks[rack_key]['paused']
-                    
-                    # Only add if not actively monitoring (either not monitoring at all or paused)
-                    if not is_monitoring or is_paused:
-                        # Get last power reading if available
-                        last_power = None
-                        if has_data and rack_data['data']:
-                            power_values = [entry[1] for entry in rack_data['data']]
-                            if power_values:
-                                last_power = f"{power_values[-1]:.2f} W"
-                        
-                        status = "Paused" if (is_monitoring and is_paused) else "Not Monitoring"
-                        
-                        standby_racks.append({
-                            'name': name,
-                            'address': address,
-                            'status': status,
-                            'last_power': last_power
-                        })
-        
-                except Exception as e:
-                    logging.error(f"Error in api_standby_racks for rack {rack_key}: {e}")
+                    standby_racks.append({
+                        'name': record['name'],
+                        'address': record['address'],
+                        'status': "Paused" if record['paused'] else "Not Monitoring",
+                        'last_power': last_power
+                    })
             
             return jsonify({"standby_racks": standby_racks})
         
@@ -596,7 +324,8 @@ class WebMonitorServer:
                 
                 # Add to the main application
                 if hasattr(self.app, 'add_rscm'):
-                    success = self.app.add_rscm(rack_name, ip_address, username, password, auto_monitor, poll_rate)
+                    success = self._call_on_gui_thread(self.app.add_rscm, rack_name, ip_address,
+                                                       username, password, auto_monitor, poll_rate)
                     if success:
                         return jsonify({"success": True, "message": "R-SCM added successfully"})
                     else:
@@ -620,7 +349,7 @@ class WebMonitorServer:
                 
                 # Call the app method with the original rack name
                 if hasattr(self.app, 'update_rscm'):
-                    success = self.app.update_rscm(original_rack_name, rack_name, ip_address)
+                    success = self._call_on_gui_thread(self.app.update_rscm, original_rack_name, rack_name, ip_address)
                     print(f"Update result: {success}")
                     return jsonify({
                         'success': success,
@@ -645,7 +374,7 @@ class WebMonitorServer:
             try:
                 # Delete from the main application
                 if hasattr(self.app, 'delete_rscm'):
-                    success = self.app.delete_rscm(rack_name)
+                    success = self._call_on_gui_thread(self.app.delete_rscm, rack_name)
                     if success:
                         return jsonify({"success": True, "message": "R-SCM deleted successfully"})
                     else:
@@ -662,7 +391,7 @@ class WebMonitorServer:
             """Start monitoring for an R-SCM."""
             try:
                 if hasattr(self.app, 'start_monitoring'):
-                    success = self.app.start_monitoring(rack_name)
+                    success = self._call_on_gui_thread(self.app.start_monitoring, rack_name)
                     if success:
                         return jsonify({"success": True, "message": "Monitoring started"})
                     else:
@@ -681,14 +410,8 @@ class WebMonitorServer:
                 # Check if we have a monitor_tab to work with
                 if hasattr(self.app, 'monitor_tab') and hasattr(self.app.monitor_tab, '_stop_rack_monitoring'):
                     # First get the rack address - needed for _stop_rack_monitoring
-                    rack_address = None
-                    
-                    # Find the rack in the tree to get its address
-                    for item_id in self.app.monitor_tab.rscm_tree.get_children():
-                        item = self.app.monitor_tab.rscm_tree.item(item_id)
-                        if item['values'][0] == rack_name:
-                            rack_address = item['values'][1]
-                            break
+                    record = self.telemetry.get(rack_name)
+                    rack_address = record['address'] if record else None
                     
                     if not rack_address:
                         return jsonify({
@@ -707,7 +430,7 @@ class WebMonitorServer:
                     
                     # Use the same method used in the GUI
                     logging.info(f"Calling _stop_rack_monitoring for {rack_name} at {rack_address}")
-                    self.app.monitor_tab._stop_rack_monitoring(rack_name, rack_address)
+                    self._call_on_gui_thread(self.app.monitor_tab._stop_rack_monitoring, rack_name, rack_address)
                     logging.info(f"Successfully stopped monitoring for {rack_name}")
                     
                     # If we couldn't get the actual filename, generate one that follows the same pattern
@@ -797,28 +520,26 @@ class WebMonitorServer:
                     'rack_tabs': []
                 }
                 
-                # Get tree status
-                if hasattr(self.app, 'monitor_tab'):
-                    for item_id in self.app.monitor_tab.rscm_tree.get_children():
-                        item = self.app.monitor_tab.rscm_tree.item(item_id)
-                        result['tree_status'].append({
-                            'rack_name': item['values'][0],
-                            'ip_address': item['values'][1],
-                            'status': item['values'][2]
-                        })
+                # Get the status the GUI published for each rack
+                for record in self.telemetry.racks():
+                    result['tree_status'].append({
+                        'rack_name': record['name'],
+                        'ip_address': record['address'],
+                        'status': record['status'],
+                        'readings': record['readings'],
+                        'last_power': record['last_power']
+                    })
                     
-                    # Get monitoring tasks
-                    if hasattr(self.app.monitor_tab, 'monitoring_tasks'):
-                        for key, value in self.app.monitor_tab.monitoring_tasks.items():
-                            result['monitoring_tasks'].append({
-                                'key': key,
-                                'stop_flag': value.get('stop_flag', False) if isinstance(value, dict) else 'unknown'
-                            })
+                    # Racks whose collector task is running
+                    if record['monitoring']:
+                        result['monitoring_tasks'].append({
+                            'key': record['rack_key'],
+                            'paused': record['paused']
+                        })
                     
-                    # Get rack tabs
-                    if hasattr(self.app.monitor_tab, 'rack_tabs'):
-                        for key in self.app.monitor_tab.rack_tabs.keys():
-                            result['rack_tabs'].append(key)
+                    # Racks with a history buffer
+                    if record['history'] is not None:
+                        result['rack_tabs'].append(record['rack_key'])
                 
                 return jsonify({
                     'success': True,
@@ -861,22 +582,23 @@ class WebMonitorServer:
                                     'started': str(monitor.get('started', 'unknown')),
                                     'save_enabled': monitor.get('save', False)
                                 })
+                    
+                    # Persistence queue depth and write latency
+                    if getattr(self.app.monitor_tab, 'persistence', None):
+                        status['persistence'] = self.app.monitor_tab.persistence.get_stats()
                 
                 # Check power_data directory
-                import os
+                from ..core.catalog import get_session_catalog
                 power_data_dir = os.path.join(os.getcwd(), 'power_data')
                 status['power_data_dir_path'] = power_data_dir
                 
                 if os.path.exists(power_data_dir):
                     status['power_data_dir_exists'] = True
                     
-                    # Get recent files
+                    # Get the 5 most recently modified files from the session catalog
                     if os.path.isdir(power_data_dir):
-                        files = [f for f in os.listdir(power_data_dir) if f.endswith('.csv')]
-                        if files:
-                            # Sort by modification time, newest first
-                            files.sort(key=lambda x: os.path.getmtime(os.path.join(power_data_dir, x)), reverse=True)
-                            status['recent_files'] = files[:5]  # Get 5 most recent files
+                        recent = get_session_catalog(power_data_dir).list_files(order="modified", limit=5)
+                        status['recent_files'] = [entry['name'] for entry in recent]
                 
                 return jsonify(status)
                 
@@ -901,10 +623,6 @@ class WebMonitorServer:
         def get_saved_data(filename):
             """Get CSV data for a specific file."""
             try:
-                import os
-                import csv
-                from datetime import datetime
-                
                 # Determine the power_data directory path
                 power_data_dir = os.path.join(os.getcwd(), 'power_data')
                 if not os.path.isdir(power_data_dir):
@@ -920,33 +638,34 @@ class WebMonitorServer:
                 if not os.path.isfile(filepath):
                     return jsonify({'success': False, 'error': 'File not found'})
                 
-                # Read the CSV file
-                timestamps = []
-                power_values = []
-                
-                with open(filepath, 'r', newline='') as csvfile:
-                    reader = csv.reader(csvfile)
-                    # Skip header if it exists
-                    try:
-                        header = next(reader)
-                    except StopIteration:
+                # Optional time range, as 'YYYY-MM-DD HH:MM:SS' local time
+                start = request.args.get('start')
+                end = request.args.get('end')
+                # Optional spacing between points in seconds; served from rollups when possible
+                resolution = request.args.get('resolution', type=float)
+                
+                # Sessions in the database are answered with an index range query
+                buckets = None
+                stored = self._read_stored_session(power_data_dir, filename, start, end, resolution)
+                if stored is not None:
+                    timestamps, power_values, buckets = stored
+                else:
+                    # Read the CSV file; only rows appended since the last request are parsed
+                    from ..core.csv_tail import get_tail_reader
+                    series = get_tail_reader().read(filepath, start, end)
+                    if series is None:
                         return jsonify({'success': False, 'error': 'Empty file'})
-                        
-                    for row in reader:
-                        try:
-                            if len(row) >= 2:
-                                # Try to parse timestamp
-                                timestamp_str = row[0]
-                                # Parse power value
-                                power = float(row[1])
-                                
-                                timestamps.append(timestamp_str)
-                                power_values.append(power)
-                        except Exception as e:
-                            continue
+                    timestamps, power_values = series
                 
                 # Calculate statistics
-                if power_values:
+                if buckets is not None:
+                    # Bucket means: the mode of the readings isn't known
+                    count = sum(buckets['count'])
+                    min_power = min(buckets['min']) if count else 0
+                    max_power = max(buckets['max']) if count else 0
+                    avg_power = sum(p * c for p, c in zip(power_values, buckets['count'])) / count if count else 0
+                    mode = None
+                elif power_values:
                     min_power = min(power_values)
                     max_power = max(power_values)
                     avg_power = sum(power_values) / len(power_values)
@@ -962,14 +681,16 @@ class WebMonitorServer:
                 return jsonify({
                     'success': True,
                     'filename': filename,
+                    'source': 'database' if stored is not None else 'csv',
                     'timestamps': timestamps,
                     'power': power_values,
+                    'buckets': buckets,
                     'stats': {
                         'min': min_power,
                         'max': max_power,
                         'avg': avg_power,
                         'mode': mode,
-                        'count': len(power_values)
+                        'count': sum(buckets['count']) if buckets is not None else len(power_values)
                     }
                 })
             
@@ -979,6 +700,86 @@ class WebMonitorServer:
                 logging.error(traceback.format_exc())
                 return jsonify({'success': False, 'error': str(e)})
         
+        @self.flask_app.route('/api/query')
+        def query_power_data():
+            """Get racks' readings across every saved session as one aligned series per rack."""
+            try:
+                from ..core.query import get_query_engine, AGGREGATIONS
+                power_data_dir = os.path.join(os.getcwd(), 'power_data')
+                if not os.path.isdir(power_data_dir):
+                    return jsonify({'success': False, 'error': 'Power data directory not found'})
+                
+                # Comma-separated rack names; every rack with saved data if omitted
+                racks = request.args.get('racks')
+                racks = [name.strip() for name in racks.split(',') if name.strip()] if racks else None
+                start = request.args.get('start')
+                end = request.args.get('end')
+                resolution = request.args.get('resolution', type=float)
+                agg = request.args.get('agg', 'mean')
+                if agg not in AGGREGATIONS:
+                    return jsonify({'success': False, 'error': f'Unknown aggregation: {agg}'})
+                
+                frame = get_query_engine(power_data_dir).query(racks, start, end, resolution, agg)
+                # NaN isn't valid JSON; missing readings are null
+                values = frame.astype(object).where(frame.notna(), None)
+                series = {rack: values[rack].tolist() for rack in frame.columns}
+                return jsonify({
+                    'success': True,
+                    'timestamps': frame.index.strftime('%Y-%m-%d %H:%M:%S').tolist(),
+                    'series': series,
+                    'resolution': resolution,
+                    'agg': agg
+                })
+            except Exception as e:
+                logging.error(f"Error in query_power_data: {str(e)}")
+                logging.error(traceback.format_exc())
+                return jsonify({'success': False, 'error': str(e)})
+        
+        @self.flask_app.route('/api/quantiles')
+        def quantile_power_data():
+            """Get percentiles of racks' stored readings, per rack and over all of them."""
+            try:
+                from ..core.sqlite_store import get_sqlite_store, SKETCH_TIERS
+                from ..core.sketch import DEFAULT_QUANTILES
+                store = get_sqlite_store(os.path.join(os.getcwd(), 'power_data'), create=False)
+                if store is None:
+                    return jsonify({'success': False, 'error': 'No stored readings'})
+                
+                # Comma-separated rack names; every stored rack if omitted
+                racks = request.args.get('racks')
+                racks = [name.strip() for name in racks.split(',') if name.strip()] if racks else None
+                start = request.args.get('start')
+                end = request.args.get('end')
+                start = datetime.datetime.fromisoformat(start) if start else None
+                end = datetime.datetime.fromisoformat(end) if end else None
+                # Comma-separated quantiles in [0, 1]
+                quantiles = request.args.get('q')
+                quantiles = [float(q) for q in quantiles.split(',')] if quantiles else list(DEFAULT_QUANTILES)
+                if any(not 0 <= q <= 1 for q in quantiles):
+                    return jsonify({'success': False, 'error': 'Quantiles must be between 0 and 1'})
+                
+                result = store.quantiles(racks, start, end, quantiles)
+                result['success'] = True
+                
+                # With a tier, also the percentiles of each rollup bucket
+                tier = request.args.get('tier', type=int)
+                if tier is not None:
+                    if tier not in SKETCH_TIERS:
+                        return jsonify({'success': False, 'error': f'No bucket percentiles for tier: {tier}'})
+                    frame = store.read_rollup_quantiles(racks, start, end, tier, quantiles)
+                    result['buckets'] = {
+                        rack: {
+                            'timestamps': group['Timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist(),
+                            **{label: group[label].tolist() for label in frame.columns[2:]}
+                        }
+                        for rack, group in frame.groupby('Rack', observed=True)
+                    }
+                return jsonify(result)
+            except Exception as e:
+                logging.error(f"Error in quantile_power_data: {str(e)}")
+                logging.error(traceback.format_exc())
+                return jsonify({'success': False, 'error': str(e)})
+        
         # Add this new route inside the setup_routes method
         @self.flask_app.route('/api/rscm/start-monitoring', methods=['POST'])
         def start_rack_monitoring():
@@ -1030,7 +831,8 @@ class WebMonitorServer:
                                 # Try each possible signature
                                 try:
                                     # Try with explicit save=True parameter
-                                    monitor_method(
+                                    self._call_on_gui_thread(
+                                        monitor_method,
                                         rack_name=rack_name,
                                         rack_address=rack_address,
                                         interval_minutes=interval,
@@ -1039,7 +841,8 @@ class WebMonitorServer:
                                     )
                                 except TypeError:
                                     # If that fails, try without the save parameter
-                                    monitor_method(
+                                    self._call_on_gui_thread(
+                                        monitor_method,
                                         rack_name=rack_name,
                                         rack_address=rack_address,
                                         interval_minutes=interval,
@@ -1093,6 +896,81 @@ class WebMonitorServer:
                     'message': f'Error: {str(e)}'
                 })
         
+    def _call_on_gui_thread(self, func, *args, timeout=30, **kwargs):
+        """Run a function on the Tk thread and wait for its result.
+        
+        Routes run on the server's threads, and Tk widgets may only be used
+        from the thread running the main loop, so changes to racks are handed
+        to it. Exceptions raised by the function are raised here.
+        
+        Args:
+            func: Function to run
+            timeout: Seconds to wait for the Tk thread
+        """
+        root = getattr(self.app, 'root', None)
+        if root is None or threading.current_thread() is threading.main_thread():
+            return func(*args, **kwargs)
+        
+        future = concurrent.futures.Future()
+        
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+        
+        root.after(0, run)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            # Don't run it later, after the route has given up
+            future.cancel()
+            raise
+    
+    def _read_stored_session(self, power_data_dir, filename, start=None, end=None, resolution=None):
+        """Read a session CSV's readings from the SQLite database.
+        
+        Reads go through their own connection, so they never wait for the
+        persistence writer. With a resolution of a minute or more, points are
+        the means of the coarsest rollup buckets that satisfy it.
+        
+        Returns:
+            Tuple of (timestamp strings, power values, buckets) where buckets
+            is None for raw readings or a dict of per-point min, max and count
+            lists, or None if the session isn't in the database
+        """
+        try:
+            from ..core.sqlite_store import get_sqlite_store
+            from ..core.timeseries import to_epoch_seconds, from_epoch_seconds
+            from ..core.rollups import choose_tier
+            
+            store = get_sqlite_store(power_data_dir, create=False)
+            if store is None:
+                return None
+            session = store.find_session(filename, power_data_dir)
+            if session is None or session['folder'] != os.path.abspath(power_data_dir):
+                return None
+            
+            if start or end:
+                first = int(to_epoch_seconds([start])[0]) if start else session['first_ts']
+                last = int(to_epoch_seconds([end])[0]) if end else session['last_ts']
+                session = dict(session, first_ts=first, last_ts=last)
+            
+            if resolution and choose_tier(resolution) and session['first_ts'] is not None:
+                df = store.read_resampled([session['rack']], from_epoch_seconds([session['first_ts']])[0],
+                                          from_epoch_seconds([session['last_ts']])[0], resolution)
+                buckets = {'min': df['Min'].tolist(), 'max': df['Max'].tolist(), 'count': df['Count'].tolist()}
+                return df['Timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist(), df['PowerWatts'].tolist(), buckets
+            
+            epoch, watts = store.read_session(session)
+            timestamps = from_epoch_seconds(epoch).strftime('%Y-%m-%d %H:%M:%S').tolist()
+            return timestamps, watts.tolist(), None
+        except Exception as e:
+            logging.error(f"Error reading {filename} from the database: {str(e)}")
+            return None
+    
     def start(self):
         """Start the web server in a separate thread."""
         if self.is_running:
@@ -0,0 +1,5 @@
+"""
+Simulated RSCM farm for exercising the collector without real hardware
+"""
+from .farm import RSCMFarm, FarmProfile
+from .harness import run_collector_benchmark
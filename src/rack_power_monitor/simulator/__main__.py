@@ -0,0 +1,132 @@
+"""
+Command line entry point for the simulated RSCM farm.
+
+    python -m rack_power_monitor.simulator serve --count 1000
+    python -m rack_power_monitor.simulator bench --count 1000 --cycles 3
+"""
+import sys
+import json
+import asyncio
+import logging
+import argparse
+
+from .farm import RSCMFarm, FarmProfile, AUTH_MODES, WAVEFORMS, create_self_signed_context
+from .harness import run_collector_benchmark
+
+
+def _build_parser():
+    """Create the argument parser."""
+    parser = argparse.ArgumentParser(prog="rack_power_monitor.simulator",
+                                     description="Simulated RSCM farm for load testing the collector")
+    parser.add_argument("--log-level", default="WARNING", help="Logging level (default: WARNING)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("serve", "Serve a farm until interrupted"),
+                            ("bench", "Run the collector against a farm and print JSON results")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--count", type=int, default=100, help="Number of virtual RSCMs")
+        sub.add_argument("--port", type=int, default=8080, help="Port (first port in multi-port mode)")
+        sub.add_argument("--mode", choices=("single-port", "multi-port"), default="single-port")
+        sub.add_argument("--latency", default="fixed:5", help="Latency spec in ms, e.g. lognormal:20:0.5")
+        sub.add_argument("--error-rate", type=float, default=0.0, help="Fraction of HTTP 500 responses")
+        sub.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of hanging requests")
+        sub.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of dropped connections")
+        sub.add_argument("--hang-seconds", type=float, default=30.0, help="How long hanging requests stall")
+        sub.add_argument("--auth-mode", choices=AUTH_MODES, default="basic")
+        sub.add_argument("--username", default="root")
+        sub.add_argument("--password", default="password")
+        sub.add_argument("--waveform", choices=WAVEFORMS, default="sine")
+        sub.add_argument("--base-watts", type=float, default=8000.0)
+        sub.add_argument("--amplitude-watts", type=float, default=1500.0)
+        sub.add_argument("--period-seconds", type=float, default=600.0)
+        sub.add_argument("--shelves", type=int, default=1, help="Power shelves per RSCM")
+        sub.add_argument("--psus", type=int, default=0, help="Power supplies per shelf")
+        sub.add_argument("--seed", type=int, default=None)
+        sub.add_argument("--tls", action="store_true", help="Serve HTTPS with a self-signed certificate")
+
+    bench = subparsers.choices["bench"]
+    bench.add_argument("--cycles", type=int, default=3)
+    bench.add_argument("--concurrency", type=int, default=32, help="max_concurrent_polls")
+    bench.add_argument("--deadline", type=float, default=60.0, help="Cycle deadline in seconds")
+    bench.add_argument("--collection-mode", choices=("single", "shelves"), default="single")
+    bench.add_argument("--timeout-seconds", type=float, default=10.0, help="Per-request timeout")
+    bench.add_argument("--max-connections", type=int, default=100)
+    bench.add_argument("--output", help="Write the JSON results to this file")
+    return parser
+
+
+def _farm_from_args(args):
+    """Create a farm from parsed arguments."""
+    profile = FarmProfile(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        drop_rate=args.drop_rate,
+        hang_seconds=args.hang_seconds,
+        auth_mode=args.auth_mode,
+        username=args.username,
+        password=args.password,
+        waveform=args.waveform,
+        base_watts=args.base_watts,
+        amplitude_watts=args.amplitude_watts,
+        period_seconds=args.period_seconds,
+        shelves=args.shelves,
+        psus_per_shelf=args.psus,
+        seed=args.seed
+    )
+    return RSCMFarm(args.count, profile, port=args.port, mode=args.mode)
+
+
+async def _serve(farm, ssl_context=None):
+    """Serve until cancelled."""
+    await farm.start(ssl_context)
+    print(f"Serving {farm.count} simulated RSCMs ({farm.mode}); first address {farm.addresses[0]}")
+    scheme = "https" if ssl_context else "http"
+    print(f"Stats: {scheme}://127.0.0.1:{farm.port}/sim/stats")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await farm.stop()
+
+
+def main(argv=None):
+    """Run the simulator command line."""
+    args = _build_parser().parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING),
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+    farm = _farm_from_args(args)
+    ssl_context = create_self_signed_context() if args.tls else None
+
+    if args.command == "serve":
+        try:
+            asyncio.run(_serve(farm, ssl_context))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    farm.start_in_thread(ssl_context)
+    try:
+        results = run_collector_benchmark(
+            farm,
+            cycles=args.cycles,
+            max_concurrent_polls=args.concurrency,
+            cycle_deadline_seconds=args.deadline,
+            collection_mode=args.collection_mode,
+            api_settings={
+                'timeout_seconds': args.timeout_seconds,
+                'max_connections': args.max_connections
+            }
+        )
+    finally:
+        farm.stop_thread()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,533 @@
+"""
+Simulated RSCM farm.
+Serves the Redfish PowerEquipment tree for many virtual RSCMs from one aiohttp
+server, with configurable latency, failures, auth modes and power waveforms.
+"""
+import os
+import ssl
+import math
+import time
+import zlib
+import base64
+import random
+import asyncio
+import logging
+import datetime
+import tempfile
+import threading
+
+from aiohttp import web
+
+logger = logging.getLogger("power_monitor")
+
+SHELVES_PATH = "/redfish/v1/PowerEquipment/PowerShelves"
+
+# Auth modes a virtual RSCM can enforce
+AUTH_MODES = ("none", "basic", "headers")
+
+# Power waveforms a virtual RSCM can follow
+WAVEFORMS = ("constant", "sine", "square", "sawtooth", "noise")
+
+# Nominal line voltage used to derive per-phase currents
+LINE_VOLTAGE = 230.0
+
+
+def parse_latency(spec):
+    """Parse a latency spec into a function returning a delay in seconds.
+
+    Specs are in milliseconds:
+        'fixed:20'          always 20 ms
+        'uniform:5:50'      uniform between 5 and 50 ms
+        'normal:20:5'       normal with mean 20 ms and std dev 5 ms
+        'lognormal:20:0.5'  log-normal with median 20 ms and sigma 0.5 (long tail)
+        'exp:20'            exponential with mean 20 ms
+    """
+    if callable(spec):
+        return spec
+
+    parts = str(spec).split(':')
+    try:
+        kind, args = parts[0], [float(p) for p in parts[1:]]
+        if kind == 'fixed':
+            delay = args[0] / 1000.0
+            return lambda rng: delay
+        if kind == 'uniform':
+            low, high = args[0] / 1000.0, args[1] / 1000.0
+            return lambda rng: rng.uniform(low, high)
+        if kind == 'normal':
+            mean, std = args[0] / 1000.0, args[1] / 1000.0
+            return lambda rng: max(0.0, rng.gauss(mean, std))
+        if kind == 'lognormal':
+            mu, sigma = math.log(args[0] / 1000.0), args[1]
+            return lambda rng: rng.lognormvariate(mu, sigma)
+        if kind == 'exp':
+            rate = 1000.0 / args[0]
+            return lambda rng: rng.expovariate(rate)
+    except (IndexError, ValueError, ZeroDivisionError):
+        pass
+    raise ValueError(f"Invalid latency spec: {spec}")
+
+
+def create_self_signed_context():
+    """Create a server SSL context with a throwaway self-signed certificate, like a real RSCM."""
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "simulated-rscm")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=30))
+        .sign(key, hashes.SHA256())
+    )
+
+    # ssl only loads certificates from files
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cert_path = os.path.join(temp_dir, "cert.pem")
+        key_path = os.path.join(temp_dir, "key.pem")
+        with open(cert_path, "wb") as f:
+            f.write(cert.public_bytes(serialization.Encoding.PEM))
+        with open(key_path, "wb") as f:
+            f.write(key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.TraditionalOpenSSL,
+                serialization.NoEncryption()
+            ))
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(cert_path, key_path)
+    return context
+
+
+class FarmProfile:
+    """Behaviour shared by every virtual RSCM in a farm."""
+
+    def __init__(self, latency="fixed:5", error_rate=0.0, timeout_rate=0.0, drop_rate=0.0,
+                 hang_seconds=30.0, auth_mode="basic", username="root", password="password",
+                 waveform="sine", base_watts=8000.0, amplitude_watts=1500.0, period_seconds=600.0,
+                 shelves=1, psus_per_shelf=0, failed_shelves=(), seed=None):
+        """Initialize the profile.
+
+        Args:
+            latency: Latency spec (see parse_latency)
+            error_rate: Fraction of requests answered with HTTP 500
+            timeout_rate: Fraction of requests that hang for hang_seconds
+            drop_rate: Fraction of requests whose connection is dropped
+            hang_seconds: How long a hanging request stalls
+            auth_mode: 'none', 'basic' (valid Authorization header) or 'headers'
+                (Authorization plus Accept: application/json)
+            username: Expected username
+            password: Expected password
+            waveform: Power waveform, one of WAVEFORMS
+            base_watts: Mean rack power
+            amplitude_watts: Waveform amplitude (std dev for 'noise')
+            period_seconds: Waveform period
+            shelves: Power shelves per RSCM
+            psus_per_shelf: Power supplies per shelf
+            failed_shelves: Shelf numbers whose power meter answers HTTP 500
+            seed: Random seed for reproducible runs
+        """
+        if auth_mode not in AUTH_MODES:
+            raise ValueError(f"Unknown auth mode: {auth_mode}")
+        if waveform not in WAVEFORMS:
+            raise ValueError(f"Unknown waveform: {waveform}")
+
+        self.latency = latency
+        self.latency_fn = parse_latency(latency)
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.drop_rate = drop_rate
+        self.hang_seconds = hang_seconds
+        self.auth_mode = auth_mode
+        self.username = username
+        self.password = password
+        self.waveform = waveform
+        self.base_watts = base_watts
+        self.amplitude_watts = amplitude_watts
+        self.period_seconds = period_seconds
+        self.shelves = max(1, int(shelves))
+        self.psus_per_shelf = max(0, int(psus_per_shelf))
+        self.failed_shelves = set(failed_shelves)
+        self.seed = seed
+
+    @classmethod
+    def from_dict(cls, settings):
+        """Create a profile from a dictionary of keyword arguments."""
+        return cls(**(settings or {}))
+
+    def as_dict(self):
+        """Return the profile settings."""
+        return {
+            'latency': self.latency if isinstance(self.latency, str) else 'custom',
+            'error_rate': self.error_rate,
+            'timeout_rate': self.timeout_rate,
+            'drop_rate': self.drop_rate,
+            'hang_seconds': self.hang_seconds,
+            'auth_mode': self.auth_mode,
+            'waveform': self.waveform,
+            'base_watts': self.base_watts,
+            'amplitude_watts': self.amplitude_watts,
+            'period_seconds': self.period_seconds,
+            'shelves': self.shelves,
+            'psus_per_shelf': self.psus_per_shelf,
+            'failed_shelves': sorted(self.failed_shelves)
+        }
+
+
+class VirtualRSCM:
+    """One simulated RSCM."""
+
+    def __init__(self, address, profile, rng):
+        """Initialize the virtual RSCM."""
+        self.address = address
+        self.profile = profile
+        self.rng = rng
+        # Deterministic phase so racks don't all peak together
+        self.phase = zlib.crc32(address.encode('utf-8')) / 2 ** 32
+        self.requests = 0
+
+    def power(self, now=None):
+        """Current rack power in watts."""
+        profile = self.profile
+        now = time.time() if now is None else now
+        x = (now / profile.period_seconds + self.phase) % 1.0
+
+        if profile.waveform == 'constant':
+            value = profile.base_watts
+        elif profile.waveform == 'sine':
+            value = profile.base_watts + profile.amplitude_watts * math.sin(2 * math.pi * x)
+        elif profile.waveform == 'square':
+            value = profile.base_watts + (profile.amplitude_watts if x < 0.5 else -profile.amplitude_watts)
+        elif profile.waveform == 'sawtooth':
+            value = profile.base_watts + profile.amplitude_watts * (2 * x - 1)
+        else:
+            value = self.rng.gauss(profile.base_watts, profile.amplitude_watts)
+        return round(max(0.0, value), 2)
+
+    def shelf_power(self, now=None):
+        """Power per shelf in watts."""
+        return round(self.power(now) / self.profile.shelves, 2)
+
+
+class RSCMFarm:
+    """aiohttp server simulating many RSCMs.
+
+    In 'single-port' mode every RSCM gets its own loopback address
+    (127.0.0.1, 127.0.0.2, ...) on the same port and requests are routed by
+    the Host header. Linux routes all of 127.0.0.0/8 to the loopback
+    interface; on other platforms use 'multi-port' mode, where every RSCM
+    listens on 127.0.0.1 with its own port.
+    """
+
+    def __init__(self, count, profile=None, host="127.0.0.1", port=8080, mode="single-port", bind_host=None):
+        """Initialize the farm.
+
+        Args:
+            count: Number of virtual RSCMs
+            profile: FarmProfile shared by every RSCM
+            host: Address collectors use (multi-port mode)
+            port: Listening port, or first port in multi-port mode
+            mode: 'single-port' or 'multi-port'
+            bind_host: Interface to bind; defaults to 0.0.0.0 in single-port
+                mode (so every 127.x address is accepted) and to host in
+                multi-port mode
+        """
+        if mode not in ("single-port", "multi-port"):
+            raise ValueError(f"Unknown farm mode: {mode}")
+
+        self.count = int(count)
+        self.profile = profile or FarmProfile()
+        self.host = host
+        self.port = int(port)
+        self.mode = mode
+        # Binding 0.0.0.0 is needed to accept every 127.x address on one port
+        self.bind_host = bind_host or ("0.0.0.0" if mode == "single-port" else host)
+
+        rng = random.Random(self.profile.seed)
+        self.rscms = {}
+        for address in self._generate_addresses():
+            self.rscms[address] = VirtualRSCM(address, self.profile, random.Random(rng.random()))
+
+        self._expected_auth = "Basic " + base64.b64encode(
+            f"{self.profile.username}:{self.profile.password}".encode()
+        ).decode()
+
+        self.stats = {
+            'requests': 0,
+            'active': 0,
+            'peak_active': 0,
+            'errors': 0,
+            'hung': 0,
+            'dropped': 0,
+            'unauthorized': 0,
+            'unknown_host': 0
+        }
+
+        self._runner = None
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def _generate_addresses(self):
+        """Generate the address of every virtual RSCM."""
+        if self.mode == "multi-port":
+            for i in range(self.count):
+                yield f"{self.host}:{self.port + i}"
+            return
+
+        generated, n = 0, 0
+        while generated < self.count:
+            n += 1
+            octets = ((n >> 16) & 255, (n >> 8) & 255, n & 255)
+            if octets[2] in (0, 255):
+                continue
+            if n >= 1 << 24:
+                raise ValueError("Too many RSCMs for the 127.0.0.0/8 range")
+            generated += 1
+            yield f"127.{octets[0]}.{octets[1]}.{octets[2]}:{self.port}"
+
+    @property
+    def addresses(self):
+        """Addresses of every virtual RSCM, as a collector would use them."""
+        return list(self.rscms.keys())
+
+    def racks(self, prefix="SIM"):
+        """Rack configuration for a RackPowerMonitor ({name: {address, username, password}})."""
+        return {
+            f"{prefix}{i:05d}": {
+                'address': address,
+                'username': self.profile.username,
+                'password': self.profile.password
+            }
+            for i, address in enumerate(self.rscms)
+        }
+
+    # ----- request handling -----
+
+    def _lookup(self, request):
+        """Find the virtual RSCM a request was addressed to."""
+        rscm = self.rscms.get(request.host)
+        if rscm is None and self.mode == "multi-port":
+            sockname = request.transport.get_extra_info('sockname') if request.transport else None
+            if sockname:
+                rscm = self.rscms.get(f"{self.host}:{sockname[1]}")
+        return rscm
+
+    def _authorized(self, request):
+        """Check the request against the farm's auth mode."""
+        if self.profile.auth_mode == "none":
+            return True
+        if request.headers.get("Authorization") != self._expected_auth:
+            return False
+        if self.profile.auth_mode == "headers":
+            return "application/json" in request.headers.get("Accept", "")
+        return True
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        """Route to the virtual RSCM and inject latency, failures and auth checks."""
+        if request.path.startswith("/sim/"):
+            return await handler(request)
+
+        stats = self.stats
+        stats['requests'] += 1
+        rscm = self._lookup(request)
+        if rscm is None:
+            stats['unknown_host'] += 1
+            return web.Response(status=404, text=f"Unknown RSCM {request.host}")
+
+        stats['active'] += 1
+        stats['peak_active'] = max(stats['peak_active'], stats['active'])
+        try:
+            rscm.requests += 1
+            rng = rscm.rng
+            profile = self.profile
+
+            delay = profile.latency_fn(rng)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            roll = rng.random()
+            if roll < profile.drop_rate:
+                stats['dropped'] += 1
+                if request.transport is not None:
+                    request.transport.abort()
+                # The connection is gone; this response is never delivered
+                return web.Response(status=500)
+            roll -= profile.drop_rate
+            if roll < profile.timeout_rate:
+                stats['hung'] += 1
+                await asyncio.sleep(profile.hang_seconds)
+            roll -= profile.timeout_rate
+            if roll < profile.error_rate:
+                stats['errors'] += 1
+                return web.json_response({"error": "Simulated failure"}, status=500)
+
+            if not self._authorized(request):
+                stats['unauthorized'] += 1
+                return web.Response(status=401)
+
+            request['rscm'] = rscm
+            return await handler(request)
+        finally:
+            stats['active'] -= 1
+
+    def _shelf_id(self, request):
+        """Validate the shelf id in the path."""
+        shelf_id = request.match_info['shelf']
+        if not shelf_id.isdigit() or not 1 <= int(shelf_id) <= self.profile.shelves:
+            raise web.HTTPNotFound()
+        return int(shelf_id)
+
+    async def _handle_shelves(self, request):
+        """PowerShelves collection."""
+        members = [{"@odata.id": f"{SHELVES_PATH}/{i}"} for i in range(1, self.profile.shelves + 1)]
+        return web.json_response({
+            "@odata.id": SHELVES_PATH,
+            "Members": members,
+            "Members@odata.count": len(members)
+        })
+
+    async def _handle_shelf(self, request):
+        """A single power shelf."""
+        shelf_id = self._shelf_id(request)
+        shelf = {"@odata.id": f"{SHELVES_PATH}/{shelf_id}", "Id": str(shelf_id), "Status": {"Health": "OK"}}
+        if self.profile.psus_per_shelf:
+            shelf["PowerSupplies"] = {"@odata.id": f"{SHELVES_PATH}/{shelf_id}/PowerSupplies"}
+        return web.json_response(shelf)
+
+    async def _handle_power_supplies(self, request):
+        """PowerSupplies collection of a shelf."""
+        shelf_id = self._shelf_id(request)
+        members = [
+            {"@odata.id": f"{SHELVES_PATH}/{shelf_id}/PowerSupplies/{i}"}
+            for i in range(1, self.profile.psus_per_shelf + 1)
+        ]
+        return web.json_response({"Members": members, "Members@odata.count": len(members)})
+
+    async def _handle_power_supply(self, request):
+        """A single power supply."""
+        shelf_id = self._shelf_id(request)
+        psu_id = request.match_info['psu']
+        if not psu_id.isdigit() or not 1 <= int(psu_id) <= self.profile.psus_per_shelf:
+            raise web.HTTPNotFound()
+
+        input_watts = request['rscm'].shelf_power() / self.profile.psus_per_shelf
+        return web.json_response({
+            "@odata.id": f"{SHELVES_PATH}/{shelf_id}/PowerSupplies/{psu_id}",
+            "Id": psu_id,
+            "InputPowerWatts": {"Reading": round(input_watts, 2)},
+            "OutputPowerWatts": {"Reading": round(input_watts * 0.94, 2)},
+            "Status": {"Health": "OK"}
+        })
+
+    async def _handle_power_meter(self, request):
+        """Microsoft OEM power meter of a shelf."""
+        if self._shelf_id(request) in self.profile.failed_shelves:
+            return web.json_response({"error": "Simulated shelf failure"}, status=500)
+        watts = request['rscm'].shelf_power()
+        phase_amps = round(watts / 3 / LINE_VOLTAGE, 3)
+        return web.json_response({
+            "TotalInputPowerInWatts": watts,
+            "Phases": [
+                {"MemberId": f"L{i}", "VoltageVolts": LINE_VOLTAGE, "CurrentAmps": phase_amps}
+                for i in (1, 2, 3)
+            ]
+        })
+
+    async def _handle_stats(self, request):
+        """Farm statistics."""
+        return web.json_response(self.get_stats())
+
+    def _build_app(self):
+        """Create the aiohttp application."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get(SHELVES_PATH, self._handle_shelves)
+        app.router.add_get(SHELVES_PATH + "/{shelf}", self._handle_shelf)
+        app.router.add_get(SHELVES_PATH + "/{shelf}/PowerSupplies", self._handle_power_supplies)
+        app.router.add_get(SHELVES_PATH + "/{shelf}/PowerSupplies/{psu}", self._handle_power_supply)
+        app.router.add_get(SHELVES_PATH + "/{shelf}/Oem/Microsoft/PowerMeter", self._handle_power_meter)
+        app.router.add_get("/sim/stats", self._handle_stats)
+        return app
+
+    # ----- lifecycle -----
+
+    async def start(self, ssl_context=None):
+        """Start serving on the running event loop."""
+        self._runner = web.AppRunner(self._build_app(), access_log=None)
+        await self._runner.setup()
+
+        if self.mode == "single-port":
+            ports = [self.port]
+        else:
+            ports = [self.port + i for i in range(self.count)]
+
+        for port in ports:
+            site = web.TCPSite(self._runner, self.bind_host, port, ssl_context=ssl_context,
+                               backlog=4096, reuse_address=True)
+            await site.start()
+
+        logger.info(f"Simulated RSCM farm serving {self.count} RSCMs ({self.mode}, port {self.port})")
+
+    async def stop(self):
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+            logger.info("Simulated RSCM farm stopped")
+
+    def start_in_thread(self, ssl_context=None, timeout=30):
+        """Run the farm on its own event loop in a background thread.
+
+        Keeps the simulated RSCMs from competing with the collector for its loop.
+        """
+        self._ready.clear()
+        self._loop = asyncio.new_event_loop()
+        error = []
+
+        def _run():
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self.start(ssl_context))
+            except Exception as e:
+                error.append(e)
+                self._ready.set()
+                return
+            self._ready.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.stop())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=_run, name="rscm-farm", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=timeout)
+        if error:
+            raise error[0]
+
+    def stop_thread(self, timeout=10):
+        """Stop a farm started with start_in_thread."""
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=timeout)
+            self._thread = None
+            self._loop = None
+
+    def get_stats(self):
+        """Return a snapshot of the request counters."""
+        stats = dict(self.stats)
+        stats['rscms'] = self.count
+        stats['profile'] = self.profile.as_dict()
+        return stats
+
+    def reset_stats(self):
+        """Reset the request counters (active requests are kept)."""
+        for key in self.stats:
+            if key != 'active':
+                self.stats[key] = 0
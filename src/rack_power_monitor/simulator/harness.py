@@ -0,0 +1,109 @@
+"""
+Harness that runs the real collector against a simulated RSCM farm.
+"""
+import time
+import shutil
+import logging
+import tempfile
+
+from ..core.collector import CollectorService
+from ..core.monitor import RackPowerMonitor
+from ..utils.api_client import apply_api_settings, get_negotiation_cache, get_shelf_cache
+from ..utils.circuit_breaker import get_health_tracker
+from ..utils.http_pool import get_connection_pool
+
+logger = logging.getLogger("power_monitor")
+
+
+def reset_client_state():
+    """Forget negotiated protocols, discovered shelves and host health.
+
+    Call between runs so one run's failures don't leak into the next.
+    """
+    get_negotiation_cache().clear()
+    get_shelf_cache().clear()
+    get_health_tracker().reset()
+
+
+def run_collector_benchmark(farm, cycles=3, max_concurrent_polls=32, cycle_deadline_seconds=60.0,
+                            collection_mode="single", api_settings=None, data_dir=None, racks=None):
+    """Poll every RSCM of a running farm with the real collector.
+
+    Cycles run back to back on a CollectorService loop, exactly as the GUI
+    schedules them, and readings are persisted to CSV as in production.
+
+    Args:
+        farm: A started RSCMFarm
+        cycles: Number of polling cycles to run
+        max_concurrent_polls: Semaphore size for each cycle
+        cycle_deadline_seconds: Deadline for each cycle
+        collection_mode: 'single' or 'shelves'
+        api_settings: Optional 'api' config block applied before the run
+        data_dir: Where readings are written; a temporary folder if omitted
+        racks: Optional subset of farm.racks() to poll
+
+    Returns:
+        Dictionary with per-cycle stats, connection pool and farm counters
+    """
+    if api_settings:
+        apply_api_settings(api_settings)
+    reset_client_state()
+
+    temp_dir = None
+    if data_dir is None:
+        data_dir = temp_dir = tempfile.mkdtemp(prefix="rpm-sim-")
+
+    monitor = RackPowerMonitor(
+        max_concurrent_polls=max_concurrent_polls,
+        cycle_deadline_seconds=cycle_deadline_seconds,
+        collection_mode=collection_mode
+    )
+    monitor.racks = racks or farm.racks()
+    monitor.data_dir = data_dir
+    monitor.reset_session()
+
+    async def _run_cycles():
+        results = []
+        for _ in range(cycles):
+            start = time.perf_counter()
+            await monitor._poll_cycle(cycle_deadline_seconds)
+            elapsed = time.perf_counter() - start
+
+            stats = dict(monitor.last_cycle_stats)
+            stats['wall_seconds'] = elapsed
+            stats['readings_per_second'] = stats.get('succeeded', 0) / elapsed if elapsed > 0 else 0.0
+            results.append(stats)
+            logger.info(f"Simulated cycle: {stats}")
+        return results
+
+    pool_before = get_connection_pool().get_stats()
+    farm_before = farm.get_stats()
+
+    collector = CollectorService()
+    try:
+        cycle_results = collector.submit(_run_cycles()).result()
+    finally:
+        collector.shutdown()
+        monitor.flush_data(close=True)
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    pool_after = get_connection_pool().get_stats()
+    farm_after = farm.get_stats()
+
+    return {
+        'racks': len(monitor.racks),
+        'collection_mode': collection_mode,
+        'max_concurrent_polls': max_concurrent_polls,
+        'cycles': cycle_results,
+        'pool': {
+            key: pool_after[key] - pool_before.get(key, 0)
+            for key in ('requests', 'connections_created', 'connections_reused')
+        },
+        'farm': {
+            'requests': farm_after['requests'] - farm_before['requests'],
+            'peak_active': farm_after['peak_active'],
+            'profile': farm_after['profile']
+        },
+        'unavailable_racks': len(monitor.unavailable_racks)
+    }
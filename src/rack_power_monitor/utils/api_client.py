@@ -1,138 +1,466 @@
 import aiohttp
+import base64
 import logging
-import ssl
 import asyncio
-from datetime import datetime
+import threading
+
+from .http_pool import get_connection_pool
+from .circuit_breaker import get_health_tracker
 
 logger = logging.getLogger("power_monitor")
 
+# Redfish endpoint that reports the rack power draw
+POWER_METER_ENDPOINT = "/redfish/v1/PowerEquipment/PowerShelves/1/Oem/Microsoft/PowerMeter"
+
+# Redfish collection listing every power shelf in the rack
+POWER_SHELVES_ENDPOINT = "/redfish/v1/PowerEquipment/PowerShelves"
+
+# Per-shelf power meter, relative to the shelf resource
+SHELF_POWER_METER_SUFFIX = "/Oem/Microsoft/PowerMeter"
+
+# Default RSCM Redfish port
+DEFAULT_PORT = 8080
+
+# Variants tried, in order, when negotiating with an RSCM we haven't talked to yet
+SCHEMES = ("https", "http")
+AUTH_MODES = ("header", "basic")
+
+# Per-request timeout, set from the 'api' config block by apply_api_settings
+_request_timeout_seconds = 10
+
+
+class NegotiationCache:
+    """Remembers which scheme, port and auth mode worked for each RSCM address.
+
+    A cached entry is reused for every poll until a request with it fails,
+    at which point it is invalidated and the next poll negotiates again.
+    """
+
+    def __init__(self):
+        """Initialize the cache."""
+        self._entries = {}  # address -> {'scheme', 'port', 'auth_mode'}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, address):
+        """Get the cached negotiation for an address, or None."""
+        with self._lock:
+            entry = self._entries.get(address)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def store(self, address, scheme, port, auth_mode):
+        """Remember the variant that worked for an address."""
+        with self._lock:
+            self._entries[address] = {'scheme': scheme, 'port': port, 'auth_mode': auth_mode}
+        logger.debug(f"Negotiated {scheme}://{address} port {port} with {auth_mode} auth")
+
+    def invalidate(self, address):
+        """Forget the negotiation for an address."""
+        with self._lock:
+            if self._entries.pop(address, None) is not None:
+                self.invalidations += 1
+                logger.info(f"Invalidated negotiated protocol for {address}")
+
+    def clear(self):
+        """Forget all negotiations."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        """Return cache counters and entry count."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations
+            }
+
+
+# Process-wide negotiation cache shared by every client
+_negotiation_cache = NegotiationCache()
+
+
+def get_negotiation_cache():
+    """Get the process-wide negotiation cache."""
+    return _negotiation_cache
+
+
+class ShelfDiscoveryCache:
+    """Remembers the Redfish resource paths of every shelf and PSU of an RSCM.
+
+    Discovery walks the PowerEquipment tree once; after that each cycle only
+    fetches the cached leaf resources. An entry is dropped when one of its
+    paths stops resolving, so the next cycle rediscovers the tree.
+    """
+
+    def __init__(self):
+        """Initialize the cache."""
+        self._entries = {}  # address -> list of shelf descriptors
+        self._lock = threading.Lock()
+
+    def get(self, address):
+        """Get the cached shelf descriptors for an address, or None."""
+        with self._lock:
+            return self._entries.get(address)
+
+    def store(self, address, shelves):
+        """Remember the discovered shelves for an address."""
+        with self._lock:
+            self._entries[address] = shelves
+
+    def invalidate(self, address):
+        """Forget the discovered shelves for an address."""
+        with self._lock:
+            self._entries.pop(address, None)
+
+    def clear(self):
+        """Forget all discovered shelves."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide shelf discovery cache shared by every client
+_shelf_cache = ShelfDiscoveryCache()
+
+
+def get_shelf_cache():
+    """Get the process-wide shelf discovery cache."""
+    return _shelf_cache
+
+
+def flatten_metrics(data, prefix=""):
+    """Flatten the numeric fields of a Redfish resource into {'Dotted.Name': value}.
+
+    OData annotations are skipped. List members are keyed by their MemberId
+    or Name when present, otherwise by position. This picks up nested
+    readings such as per-phase values without hard-coding the schema.
+    """
+    metrics = {}
+    if isinstance(data, dict):
+        items = ((key, value) for key, value in data.items() if not key.startswith('@') and '@odata' not in key)
+    elif isinstance(data, list):
+        items = ((str(item.get('MemberId') or item.get('Name') or index) if isinstance(item, dict) else str(index), item)
+                 for index, item in enumerate(data))
+    else:
+        return metrics
+
+    for key, value in items:
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, (int, float)):
+            metrics[name] = float(value)
+        elif isinstance(value, (dict, list)):
+            metrics.update(flatten_metrics(value, name))
+    return metrics
+
+
+def split_address(address, default_port=DEFAULT_PORT):
+    """Split an RSCM address of the form 'host' or 'host:port' into (host, port)."""
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and host and ':' not in host:
+        return host, int(port)
+    return address, default_port
+
+
+def apply_api_settings(api_config):
+    """Apply the 'api' block of the application config to the shared client state."""
+    global _request_timeout_seconds
+    api_config = api_config or {}
+    get_connection_pool().configure(
+        limit=api_config.get('max_connections'),
+        limit_per_host=api_config.get('max_connections_per_host'),
+        keepalive_timeout=api_config.get('keepalive_seconds')
+    )
+    
+    if api_config.get('timeout_seconds'):
+        _request_timeout_seconds = float(api_config['timeout_seconds'])
+    
+    # Circuit breaker: open after retry_attempts consecutive failures, back off
+    # exponentially starting at retry_delay_seconds
+    get_health_tracker().configure(
+        failure_threshold=api_config.get('retry_attempts'),
+        base_delay_seconds=api_config.get('retry_delay_seconds'),
+        max_delay_seconds=api_config.get('max_backoff_seconds'),
+        probe_timeout_seconds=_request_timeout_seconds * len(SCHEMES) * len(AUTH_MODES)
+    )
+    
+    # Imported here because the preflight module builds on this one
+    from .preflight import get_preflight
+    get_preflight().configure(
+        ttl_seconds=api_config.get('preflight_ttl_seconds'),
+        connect_timeout_seconds=api_config.get('preflight_connect_timeout_seconds'),
+        max_concurrency=api_config.get('preflight_max_concurrency')
+    )
+
+
 class RedfishAPIClient:
     """Client for interacting with the Redfish API to monitor server power consumption."""
     
-    def __init__(self):
+    def __init__(self, pool=None, negotiation_cache=None, health_tracker=None, shelf_cache=None):
         """Initialize the API client."""
+        self.pool = pool or get_connection_pool()
+        self.negotiation_cache = negotiation_cache or get_negotiation_cache()
+        self.shelf_cache = shelf_cache or get_shelf_cache()
+        self.health = health_tracker or get_health_tracker()
         self.session = None
     
     async def create_session(self):
-        """Create an aiohttp client session."""
-        if self.session is None or self.session.closed:
-            # Create a session that ignores SSL certificate validation
-            self.session = aiohttp.ClientSession(
-                connector=aiohttp.TCPConnector(verify_ssl=False)
-            )
+        """Get the pooled aiohttp client session for the running event loop."""
+        self.session = self.pool.get_session()
         return self.session
     
     async def close_session(self):
-        """Close the client session."""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Release the client session.
+        
+        The session is owned by the shared connection pool and stays open so
+        other clients can keep reusing its connections.
+        """
+        self.session = None
+    
+    def get_pool_stats(self):
+        """Get connection reuse counters from the shared pool."""
+        return self.pool.get_stats()
     
+    def is_available(self, address):
+        """Check the circuit breaker before polling an RSCM.
+        
+        Returns False while the host's circuit is open; the caller should skip
+        the poll and mark the reading as unavailable.
+        """
+        return self.health.allow_request(address)
+    
+    def _request_kwargs(self, auth_mode, username, password):
+        """Build the request arguments for an auth mode."""
+        if auth_mode == "basic":
+            return {'auth': aiohttp.BasicAuth(username, password)}
+        basic_auth_header = f"Basic {base64.b64encode(f'{username}:{password}'.encode()).decode()}"
+        return {'headers': {
+            "Authorization": basic_auth_header,
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        }}
+
+    async def _try_variant(self, session, host, port, scheme, auth_mode, username, password):
+        """Request the power meter with one scheme/port/auth combination.
+
+        Returns:
+            Tuple of (status, power) where status is 'ok', 'auth' (the server
+            answered but rejected or didn't understand the request) or
+            'unreachable' (this scheme/port can't be used at all).
+        """
+        url = f"{scheme}://{host}:{port}{POWER_METER_ENDPOINT}"
+        try:
+            kwargs = self._request_kwargs(auth_mode, username, password)
+            timeout = aiohttp.ClientTimeout(total=_request_timeout_seconds)
+            async with session.get(url, timeout=timeout, **kwargs) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if "TotalInputPowerInWatts" in data:
+                        power_watts = data.get("TotalInputPowerInWatts")
+                        logger.info(f"Power reading from {url} ({auth_mode} auth): {power_watts}W")
+                        return 'ok', power_watts
+                    logger.warning(f"TotalInputPowerInWatts field not found in response from {url}")
+                    return 'auth', None
+                logger.warning(f"HTTP {response.status} from {url} with {auth_mode} auth")
+                return 'auth', None
+        except asyncio.TimeoutError:
+            logger.warning(f"Timeout accessing {url}")
+        except Exception as e:
+            logger.warning(f"Error accessing {url}: {e}")
+        return 'unreachable', None
+
+    async def fetch_power(self, address, username, password):
+        """Get the power reading from an RSCM, reusing the negotiated protocol.
+
+        In steady state this is exactly one request. If the cached variant
+        fails it is invalidated; a rejected request renegotiates right away,
+        while an unreachable host is left for the next poll so a dead RSCM
+        costs a single timeout. The outcome is reported to the circuit
+        breaker: any HTTP answer counts as the host being reachable.
+
+        Returns:
+            Tuple of (success, power_watts)
+        """
+        session = await self.create_session()
+        host, port = split_address(address)
+
+        cached = self.negotiation_cache.get(address)
+        if cached is not None:
+            status, power = await self._try_variant(
+                session, host, cached['port'], cached['scheme'], cached['auth_mode'], username, password
+            )
+            if status == 'ok':
+                self.health.record_success(address)
+                return True, power
+            self.negotiation_cache.invalidate(address)
+            if status == 'unreachable':
+                self.health.record_failure(address)
+                return False, None
+        
+        # Whether the host answered at all during negotiation
+        reachable = cached is not None
+
+        # Negotiate: try each scheme, and each auth mode while the scheme is reachable
+        for scheme in SCHEMES:
+            for auth_mode in AUTH_MODES:
+                if cached is not None and (scheme, port, auth_mode) == (cached['scheme'], cached['port'], cached['auth_mode']):
+                    continue
+                status, power = await self._try_variant(session, host, port, scheme, auth_mode, username, password)
+                if status == 'ok':
+                    self.negotiation_cache.store(address, scheme, port, auth_mode)
+                    self.health.record_success(address)
+                    return True, power
+                if status == 'unreachable':
+                    break
+                reachable = True
+        
+        if reachable:
+            self.health.record_success(address)
+        else:
+            self.health.record_failure(address)
+
+        logger.error(f"Failed to get power reading from {address} using endpoint {POWER_METER_ENDPOINT}")
+        return False, None
+
     async def get_power_reading(self, address, username, password):
         """Get power reading from RSCM via Redfish API."""
-        import logging
-        import aiohttp
-        import asyncio
-        import base64
-        logger = logging.getLogger("power_monitor")
-        
         logger.info(f"Getting power reading for {address}")
+        success, power = await self.fetch_power(address, username, password)
+        return power if success else None
+
+    async def get_json(self, address, path, username, password):
+        """GET a Redfish resource using the protocol negotiated for the RSCM.
+        
+        Negotiates first (with a power meter request) if the RSCM hasn't been
+        contacted yet.
         
-        # Create a new session for this call
-        session = aiohttp.ClientSession(
-            connector=aiohttp.TCPConnector(verify_ssl=False)
-        )
-        logger.info(f"Created new HTTP session for {address}")
+        Returns:
+            Tuple of (status, data) where status is the HTTP status code, or
+            None if the request failed before a response arrived.
+        """
+        negotiated = self.negotiation_cache.get(address)
+        if negotiated is None:
+            success, _ = await self.fetch_power(address, username, password)
+            negotiated = self.negotiation_cache.get(address) if success else None
+            if negotiated is None:
+                return None, None
         
+        session = await self.create_session()
+        host, _ = split_address(address)
+        url = f"{negotiated['scheme']}://{host}:{negotiated['port']}{path}"
         try:
-            # Use ONLY the correct endpoint with port 8080
-            endpoint = "/redfish/v1/PowerEquipment/PowerShelves/1/Oem/Microsoft/PowerMeter"
-            
-            # Prepare authentication headers - try both methods
-            auth = aiohttp.BasicAuth(username, password)
-            basic_auth_header = f"Basic {base64.b64encode(f'{username}:{password}'.encode()).decode()}"
-            headers = {
-                "Authorization": basic_auth_header,
-                "Content-Type": "application/json",
-                "Accept": "application/json"
-            }
-            
-            # Try HTTPS on port 8080 first
-            url = f"https://{address}:8080{endpoint}"
-            try:
-                logger.info(f"Trying endpoint: {url}")
-                
-                # First try with aiohttp's built-in auth
-                async with session.get(url, auth=auth, timeout=10, ssl=False) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        # Extract the TotalInputPowerInWatts field
-                        if "TotalInputPowerInWatts" in data:
-                            power_watts = data.get("TotalInputPowerInWatts")
-                            logger.info(f"Power reading from {url}: {power_watts}W")
-                            return power_watts
-                        else:
-                            logger.warning(f"TotalInputPowerInWatts field not found in response from {url}")
-                    elif response.status == 401:
-                        logger.warning(f"Authentication failed (401) with built-in auth, trying explicit headers")
-                        
-                        # Try again with explicit auth headers
-                        async with session.get(url, headers=headers, timeout=10, ssl=False) as headers_response:
-                            if headers_response.status == 200:
-                                data = await headers_response.json()
-                                if "TotalInputPowerInWatts" in data:
-                                    power_watts = data.get("TotalInputPowerInWatts")
-                                    logger.info(f"Power reading from {url} (with headers): {power_watts}W")
-                                    return power_watts
-                            else:
-                                logger.warning(f"HTTP {headers_response.status} from {url} with explicit headers")
-                    else:
-                        logger.warning(f"HTTP {response.status} from {url}")
-            except asyncio.TimeoutError:
-                logger.warning(f"Timeout accessing {url}")
-            except Exception as e:
-                logger.warning(f"Error accessing {url}: {e}")
-            
-            # If HTTPS fails, try HTTP
-            url = f"http://{address}:8080{endpoint}"
-            try:
-                logger.info(f"Trying endpoint: {url}")
-                # Try with built-in auth
-                async with session.get(url, auth=auth, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        # Extract the TotalInputPowerInWatts field
-                        if "TotalInputPowerInWatts" in data:
-                            power_watts = data.get("TotalInputPowerInWatts")
-                            logger.info(f"Power reading from {url}: {power_watts}W")
-                            return power_watts
-                    elif response.status == 401:
-                        # Try again with explicit auth headers
-                        async with session.get(url, headers=headers, timeout=10) as headers_response:
-                            if headers_response.status == 200:
-                                data = await headers_response.json()
-                                if "TotalInputPowerInWatts" in data:
-                                    power_watts = data.get("TotalInputPowerInWatts")
-                                    logger.info(f"Power reading from {url} (with headers): {power_watts}W")
-                                    return power_watts
-                            else:
-                                logger.warning(f"HTTP {headers_response.status} from {url} with explicit headers")
-                    else:
-                        logger.warning(f"HTTP {response.status} from {url}")
-            except Exception as e:
-                logger.warning(f"Error accessing {url}: {e}")
-            
-            logger.error(f"Failed to get power reading from {address} using endpoint {endpoint}")
+            kwargs = self._request_kwargs(negotiated['auth_mode'], username, password)
+            timeout = aiohttp.ClientTimeout(total=_request_timeout_seconds)
+            async with session.get(url, timeout=timeout, **kwargs) as response:
+                if response.status != 200:
+                    return response.status, None
+                return response.status, await response.json(content_type=None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Error accessing {url}: {e}")
+            return None, None
+
+    async def discover_shelves(self, address, username, password):
+        """Walk the PowerEquipment tree once and cache the shelf and PSU paths.
+        
+        Returns:
+            List of shelf descriptors {'id', 'path', 'meter', 'power_supplies'},
+            or None if discovery failed.
+        """
+        status, collection = await self.get_json(address, POWER_SHELVES_ENDPOINT, username, password)
+        if status != 200 or not collection:
+            logger.warning(f"Shelf discovery failed for {address} (HTTP {status})")
             return None
-        finally:
-            # Always close the session
-            if not session.closed:
-                await session.close()
-                logger.info(f"Closed HTTP session for {address}")
+        
+        shelf_paths = [member.get('@odata.id') for member in collection.get('Members', []) if member.get('@odata.id')]
+        
+        async def _describe(shelf_path):
+            shelf = {
+                'id': shelf_path.rstrip('/').rsplit('/', 1)[-1],
+                'path': shelf_path,
+                'meter': shelf_path.rstrip('/') + SHELF_POWER_METER_SUFFIX,
+                'power_supplies': []
+            }
+            status, resource = await self.get_json(address, shelf_path, username, password)
+            psu_link = (resource or {}).get('PowerSupplies', {}).get('@odata.id') if status == 200 else None
+            if psu_link:
+                status, psus = await self.get_json(address, psu_link, username, password)
+                if status == 200 and psus:
+                    shelf['power_supplies'] = [m['@odata.id'] for m in psus.get('Members', []) if m.get('@odata.id')]
+            return shelf
+        
+        shelves = await asyncio.gather(*(_describe(path) for path in shelf_paths))
+        self.shelf_cache.store(address, shelves)
+        logger.info(f"Discovered {len(shelves)} shelves with "
+                    f"{sum(len(s['power_supplies']) for s in shelves)} power supplies on {address}")
+        return shelves
+
+    async def collect_shelves(self, address, username, password):
+        """Fetch every shelf meter and PSU of an RSCM concurrently.
+        
+        Discovery runs only when the shelf paths aren't cached yet. If a cached
+        path no longer resolves the cache entry is dropped so the next call
+        rediscovers the tree.
+        
+        Returns:
+            Tuple of (success, records). Success means every discovered shelf
+            meter answered; records of the shelves that did answer are
+            returned either way. Each record is {'shelf_id': str, 'metrics':
+            {name: value}}. Meter fields are named as reported (e.g.
+            'TotalInputPowerInWatts'); PSU fields are prefixed with 'PSU.<id>.'.
+        """
+        shelves = self.shelf_cache.get(address)
+        if shelves is None:
+            shelves = await self.discover_shelves(address, username, password)
+            if not shelves:
+                return False, []
+        
+        # One request per meter and per PSU, all in flight at once
+        requests = []
+        for shelf in shelves:
+            requests.append((shelf['id'], None, shelf['meter']))
+            for psu_path in shelf['power_supplies']:
+                requests.append((shelf['id'], psu_path.rstrip('/').rsplit('/', 1)[-1], psu_path))
+        
+        responses = await asyncio.gather(*(self.get_json(address, path, username, password) for _, _, path in requests))
+        
+        # Report reachability to the circuit breaker
+        if any(status is not None for status, _ in responses):
+            self.health.record_success(address)
+        else:
+            self.health.record_failure(address)
+        
+        records = {shelf['id']: {'shelf_id': shelf['id'], 'metrics': {}} for shelf in shelves}
+        stale = False
+        meters_answered = 0
+        for (shelf_id, psu_id, path), (status, data) in zip(requests, responses):
+            if status == 404:
+                stale = True
+            if status != 200 or not data:
+                continue
+            if psu_id is None:
+                meters_answered += 1
+            prefix = f"PSU.{psu_id}" if psu_id else ""
+            records[shelf_id]['metrics'].update(flatten_metrics(data, prefix))
+        
+        if stale:
+            logger.info(f"Shelf layout of {address} changed, rediscovering next cycle")
+            self.shelf_cache.invalidate(address)
+        
+        records = [record for record in records.values() if record['metrics']]
+        return meters_answered == len(shelves), records
 
     async def test_connection(self, address, username, password):
-        """Test connection to RSCM by first pinging it, then attempting to get a power reading."""
+        """Test connection to RSCM by checking TCP reachability, then attempting to get a power reading."""
         try:
             # Call the more detailed method and just return the success status
             success, _ = await self.test_connection_with_power(address, username, password)
@@ -142,163 +470,31 @@ class RedfishAPIClient:
             logger = logging.getLogger("power_monitor")
             logger.error(f"Error in test_connection: {str(e)}")
             return False
-        finally:
-            # Important: Close the session properly to avoid the "Unclosed client session" warning
-            if hasattr(self, 'session') and self.session and not self.session.closed:
-                try:
-                    await self.session.close()
-                    logger.info(f"Closed HTTP session for {address}")
-                except Exception:
-                    pass
 
     async def test_connection_with_power(self, address, username, password):
-        """Test connection to RSCM by first pinging it, then attempting to get a power reading."""
-        import logging
-        import subprocess
-        import asyncio
-        logger = logging.getLogger("power_monitor")
+        """Test connection to RSCM: check TCP reachability, then attempt to get a power reading.
         
-        # When called during monitoring, we can skip the ping test to improve performance
-        # This check determines if we're in a test or monitoring context
-        import inspect
-        caller_frame = inspect.currentframe().f_back
-        caller_function = caller_frame.f_code.co_name if caller_frame else "unknown"
+        Always runs a fresh check (bypassing the preflight cache) and refreshes
+        the cached result for the address.
         
-        is_monitoring = caller_function == "monitor_all_racks"
-        
-        if not is_monitoring:
-            # Add detailed logging only during a real test
-            logger.info(f"START test_connection for {address}")
-            
-            # First check if the RSCM is reachable via ping
-            logger.info(f"Pinging {address} to verify network connectivity...")
-            
-            ping_success = False
-            
-            # Run ping command based on platform
-            try:
-                # Use the subprocess module directly
-                import platform
-                if platform.system().lower() == "windows":
-                    # Windows ping command with 2 packets and 1 second timeout
-                    cmd = ["ping", "-n", "2", "-w", "1000", address]
-                    logger.info(f"Running ping command: {' '.join(cmd)}")
-                    
-                    # Use subprocess.run with timeout
-                    result = subprocess.run(
-                        cmd, 
-                        capture_output=True,
-                        text=True,
-                        timeout=5  # 5 seconds total timeout for the ping process
-                    )
-                    ping_success = (result.returncode == 0)
-                    
-                    if ping_success:
-                        logger.info(f"Ping successful: {result.stdout.strip()}")
-                    else:
-                        logger.error(f"Ping failed: {result.stdout.strip()}")
-                else:
-                    # Unix ping command with 2 packets and 1 second timeout
-                    cmd = ["ping", "-c", "2", "-W", "1", address]
-                    logger.info(f"Running ping command: {' '.join(cmd)}")
-                    
-                    # Use subprocess.run with timeout
-                    result = subprocess.run(
-                        cmd, 
-                        capture_output=True,
-                        text=True,
-                        timeout=5  # 5 seconds total timeout for the ping process
-                    )
-                    ping_success = (result.returncode == 0)
-                    
-                    if ping_success:
-                        logger.info(f"Ping successful: {result.stdout.strip()}")
-                    else:
-                        logger.error(f"Ping failed: {result.stdout.strip()}")
-                        
-            except subprocess.TimeoutExpired:
-                logger.error(f"Ping command timed out after 5 seconds")
-            except Exception as e:
-                logger.error(f"Error running ping: {str(e)}")
-            
-            # Continue even if ping fails - API might still be reachable
-            if ping_success:
-                logger.info(f"Ping to {address} was successful, proceeding with API test")
-            else:
-                logger.warning(f"Ping to {address} failed, but still trying API connection")
-        
-        # Now attempt to get power reading via the API
-        if not is_monitoring:
-            logger.info(f"Testing API connection to {address}...")
+        Returns:
+            Tuple of (success, power_watts)
+        """
+        from .preflight import get_preflight
         
+        logger.info(f"START test_connection for {address}")
         try:
-            # Create this special URL directly - don't use the get_power_reading code path
-            # This avoids the authentication issues that happen in monitoring
-            import aiohttp
-            import base64
-            
-            # Create a new session for this call
-            session = aiohttp.ClientSession(
-                connector=aiohttp.TCPConnector(verify_ssl=False)
-            )
-            
-            try:
-                # Use ONLY this specific endpoint and port that works in tests
-                endpoint = "/redfish/v1/PowerEquipment/PowerShelves/1/Oem/Microsoft/PowerMeter"
-                url = f"https://{address}:8080{endpoint}"
-                
-                # Prepare both types of authentication
-                auth = aiohttp.BasicAuth(username, password)
-                basic_auth_header = f"Basic {base64.b64encode(f'{username}:{password}'.encode()).decode()}"
-                headers = {
-                    "Authorization": basic_auth_header,
-                    "Content-Type": "application/json",
-                    "Accept": "application/json"
-                }
-                
-                # Try with basic auth first
-                async with session.get(url, auth=auth, timeout=10, ssl=False) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        # Extract the TotalInputPowerInWatts field
-                        if "TotalInputPowerInWatts" in data:
-                            power_watts = data.get("TotalInputPowerInWatts")
-                            logger.info(f"Power reading from {url}: {power_watts}W")
-                            return True, power_watts
-                        else:
-                            logger.warning(f"TotalInputPowerInWatts field not found in response")
-                    else:
-                        logger.warning(f"HTTP {response.status} from {url} with basic auth")
-                        
-                        # Try with explicit headers as fallback
-                        async with session.get(url, headers=headers, timeout=10, ssl=False) as headers_response:
-                            if headers_response.status == 200:
-                                data = await headers_response.json()
-                                if "TotalInputPowerInWatts" in data:
-                                    power_watts = data.get("TotalInputPowerInWatts")
-                                    logger.info(f"Power reading from {url} (with headers): {power_watts}W")
-                                    return True, power_watts
-                            else:
-                                logger.warning(f"HTTP {headers_response.status} from {url} with explicit headers")
-                                
-                # If we get here, both attempts failed
-                if not is_monitoring:
-                    logger.error(f"API test FAILED for {address}: No power reading returned")
-                return False, None
-                
-            finally:
-                # Always close the session
-                if not session.closed:
-                    await session.close()
-                    if not is_monitoring:
-                        logger.info(f"Closed HTTP session for {address}")
-                        
+            result = await get_preflight().check(address, username, password, use_cache=False, client=self)
+            if not result.ok:
+                logger.error(f"API test FAILED for {address}: {result.error}")
+            return result.ok, result.power
         except Exception as e:
             error_msg = str(e) if str(e) else "Unknown error occurred"
-            if not is_monitoring:
-                logger.error(f"Error in API test: {error_msg}")
+            logger.error(f"Error in API test: {error_msg}")
             return False, None
+        finally:
+            # The pooled session stays open for reuse
+            await self.close_session()
 
 # Keep the original APIClient for compatibility, but mark it as deprecated
 class APIClient:
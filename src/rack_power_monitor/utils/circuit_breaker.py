@@ -0,0 +1,184 @@
+"""
+Per-RSCM circuit breaker.
+Stops polling hosts that keep failing and probes them again with jittered exponential backoff.
+"""
+import time
+import random
+import logging
+import threading
+
+logger = logging.getLogger("power_monitor")
+
+# Circuit states
+CLOSED = "closed"        # Host is healthy, requests go through
+OPEN = "open"            # Host is failing, requests are skipped until the backoff expires
+HALF_OPEN = "half_open"  # Backoff expired, a single probe request is allowed
+
+
+class HostHealth:
+    """Health state of a single RSCM."""
+
+    def __init__(self):
+        """Initialize a healthy host."""
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_count = 0          # Times the circuit opened since the last success
+        self.open_until = 0.0        # Monotonic time when a probe is allowed
+        self.probe_started = None    # Monotonic time of the in-flight half-open probe
+        self.last_failure = None     # Wall-clock time of the last failure
+        self.skipped = 0             # Requests skipped while open
+
+    def as_dict(self, now):
+        """Return a JSON-friendly snapshot."""
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'retry_in_seconds': max(0.0, self.open_until - now) if self.state == OPEN else 0.0,
+            'last_failure': self.last_failure,
+            'skipped': self.skipped
+        }
+
+
+class HostHealthTracker:
+    """Tracks open / half-open / closed circuit state for every RSCM address."""
+
+    def __init__(self, failure_threshold=3, base_delay_seconds=1.0, max_delay_seconds=300.0,
+                 probe_timeout_seconds=30.0, clock=time.monotonic, rng=random):
+        """Initialize the tracker.
+
+        Args:
+            failure_threshold: Consecutive failures before the circuit opens
+            base_delay_seconds: Backoff after the circuit first opens
+            max_delay_seconds: Upper bound for the backoff
+            probe_timeout_seconds: A half-open probe that never reports back is
+                abandoned after this long so another one can be sent
+            clock: Monotonic clock
+            rng: Source of the backoff jitter, with a uniform(a, b) method
+        """
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay_seconds
+        self.max_delay = max_delay_seconds
+        self.probe_timeout = probe_timeout_seconds
+        self.clock = clock
+        self.rng = rng
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def configure(self, failure_threshold=None, base_delay_seconds=None, max_delay_seconds=None,
+                  probe_timeout_seconds=None):
+        """Update the breaker settings."""
+        with self._lock:
+            if failure_threshold is not None:
+                self.failure_threshold = max(1, int(failure_threshold))
+            if base_delay_seconds is not None:
+                self.base_delay = max(0.0, float(base_delay_seconds))
+            if max_delay_seconds is not None:
+                self.max_delay = float(max_delay_seconds)
+            if probe_timeout_seconds is not None:
+                self.probe_timeout = float(probe_timeout_seconds)
+
+    def _get(self, address):
+        """Get (or create) the health entry for an address. Caller holds the lock."""
+        health = self._hosts.get(address)
+        if health is None:
+            health = self._hosts[address] = HostHealth()
+        return health
+
+    def _backoff(self, open_count):
+        """Jittered exponential backoff for the n-th consecutive opening."""
+        delay = min(self.max_delay, self.base_delay * (2 ** (open_count - 1)))
+        # Equal jitter: keep half the delay, randomize the other half so hosts
+        # that failed together don't get probed together
+        return delay / 2 + self.rng.uniform(0, delay / 2)
+
+    def allow_request(self, address):
+        """Check whether a request to this address should be made now."""
+        now = self.clock()
+        with self._lock:
+            health = self._get(address)
+
+            if health.state == CLOSED:
+                return True
+
+            if health.state == OPEN:
+                if now < health.open_until:
+                    health.skipped += 1
+                    return False
+                # Backoff expired, let a single probe through
+                health.state = HALF_OPEN
+                health.probe_started = now
+                logger.info(f"Circuit for {address} half-open, probing")
+                return True
+
+            # HALF_OPEN: only one probe at a time
+            if health.probe_started is not None and now - health.probe_started < self.probe_timeout:
+                health.skipped += 1
+                return False
+            health.probe_started = now
+            return True
+
+    def record_success(self, address):
+        """Record that the host answered."""
+        with self._lock:
+            health = self._get(address)
+            if health.state != CLOSED:
+                logger.info(f"Circuit for {address} closed, host is reachable again")
+            health.state = CLOSED
+            health.consecutive_failures = 0
+            health.open_count = 0
+            health.probe_started = None
+
+    def record_failure(self, address):
+        """Record that the host could not be reached."""
+        now = self.clock()
+        with self._lock:
+            health = self._get(address)
+            health.consecutive_failures += 1
+            health.last_failure = time.time()
+
+            if health.state == HALF_OPEN or health.consecutive_failures >= self.failure_threshold:
+                health.open_count += 1
+                delay = self._backoff(health.open_count)
+                health.state = OPEN
+                health.open_until = now + delay
+                health.probe_started = None
+                logger.warning(
+                    f"Circuit for {address} open after {health.consecutive_failures} failures, "
+                    f"retrying in {delay:.1f}s"
+                )
+
+    def get_state(self, address):
+        """Get the circuit state for an address."""
+        with self._lock:
+            health = self._hosts.get(address)
+            return health.state if health else CLOSED
+
+    def get_health(self, address):
+        """Get a snapshot of the health entry for an address."""
+        now = self.clock()
+        with self._lock:
+            health = self._hosts.get(address) or HostHealth()
+            return health.as_dict(now)
+
+    def snapshot(self):
+        """Get health snapshots for every tracked address."""
+        now = self.clock()
+        with self._lock:
+            return {address: health.as_dict(now) for address, health in self._hosts.items()}
+
+    def reset(self, address=None):
+        """Forget the health of one address, or of all addresses."""
+        with self._lock:
+            if address is None:
+                self._hosts.clear()
+            else:
+                self._hosts.pop(address, None)
+
+
+# Process-wide tracker shared by every client
+_health_tracker = HostHealthTracker()
+
+
+def get_health_tracker():
+    """Get the process-wide host health tracker."""
+    return _health_tracker
@@ -0,0 +1,161 @@
+"""
+Shared HTTP connection pool for Redfish API access.
+Keeps long-lived aiohttp sessions so polls reuse TCP/TLS connections.
+"""
+import ssl
+import asyncio
+import logging
+import threading
+
+import aiohttp
+
+logger = logging.getLogger("power_monitor")
+
+
+class ConnectionPoolStats:
+    """Counters describing how often pooled connections are reused."""
+
+    def __init__(self):
+        """Initialize the counters."""
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.sessions_created = 0
+
+    def record(self, field):
+        """Increment a counter in a thread-safe way."""
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    @property
+    def reuse_hit_rate(self):
+        """Fraction of requests that were served on an already-open connection."""
+        total = self.connections_created + self.connections_reused
+        if total == 0:
+            return 0.0
+        return self.connections_reused / total
+
+    def as_dict(self):
+        """Return a snapshot of the counters."""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'connections_created': self.connections_created,
+                'connections_reused': self.connections_reused,
+                'sessions_created': self.sessions_created,
+                'reuse_hit_rate': self.reuse_hit_rate
+            }
+
+
+class HTTPConnectionPool:
+    """Lifecycle-managed aiohttp sessions shared by every RedfishAPIClient.
+
+    aiohttp sessions are bound to the event loop they were created on, so the
+    pool keeps one session per running loop. All clients on the same loop share
+    the same connector, keep-alive connections and SSL context.
+    """
+
+    def __init__(self, limit=100, limit_per_host=4, keepalive_timeout=75, dns_cache_ttl=300):
+        """Initialize the pool settings."""
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.stats = ConnectionPoolStats()
+
+        self._sessions = {}  # event loop -> ClientSession
+        self._lock = threading.Lock()
+
+        # One SSL context for every connection so TLS state (ciphers, session
+        # cache) is shared. RSCMs use self-signed certificates.
+        self._ssl_context = ssl.create_default_context()
+        self._ssl_context.check_hostname = False
+        self._ssl_context.verify_mode = ssl.CERT_NONE
+
+    def configure(self, limit=None, limit_per_host=None, keepalive_timeout=None):
+        """Update pool limits. Applies to sessions created after the call."""
+        if limit is not None:
+            self.limit = int(limit)
+        if limit_per_host is not None:
+            self.limit_per_host = int(limit_per_host)
+        if keepalive_timeout is not None:
+            self.keepalive_timeout = float(keepalive_timeout)
+
+    @property
+    def ssl_context(self):
+        """SSL context shared by all pooled connections."""
+        return self._ssl_context
+
+    def _create_trace_config(self):
+        """Create a trace config that feeds the reuse counters."""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.stats.record('requests')
+
+        async def on_connection_create_end(session, context, params):
+            self.stats.record('connections_created')
+
+        async def on_connection_reuseconn(session, context, params):
+            self.stats.record('connections_reused')
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def get_session(self):
+        """Get the shared session for the running event loop, creating it if needed."""
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            session = self._sessions.get(loop)
+            if session is not None and not session.closed:
+                return session
+
+            connector = aiohttp.TCPConnector(
+                ssl=self._ssl_context,
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                trace_configs=[self._create_trace_config()]
+            )
+            self._sessions[loop] = session
+            self.stats.record('sessions_created')
+            logger.debug(f"Created pooled HTTP session (limit={self.limit}, per_host={self.limit_per_host})")
+            return session
+
+    async def close_loop_session(self):
+        """Close the session that belongs to the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+            logger.debug("Closed pooled HTTP session")
+
+    def get_stats(self):
+        """Return connection reuse counters."""
+        stats = self.stats.as_dict()
+        with self._lock:
+            stats['open_sessions'] = sum(1 for s in self._sessions.values() if not s.closed)
+        return stats
+
+
+# Process-wide pool used by all monitors
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_connection_pool():
+    """Get the process-wide HTTP connection pool."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = HTTPConnectionPool()
+        return _shared_pool
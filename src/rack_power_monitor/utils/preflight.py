@@ -0,0 +1,207 @@
+"""
+Connectivity preflight for RSCMs.
+Checks TCP reachability and an authenticated Redfish GET for many RSCMs concurrently,
+caching results for a short TTL.
+"""
+import time
+import asyncio
+import logging
+import threading
+
+from .api_client import RedfishAPIClient, split_address
+
+logger = logging.getLogger("power_monitor")
+
+
+class PreflightResult:
+    """Outcome of a preflight check for one RSCM."""
+
+    def __init__(self, address, reachable=False, authenticated=False, power=None,
+                 error=None, latency_seconds=None):
+        """Initialize the result."""
+        self.address = address
+        self.reachable = reachable          # TCP connect to the Redfish port succeeded
+        self.authenticated = authenticated  # Authenticated GET returned a power reading
+        self.power = power
+        self.error = error
+        self.latency_seconds = latency_seconds
+        self.checked_at = time.monotonic()
+
+    @property
+    def ok(self):
+        """Whether the RSCM is ready to be monitored."""
+        return self.reachable and self.authenticated
+
+    def as_dict(self):
+        """Return a JSON-friendly representation."""
+        return {
+            'address': self.address,
+            'ok': self.ok,
+            'reachable': self.reachable,
+            'authenticated': self.authenticated,
+            'power': self.power,
+            'error': self.error,
+            'latency_seconds': self.latency_seconds
+        }
+
+
+class Preflight:
+    """Concurrent, non-blocking RSCM preflight with a TTL cache.
+
+    Results are keyed by address and username, so changing credentials
+    forces a fresh check. Concurrent checks of the same RSCM on the same
+    event loop share a single request.
+    """
+
+    def __init__(self, ttl_seconds=30.0, connect_timeout_seconds=3.0, max_concurrency=64):
+        """Initialize the preflight.
+
+        Args:
+            ttl_seconds: How long a result is reused
+            connect_timeout_seconds: TCP connect timeout for the reachability check
+            max_concurrency: Maximum number of RSCMs checked at the same time
+        """
+        self.ttl_seconds = ttl_seconds
+        self.connect_timeout = connect_timeout_seconds
+        self.max_concurrency = max_concurrency
+        self._cache = {}     # (address, username) -> PreflightResult
+        self._inflight = {}  # (loop, address, username) -> asyncio.Future
+        self._lock = threading.Lock()
+
+    def configure(self, ttl_seconds=None, connect_timeout_seconds=None, max_concurrency=None):
+        """Update preflight settings."""
+        if ttl_seconds is not None:
+            self.ttl_seconds = float(ttl_seconds)
+        if connect_timeout_seconds is not None:
+            self.connect_timeout = float(connect_timeout_seconds)
+        if max_concurrency is not None:
+            self.max_concurrency = max(1, int(max_concurrency))
+
+    def get_cached(self, address, username):
+        """Get a cached result that is still within its TTL, or None."""
+        with self._lock:
+            result = self._cache.get((address, username))
+        if result is not None and time.monotonic() - result.checked_at < self.ttl_seconds:
+            return result
+        return None
+
+    def invalidate(self, address=None):
+        """Drop cached results for one address, or all of them."""
+        with self._lock:
+            if address is None:
+                self._cache.clear()
+            else:
+                for key in [k for k in self._cache if k[0] == address]:
+                    del self._cache[key]
+
+    async def _check_tcp(self, host, port):
+        """Check that the Redfish port accepts TCP connections. Returns an error string or None."""
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=self.connect_timeout)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+            return None
+        except asyncio.TimeoutError:
+            return f"TCP connect to {host}:{port} timed out"
+        except OSError as e:
+            return f"TCP connect to {host}:{port} failed: {e.strerror or e}"
+
+    async def _run_check(self, address, username, password, client):
+        """Run the TCP and authenticated GET checks for one RSCM."""
+        start = time.monotonic()
+        host, port = split_address(address)
+
+        error = await self._check_tcp(host, port)
+        if error:
+            logger.warning(f"Preflight: {address} unreachable ({error})")
+            return PreflightResult(address, error=error, latency_seconds=time.monotonic() - start)
+
+        success, power = await client.fetch_power(address, username, password)
+        latency = time.monotonic() - start
+        if success:
+            logger.info(f"Preflight: {address} OK ({power}W, {latency:.2f}s)")
+            return PreflightResult(address, reachable=True, authenticated=True, power=power, latency_seconds=latency)
+
+        logger.warning(f"Preflight: {address} reachable but no power reading returned")
+        return PreflightResult(address, reachable=True, error="No power reading returned (check credentials)",
+                               latency_seconds=latency)
+
+    async def check(self, address, username, password, use_cache=True, client=None):
+        """Preflight a single RSCM.
+
+        Args:
+            address: RSCM address ('host' or 'host:port')
+            username: Redfish username
+            password: Redfish password
+            use_cache: Reuse a result younger than the TTL
+            client: Optional RedfishAPIClient to use for the GET
+
+        Returns:
+            PreflightResult
+        """
+        if use_cache:
+            cached = self.get_cached(address, username)
+            if cached is not None:
+                return cached
+
+        loop = asyncio.get_running_loop()
+        key = (loop, address, username)
+
+        # Share an in-flight check with concurrent callers
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = loop.create_future()
+
+        if not owner:
+            return await asyncio.shield(future)
+
+        try:
+            result = await self._run_check(address, username, password, client or RedfishAPIClient())
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            result = PreflightResult(address, error=str(e) or "Unknown error")
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+        with self._lock:
+            self._cache[(address, username)] = result
+        future.set_result(result)
+        return result
+
+    async def check_many(self, targets, use_cache=True):
+        """Preflight many RSCMs concurrently.
+
+        Args:
+            targets: Iterable of (address, username, password) tuples
+            use_cache: Reuse results younger than the TTL
+
+        Returns:
+            Dictionary of address -> PreflightResult
+        """
+        targets = list(targets)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        client = RedfishAPIClient()
+
+        async def _bounded(address, username, password):
+            async with semaphore:
+                return await self.check(address, username, password, use_cache=use_cache, client=client)
+
+        results = await asyncio.gather(*(_bounded(*target) for target in targets))
+        return {result.address: result for result in results}
+
+
+# Process-wide preflight shared by the GUI and web server
+_preflight = Preflight()
+
+
+def get_preflight():
+    """Get the process-wide preflight."""
+    return _preflight
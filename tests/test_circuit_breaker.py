@@ -0,0 +1,185 @@
+"""
+Tests for the per-RSCM circuit breaker.
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import random
+import unittest
+
+# Set up proper paths (same layout as run.py)
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(base_dir, "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from rack_power_monitor.utils.circuit_breaker import HostHealthTracker, CLOSED, OPEN, HALF_OPEN
+
+HOST = "10.0.0.1"
+
+
+class FakeClock:
+    """Monotonic clock that only moves when told to."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeRandom:
+    """Jitter source returning a fixed fraction of the range, and recording the ranges asked for."""
+
+    def __init__(self, fraction=0.0):
+        self.fraction = fraction
+        self.calls = []
+
+    def uniform(self, a, b):
+        self.calls.append((a, b))
+        return a + (b - a) * self.fraction
+
+
+class CircuitTransitionTest(unittest.TestCase):
+    """Closed -> open -> half-open -> closed or open again."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.rng = FakeRandom(fraction=1.0)
+        self.tracker = HostHealthTracker(failure_threshold=3, base_delay_seconds=2.0, max_delay_seconds=60.0,
+                                         probe_timeout_seconds=30.0, clock=self.clock, rng=self.rng)
+
+    def open_circuit(self):
+        for _ in range(3):
+            self.assertTrue(self.tracker.allow_request(HOST))
+            self.tracker.record_failure(HOST)
+        self.assertEqual(self.tracker.get_state(HOST), OPEN)
+
+    def test_opens_after_threshold(self):
+        self.tracker.record_failure(HOST)
+        self.tracker.record_failure(HOST)
+        self.assertEqual(self.tracker.get_state(HOST), CLOSED)
+        self.assertTrue(self.tracker.allow_request(HOST))
+        self.tracker.record_failure(HOST)
+        self.assertEqual(self.tracker.get_state(HOST), OPEN)
+
+    def test_success_resets_failure_count(self):
+        self.tracker.record_failure(HOST)
+        self.tracker.record_failure(HOST)
+        self.tracker.record_success(HOST)
+        self.tracker.record_failure(HOST)
+        self.tracker.record_failure(HOST)
+        self.assertEqual(self.tracker.get_state(HOST), CLOSED)
+
+    def test_open_skips_until_backoff_expires(self):
+        self.open_circuit()
+        # Full jitter fraction: the whole 2 s delay
+        self.assertEqual(self.tracker.get_health(HOST)['retry_in_seconds'], 2.0)
+        self.clock.advance(1.9)
+        self.assertFalse(self.tracker.allow_request(HOST))
+        self.assertEqual(self.tracker.get_health(HOST)['skipped'], 1)
+        self.clock.advance(0.1)
+        self.assertTrue(self.tracker.allow_request(HOST))
+        self.assertEqual(self.tracker.get_state(HOST), HALF_OPEN)
+
+    def test_half_open_allows_one_probe(self):
+        self.open_circuit()
+        self.clock.advance(2.0)
+        self.assertTrue(self.tracker.allow_request(HOST))
+        self.assertFalse(self.tracker.allow_request(HOST))
+        self.clock.advance(29.0)
+        self.assertFalse(self.tracker.allow_request(HOST))
+
+    def test_abandoned_probe_is_replaced(self):
+        self.open_circuit()
+        self.clock.advance(2.0)
+        self.assertTrue(self.tracker.allow_request(HOST))
+        self.clock.advance(30.0)
+        self.assertTrue(self.tracker.allow_request(HOST))
+        self.assertEqual(self.tracker.get_state(HOST), HALF_OPEN)
+
+    def test_probe_success_closes(self):
+        self.open_circuit()
+        self.clock.advance(2.0)
+        self.assertTrue(self.tracker.allow_request(HOST))
+        self.tracker.record_success(HOST)
+        self.assertEqual(self.tracker.get_state(HOST), CLOSED)
+        self.assertTrue(self.tracker.allow_request(HOST))
+        # The failure count starts over
+        self.tracker.record_failure(HOST)
+        self.assertEqual(self.tracker.get_state(HOST), CLOSED)
+
+    def test_probe_failure_reopens_with_longer_backoff(self):
+        self.open_circuit()
+        self.clock.advance(2.0)
+        self.assertTrue(self.tracker.allow_request(HOST))
+        # One failure is enough while half-open
+        self.tracker.record_failure(HOST)
+        self.assertEqual(self.tracker.get_state(HOST), OPEN)
+        self.assertEqual(self.tracker.get_health(HOST)['retry_in_seconds'], 4.0)
+
+    def test_hosts_are_independent(self):
+        self.open_circuit()
+        self.assertTrue(self.tracker.allow_request("10.0.0.2"))
+        self.assertEqual(self.tracker.get_state("10.0.0.2"), CLOSED)
+
+    def test_reset(self):
+        self.open_circuit()
+        self.tracker.reset(HOST)
+        self.assertEqual(self.tracker.get_state(HOST), CLOSED)
+        self.assertTrue(self.tracker.allow_request(HOST))
+
+
+class BackoffTest(unittest.TestCase):
+    """Equal-jitter exponential backoff."""
+
+    def make_tracker(self, rng):
+        return HostHealthTracker(failure_threshold=1, base_delay_seconds=1.0, max_delay_seconds=10.0,
+                                 clock=FakeClock(), rng=rng)
+
+    def reopen(self, tracker, times):
+        """Open the circuit `times` times in a row and return each backoff."""
+        delays = []
+        for _ in range(times):
+            tracker.clock.advance(1000.0)
+            tracker.allow_request(HOST)
+            tracker.record_failure(HOST)
+            delays.append(tracker.get_health(HOST)['retry_in_seconds'])
+        return delays
+
+    def test_doubles_up_to_the_cap(self):
+        rng = FakeRandom(fraction=0.5)
+        delays = self.reopen(self.make_tracker(rng), 6)
+        # Half the delay is kept, the other half jittered
+        self.assertEqual(rng.calls, [(0, 0.5), (0, 1.0), (0, 2.0), (0, 4.0), (0, 5.0), (0, 5.0)])
+        self.assertEqual(delays, [0.75, 1.5, 3.0, 6.0, 7.5, 7.5])
+
+    def test_jitter_bounds(self):
+        low = self.reopen(self.make_tracker(FakeRandom(fraction=0.0)), 5)
+        high = self.reopen(self.make_tracker(FakeRandom(fraction=1.0)), 5)
+        self.assertEqual(low, [0.5, 1.0, 2.0, 4.0, 5.0])
+        self.assertEqual(high, [1.0, 2.0, 4.0, 8.0, 10.0])
+
+    def test_seeded_random_stays_in_bounds(self):
+        delays = self.reopen(self.make_tracker(random.Random(42)), 8)
+        for n, delay in enumerate(delays, start=1):
+            full = min(10.0, 2 ** (n - 1))
+            self.assertGreaterEqual(delay, full / 2)
+            self.assertLessEqual(delay, full)
+        # Hosts failing together are spread out
+        self.assertNotEqual(self.reopen(self.make_tracker(random.Random(1)), 8), delays)
+
+    def test_success_resets_backoff(self):
+        rng = FakeRandom(fraction=1.0)
+        tracker = self.make_tracker(rng)
+        self.assertEqual(self.reopen(tracker, 3), [1.0, 2.0, 4.0])
+        tracker.record_success(HOST)
+        self.assertEqual(self.reopen(tracker, 1), [1.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
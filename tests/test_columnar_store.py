@@ -0,0 +1,76 @@
+"""
+Tests for the columnar reading store.
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+# Set up proper paths (same layout as run.py)
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(base_dir, "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from rack_power_monitor.core import timeseries
+from rack_power_monitor.core.timeseries import ColumnarStore, _utc_day
+
+
+class CompactionReadTest(unittest.TestCase):
+    """Reads during a compaction see each reading once."""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp(prefix="rpm-test-columnar-")
+        self.store = ColumnarStore(self.data_dir, file_format="zlib")
+        # Today's parts aren't compacted by a flush
+        now = int(time.time())
+        self.start = now - now % 86400
+        self.folder = self.store._partition_dir("RACK1", _utc_day(self.start))
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def write_parts(self):
+        self.store.append("RACK1", [self.start + 1, self.start + 2], [100, 200])
+        self.store.flush()
+        self.store.append("RACK1", [self.start, self.start + 3], [50, 300])
+        self.store.flush()
+        self.assertEqual(len(os.listdir(self.folder)), 2)
+
+    def assert_readings(self):
+        epoch, watts = self.store.read_arrays("RACK1")
+        np.testing.assert_array_equal(epoch, self.start + np.arange(4))
+        np.testing.assert_array_equal(watts, [50, 100, 200, 300])
+        self.assertEqual(len(self.store.read(["RACK1"])), 4)
+
+    def test_compacted(self):
+        self.write_parts()
+        self.assertTrue(self.store.compact_partition(self.folder))
+        self.assertEqual(os.listdir(self.folder), ["data.zcol"])
+        self.assert_readings()
+
+    def test_data_file_published_before_parts_removed(self):
+        self.write_parts()
+        # A reader between the data file's replace and the removal of the parts
+        with mock.patch.object(timeseries.os, "remove"):
+            self.store.compact_partition(self.folder)
+        self.assertEqual(len(os.listdir(self.folder)), 3)
+        self.assert_readings()
+
+    def test_latest_reading_of_a_second_wins(self):
+        self.write_parts()
+        self.store.append("RACK1", [self.start + 2], [250])
+        epoch, watts = self.store.read_arrays("RACK1")
+        np.testing.assert_array_equal(epoch, self.start + np.arange(4))
+        np.testing.assert_array_equal(watts, [50, 100, 250, 300])
+
+
+if __name__ == "__main__":
+    unittest.main()
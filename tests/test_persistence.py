@@ -0,0 +1,198 @@
+"""
+Tests for the persistence pipeline's back-pressure modes and spool replay.
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import shutil
+import asyncio
+import tempfile
+import threading
+import unittest
+
+# Set up proper paths (same layout as run.py)
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(base_dir, "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from rack_power_monitor.core.persistence import PersistencePipeline
+
+PATH = "rack.csv"
+
+
+class GatedWriter:
+    """Records the rows handed to it; write_rows waits while the gate is closed."""
+
+    flush_interval_seconds = 0.05
+
+    def __init__(self):
+        self.rows = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.writing = threading.Event()  # Set once write_rows is waiting at the gate
+        self.closed = 0
+
+    def write_rows(self, path, rows, header=None):
+        self.writing.set()
+        self.gate.wait(10)
+        self.rows.extend(row[0] for row in rows)
+
+    def flush(self, paths=None):
+        pass
+
+    def flush_due(self):
+        pass
+
+    def close(self, paths=None):
+        self.closed += 1
+
+    def get_stats(self):
+        return {}
+
+
+class PipelineTestCase(unittest.TestCase):
+    """Pipeline with a queue of one item and a writer that can be held up."""
+
+    backpressure = "spill"
+
+    def setUp(self):
+        self.spill_dir = tempfile.mkdtemp(prefix="rpm-test-spill-")
+        self.writer = GatedWriter()
+        self.pipeline = PersistencePipeline(self.writer, max_queue_items=1, backpressure=self.backpressure,
+                                            block_timeout_seconds=5.0, spill_dir=self.spill_dir)
+
+    def tearDown(self):
+        self.writer.gate.set()
+        self.pipeline.stop(timeout=5)
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def fill(self):
+        """Hold the writer on reading 1 with reading 2 queued, so the queue is full."""
+        self.writer.gate.clear()
+        self.writer.writing.clear()
+        self.assertTrue(self.pipeline.submit(PATH, [[1]]))
+        self.assertTrue(self.writer.writing.wait(5))
+        self.assertTrue(self.pipeline.submit(PATH, [[2]]))
+        self.assertEqual(self.pipeline.get_stats()['queue_depth'], 1)
+
+    def release(self):
+        """Let the writer go and wait for everything submitted."""
+        self.writer.gate.set()
+        self.assertTrue(self.pipeline.drain(timeout=5))
+
+
+class BlockTest(PipelineTestCase):
+    """Block mode holds plain threads back until there is room."""
+
+    backpressure = "block"
+
+    def test_waits_for_room(self):
+        self.fill()
+        results = []
+        thread = threading.Thread(target=lambda: results.append(self.pipeline.submit(PATH, [[3]])))
+        thread.start()
+        thread.join(0.2)
+        self.assertTrue(thread.is_alive())
+        self.writer.gate.set()
+        thread.join(5)
+        self.assertEqual(results, [True])
+        self.release()
+        self.assertEqual(self.writer.rows, [1, 2, 3])
+        self.assertEqual(self.pipeline.get_stats()['dropped'], 0)
+
+    def test_drops_after_timeout(self):
+        self.pipeline.configure(block_timeout_seconds=0.05)
+        self.fill()
+        self.assertFalse(self.pipeline.submit(PATH, [[3]]))
+        self.release()
+        self.assertEqual(self.writer.rows, [1, 2])
+        self.assertEqual(self.pipeline.get_stats()['dropped'], 1)
+
+    def test_event_loop_spills_instead_of_waiting(self):
+        self.fill()
+
+        async def submit():
+            return self.pipeline.submit(PATH, [[3]])
+
+        self.assertTrue(asyncio.run(submit()))
+        self.assertEqual(self.pipeline.get_stats()['spilled'], 1)
+        self.release()
+        self.assertEqual(self.writer.rows, [1, 2, 3])
+
+
+class DropOldestTest(PipelineTestCase):
+    """drop_oldest mode makes room by discarding the oldest queued rows."""
+
+    backpressure = "drop_oldest"
+
+    def test_drops_oldest(self):
+        self.fill()
+        self.assertTrue(self.pipeline.submit(PATH, [[3]]))
+        self.assertTrue(self.pipeline.submit(PATH, [[4]]))
+        self.release()
+        self.assertEqual(self.writer.rows, [1, 4])
+        stats = self.pipeline.get_stats()
+        self.assertEqual(stats['dropped'], 2)
+        self.assertEqual(stats['written'], 2)
+
+
+class SpillTest(PipelineTestCase):
+    """spill mode overflows to a spool file that is replayed in order."""
+
+    def spool_files(self):
+        return os.listdir(self.spill_dir)
+
+    def test_spills_and_replays_in_order(self):
+        self.fill()
+        for reading in (3, 4, 5):
+            self.assertTrue(self.pipeline.submit(PATH, [[reading]]))
+        self.assertEqual(len(self.spool_files()), 1)
+        self.assertEqual(self.pipeline.get_stats()['spilled'], 3)
+        self.assertEqual(self.pipeline.get_queue_depth(), 4)
+        self.release()
+        self.assertEqual(self.writer.rows, [1, 2, 3, 4, 5])
+        self.assertEqual(self.spool_files(), [])
+        self.assertEqual(self.pipeline.get_queue_depth(), 0)
+
+        # Once replayed, rows use the queue again
+        self.assertTrue(self.pipeline.submit(PATH, [[6]]))
+        self.assertTrue(self.pipeline.drain(timeout=5))
+        self.assertEqual(self.pipeline.get_stats()['spilled'], 3)
+        self.assertEqual(self.writer.rows[-1], 6)
+
+    def test_close_waits_for_replay(self):
+        self.fill()
+        self.assertTrue(self.pipeline.submit(PATH, [[3]]))
+        threading.Timer(0.1, self.writer.gate.set).start()
+        self.assertTrue(self.pipeline.close(timeout=5))
+        self.assertEqual(self.writer.rows, [1, 2, 3])
+        self.assertEqual(self.writer.closed, 1)
+        self.assertEqual(self.spool_files(), [])
+
+    def test_replays_after_restart(self):
+        self.assertTrue(self.pipeline.submit(PATH, [[0]]))
+        self.assertTrue(self.pipeline.stop(timeout=5))
+        self.assertFalse(self.pipeline.get_stats()['writer_running'])
+
+        # The next submit starts a new writer thread, which replays the spool too
+        self.fill()
+        self.assertTrue(self.pipeline.submit(PATH, [[3]]))
+        self.assertTrue(self.pipeline.get_stats()['writer_running'])
+        self.release()
+        self.assertEqual(self.writer.rows, [0, 1, 2, 3])
+        self.assertEqual(self.spool_files(), [])
+
+    def test_stop_drains_spool(self):
+        self.fill()
+        self.assertTrue(self.pipeline.submit(PATH, [[3]]))
+        threading.Timer(0.1, self.writer.gate.set).start()
+        self.assertTrue(self.pipeline.stop(timeout=5))
+        self.assertEqual(self.writer.rows, [1, 2, 3])
+        self.assertEqual(self.pipeline.get_queue_depth(), 0)
+        self.assertEqual(self.spool_files(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
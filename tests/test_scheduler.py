@@ -0,0 +1,110 @@
+"""
+Tests for the polling scheduler and the poll cycle deadline.
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import time
+import asyncio
+import unittest
+
+# Set up proper paths (same layout as run.py)
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(base_dir, "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from rack_power_monitor.core.scheduler import PollScheduler
+from rack_power_monitor.core.monitor import RackPowerMonitor
+
+
+class FakeClock:
+    """Monotonic clock that only moves when slept on."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+        return False
+
+
+class PollSchedulerTest(unittest.TestCase):
+
+    def run_ticks(self, scheduler, clock, count):
+        async def ticks():
+            return [await scheduler.wait_for_next_tick(clock.sleep) for _ in range(count)]
+        return asyncio.run(ticks())
+
+    def test_first_tick_is_now_just_before_grid_point(self):
+        clock = FakeClock()
+        scheduler = PollScheduler(60, clock=clock, wall_clock=lambda: 59.9)
+        first, = self.run_ticks(scheduler, clock, 1)
+        self.assertEqual(first, 1000.0)
+        # The first cycle gets its whole deadline
+        self.assertEqual(scheduler.seconds_until(first, 60), 60)
+        # The grid point 0.1 s away is skipped; the next one is 60.1 s away
+        second, third = self.run_ticks(scheduler, clock, 2)
+        self.assertAlmostEqual(second, 1060.1)
+        self.assertAlmostEqual(third, 1120.1)
+
+    def test_first_tick_is_now_just_after_grid_point(self):
+        clock = FakeClock()
+        scheduler = PollScheduler(60, clock=clock, wall_clock=lambda: 120.5)
+        first, second = self.run_ticks(scheduler, clock, 2)
+        self.assertEqual(first, 1000.0)
+        self.assertAlmostEqual(second, 1059.5)
+
+    def test_phase_offsets_apply_to_first_tick(self):
+        clock = FakeClock()
+        scheduler = PollScheduler(60, clock=clock, wall_clock=lambda: 59.9)
+        first, = self.run_ticks(scheduler, clock, 1)
+        for key in ("r1", "r2", "r3"):
+            offset = scheduler.phase_offset(key)
+            self.assertEqual(scheduler.seconds_until(first, offset), offset)
+
+    def test_unaligned_ticks_follow_interval(self):
+        clock = FakeClock()
+        scheduler = PollScheduler(10, align_to_grid=False, clock=clock)
+        self.assertEqual(self.run_ticks(scheduler, clock, 3), [1000.0, 1010.0, 1020.0])
+
+    def test_skips_missed_ticks(self):
+        clock = FakeClock()
+        scheduler = PollScheduler(10, align_to_grid=False, clock=clock)
+        self.run_ticks(scheduler, clock, 1)
+        # The tick at 1010 is due; 1020 and 1030 have also passed
+        clock.now += 35
+        tick, = self.run_ticks(scheduler, clock, 1)
+        self.assertEqual(tick, 1030.0)
+        self.assertEqual(scheduler.metrics['skipped_ticks'], 2)
+
+
+class PollCycleDeadlineTest(unittest.TestCase):
+
+    def test_first_cycle_not_cut_short_before_grid_point(self):
+        monitor = RackPowerMonitor(stagger_fraction=0.0)
+        monitor.racks = {'r1': {'address': "127.0.0.1", 'username': "u", 'password': "p"}}
+
+        async def slow_poll(rack_name, rack_info, semaphore, callback=None, start_delay=0.0):
+            await asyncio.sleep(0.3)
+            return True
+        monitor._poll_rack = slow_poll
+
+        async def cycle():
+            # Wall clock 0.1 s before a whole minute
+            monitor.scheduler = PollScheduler(60, stagger_fraction=0.0, clock=time.monotonic,
+                                              wall_clock=lambda: 59.9)
+            tick = await monitor.scheduler.wait_for_next_tick()
+            await monitor._poll_cycle(60, tick=tick)
+        asyncio.run(cycle())
+
+        self.assertEqual(monitor.last_cycle_stats['timed_out'], 0)
+        self.assertEqual(monitor.last_cycle_stats['succeeded'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Tests for multi-shelf collection against the simulated RSCM farm.
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import socket
+import asyncio
+import unittest
+
+# Set up proper paths (same layout as run.py)
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(base_dir, "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from rack_power_monitor.core.monitor import RackPowerMonitor
+from rack_power_monitor.simulator import RSCMFarm, FarmProfile
+from rack_power_monitor.utils.api_client import RedfishAPIClient, NegotiationCache, ShelfDiscoveryCache
+from rack_power_monitor.utils.circuit_breaker import HostHealthTracker
+from rack_power_monitor.utils.http_pool import get_connection_pool
+
+SHELVES = 3
+PSUS_PER_SHELF = 2
+
+
+def _free_port():
+    """Find a free TCP port for the farm."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ShelfCollectionTest(unittest.TestCase):
+    """collect_shelves against one virtual RSCM with three shelves of two PSUs."""
+
+    def setUp(self):
+        self.profile = FarmProfile(latency="fixed:0", waveform="constant", base_watts=9000.0,
+                                   shelves=SHELVES, psus_per_shelf=PSUS_PER_SHELF, seed=1)
+        self.farm = RSCMFarm(1, self.profile, port=_free_port(), mode="multi-port")
+        self.farm.start_in_thread()
+        self.address = self.farm.addresses[0]
+        self.client = RedfishAPIClient(negotiation_cache=NegotiationCache(), health_tracker=HostHealthTracker(),
+                                       shelf_cache=ShelfDiscoveryCache())
+
+    def tearDown(self):
+        self.farm.stop_thread()
+
+    def run_calls(self, *calls):
+        """Run coroutine functions one after the other on one loop; return their results."""
+        async def run():
+            try:
+                return [await call() for call in calls]
+            finally:
+                await get_connection_pool().close_loop_session()
+        return asyncio.run(run())
+
+    def collect(self):
+        return self.client.collect_shelves(self.address, self.profile.username, self.profile.password)
+
+    def test_discovers_every_shelf_and_psu(self):
+        (success, records), = self.run_calls(self.collect)
+        self.assertTrue(success)
+        self.assertEqual(sorted(record['shelf_id'] for record in records), ["1", "2", "3"])
+        for record in records:
+            self.assertEqual(record['metrics']['TotalInputPowerInWatts'], 3000.0)
+            self.assertIn("PSU.1.InputPowerWatts.Reading", record['metrics'])
+            self.assertIn("PSU.2.InputPowerWatts.Reading", record['metrics'])
+        shelves = self.client.shelf_cache.get(self.address)
+        self.assertEqual(len(shelves), SHELVES)
+        self.assertTrue(all(len(shelf['power_supplies']) == PSUS_PER_SHELF for shelf in shelves))
+
+    def test_later_cycles_reuse_discovery(self):
+        async def second_cycle():
+            self.farm.reset_stats()
+            return await self.collect()
+        _, (success, records) = self.run_calls(self.collect, second_cycle)
+        self.assertTrue(success)
+        self.assertEqual(len(records), SHELVES)
+        # Only the meters and PSUs; no collection or shelf resources
+        self.assertEqual(self.farm.get_stats()['requests'], SHELVES * (1 + PSUS_PER_SHELF))
+
+    def test_rediscovers_after_not_found(self):
+        async def shrink():
+            self.profile.shelves = 2
+            return await self.collect()
+        _, (stale_success, _), (success, records) = self.run_calls(self.collect, shrink, self.collect)
+        # Shelf 3 answered 404: no complete reading, and the tree is rediscovered
+        self.assertFalse(stale_success)
+        self.assertTrue(success)
+        self.assertEqual(sorted(record['shelf_id'] for record in records), ["1", "2"])
+        self.assertEqual(len(self.client.shelf_cache.get(self.address)), 2)
+
+    def test_failed_shelf_gives_no_rack_total(self):
+        monitor = RackPowerMonitor(collection_mode="shelves")
+        monitor.api_client = self.client
+
+        async def poll():
+            return await monitor._collect_shelves_call(self.address, self.profile.username, self.profile.password)
+
+        async def poll_with_failure():
+            self.profile.failed_shelves = {2}
+            return await poll()
+
+        (success, power, records), (failed_success, failed_power, failed_records) = \
+            self.run_calls(poll, poll_with_failure)
+        self.assertTrue(success)
+        self.assertEqual(power, 9000.0)
+        self.assertEqual(len(records), SHELVES)
+
+        self.assertFalse(failed_success)
+        self.assertIsNone(failed_power)
+        # The shelves that answered, and the PSUs of the failed one, are still recorded
+        by_shelf = {record['shelf_id']: record['metrics'] for record in failed_records}
+        self.assertEqual(by_shelf["1"]['TotalInputPowerInWatts'], 3000.0)
+        self.assertEqual(by_shelf["3"]['TotalInputPowerInWatts'], 3000.0)
+        self.assertNotIn('TotalInputPowerInWatts', by_shelf["2"])
+        self.assertIn("PSU.1.InputPowerWatts.Reading", by_shelf["2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+"""
+Tests for the quantile sketch against exact percentiles.
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# Set up proper paths (same layout as run.py)
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(base_dir, "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from rack_power_monitor.core.sketch import QuantileSketch
+
+QUANTILES = (0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 0.999, 1.0)
+
+
+class SketchTestCase(unittest.TestCase):
+    """Compares sketch estimates to numpy.percentile."""
+
+    relative_accuracy = 0.01
+
+    def setUp(self):
+        self.rng = np.random.default_rng(7)
+
+    def power_readings(self, n):
+        """Rack-like readings spanning three orders of magnitude, with a few idle zeros."""
+        values = self.rng.lognormal(mean=8.5, sigma=1.0, size=n)
+        values[self.rng.random(n) < 0.01] = 0.0
+        return values
+
+    def assert_within_bound(self, sketch, values, qs=QUANTILES):
+        # The sketch ranks like numpy's 'lower' method: the reading at floor(q * (n - 1))
+        exact = np.percentile(values, np.array(qs) * 100, method='lower')
+        for q, estimate, true in zip(qs, sketch.quantiles(qs), exact):
+            self.assertLessEqual(abs(estimate - true), self.relative_accuracy * abs(true) * (1 + 1e-9) + 1e-12,
+                                 f"q={q}: {estimate} vs {true}")
+
+
+class QuantileTest(SketchTestCase):
+    """Single sketches stay within the relative accuracy."""
+
+    def test_add_many(self):
+        values = self.power_readings(50000)
+        sketch = QuantileSketch(self.relative_accuracy)
+        sketch.add_many(values)
+        self.assertEqual(len(sketch), len(values))
+        self.assert_within_bound(sketch, values)
+
+    def test_add_matches_add_many(self):
+        values = self.power_readings(2000)
+        one_by_one = QuantileSketch(self.relative_accuracy)
+        for value in values:
+            one_by_one.add(value)
+        at_once = QuantileSketch(self.relative_accuracy)
+        at_once.add_many(values)
+        self.assertEqual(one_by_one.to_bytes(), at_once.to_bytes())
+
+    def test_negative_values(self):
+        values = self.rng.normal(0, 500, size=20000)
+        sketch = QuantileSketch(self.relative_accuracy)
+        sketch.add_many(values)
+        self.assert_within_bound(sketch, values)
+
+    def test_coarser_accuracy(self):
+        self.relative_accuracy = 0.05
+        values = self.power_readings(20000)
+        sketch = QuantileSketch(self.relative_accuracy)
+        sketch.add_many(values)
+        self.assert_within_bound(sketch, values)
+
+    def test_nan_is_ignored(self):
+        sketch = QuantileSketch(self.relative_accuracy)
+        sketch.add_many([100.0, np.nan, 300.0])
+        self.assertEqual(len(sketch), 2)
+        self.assert_within_bound(sketch, [100.0, 300.0])
+
+    def test_empty(self):
+        self.assertEqual(QuantileSketch().quantiles((0.5, 0.99)), [None, None])
+
+    def test_round_trip(self):
+        values = self.power_readings(5000)
+        values[:50] *= -1
+        sketch = QuantileSketch(self.relative_accuracy)
+        sketch.add_many(values)
+        copy = QuantileSketch.from_bytes(sketch.to_bytes())
+        self.assertEqual(len(copy), len(sketch))
+        self.assertEqual(copy.quantiles(QUANTILES), sketch.quantiles(QUANTILES))
+
+
+class MergeTest(SketchTestCase):
+    """Merged sketches estimate like one sketch of all the values."""
+
+    def test_merged_equals_unmerged(self):
+        values = self.power_readings(30000)
+        whole = QuantileSketch(self.relative_accuracy)
+        whole.add_many(values)
+        parts = []
+        for chunk in np.array_split(values, 24):
+            part = QuantileSketch(self.relative_accuracy)
+            part.add_many(chunk)
+            parts.append(part)
+        merged = QuantileSketch.merged(parts, self.relative_accuracy)
+        self.assertEqual(len(merged), len(values))
+        self.assertEqual(merged.quantiles(QUANTILES), whole.quantiles(QUANTILES))
+        self.assert_within_bound(merged, values)
+
+    def test_merge_racks_of_different_load(self):
+        racks = [self.rng.normal(load, load * 0.05, size=3000) for load in (2000, 6000, 15000)]
+        merged = QuantileSketch.merged([self.sketch_of(rack) for rack in racks], self.relative_accuracy)
+        self.assert_within_bound(merged, np.concatenate(racks))
+
+    def test_merge_needs_same_accuracy(self):
+        with self.assertRaises(ValueError):
+            QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+    def test_bucketed_matches_separate_sketches(self):
+        groups = [self.power_readings(n) for n in (1, 0, 500, 37, 2000)]
+        groups[1] = np.empty(0)
+        sketches = QuantileSketch.bucketed(np.concatenate(groups), [len(g) for g in groups],
+                                           self.relative_accuracy)
+        self.assertEqual(len(sketches), len(groups))
+        for sketch, group in zip(sketches, groups):
+            self.assertEqual(sketch.to_bytes(), self.sketch_of(group).to_bytes())
+            if len(group):
+                self.assert_within_bound(sketch, group)
+
+    def test_sliding_window(self):
+        values = self.power_readings(6000)
+        window = 1000
+        sketch = QuantileSketch(self.relative_accuracy)
+        for i, value in enumerate(values):
+            sketch.add(value)
+            if i >= window:
+                sketch.remove(values[i - window])
+            if i % 997 == 0:
+                self.assert_within_bound(sketch, values[max(0, i - window + 1):i + 1])
+
+    def sketch_of(self, values):
+        sketch = QuantileSketch(self.relative_accuracy)
+        sketch.add_many(values)
+        return sketch
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Tests for the SQLite reading store.
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Set up proper paths (same layout as run.py)
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(base_dir, "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from rack_power_monitor.core.sqlite_store import SQLiteStore
+
+
+class ReplacedReadingsTest(unittest.TestCase):
+    """A second reading for the same rack and second replaces the first everywhere."""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp(prefix="rpm-test-sqlite-")
+        self.store = SQLiteStore(os.path.join(self.data_dir, "test.db"))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def assert_replaced(self, source=None):
+        summary = self.store.summarize("RACK1")
+        self.assertEqual(summary['count'], 2)
+        self.assertEqual(summary['max'], 300)
+        self.assertAlmostEqual(summary['mean'], 200)
+        # 60 s between 100 W and 300 W
+        self.assertAlmostEqual(summary['energy_wh'], 200 * 60 / 3600)
+        self.assertEqual(self.store.read_sketch(["RACK1"]).count, 2)
+        if source is not None:
+            sessions = self.store.list_sessions("RACK1")
+            self.assertEqual(sum(session['reading_count'] for session in sessions), 2)
+
+    def test_replaced_in_later_batch(self):
+        self.store.append("RACK1", [1000, 1060], [100, 200])
+        self.store.flush()
+        self.store.append("RACK1", [1060], [300])
+        self.store.flush()
+        self.assert_replaced()
+
+    def test_replaced_in_same_batch(self):
+        self.store.append("RACK1", [1000, 1060, 1060], [100, 200, 300])
+        self.store.flush()
+        self.assert_replaced()
+
+    def test_session_counts(self):
+        first = os.path.join(self.data_dir, "first.csv")
+        second = os.path.join(self.data_dir, "second.csv")
+        self.store.append("RACK1", [1000, 1060], [100, 200], source=first)
+        self.store.flush()
+        self.store.append("RACK1", [1060], [300], source=second)
+        self.store.flush()
+        self.assert_replaced(source=second)
+        counts = {session['file_name']: session['reading_count'] for session in self.store.list_sessions("RACK1")}
+        self.assertEqual(counts, {"first.csv": 1, "second.csv": 1})
+
+    def test_later_readings_still_added(self):
+        self.store.append("RACK1", [1000, 1060], [100, 200])
+        self.store.flush()
+        # Replaces one reading and adds one on the next day
+        self.store.append("RACK1", [1060, 1000 + 86400], [300, 400])
+        self.store.flush()
+        summary = self.store.summarize("RACK1")
+        self.assertEqual(summary['count'], 3)
+        self.assertEqual(summary['max'], 400)
+        self.assertEqual(self.store.read_sketch(["RACK1"]).count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Tests for the sliding-window statistics against brute force over the window.
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+from collections import Counter, deque
+
+import numpy as np
+
+# Set up proper paths (same layout as run.py)
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+src_dir = os.path.join(base_dir, "src")
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from rack_power_monitor.core.streaming_stats import StreamingStats, MODE_DECIMALS
+from rack_power_monitor.core.sketch import DEFAULT_RELATIVE_ACCURACY
+
+
+class WindowTest(unittest.TestCase):
+    """Statistics of a sliding window match those computed from the window itself."""
+
+    def setUp(self):
+        self.rng = np.random.default_rng(11)
+
+    def readings(self, n):
+        """Noisy load with ramps up and down (which stress the min/max deques) and repeated values."""
+        ramp = np.concatenate([np.linspace(3000, 9000, n // 4), np.linspace(9000, 2000, n // 4)])
+        load = np.resize(ramp, n) + self.rng.normal(0, 150, size=n)
+        # Meters report in half watts, so modes repeat
+        return np.round(load * 2) / 2
+
+    def run_window(self, values, size, check_every=1, stats=None, window=None):
+        stats = StreamingStats() if stats is None else stats
+        window = deque() if window is None else window
+        for i, value in enumerate(values):
+            stats.add(value)
+            window.append(value)
+            if len(window) > size:
+                stats.remove(window.popleft())
+            if i % check_every == 0:
+                self.assert_matches(stats.snapshot(), list(window))
+        return stats, window
+
+    def assert_matches(self, snapshot, window):
+        self.assertEqual(snapshot['count'], len(window))
+        self.assertEqual(snapshot['current'], window[-1])
+        self.assertEqual(snapshot['min'], min(window))
+        self.assertEqual(snapshot['max'], max(window))
+        self.assertAlmostEqual(snapshot['avg'], float(np.mean(window)), delta=1e-6 * max(window))
+        self.assertAlmostEqual(snapshot['std'], float(np.std(window)), delta=1e-6 * max(window))
+
+        counts = Counter(round(value, MODE_DECIMALS) for value in window)
+        top = max(counts.values())
+        self.assertEqual(snapshot['mode_count'], top)
+        self.assertEqual(counts[snapshot['mode']], top)
+
+        for label, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+            true = float(np.percentile(window, q * 100, method='lower'))
+            self.assertLessEqual(abs(snapshot[label] - true), DEFAULT_RELATIVE_ACCURACY * abs(true) * (1 + 1e-9))
+
+    def test_small_window(self):
+        self.run_window(self.readings(3000), size=7)
+
+    def test_large_window(self):
+        self.run_window(self.readings(20000), size=1440, check_every=251)
+
+    def test_monotonic_runs(self):
+        # Strictly rising then falling: every reading replaces the deque's back, or none does
+        values = np.concatenate([np.arange(0, 500, 1.0), np.arange(500, 0, -1.0), np.full(200, 250.0)])
+        self.run_window(values, size=60)
+
+    def test_mode_follows_removals(self):
+        stats, _ = self.run_window([5.0, 5.0, 5.0, 7.0, 7.0, 9.0], size=6)
+        self.assertEqual(stats.snapshot()['mode'], 5.0)
+        stats.remove(5.0)
+        stats.remove(5.0)
+        snapshot = stats.snapshot()
+        self.assertEqual((snapshot['mode'], snapshot['mode_count']), (7.0, 2))
+        self.assertEqual(snapshot['min'], 5.0)
+
+    def test_emptied_window(self):
+        stats, window = self.run_window(self.readings(50), size=10)
+        while window:
+            stats.remove(window.popleft())
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot['count'], 0)
+        self.assertIsNone(snapshot['min'])
+        self.assertIsNone(snapshot['mode'])
+        self.assertIsNone(snapshot['p50'])
+        # And it fills up again
+        self.run_window(self.readings(100), size=10, stats=stats, window=window)
+
+
+if __name__ == "__main__":
+    unittest.main()